@@ -0,0 +1,13 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2023 The HuggingFace Authors.
+
+{{- define "envHttpClient" -}}
+- name: HTTP_CLIENT_CIRCUIT_BREAKER_FAILURE_THRESHOLD
+  value: {{ .Values.httpClient.circuitBreakerFailureThreshold | quote }}
+- name: HTTP_CLIENT_CIRCUIT_BREAKER_RESET_SECONDS
+  value: {{ .Values.httpClient.circuitBreakerResetSeconds | quote }}
+- name: HTTP_CLIENT_MAX_CONNECTIONS_PER_HOST
+  value: {{ .Values.httpClient.maxConnectionsPerHost | quote }}
+- name: HTTP_CLIENT_SLOW_CALL_SECONDS
+  value: {{ .Values.httpClient.slowCallSeconds | quote }}
+{{- end -}}
@@ -14,6 +14,14 @@
     value: {{ .Values.cacheMaintenance.action | quote }}
   - name: CACHE_MAINTENANCE_BACKFILL_ERROR_CODES_TO_RETRY
     value: {{ .Values.cacheMaintenance.backfill.error_codes_to_retry | quote }}
+  - name: CACHE_MAINTENANCE_BACKFILL_MAX_CREATED_JOBS_PER_SECOND
+    value: {{ .Values.cacheMaintenance.backfill.max_created_jobs_per_second | quote }}
+  - name: CACHE_MAINTENANCE_BACKFILL_NUM_WORKERS
+    value: {{ .Values.cacheMaintenance.backfill.num_workers | quote }}
+  - name: CACHE_MAINTENANCE_BACKFILL_RESUME
+    value: {{ .Values.cacheMaintenance.backfill.resume | quote }}
+  - name: CACHE_MAINTENANCE_BACKFILL_SKIP_UP_TO_DATE_DATASETS
+    value: {{ .Values.cacheMaintenance.backfill.skip_up_to_date_datasets | quote }}
   - name: LOG_LEVEL
     value: {{ .Values.cacheMaintenance.log.level | quote }}
   securityContext:
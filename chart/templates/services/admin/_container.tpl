@@ -12,6 +12,7 @@
   {{ include "envQueue" . | nindent 2 }}
   {{ include "envCommon" . | nindent 2 }}
   {{ include "envLog" . | nindent 2 }}
+  {{ include "envHttpClient" . | nindent 2 }}
   {{ include "envMetrics" . | nindent 2 }}
   # service
   - name: ADMIN_HF_ORGANIZATION
@@ -12,8 +12,13 @@
   {{ include "envQueue" . | nindent 2 }}
   {{ include "envCommon" . | nindent 2 }}
   {{ include "envLog" . | nindent 2 }}
+  {{ include "envHttpClient" . | nindent 2 }}
   {{ include "envNumba" . | nindent 2 }}
   # service
+  - name: API_AUTH_CACHE_MAX_SIZE
+    value: {{ .Values.api.authCacheMaxSize | quote }}
+  - name: API_AUTH_CACHE_TTL_SECONDS
+    value: {{ .Values.api.authCacheTtlSeconds | quote }}
   - name: API_HF_AUTH_PATH
     value: {{ .Values.api.hfAuthPath | quote }}
   - name: API_HF_JWT_PUBLIC_KEY_URL
@@ -36,6 +41,16 @@
     value: {{ .Values.api.maxAgeLong | quote }}
   - name: API_MAX_AGE_SHORT
     value: {{ .Values.api.maxAgeShort | quote }}
+  - name: API_RESPONSE_CACHE_MAX_BYTES
+    value: {{ .Values.api.responseCacheMaxBytes | quote }}
+  - name: API_VALID_DATASETS_MAX_AGE_SECONDS
+    value: {{ .Values.api.validDatasetsMaxAgeSeconds | quote }}
+  - name: API_WEBHOOK_CONSUMER_INTERVAL_SECONDS
+    value: {{ .Values.api.webhookConsumerIntervalSeconds | quote }}
+  - name: API_WEBHOOK_DEBOUNCE_SECONDS
+    value: {{ .Values.api.webhookDebounceSeconds | quote }}
+  - name: API_WEBHOOK_MAX_WAIT_SECONDS
+    value: {{ .Values.api.webhookMaxWaitSeconds | quote }}
   # prometheus
   - name: PROMETHEUS_MULTIPROC_DIR
     value:  {{ .Values.api.prometheusMultiprocDirectory | quote }}
@@ -2,12 +2,182 @@
 # Copyright 2022 The HuggingFace Authors.
 
 import logging
-from typing import List, Optional
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import List, NamedTuple, Optional, Sequence, Set, Tuple
 
 from libcommon.dataset import get_supported_dataset_infos
-from libcommon.orchestrator import DatasetOrchestrator
+from libcommon.log import init_logging
+from libcommon.metrics import BackfillProgressMetric
+from libcommon.orchestrator import DatasetOrchestrator, get_up_to_date_datasets
 from libcommon.processing_graph import ProcessingGraph
-from libcommon.utils import Priority
+from libcommon.resources import MongoResource
+from libcommon.utils import Priority, get_datetime
+
+LOG_BATCH = 100
+# ^ the progress is logged, and the checkpoint is saved, every LOG_BATCH analyzed datasets
+FRESHNESS_BATCH = 10_000
+# ^ number of datasets checked by every aggregation on the cache, to find the up-to-date datasets
+
+DatasetRevision = Tuple[str, str]
+# ^ (dataset, revision)
+
+
+class BackfillReport(NamedTuple):
+    analyzed_datasets: int
+    backfilled_datasets: int
+    created_jobs: int
+
+
+def get_shard(dataset: str, num_shards: int) -> int:
+    """Get the shard of a dataset. Unlike hash(), the result does not change between processes or runs."""
+    return zlib.crc32(dataset.encode("utf-8")) % num_shards
+
+
+def get_shards(dataset_revisions: Sequence[DatasetRevision], num_shards: int) -> List[List[DatasetRevision]]:
+    """Split the datasets into shards, by dataset hash. The datasets of every shard are sorted by name."""
+    shards: List[List[DatasetRevision]] = [[] for _ in range(num_shards)]
+    for dataset, revision in dataset_revisions:
+        shards[get_shard(dataset=dataset, num_shards=num_shards)].append((dataset, revision))
+    return [sorted(shard) for shard in shards]
+
+
+def filter_up_to_date_datasets(
+    dataset_revisions: List[DatasetRevision],
+    processing_graph: ProcessingGraph,
+    error_codes_to_retry: Optional[List[str]] = None,
+) -> List[DatasetRevision]:
+    """Remove the datasets whose cache is up to date (see libcommon.orchestrator.get_up_to_date_datasets)."""
+    up_to_date_datasets: Set[str] = set()
+    for start in range(0, len(dataset_revisions), FRESHNESS_BATCH):
+        up_to_date_datasets.update(
+            get_up_to_date_datasets(
+                dataset_revisions=dict(dataset_revisions[start : start + FRESHNESS_BATCH]),
+                processing_graph=processing_graph,
+                error_codes_to_retry=error_codes_to_retry,
+            )
+        )
+    logging.info(f"{len(up_to_date_datasets)} datasets are up to date, they are skipped")
+    return [(dataset, revision) for dataset, revision in dataset_revisions if dataset not in up_to_date_datasets]
+
+
+def get_checkpoint(shard: int, num_shards: int, total_datasets: int, resume: bool) -> BackfillProgressMetric:
+    """Get the checkpoint of an unfinished backfill of the shard if resume is True, or start a new one."""
+    checkpoint = BackfillProgressMetric.objects(shard=shard, num_shards=num_shards).first()
+    if checkpoint is not None and resume and checkpoint.finished_at is None:
+        logging.info(
+            f"resume the backfill of shard {shard}/{num_shards} after dataset {checkpoint.last_dataset}"
+            f" ({checkpoint.analyzed_datasets} analyzed datasets)"
+        )
+        checkpoint.total_datasets = total_datasets
+        return checkpoint
+    if checkpoint is None:
+        checkpoint = BackfillProgressMetric(shard=shard, num_shards=num_shards)
+    now = get_datetime()
+    checkpoint.last_dataset = None
+    checkpoint.total_datasets = total_datasets
+    checkpoint.analyzed_datasets = 0
+    checkpoint.backfilled_datasets = 0
+    checkpoint.created_jobs = 0
+    checkpoint.started_at = now
+    checkpoint.updated_at = now
+    checkpoint.finished_at = None
+    checkpoint.save()
+    return checkpoint
+
+
+def backfill_shard(
+    shard: int,
+    num_shards: int,
+    dataset_revisions: List[DatasetRevision],
+    processing_graph: ProcessingGraph,
+    error_codes_to_retry: Optional[List[str]] = None,
+    max_created_jobs_per_second: Optional[float] = None,
+    resume: bool = True,
+) -> BackfillReport:
+    """Backfill the datasets of a shard, in order, and save the progress (also used as a checkpoint).
+
+    Args:
+        shard (int): index of the shard
+        num_shards (int): number of shards
+        dataset_revisions (List[DatasetRevision]): the datasets of the shard, and their revision, sorted by name
+        processing_graph (ProcessingGraph): the processing graph
+        error_codes_to_retry (List[str], optional): the error codes for which the jobs should be retried
+        max_created_jobs_per_second (float, optional): the maximum number of jobs created per second, for all the
+          shards. If None, no limit.
+        resume (bool): if True, and the previous backfill of the shard did not finish, skip the datasets that had
+          already been analyzed
+
+    Returns:
+        BackfillReport: the number of analyzed and backfilled datasets, and of created jobs, in the shard
+    """
+    checkpoint = get_checkpoint(
+        shard=shard, num_shards=num_shards, total_datasets=len(dataset_revisions), resume=resume
+    )
+    min_seconds_per_job = (
+        num_shards / max_created_jobs_per_second
+        if max_created_jobs_per_second is not None and max_created_jobs_per_second > 0
+        else None
+    )
+    start_time = time.monotonic()
+    created_jobs_since_start = 0
+
+    def get_log() -> str:
+        return (
+            f"shard {shard}/{num_shards}: {checkpoint.analyzed_datasets} analyzed datasets (total:"
+            f" {checkpoint.total_datasets} datasets): {checkpoint.backfilled_datasets} backfilled datasets"
+            f" ({100 * checkpoint.backfilled_datasets / max(1, checkpoint.analyzed_datasets):.2f}%), with"
+            f" {checkpoint.created_jobs} created jobs."
+        )
+
+    for dataset, revision in dataset_revisions:
+        if checkpoint.last_dataset is not None and dataset <= checkpoint.last_dataset:
+            # already analyzed before the interruption
+            continue
+        created_jobs = DatasetOrchestrator(dataset=dataset, processing_graph=processing_graph).backfill(
+            revision=revision,
+            priority=Priority.LOW,
+            error_codes_to_retry=error_codes_to_retry,
+        )
+        checkpoint.analyzed_datasets += 1
+        if created_jobs > 0:
+            checkpoint.backfilled_datasets += 1
+        checkpoint.created_jobs += created_jobs
+        checkpoint.last_dataset = dataset
+
+        logging.debug(get_log())
+        if checkpoint.analyzed_datasets % LOG_BATCH == 0:
+            logging.info(get_log())
+            checkpoint.updated_at = get_datetime()
+            checkpoint.save()
+
+        if min_seconds_per_job is not None:
+            created_jobs_since_start += created_jobs
+            delay = created_jobs_since_start * min_seconds_per_job - (time.monotonic() - start_time)
+            if delay > 0:
+                time.sleep(delay)
+
+    logging.info(get_log())
+    checkpoint.updated_at = get_datetime()
+    checkpoint.finished_at = checkpoint.updated_at
+    checkpoint.save()
+    return BackfillReport(
+        analyzed_datasets=checkpoint.analyzed_datasets,
+        backfilled_datasets=checkpoint.backfilled_datasets,
+        created_jobs=checkpoint.created_jobs,
+    )
+
+
+_mongo_resources: List[MongoResource] = []
+
+
+def init_worker(mongo_resources: List[MongoResource], log_level: int) -> None:
+    init_logging(level=log_level)
+    # The resources connect to the databases when they are unpickled in the subprocess (see MongoResource.__reduce__).
+    # Keep a reference to them during the life of the subprocess.
+    _mongo_resources.extend(mongo_resources)
 
 
 def backfill_cache(
@@ -15,27 +185,27 @@ def backfill_cache(
     hf_endpoint: str,
     hf_token: Optional[str] = None,
     error_codes_to_retry: Optional[List[str]] = None,
+    num_workers: int = 1,
+    max_created_jobs_per_second: Optional[float] = None,
+    resume: bool = True,
+    mongo_resources: Optional[List[MongoResource]] = None,
+    skip_up_to_date_datasets: bool = True,
 ) -> None:
-    logging.info("backfill supported datasets")
-    supported_dataset_infos = get_supported_dataset_infos(hf_endpoint=hf_endpoint, hf_token=hf_token)
-    logging.info(f"analyzing {len(supported_dataset_infos)} supported datasets")
-    analyzed_datasets = 0
-    backfilled_datasets = 0
-    total_created_jobs = 0
-    log_batch = 100
+    """Backfill all the supported datasets.
 
-    def get_log() -> str:
-        return (
-            f"{analyzed_datasets} analyzed datasets (total: {len(supported_dataset_infos)} datasets):"
-            f" {backfilled_datasets} backfilled datasets ({100 * backfilled_datasets / analyzed_datasets:.2f}%), with"
-            f" {total_created_jobs} created jobs."
-        )
+    If skip_up_to_date_datasets is True, the datasets whose cache is up to date are found with a few aggregations on
+    the cache, and skipped, instead of building a plan for every one of them.
 
+    The datasets are split into num_workers shards, by dataset hash. If num_workers is more than 1, the shards are
+    backfilled in parallel, in subprocesses that connect to the databases with mongo_resources.
+    """
+    if num_workers < 1:
+        raise ValueError(f"num_workers must be at least 1, got {num_workers}")
+    logging.info("backfill supported datasets")
+    supported_dataset_infos = get_supported_dataset_infos(hf_endpoint=hf_endpoint, hf_token=hf_token)
+    dataset_revisions: List[DatasetRevision] = []
     for dataset_info in supported_dataset_infos:
-        analyzed_datasets += 1
-
-        dataset = dataset_info.id
-        if not dataset:
+        if not dataset_info.id:
             logging.warning(f"dataset id not found for {dataset_info}")
             # should not occur
             continue
@@ -43,19 +213,56 @@ def backfill_cache(
             logging.warning(f"dataset revision not found for {dataset_info}")
             # should not occur
             continue
-        dataset_orchestrator = DatasetOrchestrator(dataset=dataset, processing_graph=processing_graph)
-        created_jobs = dataset_orchestrator.backfill(
-            revision=str(dataset_info.sha),
-            priority=Priority.LOW,
+        dataset_revisions.append((dataset_info.id, str(dataset_info.sha)))
+    if skip_up_to_date_datasets:
+        dataset_revisions = filter_up_to_date_datasets(
+            dataset_revisions=dataset_revisions,
+            processing_graph=processing_graph,
             error_codes_to_retry=error_codes_to_retry,
         )
-        if created_jobs > 0:
-            backfilled_datasets += 1
-        total_created_jobs += created_jobs
+    shards = get_shards(dataset_revisions=dataset_revisions, num_shards=num_workers)
+    logging.info(f"analyzing {len(dataset_revisions)} supported datasets, in {num_workers} shard(s)")
 
-        logging.debug(get_log())
-        if analyzed_datasets % log_batch == 0:
-            logging.info(get_log())
+    if num_workers == 1:
+        reports = [
+            backfill_shard(
+                shard=0,
+                num_shards=1,
+                dataset_revisions=shards[0],
+                processing_graph=processing_graph,
+                error_codes_to_retry=error_codes_to_retry,
+                max_created_jobs_per_second=max_created_jobs_per_second,
+                resume=resume,
+            )
+        ]
+    else:
+        if mongo_resources is None:
+            raise ValueError("mongo_resources is required to backfill in parallel")
+        # spawn, not fork: the mongo clients must not be shared with the subprocesses
+        with ProcessPoolExecutor(
+            max_workers=num_workers,
+            mp_context=get_context("spawn"),
+            initializer=init_worker,
+            initargs=(mongo_resources, logging.getLogger().getEffectiveLevel()),
+        ) as executor:
+            futures = [
+                executor.submit(
+                    backfill_shard,
+                    shard=shard,
+                    num_shards=num_workers,
+                    dataset_revisions=dataset_revisions_in_shard,
+                    processing_graph=processing_graph,
+                    error_codes_to_retry=error_codes_to_retry,
+                    max_created_jobs_per_second=max_created_jobs_per_second,
+                    resume=resume,
+                )
+                for shard, dataset_revisions_in_shard in enumerate(shards)
+            ]
+            reports = [future.result() for future in futures]
 
-    logging.info(get_log())
+    logging.info(
+        f"{sum(report.analyzed_datasets for report in reports)} analyzed datasets:"
+        f" {sum(report.backfilled_datasets for report in reports)} backfilled datasets, with"
+        f" {sum(report.created_jobs for report in reports)} created jobs."
+    )
     logging.info("backfill completed")
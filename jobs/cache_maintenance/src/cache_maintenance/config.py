@@ -15,19 +15,36 @@ from libcommon.config import (
 )
 
 CACHE_MAINTENANCE_BACKFILL_ERROR_CODES_TO_RETRY = None
+CACHE_MAINTENANCE_BACKFILL_MAX_CREATED_JOBS_PER_SECOND = None
+CACHE_MAINTENANCE_BACKFILL_NUM_WORKERS = 1
+CACHE_MAINTENANCE_BACKFILL_RESUME = True
+CACHE_MAINTENANCE_BACKFILL_SKIP_UP_TO_DATE_DATASETS = True
 
 
 @dataclass(frozen=True)
 class BackfillConfig:
     error_codes_to_retry: Optional[List[str]] = CACHE_MAINTENANCE_BACKFILL_ERROR_CODES_TO_RETRY
+    max_created_jobs_per_second: Optional[float] = CACHE_MAINTENANCE_BACKFILL_MAX_CREATED_JOBS_PER_SECOND
+    num_workers: int = CACHE_MAINTENANCE_BACKFILL_NUM_WORKERS
+    resume: bool = CACHE_MAINTENANCE_BACKFILL_RESUME
+    skip_up_to_date_datasets: bool = CACHE_MAINTENANCE_BACKFILL_SKIP_UP_TO_DATE_DATASETS
 
     @classmethod
     def from_env(cls) -> "BackfillConfig":
         env = Env(expand_vars=True)
 
-        return cls(
-            error_codes_to_retry=env.list(name="CACHE_MAINTENANCE_BACKFILL_ERROR_CODES_TO_RETRY", default=""),
-        )
+        with env.prefixed("CACHE_MAINTENANCE_BACKFILL_"):
+            return cls(
+                error_codes_to_retry=env.list(name="ERROR_CODES_TO_RETRY", default=""),
+                max_created_jobs_per_second=env.float(
+                    name="MAX_CREATED_JOBS_PER_SECOND", default=CACHE_MAINTENANCE_BACKFILL_MAX_CREATED_JOBS_PER_SECOND
+                ),
+                num_workers=env.int(name="NUM_WORKERS", default=CACHE_MAINTENANCE_BACKFILL_NUM_WORKERS),
+                resume=env.bool(name="RESUME", default=CACHE_MAINTENANCE_BACKFILL_RESUME),
+                skip_up_to_date_datasets=env.bool(
+                    name="SKIP_UP_TO_DATE_DATASETS", default=CACHE_MAINTENANCE_BACKFILL_SKIP_UP_TO_DATE_DATASETS
+                ),
+            )
 
 
 CACHE_MAINTENANCE_ACTION = None
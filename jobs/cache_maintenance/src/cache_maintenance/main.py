@@ -16,12 +16,13 @@ from libcommon.resources import (
 from cache_maintenance.backfill import backfill_cache
 from cache_maintenance.config import JobConfig
 from cache_maintenance.metrics import collect_metrics
+from cache_maintenance.valid_datasets import update_valid_datasets
 
 
 def run_job() -> None:
     job_config = JobConfig.from_env()
     action = job_config.action
-    supported_actions = ["backfill", "collect-metrics", "skip"]
+    supported_actions = ["backfill", "collect-metrics", "skip", "update-valid-datasets"]
     #  In the future we will support other kind of actions
     if not action:
         logging.warning("No action mode was selected, skipping tasks.")
@@ -62,9 +63,16 @@ def run_job() -> None:
                 hf_endpoint=job_config.common.hf_endpoint,
                 hf_token=job_config.common.hf_token,
                 error_codes_to_retry=job_config.backfill.error_codes_to_retry,
+                num_workers=job_config.backfill.num_workers,
+                max_created_jobs_per_second=job_config.backfill.max_created_jobs_per_second,
+                resume=job_config.backfill.resume,
+                mongo_resources=[cache_resource, queue_resource, metrics_resource],
+                skip_up_to_date_datasets=job_config.backfill.skip_up_to_date_datasets,
             )
         elif action == "collect-metrics":
             collect_metrics(processing_graph=processing_graph)
+        elif action == "update-valid-datasets":
+            update_valid_datasets(processing_graph=processing_graph)
 
         end_time = datetime.now()
         logging.info(f"Duration: {end_time - start_time}")
@@ -0,0 +1,23 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2023 The HuggingFace Authors.
+
+import logging
+
+from libcommon.processing_graph import ProcessingGraph
+from libcommon.simple_cache import update_valid_datasets_snapshot
+
+
+def update_valid_datasets(processing_graph: ProcessingGraph) -> None:
+    logging.info("updating the lists of valid datasets")
+    content = update_valid_datasets_snapshot(
+        viewer_kinds=[
+            processing_step.cache_kind for processing_step in processing_graph.get_processing_steps_enables_viewer()
+        ],
+        preview_kinds=[
+            processing_step.cache_kind for processing_step in processing_graph.get_processing_steps_enables_preview()
+        ],
+    )
+    logging.info(
+        f"the lists of valid datasets have been updated: {len(content['valid'])} valid datasets, of which"
+        f" {len(content['viewer'])} support the viewer"
+    )
@@ -0,0 +1,75 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2023 The HuggingFace Authors.
+
+from typing import List
+
+from libcommon.metrics import BackfillProgressMetric
+from libcommon.processing_graph import ProcessingGraph
+from libcommon.queue import Queue
+from libcommon.utils import Status
+
+from cache_maintenance.backfill import backfill_shard, get_shard, get_shards
+
+PROCESSING_STEP_NAME = "dataset-step"
+PROCESSING_GRAPH = ProcessingGraph(
+    processing_graph_specification={PROCESSING_STEP_NAME: {"input_type": "dataset", "job_runner_version": 1}}
+)
+DATASET_REVISIONS = [("dataset_a", "revision"), ("dataset_b", "revision"), ("dataset_c", "revision")]
+
+
+def get_waiting_datasets() -> List[str]:
+    return sorted(
+        job["dataset"]
+        for job in Queue().get_dump_by_pending_status(job_type=PROCESSING_STEP_NAME)[Status.WAITING.value]
+    )
+
+
+def test_get_shards() -> None:
+    dataset_revisions = [(f"dataset_{i}", "revision") for i in range(100)]
+    shards = get_shards(dataset_revisions=dataset_revisions, num_shards=4)
+    assert len(shards) == 4
+    assert sorted(dataset_revision for shard in shards for dataset_revision in shard) == sorted(dataset_revisions)
+    for index, shard in enumerate(shards):
+        assert shard == sorted(shard)
+        assert all(get_shard(dataset=dataset, num_shards=4) == index for dataset, _ in shard)
+    # the hash is stable
+    assert get_shard(dataset="dataset_0", num_shards=4) == get_shard(dataset="dataset_0", num_shards=4)
+
+
+def test_backfill_shard() -> None:
+    report = backfill_shard(
+        shard=0, num_shards=1, dataset_revisions=DATASET_REVISIONS, processing_graph=PROCESSING_GRAPH
+    )
+
+    assert report.analyzed_datasets == 3
+    assert report.backfilled_datasets == 3
+    assert report.created_jobs == 3
+    assert get_waiting_datasets() == ["dataset_a", "dataset_b", "dataset_c"]
+    checkpoint = BackfillProgressMetric.objects(shard=0, num_shards=1).get()
+    assert checkpoint.last_dataset == "dataset_c"
+    assert checkpoint.total_datasets == 3
+    assert checkpoint.analyzed_datasets == 3
+    assert checkpoint.finished_at is not None
+
+
+def test_backfill_shard_resume() -> None:
+    # a previous backfill has been interrupted after dataset_a
+    BackfillProgressMetric(
+        shard=0, num_shards=1, last_dataset="dataset_a", total_datasets=3, analyzed_datasets=1
+    ).save()
+
+    report = backfill_shard(
+        shard=0, num_shards=1, dataset_revisions=DATASET_REVISIONS, processing_graph=PROCESSING_GRAPH
+    )
+
+    assert report.analyzed_datasets == 3
+    assert report.created_jobs == 2
+    assert get_waiting_datasets() == ["dataset_b", "dataset_c"]
+
+    # the backfill is finished: the next one starts over (only dataset_a has no pending job)
+    report = backfill_shard(
+        shard=0, num_shards=1, dataset_revisions=DATASET_REVISIONS, processing_graph=PROCESSING_GRAPH
+    )
+    assert report.analyzed_datasets == 3
+    assert report.created_jobs == 1
+    assert get_waiting_datasets() == ["dataset_a", "dataset_b", "dataset_c"]
@@ -0,0 +1,39 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2023 The HuggingFace Authors.
+
+import json
+from http import HTTPStatus
+
+from libcommon.processing_graph import ProcessingGraph
+from libcommon.simple_cache import get_valid_datasets_snapshot, upsert_response
+
+from cache_maintenance.valid_datasets import update_valid_datasets
+
+
+def test_update_valid_datasets() -> None:
+    viewer_step_name = "viewer_step"
+    preview_step_name = "preview_step"
+    processing_graph = ProcessingGraph(
+        processing_graph_specification={
+            viewer_step_name: {"input_type": "dataset", "enables_viewer": True},
+            preview_step_name: {"input_type": "dataset", "enables_preview": True},
+        }
+    )
+    viewer_kind = processing_graph.get_processing_step(viewer_step_name).cache_kind
+    preview_kind = processing_graph.get_processing_step(preview_step_name).cache_kind
+    upsert_response(kind=viewer_kind, dataset="dataset_a", content={}, http_status=HTTPStatus.OK)
+    upsert_response(kind=preview_kind, dataset="dataset_a", content={}, http_status=HTTPStatus.OK)
+    upsert_response(kind=preview_kind, dataset="dataset_b", content={}, http_status=HTTPStatus.OK)
+    upsert_response(kind=viewer_kind, dataset="dataset_c", content={}, http_status=HTTPStatus.NOT_FOUND)
+
+    assert get_valid_datasets_snapshot() is None
+
+    update_valid_datasets(processing_graph=processing_graph)
+
+    snapshot = get_valid_datasets_snapshot()
+    assert snapshot is not None
+    assert json.loads(snapshot["content_json"]) == {
+        "valid": ["dataset_a", "dataset_b"],
+        "preview": ["dataset_b"],
+        "viewer": ["dataset_a"],
+    }
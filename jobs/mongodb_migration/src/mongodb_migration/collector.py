@@ -44,6 +44,12 @@ from mongodb_migration.migrations._20230516101500_queue_job_add_revision import
 from mongodb_migration.migrations._20230516101600_queue_delete_index_without_revision import (
     MigrationQueueDeleteIndexWithoutRevision,
 )
+from mongodb_migration.migrations._20230622131500_queue_cancel_duplicate_waiting_jobs import (
+    MigrationQueueCancelDuplicateWaitingJobs,
+)
+from mongodb_migration.migrations._20230703110000_cache_compress_content import (
+    MigrationCompressCacheContent,
+)
 from mongodb_migration.renaming_migrations import (
     CacheRenamingMigration,
     QueueRenamingMigration,
@@ -222,4 +228,17 @@ class MigrationsCollector:
                 ),
                 field_name="finished_at",
             ),
+            MigrationQueueCancelDuplicateWaitingJobs(
+                version="20230622131500",
+                description=(
+                    "cancel the duplicate waiting jobs (same unicity_id) before the unique partial index is created"
+                ),
+            ),
+            MigrationCompressCacheContent(
+                version="20230703110000",
+                description=(
+                    "compress the content of the cached responses of kinds 'split-first-rows-from-streaming',"
+                    " 'split-first-rows-from-parquet' and 'config-parquet-and-info'"
+                ),
+            ),
         ]
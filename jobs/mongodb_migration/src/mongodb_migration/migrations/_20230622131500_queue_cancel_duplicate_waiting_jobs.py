@@ -0,0 +1,78 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2023 The HuggingFace Authors.
+
+import logging
+
+from libcommon.constants import QUEUE_COLLECTION_JOBS, QUEUE_MONGOENGINE_ALIAS
+from libcommon.utils import get_datetime
+from mongoengine.connection import get_db
+
+from mongodb_migration.migration import IrreversibleMigrationError, Migration
+
+waiting_status = "waiting"
+cancelled_status = "cancelled"
+normal_priority = "normal"
+
+
+# connection already occurred in the main.py (caveat: we use globals)
+class MigrationQueueCancelDuplicateWaitingJobs(Migration):
+    """Cancel the duplicate waiting jobs, before the unique partial index on 'unicity_id' is created.
+
+    For every unicity_id, only the most recent waiting job is kept. It gets the "normal" priority if any of its
+    duplicates had it.
+    """
+
+    def up(self) -> None:
+        logging.info("Cancel the duplicate waiting jobs (same unicity_id), keep the most recent one")
+        db = get_db(QUEUE_MONGOENGINE_ALIAS)
+        duplicates = db[QUEUE_COLLECTION_JOBS].aggregate(
+            [
+                {"$match": {"status": waiting_status}},
+                {"$sort": {"created_at": -1}},
+                {
+                    "$group": {
+                        "_id": "$unicity_id",
+                        "ids": {"$push": "$_id"},
+                        "priorities": {"$addToSet": "$priority"},
+                        "count": {"$sum": 1},
+                    }
+                },
+                {"$match": {"count": {"$gt": 1}}},
+            ],
+            allowDiskUse=True,
+        )
+        ids_to_cancel = []
+        ids_to_prioritize = []
+        for duplicate in duplicates:
+            ids_to_cancel.extend(duplicate["ids"][1:])
+            if normal_priority in duplicate["priorities"]:
+                ids_to_prioritize.append(duplicate["ids"][0])
+        if ids_to_prioritize:
+            db[QUEUE_COLLECTION_JOBS].update_many(
+                {"_id": {"$in": ids_to_prioritize}}, {"$set": {"priority": normal_priority}}
+            )
+        if ids_to_cancel:
+            db[QUEUE_COLLECTION_JOBS].update_many(
+                {"_id": {"$in": ids_to_cancel}},
+                {"$set": {"status": cancelled_status, "finished_at": get_datetime()}},
+            )
+        logging.info(f"{len(ids_to_cancel)} duplicate waiting jobs have been cancelled")
+
+    def down(self) -> None:
+        raise IrreversibleMigrationError("This migration does not support rollback")
+
+    def validate(self) -> None:
+        logging.info("Ensure that there is at most one waiting job per unicity_id")
+        db = get_db(QUEUE_MONGOENGINE_ALIAS)
+        duplicates = list(
+            db[QUEUE_COLLECTION_JOBS].aggregate(
+                [
+                    {"$match": {"status": waiting_status}},
+                    {"$group": {"_id": "$unicity_id", "count": {"$sum": 1}}},
+                    {"$match": {"count": {"$gt": 1}}},
+                    {"$limit": 1},
+                ]
+            )
+        )
+        if duplicates:
+            raise ValueError(f"Found duplicate waiting jobs for unicity_id {duplicates[0]['_id']}")
@@ -0,0 +1,123 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2023 The HuggingFace Authors.
+
+import json
+import logging
+from typing import Any, List
+
+from libcommon.config import ProcessingGraphConfig
+from libcommon.constants import CACHE_COLLECTION_RESPONSES, CACHE_MONGOENGINE_ALIAS
+from libcommon.processing_graph import ProcessingGraph
+from libcommon.simple_cache import (
+    CachedResponse,
+    compress_content_json,
+    decompress_content_json,
+    get_content_hash,
+)
+from libcommon.utils import orjson_dumps
+from mongoengine import Document
+from mongoengine.connection import get_db
+from pymongo import UpdateOne
+
+from mongodb_migration.check import check_documents
+from mongodb_migration.migration import Migration
+
+batch_size = 100
+
+
+def get_compressed_kinds() -> List[str]:
+    # the cache kinds of the processing steps that compress their content (all except the ones that provide names)
+    processing_graph = ProcessingGraph(ProcessingGraphConfig().specification)
+    return [
+        processing_step.cache_kind
+        for processing_step in processing_graph.get_processing_steps()
+        if processing_step.compress_content
+    ]
+
+
+# connection already occurred in the main.py (caveat: we use globals)
+class MigrationCompressCacheContent(Migration):
+    """Store the content of the cached responses serialized to JSON and compressed.
+
+    The "content" and "content_json" fields of the cached responses of the compressed kinds (see
+    `get_compressed_kinds`) are replaced by the "content_compressed" field. The "content_json" field, that duplicated
+    the content, is removed from the other cached responses.
+    """
+
+    def up(self) -> None:
+        compressed_kinds = get_compressed_kinds()
+        logging.info(f"Compress the content of the cached responses of kinds {compressed_kinds}")
+        collection = get_db(CACHE_MONGOENGINE_ALIAS)[CACHE_COLLECTION_RESPONSES]
+        num_documents = 0
+        num_bytes = 0
+        num_compressed_bytes = 0
+        requests: List[Any] = []
+        for document in collection.find(
+            {"kind": {"$in": compressed_kinds}, "content_compressed": None}, {"content": 1, "content_json": 1}
+        ):
+            content_json = document.get("content_json") or orjson_dumps(content=document.get("content") or {})
+            content_compressed = compress_content_json(content_json)
+            requests.append(
+                UpdateOne(
+                    {"_id": document["_id"]},
+                    {
+                        "$set": {
+                            "content_compressed": content_compressed,
+                            "content_hash": get_content_hash(content_json),
+                        },
+                        "$unset": {"content": "", "content_json": ""},
+                    },
+                )
+            )
+            num_documents += 1
+            num_bytes += len(content_json)
+            num_compressed_bytes += len(content_compressed)
+            if len(requests) >= batch_size:
+                collection.bulk_write(requests, ordered=False)
+                requests = []
+        if requests:
+            collection.bulk_write(requests, ordered=False)
+        logging.info(
+            f"The content of {num_documents} cached responses has been compressed from {num_bytes} bytes to"
+            f" {num_compressed_bytes} bytes"
+        )
+        logging.info("Remove the content serialized to JSON from the other cached responses")
+        result = collection.update_many(
+            {"kind": {"$nin": compressed_kinds}, "content_json": {"$exists": True}}, {"$unset": {"content_json": ""}}
+        )
+        logging.info(f"The content serialized to JSON has been removed from {result.modified_count} cached responses")
+
+    def down(self) -> None:
+        logging.info("Decompress the content of the cached responses")
+        collection = get_db(CACHE_MONGOENGINE_ALIAS)[CACHE_COLLECTION_RESPONSES]
+        requests: List[Any] = []
+        for document in collection.find({"content_compressed": {"$ne": None}}, {"content_compressed": 1}):
+            content_json = decompress_content_json(document["content_compressed"])
+            requests.append(
+                UpdateOne(
+                    {"_id": document["_id"]},
+                    {
+                        "$set": {"content": json.loads(content_json)},
+                        "$unset": {"content_compressed": ""},
+                    },
+                )
+            )
+            if len(requests) >= batch_size:
+                collection.bulk_write(requests, ordered=False)
+                requests = []
+        if requests:
+            collection.bulk_write(requests, ordered=False)
+
+    def validate(self) -> None:
+        logging.info("Ensure that a random selection of cached results of the compressed kinds are compressed")
+        compressed_kinds = get_compressed_kinds()
+
+        def custom_validation(doc: Document) -> None:
+            if not isinstance(doc, CachedResponse):
+                raise ValueError("Document is not a CachedResponse")
+            if doc.kind in compressed_kinds and doc.content_compressed is None:
+                raise ValueError(f"The content of the cached response {doc.pk} of kind {doc.kind} is not compressed")
+            if doc.content_json is not None:
+                raise ValueError(f"The cached response {doc.pk} still stores its content serialized to JSON")
+
+        check_documents(DocCls=CachedResponse, sample_size=10, custom_validation=custom_validation)
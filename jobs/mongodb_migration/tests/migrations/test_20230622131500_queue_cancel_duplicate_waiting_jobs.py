@@ -0,0 +1,77 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2023 The HuggingFace Authors.
+
+from datetime import datetime
+
+from libcommon.constants import QUEUE_COLLECTION_JOBS, QUEUE_MONGOENGINE_ALIAS
+from libcommon.resources import MongoResource
+from mongoengine.connection import get_db
+from pytest import raises
+
+from mongodb_migration.migration import IrreversibleMigrationError
+from mongodb_migration.migrations._20230622131500_queue_cancel_duplicate_waiting_jobs import (
+    MigrationQueueCancelDuplicateWaitingJobs,
+)
+
+
+def test_queue_cancel_duplicate_waiting_jobs(mongo_host: str) -> None:
+    with MongoResource(
+        database="test_queue_cancel_duplicate_waiting_jobs", host=mongo_host, mongoengine_alias="queue"
+    ):
+        db = get_db(QUEUE_MONGOENGINE_ALIAS)
+        db[QUEUE_COLLECTION_JOBS].delete_many({})
+        db[QUEUE_COLLECTION_JOBS].insert_many(
+            [
+                {
+                    "type": "test",
+                    "dataset": "dataset",
+                    "unicity_id": "test,dataset",
+                    "status": "waiting",
+                    "priority": "normal",
+                    "created_at": datetime(2023, 1, 1),
+                },
+                {
+                    "type": "test",
+                    "dataset": "dataset",
+                    "unicity_id": "test,dataset",
+                    "status": "waiting",
+                    "priority": "low",
+                    "created_at": datetime(2023, 1, 2),
+                },
+                {
+                    "type": "test",
+                    "dataset": "dataset",
+                    "unicity_id": "test,dataset",
+                    "status": "started",
+                    "priority": "low",
+                    "created_at": datetime(2023, 1, 3),
+                },
+                {
+                    "type": "test",
+                    "dataset": "other",
+                    "unicity_id": "test,other",
+                    "status": "waiting",
+                    "priority": "low",
+                    "created_at": datetime(2023, 1, 1),
+                },
+            ]
+        )
+        migration = MigrationQueueCancelDuplicateWaitingJobs(
+            version="20230622131500", description="cancel the duplicate waiting jobs"
+        )
+        with raises(ValueError):
+            migration.validate()
+        migration.up()
+        migration.validate()
+
+        waiting = list(db[QUEUE_COLLECTION_JOBS].find({"unicity_id": "test,dataset", "status": "waiting"}))
+        assert len(waiting) == 1
+        assert waiting[0]["created_at"] == datetime(2023, 1, 2)
+        assert waiting[0]["priority"] == "normal"
+        assert db[QUEUE_COLLECTION_JOBS].count_documents({"unicity_id": "test,dataset", "status": "cancelled"}) == 1
+        assert db[QUEUE_COLLECTION_JOBS].count_documents({"unicity_id": "test,dataset", "status": "started"}) == 1
+        assert db[QUEUE_COLLECTION_JOBS].count_documents({"unicity_id": "test,other", "status": "waiting"}) == 1
+
+        with raises(IrreversibleMigrationError):
+            migration.down()
+        db[QUEUE_COLLECTION_JOBS].drop()
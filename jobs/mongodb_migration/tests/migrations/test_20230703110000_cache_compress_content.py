@@ -0,0 +1,97 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2023 The HuggingFace Authors.
+
+from libcommon.constants import CACHE_COLLECTION_RESPONSES, CACHE_MONGOENGINE_ALIAS
+from libcommon.resources import MongoResource
+from libcommon.simple_cache import get_content_hash, get_response, get_response_json
+from libcommon.utils import orjson_dumps
+from mongoengine.connection import get_db
+
+from mongodb_migration.migrations._20230703110000_cache_compress_content import (
+    MigrationCompressCacheContent,
+)
+
+
+def test_cache_compress_content(mongo_host: str) -> None:
+    with MongoResource(database="test_cache_compress_content", host=mongo_host, mongoengine_alias="cache"):
+        db = get_db(CACHE_MONGOENGINE_ALIAS)
+        content = {"rows": [{"row_idx": 0, "row": {"text": "hello"}}]}
+        content_json = orjson_dumps(content=content)
+        config_names_content = {"config_names": [{"dataset": "dataset", "config": "config"}]}
+        db[CACHE_COLLECTION_RESPONSES].insert_many(
+            [
+                # legacy entry, without the serialized content
+                {
+                    "kind": "split-first-rows-from-streaming",
+                    "dataset": "dataset",
+                    "config": "config",
+                    "split": "split",
+                    "http_status": 200,
+                    "content": content,
+                },
+                {
+                    "kind": "config-parquet-and-info",
+                    "dataset": "dataset",
+                    "config": "config",
+                    "http_status": 200,
+                    "content": content,
+                    "content_json": content_json,
+                    "content_hash": get_content_hash(content_json),
+                },
+                {
+                    "kind": "dataset-info",
+                    "dataset": "dataset",
+                    "http_status": 200,
+                    "content": content,
+                    "content_json": content_json,
+                    "content_hash": get_content_hash(content_json),
+                },
+                # not compressed, since the config names are read in the database queries
+                {
+                    "kind": "dataset-config-names",
+                    "dataset": "dataset",
+                    "http_status": 200,
+                    "content": config_names_content,
+                    "content_json": orjson_dumps(content=config_names_content),
+                },
+            ]
+        )
+        migration = MigrationCompressCacheContent(
+            version="20230703110000", description="compress the content of the cached responses"
+        )
+        migration.up()
+        migration.validate()
+
+        for kind, config, split in [
+            ("split-first-rows-from-streaming", "config", "split"),
+            ("config-parquet-and-info", "config", None),
+            ("dataset-info", None, None),
+        ]:
+            result = db[CACHE_COLLECTION_RESPONSES].find_one({"kind": kind})
+            assert result
+            assert "content" not in result
+            assert "content_json" not in result
+            assert result["content_compressed"]
+            assert result["content_hash"] == get_content_hash(content_json)
+            assert get_response(kind=kind, dataset="dataset", config=config, split=split)["content"] == content
+            assert (
+                get_response_json(kind=kind, dataset="dataset", config=config, split=split)["content_json"]
+                == content_json
+            )
+        result = db[CACHE_COLLECTION_RESPONSES].find_one({"kind": "dataset-config-names"})
+        assert result
+        assert result["content"] == config_names_content
+        assert "content_json" not in result
+        assert "content_compressed" not in result
+        assert get_response_json(kind="dataset-config-names", dataset="dataset")["content_json"] == orjson_dumps(
+            content=config_names_content
+        )
+
+        migration.down()
+        result = db[CACHE_COLLECTION_RESPONSES].find_one({"kind": "config-parquet-and-info"})
+        assert result
+        assert result["content"] == content
+        assert "content_json" not in result
+        assert "content_compressed" not in result
+
+        db[CACHE_COLLECTION_RESPONSES].drop()
@@ -0,0 +1,140 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2023 The HuggingFace Authors.
+
+"""Benchmark the matching of the pending jobs with the expected artifacts in AfterJobPlan, for a large fan-out.
+
+A config-level job has finished, and its split-level children are expected for every split of the config. Two
+implementations are compared, on the same synthetic pending jobs:
+- masks: the previous implementation, that evaluates several boolean masks over the full pandas DataFrame for every
+  expected artifact, then drops rows in place.
+- sets: the current implementation (libcommon.orchestrator.match_pending_jobs), that goes once over the pending jobs
+  and matches them with the set of expected artifacts.
+
+The counts differ: the masks implementation drops the pending jobs of the sibling artifacts (same job type, other
+split) while processing every artifact, so it ignores the jobs to delete and recreates the jobs that were already
+pending.
+
+No database is required.
+
+Usage:
+    poetry run python benchmarks/bench_after_job_plan.py [--splits 5000] [--children 2]
+"""
+
+import argparse
+import time
+from datetime import datetime
+from functools import partial
+from typing import Callable, List, Set, Tuple
+
+import pandas as pd
+
+from libcommon.orchestrator import AfterJobPlanArtifactKey, match_pending_jobs
+from libcommon.queue import Queue
+from libcommon.utils import Priority, Status
+
+DATASET = "dataset"
+REVISION = "revision"
+OTHER_REVISION = "other_revision"
+CONFIG = "config"
+
+
+def get_synthetic_pending_jobs_df(
+    artifacts: List[AfterJobPlanArtifactKey], pending_jobs_ratio: float, other_revision_ratio: float
+) -> pd.DataFrame:
+    """A pending job for a fraction of the artifacts, some of them for another revision."""
+    every = max(1, int(1 / pending_jobs_ratio)) if pending_jobs_ratio > 0 else len(artifacts) + 1
+    every_other_revision = max(1, int(1 / other_revision_ratio)) if other_revision_ratio > 0 else len(artifacts) + 1
+    return Queue()._get_df(
+        [
+            {
+                "job_id": f"job{i}",
+                "type": job_type,
+                "dataset": DATASET,
+                "revision": OTHER_REVISION if (i // every) % every_other_revision == 0 else REVISION,
+                "config": config,
+                "split": split,
+                "priority": Priority.LOW.value,
+                "status": Status.WAITING.value,
+                "created_at": datetime(2023, 6, 1),
+            }
+            for i, (job_type, config, split) in enumerate(artifacts)
+            if i % every == 0
+        ]
+    )
+
+
+def match_with_masks(pending_jobs_df: pd.DataFrame, artifacts: List[AfterJobPlanArtifactKey]) -> Tuple[int, int]:
+    """Reproduce the masking done by the previous implementation of AfterJobPlan.update."""
+    pending_jobs_df = pending_jobs_df.copy()
+    num_jobs_to_create = 0
+    for job_type, config, split in artifacts:
+        config_mask = pending_jobs_df["config"].isnull() if config is None else pending_jobs_df["config"] == config
+        split_mask = pending_jobs_df["split"].isnull() if split is None else pending_jobs_df["split"] == split
+        unrelated_jobs_mask = (pending_jobs_df["type"] == job_type) & (
+            (pending_jobs_df["dataset"] != DATASET) | (~config_mask) | (~split_mask)
+        )
+        pending_jobs_df = pending_jobs_df[~unrelated_jobs_mask]
+        jobs_mask = (
+            (pending_jobs_df["type"] == job_type)
+            & (pending_jobs_df["dataset"] == DATASET)
+            & (config_mask)
+            & (split_mask)
+        )
+        ok_jobs_mask = jobs_mask & (pending_jobs_df["revision"] == REVISION)
+        if ok_jobs_mask.any():
+            pending_jobs_df.drop(ok_jobs_mask.idxmax(), inplace=True)
+        else:
+            num_jobs_to_create += 1
+    return len(pending_jobs_df), num_jobs_to_create
+
+
+def match_with_sets(pending_jobs_df: pd.DataFrame, artifacts: List[AfterJobPlanArtifactKey]) -> Tuple[int, int]:
+    expected_artifacts: Set[AfterJobPlanArtifactKey] = set(artifacts)
+    job_ids_to_delete, artifacts_with_pending_job = match_pending_jobs(
+        pending_jobs_df=pending_jobs_df, artifacts=expected_artifacts, revision=REVISION
+    )
+    return len(job_ids_to_delete), len(expected_artifacts - artifacts_with_pending_job)
+
+
+def measure(function: Callable[[], Tuple[int, int]], repeat: int) -> Tuple[float, Tuple[int, int]]:
+    durations = []
+    result = (0, 0)
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        durations.append(time.perf_counter() - start)
+    return min(durations), result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--splits", type=int, default=5_000)
+    parser.add_argument("--children", type=int, default=2, help="number of split-level children steps")
+    parser.add_argument("--pending-jobs-ratio", type=float, default=0.5)
+    parser.add_argument("--other-revision-ratio", type=float, default=0.1)
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    artifacts: List[AfterJobPlanArtifactKey] = [
+        (f"split-child-{child_index}", CONFIG, f"split{split_index}")
+        for child_index in range(args.children)
+        for split_index in range(args.splits)
+    ]
+    pending_jobs_df = get_synthetic_pending_jobs_df(
+        artifacts=artifacts,
+        pending_jobs_ratio=args.pending_jobs_ratio,
+        other_revision_ratio=args.other_revision_ratio,
+    )
+    print(f"{len(artifacts)} expected artifacts, {len(pending_jobs_df)} pending jobs")
+    for name, function in [("masks", match_with_masks), ("sets", match_with_sets)]:
+        duration, (num_jobs_to_delete, num_jobs_to_create) = measure(
+            partial(function, pending_jobs_df, artifacts), repeat=args.repeat
+        )
+        print(
+            f"{name:<6} {num_jobs_to_delete:>8} jobs to delete, {num_jobs_to_create:>8} jobs to create in"
+            f" {duration:8.3f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2023 The HuggingFace Authors.
+
+"""Simulate the queue scheduling policies on synthetic arrival traces.
+
+The simulation replays a trace of jobs (a backfill of LOW priority jobs, and webhooks creating NORMAL priority jobs,
+with a flood in the middle of the trace) on a pool of workers, and reports the waiting time of the jobs for each
+priority, for the following policies:
+- strict: the NORMAL jobs are always started before the LOW jobs (default behavior of the queue)
+- weighted: the priority and the job type of the next job are drawn with libcommon.queue.get_weighted_random_order
+- weighted+aging: same, and the LOW jobs that waited for too long are considered as NORMAL
+
+No database is required: the queue is simulated in memory, with the same rules as libcommon.queue.Queue (except the
+namespace rules).
+
+Usage:
+    poetry run python benchmarks/bench_queue_scheduling.py [--workers 40] [--seed 0]
+"""
+
+import argparse
+import heapq
+import random
+import statistics
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Mapping, Optional, Tuple
+
+from libcommon.queue import get_weighted_random_order
+from libcommon.utils import Priority
+
+JOB_TYPES = ["dataset-config-names", "config-parquet", "split-first-rows-from-parquet", "split-descriptive-stats"]
+MEAN_DURATION_SECONDS = {
+    "dataset-config-names": 5.0,
+    "config-parquet": 60.0,
+    "split-first-rows-from-parquet": 10.0,
+    "split-descriptive-stats": 120.0,
+}
+
+
+@dataclass
+class SimulatedJob:
+    job_type: str
+    priority: Priority
+    created_at: float
+    duration: float
+    started_at: Optional[float] = None
+
+
+@dataclass
+class Policy:
+    name: str
+    priority_weights: Mapping[Priority, float] = field(default_factory=dict)
+    job_type_weights: Mapping[str, float] = field(default_factory=dict)
+    priority_aging_seconds: Optional[float] = None
+
+
+@dataclass
+class SimulatedQueue:
+    policy: Policy
+    waiting: Dict[Tuple[Priority, str], Deque[SimulatedJob]] = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.waiting = {(priority, job_type): deque() for priority in Priority for job_type in JOB_TYPES}
+
+    def add(self, job: SimulatedJob) -> None:
+        # the jobs are added in chronological order: every deque is sorted by creation date
+        self.waiting[(job.priority, job.job_type)].append(job)
+
+    def _pop(self, priority: Priority, job_type: str, now: float) -> Optional[SimulatedJob]:
+        normal_jobs = self.waiting[(Priority.NORMAL, job_type)]
+        low_jobs = self.waiting[(Priority.LOW, job_type)]
+        aging = self.policy.priority_aging_seconds
+        is_low_job_aged = bool(low_jobs) and aging is not None and now - low_jobs[0].created_at >= aging
+        if priority == Priority.LOW:
+            return low_jobs.popleft() if low_jobs and not is_low_job_aged else None
+        if is_low_job_aged and (not normal_jobs or low_jobs[0].created_at < normal_jobs[0].created_at):
+            return low_jobs.popleft()
+        return normal_jobs.popleft() if normal_jobs else None
+
+    def pop(self, now: float) -> Optional[SimulatedJob]:
+        if self.policy.priority_weights or self.policy.job_type_weights:
+            waiting_job_types = [
+                job_type
+                for job_type in JOB_TYPES
+                if self.waiting[(Priority.NORMAL, job_type)] or self.waiting[(Priority.LOW, job_type)]
+            ]
+            weights = {
+                (priority, job_type): self.policy.priority_weights.get(priority, 1.0)
+                * self.policy.job_type_weights.get(job_type, 1.0)
+                for priority in [Priority.NORMAL, Priority.LOW]
+                for job_type in waiting_job_types
+            }
+            job_classes = get_weighted_random_order(weights)
+        else:
+            job_classes = [
+                (priority, job_type) for priority in [Priority.NORMAL, Priority.LOW] for job_type in JOB_TYPES
+            ]
+        for priority, job_type in job_classes:
+            job = self._pop(priority=priority, job_type=job_type, now=now)
+            if job is not None:
+                return job
+        return None
+
+
+def get_trace(
+    backfill_jobs: int, webhook_rate: float, flood_rate: float, duration: float, rng: random.Random
+) -> List[SimulatedJob]:
+    """Generate the jobs: a backfill at t=0, then webhooks (Poisson arrivals), with a flood during the middle third."""
+    jobs = [
+        SimulatedJob(
+            job_type=job_type,
+            priority=Priority.LOW,
+            created_at=0.0,
+            duration=rng.expovariate(1 / MEAN_DURATION_SECONDS[job_type]),
+        )
+        for job_type in rng.choices(JOB_TYPES, k=backfill_jobs)
+    ]
+    now = 0.0
+    while True:
+        rate = flood_rate if duration / 3 <= now < 2 * duration / 3 else webhook_rate
+        now += rng.expovariate(rate)
+        if now >= duration:
+            break
+        job_type = rng.choice(JOB_TYPES)
+        jobs.append(
+            SimulatedJob(
+                job_type=job_type,
+                priority=Priority.NORMAL,
+                created_at=now,
+                duration=rng.expovariate(1 / MEAN_DURATION_SECONDS[job_type]),
+            )
+        )
+    return jobs
+
+
+def simulate(policy: Policy, trace: List[SimulatedJob], workers: int, seed: int) -> List[SimulatedJob]:
+    """Run the trace on the workers with a discrete-event simulation, and return the jobs that have been started."""
+    random.seed(seed)
+    # ^ get_weighted_random_order uses the global random generator
+    queue = SimulatedQueue(policy=policy)
+    jobs = [SimulatedJob(job.job_type, job.priority, job.created_at, job.duration) for job in trace]
+    # events: (time, order, job): job is None for a worker that becomes idle, else it's a job arrival
+    events: List[Tuple[float, int, Optional[SimulatedJob]]] = [(job.created_at, i, job) for i, job in enumerate(jobs)]
+    heapq.heapify(events)
+    order = len(events)
+    idle_workers = workers
+    started_jobs: List[SimulatedJob] = []
+    while events:
+        now, _, arrival = heapq.heappop(events)
+        if arrival is None:
+            idle_workers += 1
+        else:
+            queue.add(arrival)
+        while idle_workers > 0:
+            job = queue.pop(now=now)
+            if job is None:
+                break
+            job.started_at = now
+            started_jobs.append(job)
+            idle_workers -= 1
+            heapq.heappush(events, (now + job.duration, order, None))
+            order += 1
+    return started_jobs
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def report(policy: Policy, started_jobs: List[SimulatedJob], flood_start: float, flood_end: float) -> None:
+    for priority in [Priority.NORMAL, Priority.LOW]:
+        waits = [
+            job.started_at - job.created_at
+            for job in started_jobs
+            if job.priority == priority and job.started_at is not None
+        ]
+        started_during_flood = sum(
+            1
+            for job in started_jobs
+            if job.priority == priority and job.started_at is not None and flood_start <= job.started_at < flood_end
+        )
+        print(
+            f"{policy.name:<16} {priority.value:<7} {len(waits):>7} {started_during_flood:>12}"
+            f" {statistics.mean(waits) if waits else float('nan'):>10.1f} {percentile(waits, 50):>10.1f}"
+            f" {percentile(waits, 95):>10.1f} {max(waits, default=float('nan')):>10.1f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=40)
+    parser.add_argument("--backfill-jobs", type=int, default=5_000)
+    parser.add_argument("--webhook-rate", type=float, default=0.2, help="NORMAL jobs per second, outside the flood")
+    parser.add_argument("--flood-rate", type=float, default=1.0, help="NORMAL jobs per second, during the flood")
+    parser.add_argument("--duration", type=float, default=6 * 3600, help="duration of the trace, in seconds")
+    parser.add_argument("--aging", type=float, default=3600, help="priority aging, in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    trace = get_trace(
+        backfill_jobs=args.backfill_jobs,
+        webhook_rate=args.webhook_rate,
+        flood_rate=args.flood_rate,
+        duration=args.duration,
+        rng=random.Random(args.seed),
+    )
+    policies = [
+        Policy(name="strict"),
+        Policy(name="weighted", priority_weights={Priority.NORMAL: 4.0, Priority.LOW: 1.0}),
+        Policy(
+            name="weighted+aging",
+            priority_weights={Priority.NORMAL: 4.0, Priority.LOW: 1.0},
+            priority_aging_seconds=args.aging,
+        ),
+    ]
+    print(f"{len(trace)} jobs, {args.workers} workers, 'flood' column: number of jobs started during the flood")
+    print(
+        f"{'policy':<16} {'prio':<7} {'jobs':>7} {'flood':>12} {'mean wait':>10} {'p50':>10} {'p95':>10} {'max':>10}"
+    )
+    for policy in policies:
+        started_jobs = simulate(policy=policy, trace=trace, workers=args.workers, seed=args.seed)
+        report(
+            policy=policy, started_jobs=started_jobs, flood_start=args.duration / 3, flood_end=2 * args.duration / 3
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2023 The HuggingFace Authors.
+
+"""Benchmark the construction of the split-level artifact states for a synthetic dataset with many splits.
+
+Two implementations are compared, on the same synthetic pending jobs and cache entries:
+- masks: the previous implementation, that boolean-masks the full pandas DataFrames for every config, every split
+  and every step, and sorts the pending jobs of every artifact.
+- indexes: the current implementation (libcommon.state), that groups the jobs and the cache entries by artifact once,
+  then gets the jobs and cache entries of every artifact with a dict lookup.
+
+No database is required: the split names are not fetched from the cache (the SplitState objects are created
+directly).
+
+Usage:
+    poetry run python benchmarks/bench_state.py [--configs 10] [--splits-per-config 1000]
+"""
+
+import argparse
+import time
+from datetime import datetime, timedelta
+from functools import partial
+from http import HTTPStatus
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from libcommon.config import ProcessingGraphConfig
+from libcommon.processing_graph import ProcessingGraph, ProcessingStep
+from libcommon.queue import Queue
+from libcommon.simple_cache import _get_df as get_cache_entries_df
+from libcommon.state import SplitState, get_cache_entries_index, get_pending_jobs_index
+from libcommon.utils import Priority, Status
+
+DATASET = "dataset"
+REVISION = "revision"
+
+
+def get_synthetic_dfs(
+    processing_graph: ProcessingGraph, configs: int, splits_per_config: int, pending_jobs_ratio: float
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """One cache entry per artifact, and a pending job for a fraction of the artifacts."""
+    now = datetime(2023, 6, 1)
+    artifacts: List[Tuple[ProcessingStep, Optional[str], Optional[str]]] = [
+        (step, None, None) for step in processing_graph.get_input_type_processing_steps(input_type="dataset")
+    ]
+    for config_index in range(configs):
+        config = f"config{config_index}"
+        artifacts.extend(
+            (step, config, None) for step in processing_graph.get_input_type_processing_steps(input_type="config")
+        )
+        artifacts.extend(
+            (step, config, f"split{split_index}")
+            for split_index in range(splits_per_config)
+            for step in processing_graph.get_input_type_processing_steps(input_type="split")
+        )
+    cache_entries_df = get_cache_entries_df(
+        [
+            {
+                "kind": step.cache_kind,
+                "dataset": DATASET,
+                "config": config,
+                "split": split,
+                "http_status": HTTPStatus.OK,
+                "error_code": None,
+                "dataset_git_revision": REVISION,
+                "job_runner_version": step.job_runner_version,
+                "progress": 1.0,
+                "updated_at": now - timedelta(seconds=i),
+            }
+            for i, (step, config, split) in enumerate(artifacts)
+        ]
+    )
+    every = max(1, int(1 / pending_jobs_ratio)) if pending_jobs_ratio > 0 else len(artifacts) + 1
+    pending_jobs_df = Queue()._get_df(
+        [
+            {
+                "job_id": f"job{i}",
+                "type": step.job_type,
+                "dataset": DATASET,
+                "revision": REVISION,
+                "config": config,
+                "split": split,
+                "priority": Priority.LOW.value,
+                "status": Status.WAITING.value,
+                "created_at": now,
+            }
+            for i, (step, config, split) in enumerate(artifacts)
+            if i % every == 0
+        ]
+    )
+    return pending_jobs_df, cache_entries_df
+
+
+def build_with_masks(
+    processing_graph: ProcessingGraph, pending_jobs_df: pd.DataFrame, cache_entries_df: pd.DataFrame
+) -> int:
+    """Reproduce the masking and sorting done by the previous DataFrame-based implementation."""
+    count = 0
+    split_steps = processing_graph.get_input_type_processing_steps(input_type="split")
+    config_names = [name for name in cache_entries_df["config"].unique() if not pd.isna(name)]
+    for config in config_names:
+        config_jobs_df = pending_jobs_df[
+            (pending_jobs_df["revision"] == REVISION) & (pending_jobs_df["config"] == config)
+        ]
+        config_cache_df = cache_entries_df[cache_entries_df["config"] == config]
+        split_names = [name for name in config_cache_df["split"].unique() if not pd.isna(name)]
+        for split in split_names:
+            split_jobs_df = config_jobs_df[config_jobs_df["split"] == split]
+            split_cache_df = config_cache_df[config_cache_df["split"] == split]
+            for step in split_steps:
+                jobs_df = split_jobs_df[split_jobs_df["type"] == step.job_type]
+                entries_df = split_cache_df[split_cache_df["kind"] == step.cache_kind]
+                jobs_df.sort_values(["status", "priority", "created_at"], ascending=[False, False, True]).head(1)
+                if len(entries_df) > 0:
+                    entries_df.iloc[0]
+                count += 1
+    return count
+
+
+def build_with_indexes(
+    processing_graph: ProcessingGraph, pending_jobs_df: pd.DataFrame, cache_entries_df: pd.DataFrame
+) -> int:
+    pending_jobs_index = get_pending_jobs_index(pending_jobs_df=pending_jobs_df, revision=REVISION)
+    cache_entries_index = get_cache_entries_index(cache_entries_df=cache_entries_df)
+    split_names_by_config: Dict[str, List[str]] = {}
+    for _, config, split in cache_entries_index:
+        if config is not None and split is not None:
+            split_names_by_config.setdefault(config, []).append(split)
+    count = 0
+    for config, split_names in split_names_by_config.items():
+        for split in dict.fromkeys(split_names):
+            split_state = SplitState(
+                dataset=DATASET,
+                revision=REVISION,
+                config=config,
+                split=split,
+                processing_graph=processing_graph,
+                pending_jobs_index=pending_jobs_index,
+                cache_entries_index=cache_entries_index,
+            )
+            count += len(split_state.artifact_state_by_step)
+    return count
+
+
+def measure(function: Callable[[], int], repeat: int) -> Tuple[float, int]:
+    durations = []
+    count = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = function()
+        durations.append(time.perf_counter() - start)
+    return min(durations), count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--configs", type=int, default=10)
+    parser.add_argument("--splits-per-config", type=int, default=1_000)
+    parser.add_argument("--pending-jobs-ratio", type=float, default=0.1)
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    processing_graph = ProcessingGraph(ProcessingGraphConfig().specification)
+    pending_jobs_df, cache_entries_df = get_synthetic_dfs(
+        processing_graph=processing_graph,
+        configs=args.configs,
+        splits_per_config=args.splits_per_config,
+        pending_jobs_ratio=args.pending_jobs_ratio,
+    )
+    print(
+        f"{args.configs * args.splits_per_config} splits, {len(cache_entries_df)} cache entries,"
+        f" {len(pending_jobs_df)} pending jobs"
+    )
+    for name, function in [("masks", build_with_masks), ("indexes", build_with_indexes)]:
+        duration, count = measure(
+            partial(function, processing_graph, pending_jobs_df, cache_entries_df), repeat=args.repeat
+        )
+        print(f"{name:<8} {count:>8} split-level artifacts in {duration:8.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -139,6 +139,37 @@ class LogConfig:
             )
 
 
+HTTP_CLIENT_CIRCUIT_BREAKER_FAILURE_THRESHOLD = 5
+HTTP_CLIENT_CIRCUIT_BREAKER_RESET_SECONDS = 30.0
+HTTP_CLIENT_MAX_CONNECTIONS_PER_HOST = 10
+HTTP_CLIENT_SLOW_CALL_SECONDS = 2.0
+
+
+@dataclass(frozen=True)
+class HttpClientConfig:
+    circuit_breaker_failure_threshold: int = HTTP_CLIENT_CIRCUIT_BREAKER_FAILURE_THRESHOLD
+    circuit_breaker_reset_seconds: float = HTTP_CLIENT_CIRCUIT_BREAKER_RESET_SECONDS
+    max_connections_per_host: int = HTTP_CLIENT_MAX_CONNECTIONS_PER_HOST
+    slow_call_seconds: float = HTTP_CLIENT_SLOW_CALL_SECONDS
+
+    @classmethod
+    def from_env(cls) -> "HttpClientConfig":
+        env = Env(expand_vars=True)
+        with env.prefixed("HTTP_CLIENT_"):
+            return cls(
+                circuit_breaker_failure_threshold=env.int(
+                    name="CIRCUIT_BREAKER_FAILURE_THRESHOLD", default=HTTP_CLIENT_CIRCUIT_BREAKER_FAILURE_THRESHOLD
+                ),
+                circuit_breaker_reset_seconds=env.float(
+                    name="CIRCUIT_BREAKER_RESET_SECONDS", default=HTTP_CLIENT_CIRCUIT_BREAKER_RESET_SECONDS
+                ),
+                max_connections_per_host=env.int(
+                    name="MAX_CONNECTIONS_PER_HOST", default=HTTP_CLIENT_MAX_CONNECTIONS_PER_HOST
+                ),
+                slow_call_seconds=env.float(name="SLOW_CALL_SECONDS", default=HTTP_CLIENT_SLOW_CALL_SECONDS),
+            )
+
+
 CACHE_MONGO_DATABASE = "datasets_server_cache"
 CACHE_MONGO_URL = "mongodb://localhost:27017"
 
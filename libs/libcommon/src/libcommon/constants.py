@@ -3,12 +3,15 @@
 
 ASSETS_CACHE_APPNAME = "datasets_server_assets"
 CACHE_COLLECTION_RESPONSES = "cachedResponsesBlue"
+CACHE_COLLECTION_VALID_DATASETS = "validDatasets"
 CACHE_MONGOENGINE_ALIAS = "cache"
 CACHED_ASSETS_CACHE_APPNAME = "datasets_server_cached_assets"
 PARQUET_METADATA_CACHE_APPNAME = "datasets_server_parquet_metadata"
+METRICS_COLLECTION_BACKFILL_PROGRESS_METRIC = "backfillProgressMetric"
 METRICS_COLLECTION_CACHE_TOTAL_METRIC = "cacheTotalMetric"
 METRICS_COLLECTION_JOB_TOTAL_METRIC = "jobTotalMetric"
 METRICS_MONGOENGINE_ALIAS = "metrics"
+QUEUE_COLLECTION_DATASET_UPDATES = "datasetUpdates"
 QUEUE_COLLECTION_JOBS = "jobsBlue"
 QUEUE_COLLECTION_LOCKS = "locks"
 QUEUE_MONGOENGINE_ALIAS = "queue"
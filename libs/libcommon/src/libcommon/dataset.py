@@ -1,7 +1,7 @@
 # SPDX-License-Identifier: Apache-2.0
 # Copyright 2022 The HuggingFace Authors.
 
-from typing import Optional
+from typing import Dict, Optional, Set
 
 from huggingface_hub.hf_api import DatasetInfo, HfApi
 from huggingface_hub.utils._errors import RepositoryNotFoundError, RevisionNotFoundError
@@ -170,3 +170,51 @@ def get_dataset_git_revision(
 
 def get_supported_dataset_infos(hf_endpoint: str, hf_token: Optional[str] = None) -> list[DatasetInfo]:
     return [d for d in HfApi(endpoint=hf_endpoint, token=hf_token).list_datasets() if is_supported(d)]
+
+
+def get_dataset_changed_paths(
+    dataset: str,
+    old_revision: str,
+    new_revision: str,
+    hf_endpoint: str,
+    hf_token: Optional[str] = None,
+) -> Set[str]:
+    """
+    Get the paths of the files that have been added, removed or modified between two revisions of a dataset.
+    Args:
+        dataset (`str`):
+            A namespace (user or an organization) and a repo name separated
+            by a `/`.
+        old_revision (`str`):
+            The previous git revision (sha) of the dataset.
+        new_revision (`str`):
+            The new git revision (sha) of the dataset.
+        hf_endpoint (`str`):
+            The Hub endpoint (for example: "https://huggingface.co")
+        hf_token (`str`, *optional*):
+            An authentication token (See https://huggingface.co/settings/token)
+    Returns:
+        `Set[str]`: the paths of the changed files, relative to the root of the repository.
+    Raises the following errors:
+        - [`~exceptions.DatasetInfoHubRequestError`]
+          if the request to the Hub to list the files failed.
+    """
+    hf_api = HfApi(endpoint=hf_endpoint, token=hf_token)
+
+    def get_blob_ids(revision: str) -> Dict[str, str]:
+        return {
+            repo_file.rfilename: repo_file.blob_id
+            for repo_file in hf_api.list_files_info(repo_id=dataset, revision=revision, repo_type="dataset")
+        }
+
+    try:
+        old_blob_ids = get_blob_ids(old_revision)
+        new_blob_ids = get_blob_ids(new_revision)
+    except Exception as err:
+        raise DatasetInfoHubRequestError(
+            "Request to the Hub to list the files of the dataset failed.",
+            cause=err,
+        ) from err
+    return {
+        path for path in old_blob_ids.keys() | new_blob_ids.keys() if old_blob_ids.get(path) != new_blob_ids.get(path)
+    }
@@ -0,0 +1,211 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2023 The HuggingFace Authors.
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from huggingface_hub import configure_http_backend
+from requests import PreparedRequest, Response
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import EmptyPoolError
+from urllib3.util.timeout import Timeout
+
+from libcommon.config import HttpClientConfig
+from libcommon.prometheus import HTTP_CLIENT_REQUEST_DURATION
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised when a request is not sent, because the circuit of the host is open."""
+
+
+class PoolTimeoutError(requests.exceptions.ConnectionError):
+    """Raised when a request is not sent, because no connection to the host has been freed in time."""
+
+
+@dataclass
+class CircuitBreaker:
+    """Stop requesting a host after too many consecutive failures, and try again after a while.
+
+    A failure is an error (connection error, timeout) or a call slower than slow_call_seconds. After
+    failure_threshold consecutive failures, the circuit is open: the requests fail immediately during reset_seconds.
+    Then, one request at a time is let through (half-open), and the circuit is closed again on the first success.
+
+    It is thread-safe.
+    """
+
+    failure_threshold: int
+    reset_seconds: float
+    slow_call_seconds: float
+    _consecutive_failures: int = field(default=0, init=False)
+    _opened_at: Optional[float] = field(default=None, init=False)
+    _probing: bool = field(default=False, init=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False)
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._probing or time.monotonic() - self._opened_at < self.reset_seconds:
+                return False
+            self._probing = True
+            return True
+
+    def record(self, duration: float, success: bool) -> None:
+        with self._lock:
+            self._probing = False
+            if success and duration < self.slow_call_seconds:
+                self._consecutive_failures = 0
+                self._opened_at = None
+                return
+            self._consecutive_failures += 1
+            if self._consecutive_failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logging.warning(
+                        f"Opening the circuit after {self._consecutive_failures} consecutive failed or slow requests"
+                    )
+                self._opened_at = time.monotonic()
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+
+def get_pool_timeout(timeout: Any, default_pool_timeout: float) -> float:
+    """Get the maximum time to wait for a free connection: the connect timeout of the request, if any."""
+    connect_timeout = timeout.connect_timeout if isinstance(timeout, Timeout) else timeout
+    return connect_timeout if isinstance(connect_timeout, (int, float)) else default_pool_timeout
+
+
+class BoundedWaitHTTPConnectionPool(HTTPConnectionPool):
+    """A connection pool that doesn't wait indefinitely for a free connection when it's full and blocking.
+
+    requests doesn't pass any pool_timeout to urllib3, so it's derived from the timeout of the request.
+    """
+
+    def __init__(self, *args: Any, default_pool_timeout: float, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.default_pool_timeout = default_pool_timeout
+
+    def urlopen(self, *args: Any, **kwargs: Any) -> Any:
+        if kwargs.get("pool_timeout") is None:
+            kwargs["pool_timeout"] = get_pool_timeout(
+                kwargs.get("timeout"), default_pool_timeout=self.default_pool_timeout
+            )
+        return super().urlopen(*args, **kwargs)
+
+
+class BoundedWaitHTTPSConnectionPool(HTTPSConnectionPool):
+    """Same as BoundedWaitHTTPConnectionPool, for HTTPS."""
+
+    def __init__(self, *args: Any, default_pool_timeout: float, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.default_pool_timeout = default_pool_timeout
+
+    def urlopen(self, *args: Any, **kwargs: Any) -> Any:
+        if kwargs.get("pool_timeout") is None:
+            kwargs["pool_timeout"] = get_pool_timeout(
+                kwargs.get("timeout"), default_pool_timeout=self.default_pool_timeout
+            )
+        return super().urlopen(*args, **kwargs)
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """A transport adapter that keeps the connections alive, limits the concurrency per host, breaks the circuit of
+    the slow or failing hosts, and measures the duration of the requests.
+
+    The concurrency is limited by the size of the connection pool of every host: the requests wait for a free
+    connection (pool_block=True), during the connect timeout of the request at most (or slow_call_seconds if the
+    request has no timeout). Otherwise, when a host is slow, the waiting requests would fill the threadpool of the
+    service.
+    """
+
+    def __init__(self, config: HttpClientConfig) -> None:
+        self.http_client_config = config
+        self._circuit_breakers: Dict[str, CircuitBreaker] = {}
+        self._circuit_breakers_lock = threading.Lock()
+        super().__init__(pool_maxsize=config.max_connections_per_host, pool_block=True)
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        default_pool_timeout = self.http_client_config.slow_call_seconds
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": partial(BoundedWaitHTTPConnectionPool, default_pool_timeout=default_pool_timeout),
+            "https": partial(BoundedWaitHTTPSConnectionPool, default_pool_timeout=default_pool_timeout),
+        }
+
+    def get_circuit_breaker(self, host: str) -> CircuitBreaker:
+        with self._circuit_breakers_lock:
+            if host not in self._circuit_breakers:
+                self._circuit_breakers[host] = CircuitBreaker(
+                    failure_threshold=self.http_client_config.circuit_breaker_failure_threshold,
+                    reset_seconds=self.http_client_config.circuit_breaker_reset_seconds,
+                    slow_call_seconds=self.http_client_config.slow_call_seconds,
+                )
+            return self._circuit_breakers[host]
+
+    def send(self, request: PreparedRequest, *args: Any, **kwargs: Any) -> Response:
+        host = urlparse(request.url or "").netloc
+        circuit_breaker = self.get_circuit_breaker(host)
+        if not circuit_breaker.allow_request():
+            HTTP_CLIENT_REQUEST_DURATION.labels(host=host, outcome="circuit_open").observe(0)
+            raise CircuitOpenError(f"The circuit is open for {host}, the request has not been sent.", request=request)
+        start = time.perf_counter()
+        try:
+            response = super().send(request, *args, **kwargs)
+        except Exception as err:
+            duration = time.perf_counter() - start
+            circuit_breaker.record(duration=duration, success=False)
+            HTTP_CLIENT_REQUEST_DURATION.labels(host=host, outcome="error").observe(duration)
+            if isinstance(err, EmptyPoolError):
+                # requests lets the urllib3 error through
+                raise PoolTimeoutError(
+                    f"No connection to {host} has been freed in time, the request has not been sent.", request=request
+                ) from err
+            raise
+        duration = time.perf_counter() - start
+        # a server error counts as a failure, a client error (401, 404...) is a valid answer
+        circuit_breaker.record(duration=duration, success=response.status_code < 500)
+        HTTP_CLIENT_REQUEST_DURATION.labels(host=host, outcome=str(response.status_code)).observe(duration)
+        return response
+
+
+def create_http_session(config: HttpClientConfig) -> requests.Session:
+    session = requests.Session()
+    adapter = PooledHTTPAdapter(config=config)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+_http_session: Optional[requests.Session] = None
+
+
+def init_http_client(config: HttpClientConfig) -> requests.Session:
+    """Create the HTTP session shared by the outbound requests of the process, including the huggingface_hub ones.
+
+    Args:
+        config (HttpClientConfig): the configuration of the connection pools and of the circuit breakers.
+
+    Returns:
+        requests.Session: the shared session.
+    """
+    global _http_session
+    _http_session = create_http_session(config=config)
+    session = _http_session
+    configure_http_backend(backend_factory=lambda: session)
+    return session
+
+
+def get_http_session() -> requests.Session:
+    """Get the shared HTTP session. It's created with the default configuration if init_http_client was not called."""
+    global _http_session
+    if _http_session is None:
+        _http_session = create_http_session(config=HttpClientConfig())
+    return _http_session
@@ -10,6 +10,7 @@ from mongoengine.fields import DateTimeField, IntField, ObjectIdField, StringFie
 from mongoengine.queryset.queryset import QuerySet
 
 from libcommon.constants import (
+    METRICS_COLLECTION_BACKFILL_PROGRESS_METRIC,
     METRICS_COLLECTION_CACHE_TOTAL_METRIC,
     METRICS_COLLECTION_JOB_TOTAL_METRIC,
     METRICS_MONGOENGINE_ALIAS,
@@ -86,7 +87,47 @@ class CacheTotalMetric(Document):
     objects = QuerySetManager["CacheTotalMetric"]()
 
 
+class BackfillProgressMetric(Document):
+    """Progress of a shard of the backfill of the cache, in the mongoDB database, used to compute prometheus metrics.
+
+    It's also the checkpoint used to resume the backfill: the datasets of a shard are processed in alphabetical order,
+    so that all the datasets up to last_dataset have already been analyzed.
+
+    Args:
+        shard (`int`): index of the shard
+        num_shards (`int`): number of shards
+        last_dataset (`str`, optional): last analyzed dataset of the shard
+        total_datasets (`int`): number of datasets in the shard
+        analyzed_datasets (`int`): number of analyzed datasets
+        backfilled_datasets (`int`): number of datasets for which jobs have been created
+        created_jobs (`int`): number of created jobs
+        started_at (`datetime`): when the backfill of the shard has been started
+        updated_at (`datetime`): when the progress has been updated
+        finished_at (`datetime`, optional): when the backfill of the shard has been finished
+    """
+
+    id = ObjectIdField(db_field="_id", primary_key=True, default=ObjectId)
+    shard = IntField(required=True)
+    num_shards = IntField(required=True)
+    last_dataset = StringField()
+    total_datasets = IntField(required=True, default=0)
+    analyzed_datasets = IntField(required=True, default=0)
+    backfilled_datasets = IntField(required=True, default=0)
+    created_jobs = IntField(required=True, default=0)
+    started_at = DateTimeField(default=get_datetime)
+    updated_at = DateTimeField(default=get_datetime)
+    finished_at = DateTimeField()
+
+    meta = {
+        "collection": METRICS_COLLECTION_BACKFILL_PROGRESS_METRIC,
+        "db_alias": METRICS_MONGOENGINE_ALIAS,
+        "indexes": [("num_shards", "shard")],
+    }
+    objects = QuerySetManager["BackfillProgressMetric"]()
+
+
 # only for the tests
 def _clean_metrics_database() -> None:
+    BackfillProgressMetric.drop_collection()  # type: ignore
     CacheTotalMetric.drop_collection()  # type: ignore
     JobTotalMetric.drop_collection()  # type: ignore
@@ -2,9 +2,18 @@
 # Copyright 2022 The HuggingFace Authors.
 
 import logging
+from functools import partial
+from typing import Optional
 
+from libcommon.dataset import get_dataset_changed_paths
 from libcommon.orchestrator import DatasetOrchestrator
 from libcommon.processing_graph import ProcessingGraph
+from libcommon.queue import (
+    add_dataset_update,
+    claim_dataset_updates,
+    delete_dataset_updates,
+    finish_dataset_update,
+)
 from libcommon.simple_cache import delete_dataset_responses
 from libcommon.utils import Priority
 
@@ -14,6 +23,8 @@ def backfill_dataset(
     revision: str,
     processing_graph: ProcessingGraph,
     priority: Priority = Priority.NORMAL,
+    hf_endpoint: Optional[str] = None,
+    hf_token: Optional[str] = None,
 ) -> None:
     """
     Update a dataset
@@ -23,12 +34,23 @@ def backfill_dataset(
         revision (str): The revision of the dataset.
         processing_graph (ProcessingGraph): the processing graph
         priority (Priority, optional): The priority of the job. Defaults to Priority.NORMAL.
+        hf_endpoint (str, optional): The Hub endpoint. If set, the changed files between the revision of the cache
+          and the new revision are listed, and if only non-data files changed, the cache entries are updated in place.
+          Defaults to None.
+        hf_token (str, optional): The token to list the files on the Hub. Defaults to None.
 
     Returns: None.
     """
     logging.debug(f"backfill {dataset=} {revision=} {priority=}")
     DatasetOrchestrator(dataset=dataset, processing_graph=processing_graph).set_revision(
-        revision=revision, priority=priority, error_codes_to_retry=[]
+        revision=revision,
+        priority=priority,
+        error_codes_to_retry=[],
+        get_changed_paths=(
+            None
+            if hf_endpoint is None
+            else partial(get_dataset_changed_paths, hf_endpoint=hf_endpoint, hf_token=hf_token)
+        ),
     )
 
 
@@ -36,10 +58,82 @@ def delete_dataset(dataset: str) -> None:
     """
     Delete a dataset
 
+    The pending update of the dataset, if any, is also deleted.
+
     Args:
         dataset (str): the dataset
 
     Returns: None.
     """
     logging.debug(f"delete cache for dataset='{dataset}'")
+    delete_dataset_updates(dataset=dataset)
     delete_dataset_responses(dataset=dataset)
+
+
+def buffer_dataset_update(dataset: str, revision: str) -> None:
+    """
+    Buffer an update of a dataset, to backfill it later with process_dataset_updates
+
+    The updates of a dataset are coalesced: if several updates are received in a short time, the dataset is only
+    backfilled once, with the latest revision.
+
+    Args:
+        dataset (str): the dataset
+        revision (str): The revision of the dataset.
+
+    Returns: None.
+    """
+    logging.debug(f"buffer update {dataset=} {revision=}")
+    add_dataset_update(dataset=dataset, revision=revision)
+
+
+def process_dataset_updates(
+    processing_graph: ProcessingGraph,
+    debounce_seconds: float,
+    max_wait_seconds: float,
+    lock_seconds: float = 600,
+    limit: int = 100,
+    hf_endpoint: Optional[str] = None,
+    hf_token: Optional[str] = None,
+) -> int:
+    """
+    Backfill the datasets whose buffered updates have settled (see libcommon.queue.claim_dataset_updates)
+
+    If the backfill of a dataset fails, its update is not deleted, and it will be processed again once the lock has
+    expired.
+
+    Args:
+        processing_graph (ProcessingGraph): the processing graph
+        debounce_seconds (float): the minimum number of seconds without event before backfilling a dataset
+        max_wait_seconds (float): the maximum number of seconds to wait before backfilling a dataset
+        lock_seconds (float, optional): the number of seconds during which a claimed update cannot be claimed again.
+          Defaults to 600.
+        limit (int, optional): the maximum number of datasets to backfill. Defaults to 100.
+        hf_endpoint (str, optional): the Hub endpoint, passed to backfill_dataset. Defaults to None.
+        hf_token (str, optional): the Hub token, passed to backfill_dataset. Defaults to None.
+
+    Returns:
+        int: the number of backfilled datasets
+    """
+    num_backfilled_datasets = 0
+    for dataset_update in claim_dataset_updates(
+        debounce_seconds=debounce_seconds, max_wait_seconds=max_wait_seconds, lock_seconds=lock_seconds, limit=limit
+    ):
+        dataset = dataset_update["dataset"]
+        revision = dataset_update["revision"]
+        try:
+            backfill_dataset(
+                dataset=dataset,
+                revision=revision,
+                processing_graph=processing_graph,
+                priority=Priority.NORMAL,
+                hf_endpoint=hf_endpoint,
+                hf_token=hf_token,
+            )
+        except Exception:
+            logging.exception(f"failed to backfill {dataset=} {revision=}, it will be retried")
+            continue
+        logging.debug(f"backfilled {dataset=} {revision=} after {dataset_update['num_events']} coalesced event(s)")
+        finish_dataset_update(dataset_update)
+        num_backfilled_datasets += 1
+    return num_backfilled_datasets
@@ -4,7 +4,8 @@
 import logging
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Set, Union
+from fnmatch import fnmatch
+from typing import Callable, Dict, List, Mapping, Optional, Set, Tuple, Union
 
 import pandas as pd
 
@@ -12,13 +13,17 @@ from libcommon.processing_graph import (
     ProcessingGraph,
     ProcessingStep,
     ProcessingStepDoesNotExist,
+    ProcessingSteps,
 )
 from libcommon.prometheus import StepProfiler
 from libcommon.queue import Queue
 from libcommon.simple_cache import (
     fetch_names,
-    get_cache_entries_df,
+    get_cache_entries_df_and_names,
+    get_dataset_git_revisions,
+    get_datasets_cache_freshness,
     has_some_cache,
+    update_dataset_git_revision,
     upsert_response_params,
 )
 from libcommon.state import ArtifactState, DatasetState, FirstStepsDatasetState
@@ -26,6 +31,18 @@ from libcommon.utils import JobInfo, JobResult, Priority
 
 # TODO: clean dangling cache entries
 
+ChangedPathsGetter = Callable[[str, str, str], Set[str]]
+# ^ (dataset, old_revision, new_revision) -> paths of the files changed between both revisions
+
+# the files that cannot change the result of any processing step. README.md is not one of them: its YAML header can
+# define the configs, or disable the viewer.
+NON_DATA_FILE_PATTERNS = [".gitattributes", ".gitignore", "*.md", "LICENSE"]
+DATA_FILES_EXCEPTIONS = ["README.md"]
+
+
+def is_non_data_file(path: str) -> bool:
+    return path not in DATA_FILES_EXCEPTIONS and any(fnmatch(path, pattern) for pattern in NON_DATA_FILE_PATTERNS)
+
 
 @dataclass
 class CacheStatus:
@@ -81,7 +98,7 @@ class CreateJobsTask(Task):
             step="all",
             context=f"num_jobs_to_create={len(self.job_infos)}",
         ):
-            created_jobs_count = Queue().create_jobs(job_infos=self.job_infos)
+            created_jobs_count = Queue().upsert_jobs(job_infos=self.job_infos)
             if created_jobs_count != len(self.job_infos):
                 raise ValueError(
                     f"Something went wrong when creating jobs: {len(self.job_infos)} jobs were supposed to be"
@@ -141,11 +158,55 @@ class Plan:
         return sorted(task.id for task in self.tasks)
 
 
+AfterJobPlanArtifactKey = Tuple[str, Optional[str], Optional[str]]
+# ^ (job type, config, split)
+
+
+def match_pending_jobs(
+    pending_jobs_df: pd.DataFrame, artifacts: Set[AfterJobPlanArtifactKey], revision: str
+) -> Tuple[Set[str], Set[AfterJobPlanArtifactKey]]:
+    """Match the pending jobs of a dataset with the expected artifacts, in one pass.
+
+    For every expected artifact, the first pending job for the revision is kept, and the other pending jobs are
+    deleted. The pending jobs for other artifacts are ignored.
+
+    Args:
+        pending_jobs_df (pd.DataFrame): the pending jobs of the dataset, as returned by Queue.get_pending_jobs_df
+        artifacts (Set[AfterJobPlanArtifactKey]): the expected artifacts, as (job type, config, split)
+        revision (str): the current revision of the dataset
+
+    Returns:
+        Tuple[Set[str], Set[AfterJobPlanArtifactKey]]: the ids of the jobs to delete, and the artifacts that already
+          have a valid pending job
+    """
+    job_ids_to_delete: Set[str] = set()
+    artifacts_with_pending_job: Set[AfterJobPlanArtifactKey] = set()
+    for job_id, job_type, config, split, job_revision in zip(
+        pending_jobs_df["job_id"],
+        pending_jobs_df["type"],
+        pending_jobs_df["config"],
+        pending_jobs_df["split"],
+        pending_jobs_df["revision"],
+    ):
+        artifact = (job_type, None if pd.isna(config) else config, None if pd.isna(split) else split)
+        if artifact not in artifacts:
+            # unrelated job
+            continue
+        if job_revision == revision and artifact not in artifacts_with_pending_job:
+            artifacts_with_pending_job.add(artifact)
+        else:
+            job_ids_to_delete.add(job_id)
+    return job_ids_to_delete, artifacts_with_pending_job
+
+
 @dataclass
 class AfterJobPlan(Plan):
     """
     Plan to create jobs after a processing step has finished.
 
+    The pending jobs of the children steps are fetched once, and matched with the expected artifacts with set
+    operations (no DataFrame masks per artifact, which matters for large fan-outs).
+
     Args:
         job_info (JobInfo): The job info.
         processing_graph (ProcessingGraph): The processing graph.
@@ -180,30 +241,30 @@ class AfterJobPlan(Plan):
             return
 
         # get the list of pending jobs for the children
-        # note that it can contain a lot of unrelated jobs, we will clean after
+        # note that it can contain a lot of unrelated jobs, they are ignored
         self.pending_jobs_df = Queue().get_pending_jobs_df(
             dataset=self.dataset,
             job_types=[next_processing_step.job_type for next_processing_step in next_processing_steps],
         )
 
-        self.job_infos_to_create: List[JobInfo] = []
+        artifacts: List[AfterJobPlanArtifactKey] = []
         config_names: Optional[List[str]] = None
         split_names: Optional[List[str]] = None
 
-        # filter to only get the jobs that are not already in the queue
+        # list the artifacts that are expected for the children
         for next_processing_step in next_processing_steps:
             if processing_step.input_type == next_processing_step.input_type:
                 # same level, one job is expected
                 # D -> D, C -> C, S -> S
-                self.update(next_processing_step, config, split)
+                artifacts.append((next_processing_step.job_type, config, split))
             elif processing_step.input_type in ["config", "split"] and next_processing_step.input_type == "dataset":
                 # going to upper level (fan-in), one job is expected
                 # S -> D, C -> D
-                self.update(next_processing_step, None, None)
+                artifacts.append((next_processing_step.job_type, None, None))
             elif processing_step.input_type == "split" and next_processing_step.input_type == "config":
                 # going to upper level (fan-in), one job is expected
                 # S -> C
-                self.update(next_processing_step, config, None)
+                artifacts.append((next_processing_step.job_type, config, None))
             elif processing_step.input_type == "dataset" and next_processing_step.input_type == "config":
                 # going to lower level (fan-out), one job is expected per config, we need the list of configs
                 # D -> C
@@ -218,8 +279,7 @@ class AfterJobPlan(Plan):
                         names_field="config_names",
                         name_field="config",
                     )  # Note that we use the cached content even the revision is different (ie. maybe obsolete)
-                for config_name in config_names:
-                    self.update(next_processing_step, config_name, None)
+                artifacts.extend((next_processing_step.job_type, config_name, None) for config_name in config_names)
             elif processing_step.input_type == "config" and next_processing_step.input_type == "split":
                 # going to lower level (fan-out), one job is expected per split, we need the list of splits
                 # C -> S
@@ -234,65 +294,44 @@ class AfterJobPlan(Plan):
                         names_field="splits",
                         name_field="split",
                     )  # Note that we use the cached content even the revision is different (ie. maybe obsolete)
-                for split_name in split_names:
-                    self.update(next_processing_step, config, split_name)
+                artifacts.extend((next_processing_step.job_type, config, split_name) for split_name in split_names)
             else:
                 raise NotImplementedError(
                     f"Unsupported input types: {processing_step.input_type} -> {next_processing_step.input_type}"
                 )
                 # we don't support fan-out dataset-level to split-level (no need for now)
 
+        job_ids_to_delete, artifacts_with_pending_job = match_pending_jobs(
+            pending_jobs_df=self.pending_jobs_df, artifacts=set(artifacts), revision=self.revision
+        )
+        job_infos_to_create: List[JobInfo] = [
+            {
+                "job_id": "not used",  # TODO: remove this field
+                "type": job_type,
+                "params": {
+                    "dataset": self.dataset,
+                    "config": config,
+                    "split": split,
+                    "revision": self.revision,
+                },
+                "priority": self.priority,
+            }
+            for job_type, config, split in dict.fromkeys(artifacts)
+            if (job_type, config, split) not in artifacts_with_pending_job
+        ]
+
         # Better keep this order: delete, then create
         # Note that all the pending jobs for other revisions will be deleted
-        if not self.pending_jobs_df.empty:
-            self.add_task(DeleteJobsTask(jobs_df=self.pending_jobs_df))
-        if self.job_infos_to_create:
-            self.add_task(CreateJobsTask(job_infos=self.job_infos_to_create))
+        if job_ids_to_delete:
+            self.add_task(
+                DeleteJobsTask(jobs_df=self.pending_jobs_df[self.pending_jobs_df["job_id"].isin(job_ids_to_delete)])
+            )
+        if job_infos_to_create:
+            self.add_task(CreateJobsTask(job_infos=job_infos_to_create))
 
-    def update(
-        self,
-        next_processing_step: ProcessingStep,
-        config: Optional[str],
-        split: Optional[str],
-    ) -> None:
-        # ignore unrelated jobs
-        config_mask = (
-            self.pending_jobs_df["config"].isnull() if config is None else self.pending_jobs_df["config"] == config
-        )
-        split_mask = (
-            self.pending_jobs_df["split"].isnull() if split is None else self.pending_jobs_df["split"] == split
-        )
 
-        unrelated_jobs_mask = (self.pending_jobs_df["type"] == next_processing_step.job_type) & (
-            (self.pending_jobs_df["dataset"] != self.dataset) | (~config_mask) | (~split_mask)
-        )
-        self.pending_jobs_df = self.pending_jobs_df[~unrelated_jobs_mask]
-
-        jobs_mask = (
-            (self.pending_jobs_df["type"] == next_processing_step.job_type)
-            & (self.pending_jobs_df["dataset"] == self.dataset)
-            & (config_mask)
-            & (split_mask)
-        )
-        ok_jobs_mask = jobs_mask & (self.pending_jobs_df["revision"] == self.revision)
-        if ok_jobs_mask.any():
-            # remove the first ok job for the list, and keep the others to delete them later
-            self.pending_jobs_df.drop(ok_jobs_mask.idxmax(), inplace=True)
-        else:
-            # no pending job for the current processing step
-            self.job_infos_to_create.append(
-                {
-                    "job_id": "not used",  # TODO: remove this field
-                    "type": next_processing_step.job_type,
-                    "params": {
-                        "dataset": self.dataset,
-                        "config": config,
-                        "split": split,
-                        "revision": self.revision,
-                    },
-                    "priority": self.priority,
-                }
-            )
+ArtifactStatesIndexKey = Tuple[str, Optional[str], Optional[str]]
+# ^ (step name, config, split)
 
 
 @dataclass
@@ -309,6 +348,11 @@ class DatasetBackfillPlan(Plan):
         error_codes_to_retry: list of error codes to retry
         priority: priority of the jobs to create
         only_first_processing_steps: if True, only the first processing steps are backfilled
+        processing_step_name: if set, only the artifacts of this processing step and of its descendants are backfilled
+          (incremental backfill). The cache entries of their parents are also loaded, to check if the artifacts are
+          outdated.
+        config: if set, with processing_step_name, only the artifacts of this config are backfilled. Ignored if one of
+          the steps to backfill is a dataset-level step, since it depends on all the configs.
     """
 
     dataset: str
@@ -317,10 +361,14 @@ class DatasetBackfillPlan(Plan):
     error_codes_to_retry: Optional[List[str]] = None
     priority: Priority = Priority.LOW
     only_first_processing_steps: bool = False
+    processing_step_name: Optional[str] = None
+    config: Optional[str] = None
 
+    processing_steps: ProcessingSteps = field(init=False)
     pending_jobs_df: pd.DataFrame = field(init=False)
     cache_entries_df: pd.DataFrame = field(init=False)
     dataset_state: DatasetState = field(init=False)
+    artifact_states_index: Dict[ArtifactStatesIndexKey, List[ArtifactState]] = field(init=False)
     cache_status: CacheStatus = field(init=False)
 
     def __post_init__(self) -> None:
@@ -330,39 +378,77 @@ class DatasetBackfillPlan(Plan):
             step="all",
             context=f"dataset={self.dataset}",
         ):
+            state_processing_step_names: Optional[Set[str]] = None
+            config: Optional[str] = None
+            if self.processing_step_name is not None:
+                if self.only_first_processing_steps:
+                    raise ValueError("processing_step_name and only_first_processing_steps are mutually exclusive")
+                try:
+                    descendants = self.processing_graph.get_descendants(self.processing_step_name)
+                except ProcessingStepDoesNotExist as e:
+                    raise ValueError(f"Processing step {self.processing_step_name} does not exist") from e
+                processing_step_names = {self.processing_step_name}.union(step.name for step in descendants)
+                self.processing_steps = tuple(
+                    processing_step
+                    for processing_step in self.processing_graph.get_topologically_ordered_processing_steps()
+                    if processing_step.name in processing_step_names
+                )
+                # the parents are only needed to check if the artifacts are outdated, they are not backfilled
+                state_processing_step_names = processing_step_names.union(
+                    parent.name
+                    for processing_step in self.processing_steps
+                    for parent in self.processing_graph.get_parents(processing_step.name)
+                )
+                if all(processing_step.input_type != "dataset" for processing_step in self.processing_steps):
+                    config = self.config
+            elif self.only_first_processing_steps:
+                self.processing_steps = self.processing_graph.get_first_processing_steps()
+            else:
+                self.processing_steps = self.processing_graph.get_topologically_ordered_processing_steps()
+            is_full_backfill = self.processing_step_name is None and not self.only_first_processing_steps
+
             with StepProfiler(
                 method="DatasetBackfillPlan.__post_init__",
                 step="get_pending_jobs_df",
                 context=f"dataset={self.dataset}",
             ):
                 job_types = (
-                    [
-                        processing_step.job_type
-                        for processing_step in self.processing_graph.get_first_processing_steps()
-                    ]
-                    if self.only_first_processing_steps
-                    else None
+                    None
+                    if is_full_backfill
+                    else [processing_step.job_type for processing_step in self.processing_steps]
                 )
                 self.pending_jobs_df = Queue().get_pending_jobs_df(
                     dataset=self.dataset,
                     job_types=job_types,
+                    config=config,
                 )
             with StepProfiler(
                 method="DatasetBackfillPlan.__post_init__",
-                step="get_cache_entries_df",
+                step="get_cache_entries_df_and_names",
                 context=f"dataset={self.dataset}",
             ):
-                cache_kinds = (
-                    [
-                        processing_step.cache_kind
-                        for processing_step in self.processing_graph.get_first_processing_steps()
+                if is_full_backfill:
+                    cache_kinds = None
+                elif state_processing_step_names is None:
+                    cache_kinds = [processing_step.cache_kind for processing_step in self.processing_steps]
+                else:
+                    cache_kinds = [
+                        self.processing_graph.get_processing_step(processing_step_name).cache_kind
+                        for processing_step_name in sorted(state_processing_step_names)
                     ]
-                    if self.only_first_processing_steps
-                    else None
-                )
-                self.cache_entries_df = get_cache_entries_df(
+                # the config and split names are read from the same query, instead of one query per config
+                self.cache_entries_df, dataset_names = get_cache_entries_df_and_names(
                     dataset=self.dataset,
+                    config_names_kinds=[
+                        processing_step.cache_kind
+                        for processing_step in self.processing_graph.get_dataset_config_names_processing_steps()
+                    ],
+                    split_names_kinds=[
+                        processing_step.cache_kind
+                        for processing_step in self.processing_graph.get_config_split_names_processing_steps()
+                    ],
                     cache_kinds=cache_kinds,
+                    config=config,
                 )
 
             with StepProfiler(
@@ -387,8 +473,17 @@ class DatasetBackfillPlan(Plan):
                         pending_jobs_df=self.pending_jobs_df,
                         cache_entries_df=self.cache_entries_df,
                         error_codes_to_retry=self.error_codes_to_retry,
+                        processing_step_names=state_processing_step_names,
+                        config=config,
+                        dataset_names=dataset_names,
                     )
                 )
+            with StepProfiler(
+                method="DatasetBackfillPlan.__post_init__",
+                step="_build_artifact_states_index",
+                context=f"dataset={self.dataset}",
+            ):
+                self._build_artifact_states_index()
             with StepProfiler(
                 method="DatasetBackfillPlan.__post_init__",
                 step="_get_cache_status",
@@ -402,6 +497,35 @@ class DatasetBackfillPlan(Plan):
             ):
                 self._create_plan()
 
+    def _build_artifact_states_index(self) -> None:
+        """Index the artifact states by (step name, config, split), to get them with a dict lookup.
+
+        Every artifact state is indexed under (step, None, None), and also under (step, config, None) if it has a
+        config, and under (step, config, split) if it has a split.
+
+        Raises:
+            ValueError: if there are duplicate artifact states for a processing step
+        """
+        self.artifact_states_index = {}
+        artifact_states = list(self.dataset_state.artifact_state_by_step.values())
+        for config_state in self.dataset_state.config_states:
+            artifact_states.extend(config_state.artifact_state_by_step.values())
+            for split_state in config_state.split_states:
+                artifact_states.extend(split_state.artifact_state_by_step.values())
+        artifact_states_ids: Set[str] = set()
+        for artifact_state in artifact_states:
+            if artifact_state.id in artifact_states_ids:
+                raise ValueError(f"Duplicate artifact states for processing_step {artifact_state.processing_step}")
+            artifact_states_ids.add(artifact_state.id)
+            step_name = artifact_state.processing_step.name
+            keys: List[ArtifactStatesIndexKey] = [(step_name, None, None)]
+            if artifact_state.config is not None:
+                keys.append((step_name, artifact_state.config, None))
+                if artifact_state.split is not None:
+                    keys.append((step_name, artifact_state.config, artifact_state.split))
+            for key in keys:
+                self.artifact_states_index.setdefault(key, []).append(artifact_state)
+
     def _get_artifact_states_for_step(
         self, processing_step: ProcessingStep, config: Optional[str] = None, split: Optional[str] = None
     ) -> List[ArtifactState]:
@@ -417,66 +541,31 @@ class DatasetBackfillPlan(Plan):
         Returns:
             the artifact states for the step
         """
+        key: ArtifactStatesIndexKey
         if processing_step.input_type == "dataset":
-            artifact_states = [self.dataset_state.artifact_state_by_step[processing_step.name]]
+            key = (processing_step.name, None, None)
         elif processing_step.input_type == "config":
-            if config is None:
-                artifact_states = [
-                    config_state.artifact_state_by_step[processing_step.name]
-                    for config_state in self.dataset_state.config_states
-                ]
-            else:
-                artifact_states = [
-                    config_state.artifact_state_by_step[processing_step.name]
-                    for config_state in self.dataset_state.config_states
-                    if config_state.config == config
-                ]
+            key = (processing_step.name, config, None)
         elif processing_step.input_type == "split":
-            if config is None:
-                artifact_states = [
-                    split_state.artifact_state_by_step[processing_step.name]
-                    for config_state in self.dataset_state.config_states
-                    for split_state in config_state.split_states
-                ]
-            elif split is None:
-                artifact_states = [
-                    split_state.artifact_state_by_step[processing_step.name]
-                    for config_state in self.dataset_state.config_states
-                    if config_state.config == config
-                    for split_state in config_state.split_states
-                ]
-            else:
-                artifact_states = [
-                    split_state.artifact_state_by_step[processing_step.name]
-                    for config_state in self.dataset_state.config_states
-                    if config_state.config == config
-                    for split_state in config_state.split_states
-                    if split_state.split == split
-                ]
+            key = (processing_step.name, config, split if config is not None else None)
         else:
             raise ValueError(f"Invalid input type: {processing_step.input_type}")
-        artifact_states_ids = {artifact_state.id for artifact_state in artifact_states}
-        if len(artifact_states_ids) != len(artifact_states):
-            raise ValueError(f"Duplicate artifact states for processing_step {processing_step}")
-        return artifact_states
+        return self.artifact_states_index.get(key, [])
 
     def _get_cache_status(self) -> CacheStatus:
         cache_status = CacheStatus()
 
-        processing_steps = (
-            self.processing_graph.get_first_processing_steps()
-            if self.only_first_processing_steps
-            else self.processing_graph.get_topologically_ordered_processing_steps()
-        )
-        for processing_step in processing_steps:
+        for processing_step in self.processing_steps:
             # Every step can have one or multiple artifacts, for example config-level steps have one artifact per
             # config
+            parent_steps = self.processing_graph.get_parents(processing_step.name)
+            # ^ computed once per step, not once per artifact
             artifact_states = self._get_artifact_states_for_step(processing_step)
             for artifact_state in artifact_states:
                 # any of the parents is more recent?
                 if any(
                     artifact_state.cache_state.is_older_than(parent_artifact_state.cache_state)
-                    for parent_step in self.processing_graph.get_parents(processing_step.name)
+                    for parent_step in parent_steps
                     for parent_artifact_state in self._get_artifact_states_for_step(
                         processing_step=parent_step,
                         config=artifact_state.config,
@@ -512,22 +601,17 @@ class DatasetBackfillPlan(Plan):
         return cache_status
 
     def get_queue_status(self) -> QueueStatus:
-        processing_steps = (
-            self.processing_graph.get_first_processing_steps()
-            if self.only_first_processing_steps
-            else self.processing_graph.get_topologically_ordered_processing_steps()
-        )
         return QueueStatus(
             in_process={
                 artifact_state.id
-                for processing_step in processing_steps
+                for processing_step in self.processing_steps
                 for artifact_state in self._get_artifact_states_for_step(processing_step)
                 if artifact_state.job_state.is_in_process
             }
         )
 
     def _create_plan(self) -> None:
-        pending_jobs_to_delete_df = self.pending_jobs_df.copy()
+        valid_pending_job_ids: Set[str] = set()
         job_infos_to_create: List[JobInfo] = []
         artifact_states = (
             list(self.cache_status.cache_is_empty.values())
@@ -537,8 +621,8 @@ class DatasetBackfillPlan(Plan):
             + list(self.cache_status.cache_has_different_git_revision.values())
         )
         for artifact_state in artifact_states:
-            valid_pending_jobs_df = artifact_state.job_state.valid_pending_jobs_df
-            if valid_pending_jobs_df.empty:
+            valid_pending_job = artifact_state.job_state.valid_pending_job
+            if valid_pending_job is None:
                 job_infos_to_create.append(
                     {
                         "job_id": "not used",
@@ -553,7 +637,8 @@ class DatasetBackfillPlan(Plan):
                     }
                 )
             else:
-                pending_jobs_to_delete_df.drop(valid_pending_jobs_df.index, inplace=True)
+                valid_pending_job_ids.add(valid_pending_job.job_id)
+        pending_jobs_to_delete_df = self.pending_jobs_df[~self.pending_jobs_df["job_id"].isin(valid_pending_job_ids)]
         # Better keep this order: delete, then create
         # Note that all the pending jobs for other revisions will be deleted
         if not pending_jobs_to_delete_df.empty:
@@ -567,17 +652,27 @@ class DatasetOrchestrator:
     dataset: str
     processing_graph: ProcessingGraph
 
-    def set_revision(self, revision: str, priority: Priority, error_codes_to_retry: List[str]) -> None:
+    def set_revision(
+        self,
+        revision: str,
+        priority: Priority,
+        error_codes_to_retry: List[str],
+        get_changed_paths: Optional[ChangedPathsGetter] = None,
+    ) -> None:
         """
         Set the current revision of the dataset.
 
-        If the revision is already set to the same value, this is a no-op. Else: one job is created for every first
-          step.
+        If the revision is already set to the same value, this is a no-op. If only non-data files (see
+          is_non_data_file) changed since the revision of the cache entries, the git revision of the cache entries is
+          updated in place. Else: one job is created for every first step.
 
         Args:
             revision (str): The new revision of the dataset.
             priority (Priority): The priority of the jobs to create.
             error_codes_to_retry (List[str]): The error codes for which the jobs should be retried.
+            get_changed_paths (ChangedPathsGetter, optional): The function that returns the paths of the files
+              changed between two revisions of the dataset (see libcommon.dataset.get_dataset_changed_paths). If
+              None, the cache entries are never updated in place.
 
         Returns:
             None
@@ -596,6 +691,16 @@ class DatasetOrchestrator:
             step="all",
             context=f"dataset={self.dataset}",
         ):
+            if get_changed_paths is not None:
+                with StepProfiler(
+                    method="DatasetOrchestrator.set_revision",
+                    step="update revision without data changes",
+                    context=f"dataset={self.dataset}",
+                ):
+                    if self._update_revision_without_data_changes(
+                        revision=revision, get_changed_paths=get_changed_paths
+                    ):
+                        return
             logging.info(f"Analyzing {self.dataset}")
             with StepProfiler(
                 method="DatasetOrchestrator.set_revision",
@@ -618,6 +723,44 @@ class DatasetOrchestrator:
             ):
                 plan.run()
 
+    def _update_revision_without_data_changes(self, revision: str, get_changed_paths: ChangedPathsGetter) -> bool:
+        """
+        Update the git revision of the cache entries in place, if only non-data files changed since their revision.
+
+        It requires that the dataset has no pending jobs, and that all the cache entries have been computed for the
+        same previous revision: otherwise, the backfill plan is needed.
+
+        Args:
+            revision (str): The new revision of the dataset.
+            get_changed_paths (ChangedPathsGetter): The function that returns the changed paths between two revisions.
+
+        Returns:
+            bool: True if the cache entries have been updated, False if the backfill plan is needed.
+        """
+        if Queue().has_pending_jobs(dataset=self.dataset):
+            return False
+        revisions = get_dataset_git_revisions(dataset=self.dataset)
+        if len(revisions) != 1:
+            return False
+        old_revision = revisions.pop()
+        if old_revision is None or old_revision == revision:
+            return False
+        try:
+            changed_paths = get_changed_paths(self.dataset, old_revision, revision)
+        except Exception as err:
+            logging.warning(f"Could not get the changed paths of {self.dataset}, the backfill plan is needed: {err}")
+            return False
+        if not all(is_non_data_file(path) for path in changed_paths):
+            return False
+        num_updated = update_dataset_git_revision(
+            dataset=self.dataset, old_revision=old_revision, new_revision=revision
+        )
+        logging.info(
+            f"Only non-data files changed in {self.dataset} between revisions {old_revision} and {revision}: updated"
+            f" the revision of {num_updated} cache entries"
+        )
+        return True
+
     def finish_job(self, job_result: JobResult) -> None:
         """
         Finish a job.
@@ -661,6 +804,7 @@ class DatasetOrchestrator:
             error_code=output["error_code"],
             details=output["details"],
             progress=output["progress"],
+            compress_content=processing_step.compress_content,
         )
         logging.debug("the job output has been written to the cache.")
         # finish the job
@@ -717,17 +861,34 @@ class DatasetOrchestrator:
         # is good enough.
         return Queue().has_pending_jobs(dataset=self.dataset, job_types=list(job_types))
 
-    def backfill(self, revision: str, priority: Priority, error_codes_to_retry: Optional[List[str]] = None) -> int:
+    def backfill(
+        self,
+        revision: str,
+        priority: Priority,
+        error_codes_to_retry: Optional[List[str]] = None,
+        processing_step_name: Optional[str] = None,
+        config: Optional[str] = None,
+    ) -> int:
         """
         Backfill the cache for a given revision.
 
+        If processing_step_name is set, the backfill is incremental: only the artifacts of this processing step and of
+          its descendants are analyzed, and only the related cache entries and pending jobs are loaded, so that the
+          cost depends on the size of the change, not on the size of the dataset.
+
         Args:
             revision (str): The revision.
             priority (Priority): The priority of the jobs.
             error_codes_to_retry (Optional[List[str]]): The error codes for which the jobs should be retried.
+            processing_step_name (Optional[str]): If set, only backfill this processing step and its descendants.
+            config (Optional[str]): If set, with processing_step_name, only backfill the artifacts of this config
+              (when none of the steps is a dataset-level step).
 
         Returns:
             int: The number of jobs created.
+
+        Raises:
+            ValueError: If the processing step does not exist.
         """
         with StepProfiler(
             method="DatasetOrchestrator.backfill",
@@ -747,6 +908,8 @@ class DatasetOrchestrator:
                     processing_graph=self.processing_graph,
                     error_codes_to_retry=error_codes_to_retry,
                     only_first_processing_steps=False,
+                    processing_step_name=processing_step_name,
+                    config=config,
                 )
             logging.info(f"Analyzing {self.dataset}")
             with StepProfiler(
@@ -754,4 +917,114 @@ class DatasetOrchestrator:
                 step="run",
                 context=f"dataset={self.dataset}",
             ):
-                return plan.run()
+                plan.run()
+            return sum(len(task.job_infos) for task in plan.tasks if isinstance(task, CreateJobsTask))
+
+
+def finish_crashed_jobs(job_results: List[JobResult], processing_graph: ProcessingGraph) -> int:
+    """
+    Finish, in bulk, jobs that crashed (eg. zombies).
+
+    The jobs that are still started are set to the error state. Then, for each of them, the output is stored in the
+    cache and the next steps are triggered, as in DatasetOrchestrator.finish_job.
+
+    The jobs whose job type is not in the processing graph anymore are set to the error state too, but nothing is
+    stored in the cache for them, so that they don't block the other jobs.
+
+    Args:
+        job_results (List[JobResult]): The results of the crashed jobs.
+        processing_graph (ProcessingGraph): The processing graph.
+
+    Returns:
+        int: The number of finished jobs.
+    """
+    processing_steps: List[Optional[ProcessingStep]] = []
+    for job_result in job_results:
+        job_type = job_result["job_info"]["type"]
+        try:
+            processing_steps.append(processing_graph.get_processing_step_by_job_type(job_type))
+        except ProcessingStepDoesNotExist:
+            logging.warning(
+                f"Processing step for job type {job_type} does not exist: the job {job_result['job_info']['job_id']}"
+                " is finished without caching its response"
+            )
+            processing_steps.append(None)
+    killed_job_ids = set(Queue().kill_zombies(zombies=[job_result["job_info"] for job_result in job_results]))
+    for job_result, processing_step in zip(job_results, processing_steps):
+        job_info = job_result["job_info"]
+        if job_info["job_id"] not in killed_job_ids:
+            logging.debug(f"the job {job_info['job_id']} was not started anymore, don't update the cache")
+            continue
+        output = job_result["output"]
+        if not output or processing_step is None:
+            continue
+        upsert_response_params(
+            # inputs
+            kind=processing_step.cache_kind,
+            job_params=job_info["params"],
+            job_runner_version=job_result["job_runner_version"],
+            # output
+            content=output["content"],
+            http_status=output["http_status"],
+            error_code=output["error_code"],
+            details=output["details"],
+            progress=output["progress"],
+            compress_content=processing_step.compress_content,
+        )
+        AfterJobPlan(job_info=job_info, processing_graph=processing_graph).run()
+    return len(killed_job_ids)
+
+
+def get_up_to_date_datasets(
+    dataset_revisions: Mapping[str, str],
+    processing_graph: ProcessingGraph,
+    error_codes_to_retry: Optional[List[str]] = None,
+) -> Set[str]:
+    """
+    Get the datasets whose cache is up to date, with one aggregation on the cache instead of one plan per dataset.
+
+    A dataset is up to date if it has exactly one cache entry per expected artifact (the config and split names are
+    read from the cache, as in DatasetState), and all of them have been computed for the given revision, with the
+    current job runner version, and are not an error to retry.
+
+    Note that, unlike DatasetBackfillPlan, it does not check if an artifact is outdated by its parent, nor the pending
+    jobs. It's meant to skip the datasets that don't need a backfill plan.
+
+    Args:
+        dataset_revisions (Mapping[str, str]): The current revision of every dataset.
+        processing_graph (ProcessingGraph): The processing graph.
+        error_codes_to_retry (Optional[List[str]]): The error codes for which the jobs should be retried.
+
+    Returns:
+        Set[str]: The datasets whose cache is up to date.
+    """
+    processing_steps = processing_graph.get_processing_steps()
+    num_dataset_steps = len(processing_graph.get_input_type_processing_steps(input_type="dataset"))
+    num_config_steps = len(processing_graph.get_input_type_processing_steps(input_type="config"))
+    num_split_steps = len(processing_graph.get_input_type_processing_steps(input_type="split"))
+    up_to_date_datasets: Set[str] = set()
+    for freshness in get_datasets_cache_freshness(
+        datasets=list(dataset_revisions),
+        job_runner_version_by_kind={
+            processing_step.cache_kind: processing_step.job_runner_version for processing_step in processing_steps
+        },
+        config_names_kinds=[
+            processing_step.cache_kind
+            for processing_step in processing_graph.get_dataset_config_names_processing_steps()
+        ],
+        split_names_kinds=[
+            processing_step.cache_kind
+            for processing_step in processing_graph.get_config_split_names_processing_steps()
+        ],
+        error_codes_to_retry=error_codes_to_retry,
+    ):
+        num_expected_entries = (
+            num_dataset_steps + num_config_steps * freshness["num_configs"] + num_split_steps * freshness["num_splits"]
+        )
+        if (
+            freshness["num_entries"] == num_expected_entries
+            and freshness["num_stale_entries"] == 0
+            and freshness["git_revisions"] == [dataset_revisions[freshness["dataset"]]]
+        ):
+            up_to_date_datasets.add(freshness["dataset"])
+    return up_to_date_datasets
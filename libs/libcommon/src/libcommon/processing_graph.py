@@ -11,6 +11,7 @@ from typing import (
     Literal,
     Mapping,
     Optional,
+    Set,
     Tuple,
     TypedDict,
     Union,
@@ -54,6 +55,7 @@ class ProcessingStepSpecification(TypedDict, total=False):
     provides_config_split_names: bool
     provides_config_parquet: bool
     provides_config_parquet_metadata: bool
+    compress_content: bool
 
 
 ProcessingGraphSpecification = Mapping[str, ProcessingStepSpecification]
@@ -63,14 +65,17 @@ class ProcessingStepDoesNotExist(Exception):
     pass
 
 
-@dataclass
+@dataclass(frozen=True)
 class ProcessingStep:
     """A dataset processing step.
 
+    The processing step is immutable, so that the same instance can be shared by all the users of the graph.
+
     Attributes:
         name (str): The processing step name.
         input_type (InputType): The input type ('dataset', 'config' or 'split').
         job_runner_version (int): The version of the job runner to use to compute the response.
+        compress_content (bool): Whether the content of the cached responses is stored compressed.
 
     Getters:
         cache_kind (str): The cache kind (ie. the key in the cache).
@@ -80,13 +85,15 @@ class ProcessingStep:
     name: str
     input_type: InputType
     job_runner_version: int
+    compress_content: bool = False
 
     cache_kind: str = field(init=False)
     job_type: str = field(init=False)
 
     def __post_init__(self) -> None:
-        self.cache_kind = self.name
-        self.job_type = self.name
+        # the dataclass is frozen
+        object.__setattr__(self, "cache_kind", self.name)
+        object.__setattr__(self, "job_type", self.name)
 
     def copy(self) -> ProcessingStep:
         """Copy the processing step.
@@ -98,6 +105,7 @@ class ProcessingStep:
             name=self.name,
             input_type=self.input_type,
             job_runner_version=self.job_runner_version,
+            compress_content=self.compress_content,
         )
 
 
@@ -107,8 +115,7 @@ def get_triggered_by_as_list(triggered_by: Union[List[str], str, None]) -> List[
     return [triggered_by] if isinstance(triggered_by, str) else triggered_by
 
 
-def copy_processing_steps_list(processing_steps: List[ProcessingStep]) -> List[ProcessingStep]:
-    return [processing_step.copy() for processing_step in processing_steps]
+ProcessingSteps = Tuple[ProcessingStep, ...]
 
 
 @dataclass
@@ -119,6 +126,10 @@ class ProcessingGraph:
       by traversing the graph).
     The graph can have multiple roots.
 
+    The graph is frozen at construction: the processing steps are immutable, and the results of the traversals
+      (children, parents, ancestors, descendants, orders, etc.) are precomputed as tuples of processing steps, shared
+      by all the callers. The getters are dict lookups, and don't copy anything.
+
     Args:
         processing_graph_specification (ProcessingGraphSpecification): The specification of the graph.
 
@@ -133,16 +144,20 @@ class ProcessingGraph:
 
     _nx_graph: nx.DiGraph = field(init=False)
     _processing_steps: Mapping[str, ProcessingStep] = field(init=False)
-    _processing_step_names_by_input_type: Mapping[InputType, List[str]] = field(init=False)
-    _first_processing_steps: List[ProcessingStep] = field(init=False)
-    _processing_steps_enables_preview: List[ProcessingStep] = field(init=False)
-    _processing_steps_enables_viewer: List[ProcessingStep] = field(init=False)
-    _config_split_names_processing_steps: List[ProcessingStep] = field(init=False)
-    _config_parquet_processing_steps: List[ProcessingStep] = field(init=False)
-    _config_parquet_metadata_processing_steps: List[ProcessingStep] = field(init=False)
-    _dataset_config_names_processing_steps: List[ProcessingStep] = field(init=False)
-    _topologically_ordered_processing_steps: List[ProcessingStep] = field(init=False)
-    _alphabetically_ordered_processing_steps: List[ProcessingStep] = field(init=False)
+    _processing_steps_by_input_type: Mapping[InputType, ProcessingSteps] = field(init=False)
+    _children_by_name: Mapping[str, ProcessingSteps] = field(init=False)
+    _parents_by_name: Mapping[str, ProcessingSteps] = field(init=False)
+    _ancestors_by_name: Mapping[str, ProcessingSteps] = field(init=False)
+    _descendants_by_name: Mapping[str, ProcessingSteps] = field(init=False)
+    _first_processing_steps: ProcessingSteps = field(init=False)
+    _processing_steps_enables_preview: ProcessingSteps = field(init=False)
+    _processing_steps_enables_viewer: ProcessingSteps = field(init=False)
+    _config_split_names_processing_steps: ProcessingSteps = field(init=False)
+    _config_parquet_processing_steps: ProcessingSteps = field(init=False)
+    _config_parquet_metadata_processing_steps: ProcessingSteps = field(init=False)
+    _dataset_config_names_processing_steps: ProcessingSteps = field(init=False)
+    _topologically_ordered_processing_steps: ProcessingSteps = field(init=False)
+    _alphabetically_ordered_processing_steps: ProcessingSteps = field(init=False)
 
     def __post_init__(self) -> None:
         _nx_graph = nx.DiGraph()
@@ -173,6 +188,12 @@ class ProcessingGraph:
                 raise ValueError(
                     f"Processing step {name} provides config parquet metadata but its input type is {input_type}."
                 )
+            # the config names and the split names are read from the content in the database queries: the content
+            # of the other steps is compressed by default
+            provides_names = provides_dataset_config_names or provides_config_split_names
+            compress_content = specification.get("compress_content", not provides_names)
+            if compress_content and provides_names:
+                raise ValueError(f"Processing step {name} provides names, its content cannot be compressed.")
             if (
                 _nx_graph.has_node(name)
                 or name in _processing_steps
@@ -192,6 +213,7 @@ class ProcessingGraph:
                 name=name,
                 input_type=input_type,
                 job_runner_version=specification.get("job_runner_version", DEFAULT_JOB_RUNNER_VERSION),
+                compress_content=compress_content,
             )
             _processing_step_names_by_input_type[input_type].append(name)
         for name, specification in self.processing_graph_specification.items():
@@ -208,313 +230,329 @@ class ProcessingGraph:
 
         self._nx_graph = _nx_graph
         self._processing_steps = _processing_steps
-        self._processing_step_names_by_input_type = _processing_step_names_by_input_type
-        self._first_processing_steps = [
-            self._processing_steps[processing_step_name]
+        self._processing_steps_by_input_type = {
+            input_type: tuple(_processing_steps[name] for name in names)
+            for input_type, names in _processing_step_names_by_input_type.items()
+        }
+        self._first_processing_steps = tuple(
+            _processing_steps[processing_step_name]
             for processing_step_name, degree in _nx_graph.in_degree()
             if degree == 0
-        ]
+        )
         if any(processing_step.input_type != "dataset" for processing_step in self._first_processing_steps):
             raise ValueError("The first processing steps must be dataset-level. The graph state is incoherent.")
-        self._processing_steps_enables_preview = [
-            self._processing_steps[processing_step_name]
-            for (processing_step_name, required) in _nx_graph.nodes(data="enables_preview")
-            if required
-        ]
-        self._processing_steps_enables_viewer = [
-            self._processing_steps[processing_step_name]
-            for (processing_step_name, required) in _nx_graph.nodes(data="enables_viewer")
-            if required
-        ]
-        self._config_parquet_processing_steps = [
-            self._processing_steps[processing_step_name]
-            for (processing_step_name, provides) in _nx_graph.nodes(data="provides_config_parquet")
-            if provides
-        ]
-        self._config_parquet_metadata_processing_steps = [
-            self._processing_steps[processing_step_name]
-            for (processing_step_name, provides) in _nx_graph.nodes(data="provides_config_parquet_metadata")
-            if provides
-        ]
-        self._config_split_names_processing_steps = [
+        self._processing_steps_enables_preview = self._get_processing_steps_with_attribute("enables_preview")
+        self._processing_steps_enables_viewer = self._get_processing_steps_with_attribute("enables_viewer")
+        self._config_parquet_processing_steps = self._get_processing_steps_with_attribute("provides_config_parquet")
+        self._config_parquet_metadata_processing_steps = self._get_processing_steps_with_attribute(
+            "provides_config_parquet_metadata"
+        )
+        self._config_split_names_processing_steps = self._get_processing_steps_with_attribute(
+            "provides_config_split_names"
+        )
+        self._dataset_config_names_processing_steps = self._get_processing_steps_with_attribute(
+            "provides_dataset_config_names"
+        )
+        self._topologically_ordered_processing_steps = tuple(
+            _processing_steps[processing_step_name] for processing_step_name in nx.topological_sort(_nx_graph)
+        )
+        self._alphabetically_ordered_processing_steps = tuple(
+            _processing_steps[processing_step_name] for processing_step_name in sorted(_nx_graph.nodes())
+        )
+        self._children_by_name = {
+            name: tuple(_processing_steps[successor] for successor in _nx_graph.successors(name))
+            for name in _processing_steps
+        }
+        self._parents_by_name = {
+            name: tuple(_processing_steps[predecessor] for predecessor in _nx_graph.predecessors(name))
+            for name in _processing_steps
+        }
+        # the ancestors and the descendants are ordered topologically
+        self._ancestors_by_name = {
+            name: self._filter_topologically_ordered_processing_steps(nx.ancestors(_nx_graph, name))
+            for name in _processing_steps
+        }
+        self._descendants_by_name = {
+            name: self._filter_topologically_ordered_processing_steps(nx.descendants(_nx_graph, name))
+            for name in _processing_steps
+        }
+
+    def _get_processing_steps_with_attribute(self, attribute: str) -> ProcessingSteps:
+        return tuple(
             self._processing_steps[processing_step_name]
-            for (processing_step_name, provides) in _nx_graph.nodes(data="provides_config_split_names")
-            if provides
-        ]
-        self._dataset_config_names_processing_steps = [
-            self.get_processing_step(processing_step_name)
-            for (processing_step_name, provides) in _nx_graph.nodes(data="provides_dataset_config_names")
-            if provides
-        ]
-        self._topologically_ordered_processing_steps = [
-            self.get_processing_step(processing_step_name) for processing_step_name in nx.topological_sort(_nx_graph)
-        ]
-        self._alphabetically_ordered_processing_steps = [
-            self.get_processing_step(processing_step_name) for processing_step_name in sorted(_nx_graph.nodes())
-        ]
+            for (processing_step_name, value) in self._nx_graph.nodes(data=attribute)
+            if value
+        )
+
+    def _filter_topologically_ordered_processing_steps(self, processing_step_names: Set[str]) -> ProcessingSteps:
+        return tuple(
+            processing_step
+            for processing_step in self._topologically_ordered_processing_steps
+            if processing_step.name in processing_step_names
+        )
 
     def get_processing_step(self, processing_step_name: str) -> ProcessingStep:
         """
         Get a processing step by its name.
 
-        The returned processing step is a copy of the original one, so that it can be modified without affecting the
-        original one.
+        The returned processing step is shared (it is created when the graph is built) and immutable.
 
         Args:
             processing_step_name (str): The name of the processing step
 
         Returns:
             ProcessingStep: The processing step
+
+        Raises:
+            ProcessingStepDoesNotExist: If the processing step is not in the graph
         """
         try:
-            return self._processing_steps[processing_step_name].copy()
-        except nx.NetworkXError as e:
+            return self._processing_steps[processing_step_name]
+        except KeyError as e:
             raise ProcessingStepDoesNotExist(f"Unknown job type: {processing_step_name}") from e
 
     def get_processing_step_by_job_type(self, job_type: str) -> ProcessingStep:
         """
         Get a processing step by its job type.
 
-        The returned processing step is a copy of the original one, so that it can be modified without affecting the
-        original one.
+        The returned processing step is shared (it is created when the graph is built) and immutable.
 
         Args:
             job_type (str): The job type of the processing step
 
         Returns:
             ProcessingStep: The processing step
+
+        Raises:
+            ProcessingStepDoesNotExist: If the processing step is not in the graph
         """
         # for now: the job_type is just an alias for the processing step name
         return self.get_processing_step(job_type)
 
-    def get_children(self, processing_step_name: str) -> List[ProcessingStep]:
+    def get_children(self, processing_step_name: str) -> ProcessingSteps:
         """
         Get the list of children processing steps
 
         The children processing steps are the ones that will be triggered at the end of the processing step.
 
-        The returned processing steps are copies of the original ones, so that they can be modified without affecting
-        the original ones.
+        The returned processing steps are shared (they are precomputed when the graph is built) and immutable.
 
         Args:
             processing_step_name (str): The name of the processing step
 
         Returns:
-            List[ProcessingStep]: The list of children processing steps (successors)
+            ProcessingSteps: The list of children processing steps (successors)
 
         Raises:
             ProcessingStepDoesNotExist: If the processing step is not in the graph
         """
         try:
-            return [
-                self.get_processing_step(successor) for successor in self._nx_graph.successors(processing_step_name)
-            ]
-        except nx.NetworkXError as e:
+            return self._children_by_name[processing_step_name]
+        except KeyError as e:
             raise ProcessingStepDoesNotExist(f"Unknown processing step: {processing_step_name}") from e
 
-    def get_parents(self, processing_step_name: str) -> List[ProcessingStep]:
+    def get_parents(self, processing_step_name: str) -> ProcessingSteps:
         """
         Get the list of parents processing steps
 
         The parent processing steps are the ones that trigger the processing step.
 
-        The returned processing steps are copies of the original ones, so that they can be modified without affecting
-        the original ones.
+        The returned processing steps are shared (they are precomputed when the graph is built) and immutable.
 
         Args:
             processing_step_name (str): The name of the processing step
 
         Returns:
-            List[ProcessingStep]: The list of parent processing steps (predecessors)
+            ProcessingSteps: The list of parent processing steps (predecessors)
 
         Raises:
             ProcessingStepDoesNotExist: If the processing step is not in the graph
         """
         try:
-            return [
-                self.get_processing_step(predecessor)
-                for predecessor in self._nx_graph.predecessors(processing_step_name)
-            ]
-        except nx.NetworkXError as e:
+            return self._parents_by_name[processing_step_name]
+        except KeyError as e:
             raise ProcessingStepDoesNotExist(f"Unknown processing step: {processing_step_name}") from e
 
-    def get_ancestors(self, processing_step_name: str) -> List[ProcessingStep]:
+    def get_ancestors(self, processing_step_name: str) -> ProcessingSteps:
         """
         Get the list of ancestors processing steps
 
         The ancestor processing steps are the ones that trigger the processing step, directly or not.
 
-        The returned processing steps are copies of the original ones, so that they can be modified without affecting
-        the original ones.
+        The returned processing steps are shared (they are precomputed when the graph is built) and immutable.
+
+        Args:
+            processing_step_name (str): The name of the processing step
+
+        Returns:
+            ProcessingSteps: The list of ancestor processing steps, ordered topologically
+
+        Raises:
+            ProcessingStepDoesNotExist: If the processing step is not in the graph
+        """
+        try:
+            return self._ancestors_by_name[processing_step_name]
+        except KeyError as e:
+            raise ProcessingStepDoesNotExist(f"Unknown processing step: {processing_step_name}") from e
+
+    def get_descendants(self, processing_step_name: str) -> ProcessingSteps:
+        """
+        Get the list of descendants processing steps
+
+        The descendant processing steps are the ones that are triggered by the processing step, directly or not.
+
+        The returned processing steps are shared (they are precomputed when the graph is built) and immutable.
 
         Args:
             processing_step_name (str): The name of the processing step
 
         Returns:
-            List[ProcessingStep]: The list of ancestor processing steps
+            ProcessingSteps: The list of descendant processing steps, ordered topologically
 
         Raises:
             ProcessingStepDoesNotExist: If the processing step is not in the graph
         """
         try:
-            return [
-                self.get_processing_step(ancestor) for ancestor in nx.ancestors(self._nx_graph, processing_step_name)
-            ]
-        except nx.NetworkXError as e:
+            return self._descendants_by_name[processing_step_name]
+        except KeyError as e:
             raise ProcessingStepDoesNotExist(f"Unknown processing step: {processing_step_name}") from e
 
-    def get_first_processing_steps(self) -> List[ProcessingStep]:
+    def get_first_processing_steps(self) -> ProcessingSteps:
         """
         Get the first processing steps.
 
         The first processing steps are the ones that don't have a previous step. This means that they will be computed
         first when a dataset is updated. Their input type is always "dataset".
 
-        The returned processing steps are copies of the original ones, so that they can be modified without affecting
-        the original ones.
+        The returned processing steps are shared (they are precomputed when the graph is built) and immutable.
 
         Returns:
-            List[ProcessingStep]: The list of first processing steps
+            ProcessingSteps: The list of first processing steps
         """
-        return copy_processing_steps_list(self._first_processing_steps)
+        return self._first_processing_steps
 
-    def get_processing_steps_enables_preview(self) -> List[ProcessingStep]:
+    def get_processing_steps_enables_preview(self) -> ProcessingSteps:
         """
         Get the processing steps that enable the dataset preview (first rows).
 
-        The returned processing steps are copies of the original ones, so that they can be modified without affecting
-        the original ones.
+        The returned processing steps are shared (they are precomputed when the graph is built) and immutable.
 
         Returns:
-            List[ProcessingStep]: The list of processing steps that enable the dataset preview
+            ProcessingSteps: The list of processing steps that enable the dataset preview
         """
-        return copy_processing_steps_list(self._processing_steps_enables_preview)
+        return self._processing_steps_enables_preview
 
-    def get_processing_steps_enables_viewer(self) -> List[ProcessingStep]:
+    def get_processing_steps_enables_viewer(self) -> ProcessingSteps:
         """
         Get the processing steps that enable the dataset viewer (all rows).
 
-        The returned processing steps are copies of the original ones, so that they can be modified without affecting
-        the original ones.
+        The returned processing steps are shared (they are precomputed when the graph is built) and immutable.
 
         Returns:
-            List[ProcessingStep]: The list of processing steps that enable the dataset viewer
+            ProcessingSteps: The list of processing steps that enable the dataset viewer
         """
-        return copy_processing_steps_list(self._processing_steps_enables_viewer)
+        return self._processing_steps_enables_viewer
 
-    def get_config_parquet_processing_steps(self) -> List[ProcessingStep]:
+    def get_config_parquet_processing_steps(self) -> ProcessingSteps:
         """
         Get the processing steps that provide a config's parquet response.
 
-        The returned processing steps are copies of the original ones, so that they can be modified without affecting
-        the original ones.
+        The returned processing steps are shared (they are precomputed when the graph is built) and immutable.
 
         Returns:
-            List[ProcessingStep]: The list of processing steps that provide a config's parquet response
+            ProcessingSteps: The list of processing steps that provide a config's parquet response
         """
-        return copy_processing_steps_list(self._config_parquet_processing_steps)
+        return self._config_parquet_processing_steps
 
-    def get_config_parquet_metadata_processing_steps(self) -> List[ProcessingStep]:
+    def get_config_parquet_metadata_processing_steps(self) -> ProcessingSteps:
         """
         Get the processing steps that provide a config's parquet metadata response.
 
-        The returned processing steps are copies of the original ones, so that they can be modified without affecting
-        the original ones.
+        The returned processing steps are shared (they are precomputed when the graph is built) and immutable.
 
         Returns:
-            List[ProcessingStep]: The list of processing steps that provide a config's parquet response
+            ProcessingSteps: The list of processing steps that provide a config's parquet metadata response
         """
-        return copy_processing_steps_list(self._config_parquet_metadata_processing_steps)
+        return self._config_parquet_metadata_processing_steps
 
-    def get_config_split_names_processing_steps(self) -> List[ProcessingStep]:
+    def get_config_split_names_processing_steps(self) -> ProcessingSteps:
         """
         Get the processing steps that provide a config's split names.
 
-        The returned processing steps are copies of the original ones, so that they can be modified without affecting
-        the original ones.
+        The returned processing steps are shared (they are precomputed when the graph is built) and immutable.
 
         Returns:
-            List[ProcessingStep]: The list of processing steps that provide a config's split names
+            ProcessingSteps: The list of processing steps that provide a config's split names
         """
-        return copy_processing_steps_list(self._config_split_names_processing_steps)
+        return self._config_split_names_processing_steps
 
-    def get_dataset_config_names_processing_steps(self) -> List[ProcessingStep]:
+    def get_dataset_config_names_processing_steps(self) -> ProcessingSteps:
         """
         Get the processing steps that provide a dataset's config names.
 
-        The returned processing steps are copies of the original ones, so that they can be modified without affecting
-        the original ones.
+        The returned processing steps are shared (they are precomputed when the graph is built) and immutable.
 
         Returns:
-            List[ProcessingStep]: The list of processing steps that provide a dataset's config names
+            ProcessingSteps: The list of processing steps that provide a dataset's config names
         """
-        return copy_processing_steps_list(self._dataset_config_names_processing_steps)
+        return self._dataset_config_names_processing_steps
 
-    def get_topologically_ordered_processing_steps(self) -> List[ProcessingStep]:
+    def get_topologically_ordered_processing_steps(self) -> ProcessingSteps:
         """
         Get the processing steps, ordered topologically.
 
         This means that the first processing steps are the ones that don't have a previous step, and that the last
         processing steps are the ones that don't have a next step.
 
-        The returned processing steps are copies of the original ones, so that they can be modified without affecting
-        the original ones.
+        The returned processing steps are shared (they are precomputed when the graph is built) and immutable.
 
         Returns:
-            List[ProcessingStep]: The list of processing steps
+            ProcessingSteps: The list of processing steps
         """
-        return copy_processing_steps_list(self._topologically_ordered_processing_steps)
+        return self._topologically_ordered_processing_steps
 
-    def get_alphabetically_ordered_processing_steps(self) -> List[ProcessingStep]:
+    def get_alphabetically_ordered_processing_steps(self) -> ProcessingSteps:
         """
         Get the processing steps, ordered alphabetically by the name of the processing steps.
 
-        The returned processing steps are copies of the original ones, so that they can be modified without affecting
-        the original ones.
+        The returned processing steps are shared (they are precomputed when the graph is built) and immutable.
 
         Returns:
-            List[ProcessingStep]: The list of processing steps
+            ProcessingSteps: The list of processing steps
         """
-        return copy_processing_steps_list(self._alphabetically_ordered_processing_steps)
+        return self._alphabetically_ordered_processing_steps
 
-    def get_processing_steps(
-        self, order: Optional[Literal["alphabetical", "topological"]] = None
-    ) -> List[ProcessingStep]:
+    def get_processing_steps(self, order: Optional[Literal["alphabetical", "topological"]] = None) -> ProcessingSteps:
         """
         Get the processing steps.
 
-        The returned processing steps are copies of the original ones, so that they can be modified without affecting
-        the original ones.
+        The returned processing steps are shared (they are precomputed when the graph is built) and immutable.
 
         Args:
             order (Optional[Literal["alphabetical", "topological"]], optional): The order in which to return the
               processing steps. If None, the order is alphabetical. Defaults to None.
 
         Returns:
-            List[ProcessingStep]: The list of processing steps
+            ProcessingSteps: The list of processing steps
         """
         if order == "topological":
-            return self.get_topologically_ordered_processing_steps()
+            return self._topologically_ordered_processing_steps
         # default
-        return self.get_alphabetically_ordered_processing_steps()
+        return self._alphabetically_ordered_processing_steps
 
-    def get_input_type_processing_steps(self, input_type: InputType = "dataset") -> List[ProcessingStep]:
+    def get_input_type_processing_steps(self, input_type: InputType = "dataset") -> ProcessingSteps:
         """
         Get the processing steps of input type `input_type`, in an undefined order.
 
-        The returned processing steps are copies of the original ones, so that they can be modified without affecting
-        the original ones.
+        The returned processing steps are shared (they are precomputed when the graph is built) and immutable.
 
         Args:
             input_type (InputType, optional): The input type. Defaults to "dataset".
 
         Returns:
-            List[ProcessingStep]: The list of processing steps
+            ProcessingSteps: The list of processing steps
         """
-        return [
-            self.get_processing_step(processing_step_name)
-            for processing_step_name in self._processing_step_names_by_input_type[input_type]
-        ]
+        return self._processing_steps_by_input_type[input_type]
 
 
 @dataclass
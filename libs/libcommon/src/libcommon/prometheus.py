@@ -16,7 +16,11 @@ from prometheus_client import (
 from prometheus_client.multiprocess import MultiProcessCollector
 from psutil import disk_usage
 
-from libcommon.metrics import CacheTotalMetric, JobTotalMetric
+from libcommon.metrics import (
+    BackfillProgressMetric,
+    CacheTotalMetric,
+    JobTotalMetric,
+)
 from libcommon.storage import StrPath
 
 
@@ -56,6 +60,20 @@ ASSETS_DISK_USAGE = Gauge(
     labelnames=["type"],
     multiprocess_mode="liveall",
 )
+BACKFILL_PROGRESS_TOTAL = Gauge(
+    name="backfill_progress_total",
+    documentation="Progress of the backfill of the cache, by shard",
+    labelnames=["shard", "type"],
+    multiprocess_mode="liveall",
+)
+HTTP_CLIENT_REQUEST_DURATION = Histogram(
+    "http_client_request_duration_seconds",
+    (
+        "Histogram of the duration of the outbound HTTP requests, by host and outcome (status code, error or"
+        " circuit_open)"
+    ),
+    ["host", "outcome"],
+)
 METHOD_STEPS_PROCESSING_TIME = Histogram(
     "method_steps_processing_time_seconds",
     "Histogram of the processing time of specific steps in methods for a given context (in seconds)",
@@ -75,6 +93,17 @@ def update_responses_in_cache_total() -> None:
         ).set(cache_metric.total)
 
 
+def update_backfill_progress_total() -> None:
+    for backfill_metric in BackfillProgressMetric.objects():
+        shard = f"{backfill_metric.shard}/{backfill_metric.num_shards}"
+        BACKFILL_PROGRESS_TOTAL.labels(shard=shard, type="total_datasets").set(backfill_metric.total_datasets)
+        BACKFILL_PROGRESS_TOTAL.labels(shard=shard, type="analyzed_datasets").set(backfill_metric.analyzed_datasets)
+        BACKFILL_PROGRESS_TOTAL.labels(shard=shard, type="backfilled_datasets").set(
+            backfill_metric.backfilled_datasets
+        )
+        BACKFILL_PROGRESS_TOTAL.labels(shard=shard, type="created_jobs").set(backfill_metric.created_jobs)
+
+
 def update_assets_disk_usage(assets_directory: StrPath) -> None:
     # TODO: move to metrics, as for the other metrics (queue, cache)
     total, used, free, percent = disk_usage(str(assets_directory))
@@ -4,6 +4,7 @@
 import contextlib
 import json
 import logging
+import random
 import time
 import types
 from collections import Counter
@@ -11,21 +12,37 @@ from datetime import datetime, timedelta
 from itertools import groupby
 from operator import itemgetter
 from types import TracebackType
-from typing import Generic, List, Literal, Optional, Sequence, Type, TypedDict, TypeVar
+from typing import (
+    Any,
+    Dict,
+    Generic,
+    List,
+    Literal,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    TypedDict,
+    TypeVar,
+)
 
 import pandas as pd
-import pytz
-from mongoengine import Document, DoesNotExist
+from mongoengine import Document, DoesNotExist, Q
 from mongoengine.errors import NotUniqueError
-from mongoengine.fields import DateTimeField, EnumField, StringField
+from mongoengine.fields import DateTimeField, EnumField, IntField, StringField
 from mongoengine.queryset.queryset import QuerySet
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
 
 from libcommon.constants import (
+    QUEUE_COLLECTION_DATASET_UPDATES,
     QUEUE_COLLECTION_JOBS,
     QUEUE_COLLECTION_LOCKS,
     QUEUE_MONGOENGINE_ALIAS,
     QUEUE_TTL_SECONDS,
 )
+from libcommon.processing_graph import ProcessingGraph
 from libcommon.utils import (
     FlatJobInfo,
     JobInfo,
@@ -92,6 +109,33 @@ class EmptyQueueError(Exception):
     pass
 
 
+# number of waiting jobs fetched at once when looking for a job without pending ancestor jobs
+CANDIDATE_JOBS_BATCH_SIZE = 100
+# beyond this number of batches of blocked jobs, the search stops (the next class of jobs is tried)
+MAX_CANDIDATE_JOBS_BATCHES = 5
+
+
+K = TypeVar("K")
+
+
+def get_weighted_random_order(weights: Mapping[K, float]) -> List[K]:
+    """Order the keys at random, the keys with the highest weights being more likely to come first.
+
+    It's a weighted random sampling without replacement (Efraimidis and Spirakis): each key gets the score
+    u ** (1 / weight), with u drawn uniformly in [0, 1), and the keys are sorted by descending score. The probability
+    for a key to come first is proportional to its weight, and this property still holds among the remaining keys if
+    the first ones are skipped.
+
+    Args:
+        weights (`Mapping[K, float]`): the weight of each key. The weights must be strictly positive.
+
+    Returns:
+        `List[K]`: the keys, in random order.
+    """
+    scores = {key: random.random() ** (1.0 / weight) for key, weight in weights.items()}  # nosec
+    return sorted(scores, key=lambda key: scores[key], reverse=True)
+
+
 # States:
 # - waiting: started_at is None and finished_at is None: waiting jobs
 # - started: started_at is not None and finished_at is None: started jobs
@@ -135,6 +179,14 @@ class Job(Document):
             ("status", "type"),
             ("status", "namespace", "priority", "type", "created_at"),
             ("status", "namespace", "unicity_id", "priority", "type", "created_at"),
+            ("status", "last_heartbeat"),
+            {
+                "fields": ["unicity_id"],
+                "name": "unicity_id_1_waiting_unique",
+                "unique": True,
+                "partialFilterExpression": {"status": Status.WAITING.value},
+            },
+            ("status", "started_at"),
             "-created_at",
             {"fields": ["finished_at"], "expireAfterSeconds": QUEUE_TTL_SECONDS},
         ],
@@ -292,6 +344,147 @@ class lock(contextlib.AbstractContextManager["lock"]):
         return cls(key=key, job_id=job_id, sleeps=sleeps)
 
 
+class DatasetUpdateInfo(TypedDict):
+    dataset: str
+    revision: str
+    num_events: int
+    last_received_at: datetime
+
+
+class DatasetUpdate(Document):
+    """A pending update of a dataset (eg. a push received by the webhook) in the mongoDB database.
+
+    The updates of a dataset are coalesced: there is at most one pending update per dataset, with the latest revision.
+
+    Args:
+        dataset (`str`): The dataset to update.
+        revision (`str`): The latest received git revision of the dataset.
+        num_events (`int`): The number of coalesced events.
+        first_received_at (`datetime`): When the first coalesced event has been received.
+        last_received_at (`datetime`): When the last coalesced event has been received.
+        locked_until (`datetime`, optional): If set, the update is being processed, and cannot be claimed again
+          before this date.
+    """
+
+    meta = {
+        "collection": QUEUE_COLLECTION_DATASET_UPDATES,
+        "db_alias": QUEUE_MONGOENGINE_ALIAS,
+        "indexes": ["last_received_at", "first_received_at"],
+    }
+    dataset = StringField(primary_key=True)
+    revision = StringField(required=True)
+    num_events = IntField(default=0)
+    first_received_at = DateTimeField(required=True)
+    last_received_at = DateTimeField(required=True)
+    locked_until = DateTimeField()
+
+    objects = QuerySetManager["DatasetUpdate"]()
+
+    def info(self) -> DatasetUpdateInfo:
+        return DatasetUpdateInfo(
+            {
+                "dataset": self.dataset,
+                "revision": self.revision,
+                "num_events": self.num_events,
+                "last_received_at": self.last_received_at,
+            }
+        )
+
+
+def add_dataset_update(dataset: str, revision: str) -> None:
+    """Add a pending update of a dataset, or coalesce it with the pending update of the dataset, if any.
+
+    Only the latest revision is kept. If the pending update is being processed, it stays locked (only one consumer
+    processes a dataset at a time): it will be processed again (with the new revision) once the consumer has finished
+    it (see finish_dataset_update) and the new event has settled.
+
+    Args:
+        dataset (`str`): The dataset to update.
+        revision (`str`): The git revision of the dataset.
+    """
+    now = get_datetime()
+    DatasetUpdate.objects(dataset=dataset).update_one(
+        upsert=True,
+        set__revision=revision,
+        set__last_received_at=now,
+        set_on_insert__first_received_at=now,
+        inc__num_events=1,
+    )
+
+
+def claim_dataset_updates(
+    debounce_seconds: float, max_wait_seconds: float, lock_seconds: float, limit: int
+) -> List[DatasetUpdateInfo]:
+    """Claim the pending updates that have settled, ie that have received no event for debounce_seconds, or that have
+    been waiting for more than max_wait_seconds (so that a dataset that is updated continuously is still processed).
+
+    The claimed updates are locked for lock_seconds: they cannot be claimed by another consumer in the meantime. If
+    the consumer fails to process them before, they will be claimed again.
+
+    Args:
+        debounce_seconds (`float`): The minimum number of seconds without event before processing an update.
+        max_wait_seconds (`float`): The maximum number of seconds to wait before processing an update.
+        lock_seconds (`float`): The number of seconds during which a claimed update cannot be claimed again.
+        limit (`int`): The maximum number of updates to claim.
+
+    Returns:
+        `list[DatasetUpdateInfo]`: The claimed updates, the oldest first.
+    """
+    now = get_datetime()
+    candidates = (
+        DatasetUpdate.objects(
+            (
+                Q(last_received_at__lte=now - timedelta(seconds=debounce_seconds))
+                | Q(first_received_at__lte=now - timedelta(seconds=max_wait_seconds))
+            )
+            & (Q(locked_until=None) | Q(locked_until__lt=now))
+        )
+        .order_by("first_received_at")
+        .limit(limit)
+    )
+    claimed_updates: List[DatasetUpdateInfo] = []
+    for candidate in candidates:
+        # the update is claimed only if it has not been modified or claimed in the meantime
+        claimed = DatasetUpdate.objects(
+            Q(dataset=candidate.dataset, last_received_at=candidate.last_received_at)
+            & (Q(locked_until=None) | Q(locked_until__lt=now))
+        ).update_one(set__locked_until=now + timedelta(seconds=lock_seconds))
+        if claimed:
+            claimed_updates.append(candidate.info())
+    return claimed_updates
+
+
+def finish_dataset_update(dataset_update: DatasetUpdateInfo) -> bool:
+    """Delete a processed update, unless a new event has been received for the dataset in the meantime.
+
+    In the latter case, the update is kept and unlocked, so that it can be claimed again once the new event has
+    settled.
+
+    Args:
+        dataset_update (`DatasetUpdateInfo`): The processed update, as returned by claim_dataset_updates.
+
+    Returns:
+        `bool`: True if the update has been deleted, False if a new event has been received (the update is kept, to
+          be processed again).
+    """
+    deleted = DatasetUpdate.objects(
+        dataset=dataset_update["dataset"], last_received_at=dataset_update["last_received_at"]
+    ).delete()
+    if deleted:
+        return True
+    DatasetUpdate.objects(dataset=dataset_update["dataset"]).update_one(unset__locked_until=True)
+    return False
+
+
+def delete_dataset_updates(dataset: str) -> None:
+    """Delete the pending update of a dataset, if any.
+
+    Args:
+        dataset (`str`): The dataset.
+    """
+    DatasetUpdate.objects(dataset=dataset).delete()
+
+
 class Queue:
     """A queue manages jobs.
 
@@ -301,13 +494,59 @@ class Queue:
     It's a FIFO queue, with the following properties:
     - a job is identified by its input arguments: unicity_id (type, dataset, config and split, NOT revision)
     - a job can be in one of the following states: waiting, started, success, error, cancelled
-    - a job can be in the queue only once (unicity_id) in the "started" or "waiting" state
+    - a job can be in the queue only once (unicity_id) in the "started" or "waiting" state (for the "waiting" state,
+      it's enforced by a unique partial index)
     - a job can be in the queue multiple times in the other states (success, error, cancelled)
     - a job has a priority (two levels: NORMAL and LOW)
     - the queue is ordered by priority then by the creation date of the jobs
     - datasets and users that already have started jobs are de-prioritized (using namespace)
+
+    By default, the priorities are strict: a LOW job is started only if no NORMAL job can be started. To ensure that
+    the LOW jobs (backfill) still make progress when a lot of NORMAL jobs are created (webhooks), the queue can be
+    configured with:
+    - weights per priority and per job type: the (priority, job type) couple of the next job is drawn at random with a
+      probability proportional to the product of the weights (weighted fair queuing). The default weight is 1.
+    - priority aging: the LOW jobs that have been waiting for more than a given duration are considered as NORMAL.
+
+    If a processing graph is passed, a waiting job is not started while a job for one of its ancestor artifacts (same
+    dataset, ancestor step in the graph, overlapping config and split) is waiting or started: it would fail, or be
+    made obsolete when the ancestor job finishes.
+
+    Args:
+        priority_weights (`Mapping[Priority, float]`, optional): The weight of each priority. If empty, and if
+          job_type_weights is empty too, the priorities are strict.
+        job_type_weights (`Mapping[str, float]`, optional): The weight of each job type.
+        priority_aging_seconds (`float`, optional): The LOW jobs that have been waiting for more than this duration
+          are considered as NORMAL. If None or not strictly positive, the priorities don't age.
+        processing_graph (`ProcessingGraph`, optional): The processing graph, used to skip the jobs whose ancestors
+          are still pending. If None, the dependencies between jobs are ignored.
     """
 
+    def __init__(
+        self,
+        priority_weights: Optional[Mapping[Priority, float]] = None,
+        job_type_weights: Optional[Mapping[str, float]] = None,
+        priority_aging_seconds: Optional[float] = None,
+        processing_graph: Optional[ProcessingGraph] = None,
+    ) -> None:
+        self.priority_weights = dict(priority_weights or {})
+        self.job_type_weights = dict(job_type_weights or {})
+        if any(weight <= 0 for weight in [*self.priority_weights.values(), *self.job_type_weights.values()]):
+            raise ValueError("The weights must be strictly positive.")
+        self.priority_aging_seconds = (
+            priority_aging_seconds if priority_aging_seconds is not None and priority_aging_seconds > 0 else None
+        )
+        self.ancestor_job_types_by_job_type: Dict[str, List[str]] = (
+            {
+                processing_step.job_type: [
+                    ancestor.job_type for ancestor in processing_graph.get_ancestors(processing_step.name)
+                ]
+                for processing_step in processing_graph.get_processing_steps()
+            }
+            if processing_graph is not None
+            else {}
+        )
+
     def _add_job(
         self,
         job_type: str,
@@ -355,9 +594,10 @@ class Queue:
     ) -> Job:
         """Add, or update, a job to the queue in the waiting state.
 
-        If jobs already exist with the same parameters in the waiting state, they are cancelled and replaced by a new
-        one.
-        Note that the new job inherits the highest priority of the previous waiting jobs.
+        If a job already exists with the same parameters in the waiting state, it's updated in place: its revision is
+        set to the new one, and its priority is bumped to NORMAL if the new priority is NORMAL (the priority is never
+        lowered). It keeps its creation date, and thus its position in the queue.
+        Else, a new waiting job is inserted.
 
         Args:
             job_type (`str`): The type of the job
@@ -369,55 +609,90 @@ class Queue:
 
         Returns: the job
         """
-        canceled_jobs = self.cancel_jobs(
-            job_type=job_type,
-            dataset=dataset,
-            config=config,
-            split=split,
-            statuses_to_cancel=[Status.WAITING],
-        )
-        if any(job["priority"] == Priority.NORMAL for job in canceled_jobs):
-            priority = Priority.NORMAL
-        return self._add_job(
-            job_type=job_type, dataset=dataset, revision=revision, config=config, split=split, priority=priority
-        )
+        job_info: JobInfo = {
+            "job_id": "not used",
+            "type": job_type,
+            "params": {"dataset": dataset, "revision": revision, "config": config, "split": split},
+            "priority": priority,
+        }
+        (query, update) = self._get_upsert_query_and_update(job_info)
+        job: Optional[Job]
+        # ^ the stubs wrongly type the result of modify() as a QuerySet
+        try:
+            job = Job.objects(__raw__=query).modify(upsert=True, new=True, __raw__=update)  # type: ignore
+        except NotUniqueError:
+            # another process inserted the same waiting job concurrently: retry, it will be updated
+            job = Job.objects(__raw__=query).modify(upsert=True, new=True, __raw__=update)  # type: ignore
+        if job is None:
+            raise RuntimeError(f"The job {query['unicity_id']} could not be upserted.")
+        return job
 
     def create_jobs(self, job_infos: List[JobInfo]) -> int:
         """Creates jobs in the queue.
 
-        They are created in the waiting state.
+        They are created in the waiting state. It's an alias of `upsert_jobs`: if a job already exists with the same
+        parameters in the waiting state, it's updated instead.
 
         Args:
             job_infos (`List[JobInfo]`): The jobs to be created.
 
         Returns:
-            `int`: The number of created jobs. 0 if we had an exception.
+            `int`: The number of created or updated jobs.
         """
-        try:
-            jobs = [
-                Job(
-                    type=job_info["type"],
-                    dataset=job_info["params"]["dataset"],
-                    revision=job_info["params"]["revision"],
-                    config=job_info["params"]["config"],
-                    split=job_info["params"]["split"],
-                    unicity_id=inputs_to_string(
-                        dataset=job_info["params"]["dataset"],
-                        config=job_info["params"]["config"],
-                        split=job_info["params"]["split"],
-                        prefix=job_info["type"],
-                    ),
-                    namespace=job_info["params"]["dataset"].split("/")[0],
-                    priority=job_info["priority"],
-                    created_at=get_datetime(),
-                    status=Status.WAITING,
-                )
-                for job_info in job_infos
-            ]
-            job_ids = Job.objects.insert(jobs, load_bulk=False)
-            return len(job_ids)
-        except Exception:
+        return self.upsert_jobs(job_infos=job_infos)
+
+    def upsert_jobs(self, job_infos: List[JobInfo]) -> int:
+        """Add, or update, jobs to the queue in the waiting state.
+
+        It's the bulk version of `upsert_job`: if a job already exists with the same parameters in the waiting state,
+        it's updated in place (new revision, priority bumped to NORMAL if needed), else a new waiting job is inserted.
+
+        The unicity of the waiting jobs is enforced by a unique partial index on `unicity_id`, so that concurrent
+        processes cannot create duplicate waiting jobs. Only one round-trip to the database is needed, whatever the
+        number of jobs.
+
+        Args:
+            job_infos (`List[JobInfo]`): The jobs to be upserted.
+
+        Returns:
+            `int`: The number of created or updated jobs.
+        """
+        if not job_infos:
             return 0
+        operations = [
+            UpdateOne(query, update, upsert=True)
+            for (query, update) in (self._get_upsert_query_and_update(job_info) for job_info in job_infos)
+        ]
+        try:
+            result = Job._get_collection().bulk_write(operations, ordered=True)
+        except BulkWriteError:
+            # another process inserted some of the same waiting jobs concurrently: retry, they will be updated
+            result = Job._get_collection().bulk_write(operations, ordered=True)
+        return int(result.upserted_count + result.matched_count)
+
+    def _get_upsert_query_and_update(self, job_info: JobInfo) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        dataset = job_info["params"]["dataset"]
+        config = job_info["params"]["config"]
+        split = job_info["params"]["split"]
+        query = {
+            "unicity_id": inputs_to_string(dataset=dataset, config=config, split=split, prefix=job_info["type"]),
+            "status": Status.WAITING.value,
+        }
+        set_fields: Dict[str, Any] = {"revision": job_info["params"]["revision"]}
+        set_on_insert_fields: Dict[str, Any] = {
+            "type": job_info["type"],
+            "dataset": dataset,
+            "config": config,
+            "split": split,
+            "namespace": dataset.split("/")[0],
+            "created_at": get_datetime(),
+        }
+        if job_info["priority"] == Priority.NORMAL:
+            # the priority can only be bumped
+            set_fields["priority"] = Priority.NORMAL.value
+        else:
+            set_on_insert_fields["priority"] = Priority(job_info["priority"]).value
+        return query, {"$set": set_fields, "$setOnInsert": set_on_insert_fields}
 
     def cancel_jobs(
         self,
@@ -476,11 +751,35 @@ class Queue:
         except Exception:
             return 0
 
+    def _get_aging_limit(self) -> Optional[datetime]:
+        if self.priority_aging_seconds is None:
+            return None
+        return get_datetime() - timedelta(seconds=self.priority_aging_seconds)
+
+    @staticmethod
+    def _get_priority_query(priority: Priority, aging_limit: Optional[datetime] = None) -> Q:
+        """Get the query that selects the jobs with the given priority, taking aging into account.
+
+        Args:
+            priority (`Priority`): The (effective) priority of the job.
+            aging_limit (`datetime`, optional): The LOW jobs created before this date are considered as NORMAL. If
+              None, the priorities don't age.
+
+        Returns: the query
+        """
+        if aging_limit is None:
+            return Q(priority=priority)
+        if priority == Priority.NORMAL:
+            return Q(priority=Priority.NORMAL) | Q(priority=Priority.LOW, created_at__lte=aging_limit)
+        return Q(priority=priority, created_at__gt=aging_limit)
+
     def _get_next_waiting_job_for_priority(
         self,
         priority: Priority,
+        started_jobs: List[Job],
         job_types_blocked: Optional[list[str]] = None,
         job_types_only: Optional[list[str]] = None,
+        aging_limit: Optional[datetime] = None,
     ) -> Job:
         """Get the next job in the queue for a given priority.
 
@@ -489,10 +788,15 @@ class Queue:
         - if none, among the datasets that have the least started jobs:
           - ensuring that the unicity_id field is unique among the started jobs.
 
+        If the queue has a processing graph, the jobs with pending ancestor jobs are skipped.
+
         Args:
             priority (`Priority`): The priority of the job.
+            started_jobs (`List[Job]`): The started jobs (only their namespace and unicity_id are used), see
+              `_get_started_jobs`.
             job_types_blocked: if not None, jobs of the given types are not considered.
             job_types_only: if not None, only jobs of the given types are considered.
+            aging_limit (`datetime`, optional): The LOW jobs created before this date are considered as NORMAL.
 
         Raises:
             EmptyQueueError: if there is no waiting job in the queue that satisfies the restrictions above.
@@ -503,24 +807,18 @@ class Queue:
             f"Getting next waiting job for priority {priority}, blocked types: {job_types_blocked}, only types:"
             f" {job_types_only}"
         )
-        filters = {}
-        if job_types_blocked:
-            filters["type__nin"] = job_types_blocked
-        if job_types_only:
-            filters["type__in"] = job_types_only
-        started_jobs = Job.objects(status=Status.STARTED, **filters)
-        logging.debug(f"Number of started jobs: {started_jobs.count()}")
-        started_job_namespaces = [job.namespace for job in started_jobs.only("namespace")]
+        filters = self._get_job_types_filters(job_types_blocked=job_types_blocked, job_types_only=job_types_only)
+        started_job_namespaces = [job.namespace for job in started_jobs]
         logging.debug(f"Started job namespaces: {started_job_namespaces}")
 
-        next_waiting_job = (
-            Job.objects(
-                status=Status.WAITING, namespace__nin=set(started_job_namespaces), priority=priority, **filters
-            )
+        priority_query = self._get_priority_query(priority=priority, aging_limit=aging_limit)
+        blocked_jobs_filters: List[Dict[str, Any]] = []
+        next_waiting_job = self._get_first_unblocked_job(
+            Job.objects(priority_query, status=Status.WAITING, namespace__nin=set(started_job_namespaces), **filters)
             .order_by("+created_at")
             .only("type", "dataset", "revision", "config", "split", "priority")
-            .no_cache()
-            .first()
+            .no_cache(),
+            blocked_jobs_filters=blocked_jobs_filters,
         )
 
         # ^ no_cache should generate a query on every iteration, which should solve concurrency issues between workers
@@ -534,7 +832,7 @@ class Queue:
         # - exclude the waiting jobs which unicity_id is already in a started job
         # and, among the remaining waiting jobs, let's:
         # - select the oldest waiting job for the namespace with the least number of started jobs
-        started_unicity_ids = {job.unicity_id for job in started_jobs.only("unicity_id")}
+        started_unicity_ids = {job.unicity_id for job in started_jobs}
         descending_frequency_namespace_counts = [
             [namespace, count] for namespace, count in Counter(started_job_namespaces).most_common()
         ]
@@ -546,30 +844,101 @@ class Queue:
         while descending_frequency_namespace_groups:
             least_common_namespaces_group = descending_frequency_namespace_groups.pop()
             logging.debug(f"Least common namespaces group: {least_common_namespaces_group}")
-            next_waiting_job = (
+            next_waiting_job = self._get_first_unblocked_job(
                 Job.objects(
+                    priority_query,
                     status=Status.WAITING,
                     namespace__in=least_common_namespaces_group,
                     unicity_id__nin=started_unicity_ids,
-                    priority=priority,
                     **filters,
                 )
                 .order_by("+created_at")
                 .only("type", "dataset", "revision", "config", "split", "priority")
-                .no_cache()
-                .first()
+                .no_cache(),
+                blocked_jobs_filters=blocked_jobs_filters,
             )
             if next_waiting_job is not None:
                 return next_waiting_job
         raise EmptyQueueError("no job available with the priority")
 
+    def _get_first_unblocked_job(
+        self, jobs: QuerySet[Job], blocked_jobs_filters: List[Dict[str, Any]]
+    ) -> Optional[Job]:
+        """Get the first job that has no pending ancestor job.
+
+        The candidates are fetched by batches. When a candidate is blocked by a pending ancestor job, all the jobs
+        of the same type that this ancestor job blocks are excluded from the next batches in the database, so that a
+        cascade of blocked jobs (eg. all the split jobs waiting for a config job) is skipped at once. The search is
+        bounded: it stops after MAX_CANDIDATE_JOBS_BATCHES batches.
+
+        Args:
+            jobs (`QuerySet[Job]`): The candidate jobs, in order of preference.
+            blocked_jobs_filters (`List[Dict[str, Any]]`): The raw filters that select the blocked jobs found so far.
+              It's filled by this method, so that the blocked jobs are excluded from the next searches too.
+
+        Returns: the first job without pending ancestor job, or None if there is none (or if the search has stopped).
+        """
+        if not self.ancestor_job_types_by_job_type:
+            return jobs.first()
+        for _ in range(MAX_CANDIDATE_JOBS_BATCHES):
+            candidates = list(
+                (jobs(__raw__={"$nor": blocked_jobs_filters}) if blocked_jobs_filters else jobs).limit(
+                    CANDIDATE_JOBS_BATCH_SIZE
+                )
+            )
+            for job in candidates:
+                if any(self._is_matching(job, blocked_jobs_filter) for blocked_jobs_filter in blocked_jobs_filters):
+                    # blocked by an ancestor job found for a previous candidate of this batch
+                    continue
+                pending_ancestor_job = self._get_pending_ancestor_job(job)
+                if pending_ancestor_job is None:
+                    return job
+                logging.debug(f"Job {job.pk} is skipped: the ancestor job {pending_ancestor_job.pk} is still pending")
+                blocked_jobs_filter = {"type": job.type, "dataset": job.dataset}
+                if pending_ancestor_job.config is not None:
+                    blocked_jobs_filter["config"] = pending_ancestor_job.config
+                    if pending_ancestor_job.split is not None:
+                        blocked_jobs_filter["split"] = pending_ancestor_job.split
+                blocked_jobs_filters.append(blocked_jobs_filter)
+            if len(candidates) < CANDIDATE_JOBS_BATCH_SIZE:
+                return None
+        logging.debug(f"No unblocked job found in {MAX_CANDIDATE_JOBS_BATCHES} batches of candidates")
+        return None
+
+    @staticmethod
+    def _is_matching(job: Job, raw_filter: Dict[str, Any]) -> bool:
+        return all(getattr(job, field) == value for field, value in raw_filter.items())
+
+    def _get_pending_ancestor_job(self, job: Job) -> Optional[Job]:
+        """Get a pending (waiting or started) job of an ancestor step, for the same dataset and an overlapping config
+        and split, if any.
+
+        Args:
+            job (`Job`): The job.
+
+        Returns: a pending ancestor job, or None if there is none.
+        """
+        ancestor_job_types = self.ancestor_job_types_by_job_type.get(job.type)
+        if not ancestor_job_types:
+            return None
+        filters: Dict[str, Any] = {}
+        if job.config is not None:
+            filters["config__in"] = [None, job.config]
+        if job.split is not None:
+            filters["split__in"] = [None, job.split]
+        pending_ancestor_jobs = Job.objects(
+            dataset=job.dataset, status__in=[Status.WAITING, Status.STARTED], type__in=ancestor_job_types, **filters
+        )
+        return pending_ancestor_jobs.only("config", "split").first()
+
     def get_next_waiting_job(
         self, job_types_blocked: Optional[list[str]] = None, job_types_only: Optional[list[str]] = None
     ) -> Job:
         """Get the next job in the queue.
 
         Get the waiting job with the oldest creation date with the following criteria:
-        - among the highest priority jobs,
+        - among the highest priority jobs (or, if weights are set, among the jobs of the drawn priority and job type,
+          see `Queue`),
         - among the datasets that still have no started job.
         - if none, among the datasets that have the least started jobs:
           - ensuring that the unicity_id field is unique among the started jobs.
@@ -583,13 +952,98 @@ class Queue:
 
         Returns: the job
         """
-        for priority in [Priority.NORMAL, Priority.LOW]:
+        aging_limit = self._get_aging_limit()
+        if self.priority_weights or self.job_type_weights:
+            job_classes = self._get_weighted_job_classes(
+                job_types_blocked=job_types_blocked, job_types_only=job_types_only, aging_limit=aging_limit
+            )
+        else:
+            job_classes = [(Priority.NORMAL, job_types_only), (Priority.LOW, job_types_only)]
+        if not job_classes:
+            raise EmptyQueueError("no job available")
+        # the started jobs are fetched once, and shared by all the classes
+        started_jobs = self._get_started_jobs(job_types_blocked=job_types_blocked, job_types_only=job_types_only)
+        for priority, job_types in job_classes:
             with contextlib.suppress(EmptyQueueError):
                 return self._get_next_waiting_job_for_priority(
-                    priority=priority, job_types_blocked=job_types_blocked, job_types_only=job_types_only
+                    priority=priority,
+                    started_jobs=started_jobs,
+                    job_types_blocked=job_types_blocked,
+                    job_types_only=job_types,
+                    aging_limit=aging_limit,
                 )
         raise EmptyQueueError("no job available")
 
+    @staticmethod
+    def _get_job_types_filters(
+        job_types_blocked: Optional[list[str]] = None, job_types_only: Optional[list[str]] = None
+    ) -> Dict[str, List[str]]:
+        filters: Dict[str, List[str]] = {}
+        if job_types_blocked:
+            filters["type__nin"] = job_types_blocked
+        if job_types_only:
+            filters["type__in"] = job_types_only
+        return filters
+
+    def _get_started_jobs(
+        self, job_types_blocked: Optional[list[str]] = None, job_types_only: Optional[list[str]] = None
+    ) -> List[Job]:
+        """Get the started jobs, with only their namespace and unicity_id.
+
+        Args:
+            job_types_blocked: if not None, jobs of the given types are not considered.
+            job_types_only: if not None, only jobs of the given types are considered.
+
+        Returns: the started jobs
+        """
+        filters = self._get_job_types_filters(job_types_blocked=job_types_blocked, job_types_only=job_types_only)
+        started_jobs = list(Job.objects(status=Status.STARTED, **filters).only("namespace", "unicity_id"))
+        logging.debug(f"Number of started jobs: {len(started_jobs)}")
+        return started_jobs
+
+    def _get_weighted_job_classes(
+        self,
+        job_types_blocked: Optional[list[str]] = None,
+        job_types_only: Optional[list[str]] = None,
+        aging_limit: Optional[datetime] = None,
+    ) -> List[Tuple[Priority, Optional[list[str]]]]:
+        """Get the (priority, job types) couples to look for a job in, in weighted random order.
+
+        Only the couples that have waiting jobs are considered. They are fetched with one aggregation, the LOW jobs
+        created before aging_limit being counted as NORMAL. The weight of a couple is the product of the weight of the
+        priority and the weight of the job type.
+
+        Args:
+            job_types_blocked: if not None, jobs of the given types are not considered.
+            job_types_only: if not None, only jobs of the given types are considered.
+            aging_limit (`datetime`, optional): The LOW jobs created before this date are considered as NORMAL.
+
+        Returns: the list of (priority, [job type]) couples
+        """
+        filters = self._get_job_types_filters(job_types_blocked=job_types_blocked, job_types_only=job_types_only)
+        effective_priority: Any = (
+            "$priority"
+            if aging_limit is None
+            else {
+                "$cond": [
+                    {"$and": [{"$eq": ["$priority", Priority.LOW.value]}, {"$lte": ["$created_at", aging_limit]}]},
+                    Priority.NORMAL.value,
+                    "$priority",
+                ]
+            }
+        )
+        waiting_job_classes = [
+            (Priority(result["_id"]["priority"]), result["_id"]["type"])
+            for result in Job.objects(status=Status.WAITING, **filters).aggregate(
+                [{"$group": {"_id": {"priority": effective_priority, "type": "$type"}}}]
+            )
+        ]
+        weights = {
+            (priority, job_type): self.priority_weights.get(priority, 1.0) * self.job_type_weights.get(job_type, 1.0)
+            for priority, job_type in waiting_job_classes
+        }
+        return [(priority, [job_type]) for priority, job_type in get_weighted_random_order(weights)]
+
     def _start_job(self, job: Job) -> Job:
         # could be a method of Job
         job.update(started_at=get_datetime(), status=Status.STARTED)
@@ -748,12 +1202,22 @@ class Queue:
         )
 
     def cancel_started_jobs(self, job_type: str) -> None:
-        """Cancel all started jobs for a given type."""
-        for job in Job.objects(type=job_type, status=Status.STARTED.value):
-            job.update(finished_at=get_datetime(), status=Status.CANCELLED)
-            self.upsert_job(
-                job_type=job.type, dataset=job.dataset, revision=job.revision, config=job.config, split=job.split
-            )
+        """Cancel all started jobs for a given type, and replace them with waiting jobs."""
+        job_infos = [job.info() for job in Job.objects(type=job_type, status=Status.STARTED.value)]
+        Job.objects(pk__in=[job_info["job_id"] for job_info in job_infos], status=Status.STARTED.value).update(
+            finished_at=get_datetime(), status=Status.CANCELLED
+        )
+        self.upsert_jobs(
+            job_infos=[
+                {
+                    "job_id": "not used",
+                    "type": job_info["type"],
+                    "params": job_info["params"],
+                    "priority": Priority.NORMAL,
+                }
+                for job_info in job_infos
+            ]
+        )
 
     def _get_df(self, jobs: List[FlatJobInfo]) -> pd.DataFrame:
         return pd.DataFrame(
@@ -785,14 +1249,29 @@ class Queue:
         )
         # ^ does not seem optimal at all, but I get the types right
 
-    def get_pending_jobs_df(self, dataset: str, job_types: Optional[List[str]] = None) -> pd.DataFrame:
-        filters = {}
+    def get_pending_jobs_df(
+        self, dataset: str, job_types: Optional[List[str]] = None, config: Optional[str] = None
+    ) -> pd.DataFrame:
+        """Get the pending (waiting or started) jobs of a dataset, as a DataFrame.
+
+        Args:
+            dataset (`str`, required): dataset name
+            job_types (`list[str]`, optional): if set, only the jobs of these types are returned
+            config (`str`, optional): if set, only the jobs of this config are returned
+
+        Returns: the pending jobs
+        """
+        filters: Dict[str, Any] = {}
         if job_types:
             filters["type__in"] = job_types
+        if config is not None:
+            filters["config"] = config
         return self._get_df(
             [
                 job.flat_info()
-                for job in Job.objects(dataset=dataset, status__in=[Status.WAITING, Status.STARTED], **filters)
+                for job in Job.objects(dataset=dataset, status__in=[Status.WAITING, Status.STARTED], **filters).only(
+                    "type", "dataset", "revision", "config", "split", "priority", "status", "created_at"
+                )
             ]
         )
 
@@ -869,47 +1348,65 @@ class Queue:
         """Update the job `last_heartbeat` field with the current date.
         This is used to keep track of running jobs.
         If a job doesn't have recent heartbeats, it means it crashed at one point and is considered a zombie.
+
+        It's a single conditional update: only a started job gets the heartbeat.
         """
-        try:
-            job = self.get_job_with_id(job_id)
-        except DoesNotExist:
-            logging.warning(f"Heartbeat skipped because job {job_id} doesn't exist in the queue.")
-            return
-        job.update(last_heartbeat=get_datetime())
+        updated = Job.objects(pk=job_id, status=Status.STARTED).update(last_heartbeat=get_datetime())
+        if not updated:
+            logging.warning(f"Heartbeat skipped because job {job_id} doesn't exist in the queue or is not started.")
 
     def get_zombies(self, max_seconds_without_heartbeat: float) -> List[JobInfo]:
         """Get the zombie jobs.
         It returns jobs without recent heartbeats, which means they crashed at one point and became zombies.
         Usually `max_seconds_without_heartbeat` is a factor of the time between two heartbeats.
 
+        The zombies are selected with a single range query on the `last_heartbeat` field (or on the `started_at`
+        field if the job never got a heartbeat), so that only the zombies are loaded from the database.
+
         Returns: an array of the zombie job infos.
         """
-        started_jobs = Job.objects(status=Status.STARTED)
         if max_seconds_without_heartbeat <= 0:
             return []
-        zombies = [
-            job
-            for job in started_jobs
-            if (
-                job.last_heartbeat is not None
-                and get_datetime()
-                >= pytz.UTC.localize(job.last_heartbeat) + timedelta(seconds=max_seconds_without_heartbeat)
-            )
-            or (
-                job.last_heartbeat is None
-                and job.started_at is not None
-                and get_datetime()
-                >= pytz.UTC.localize(job.started_at) + timedelta(seconds=max_seconds_without_heartbeat)
-            )
-        ]
+        limit = get_datetime() - timedelta(seconds=max_seconds_without_heartbeat)
+        zombies = Job.objects(
+            Q(last_heartbeat__lte=limit) | Q(last_heartbeat=None, started_at__lte=limit), status=Status.STARTED
+        ).only("type", "dataset", "revision", "config", "split", "priority")
         return [zombie.info() for zombie in zombies]
 
+    def kill_zombies(self, zombies: List[JobInfo]) -> List[str]:
+        """Kill the zombie jobs in the queue, setting their status to ERROR.
+
+        It does nothing if the list of zombies is empty. The jobs that are not in the started state anymore (for
+        example, if they finished in the meantime) are ignored.
+
+        The jobs are killed in two queries: one update of the jobs that are still started, and one query to get the
+        ids of the updated jobs, identified by the finished_at date of this call. A job that finishes concurrently is
+        never reported as killed.
+
+        Args:
+            zombies (`list[JobInfo]`): The zombie jobs to kill.
+
+        Returns:
+            `list[str]`: The ids of the jobs that have been moved to the error state by this call.
+        """
+        if not zombies:
+            return []
+        job_ids = [zombie["job_id"] for zombie in zombies]
+        finished_at = get_datetime()
+        if not Job.objects(pk__in=job_ids, status=Status.STARTED).update(finished_at=finished_at, status=Status.ERROR):
+            return []
+        return [
+            str(job.pk)
+            for job in Job.objects(pk__in=job_ids, status=Status.ERROR, finished_at=finished_at).only("id")
+        ]
+
 
 # only for the tests
 def _clean_queue_database() -> None:
     """Delete all the jobs in the database"""
     Job.drop_collection()  # type: ignore
     Lock.drop_collection()  # type: ignore
+    DatasetUpdate.drop_collection()  # type: ignore
 
 
 # explicit re-export
@@ -1,9 +1,11 @@
 # SPDX-License-Identifier: Apache-2.0
 # Copyright 2022 The HuggingFace Authors.
 
+import hashlib
 import types
+import zlib
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import datetime, timedelta
 from http import HTTPStatus
 from typing import (
     Any,
@@ -14,15 +16,18 @@ from typing import (
     NamedTuple,
     Optional,
     Set,
+    Tuple,
     Type,
     TypedDict,
     TypeVar,
 )
 
+import orjson
 import pandas as pd
 from bson import ObjectId
 from bson.errors import InvalidId
 from mongoengine import Document, DoesNotExist
+from mongoengine.fields import BinaryField  # type: ignore
 from mongoengine.fields import (
     DateTimeField,
     DictField,
@@ -34,8 +39,12 @@ from mongoengine.fields import (
 )
 from mongoengine.queryset.queryset import QuerySet
 
-from libcommon.constants import CACHE_COLLECTION_RESPONSES, CACHE_MONGOENGINE_ALIAS
-from libcommon.utils import JobParams, get_datetime
+from libcommon.constants import (
+    CACHE_COLLECTION_RESPONSES,
+    CACHE_COLLECTION_VALID_DATASETS,
+    CACHE_MONGOENGINE_ALIAS,
+)
+from libcommon.utils import JobParams, get_datetime, orjson_dumps
 
 # START monkey patching ### hack ###
 # see https://github.com/sbdchd/mongo-types#install
@@ -76,7 +85,14 @@ class CachedResponse(Document):
         split (`str`, optional): The requested split, if any.
         http_status (`HTTPStatus`): The HTTP status code.
         error_code (`str`, optional): The error code, if any.
-        content (`dict`): The content of the cached response. Can be an error or a valid content.
+        content (`dict`, optional): The content of the cached response. Can be an error or a valid content. Missing if
+          the content is compressed.
+        content_json (`bytes`, optional): Deprecated: the content serialized to JSON, stored along with the content by
+          an earlier version. It's not written anymore, since it doubled the size of the documents.
+        content_compressed (`bytes`, optional): The content, serialized to JSON and compressed with zlib, instead of
+          content, for the processing steps that compress their responses.
+        content_hash (`str`, optional): The SHA-256 hash of the content serialized to JSON, used as the ETag of the API
+          response.
         details (`dict`, optional): Additional details, eg. a detailed error that we don't want to send as a response.
         updated_at (`datetime`): When the cache entry has been last updated.
         job_runner_version (`int`): The version of the job runner that cached the response.
@@ -93,7 +109,10 @@ class CachedResponse(Document):
 
     http_status = EnumField(HTTPStatus, required=True)
     error_code = StringField()
-    content = DictField(required=True)
+    content = DictField()
+    content_json = BinaryField()
+    content_compressed = BinaryField()
+    content_hash = StringField()
     dataset_git_revision = StringField()
     progress = FloatField(min_value=0.0, max_value=1.0)
     job_runner_version = IntField()
@@ -123,6 +142,25 @@ CachedResponse.config.required = False  # type: ignore
 CachedResponse.split.required = False  # type: ignore
 
 
+def get_content_hash(content_json: bytes) -> str:
+    return hashlib.sha256(content_json).hexdigest()
+
+
+def compress_content_json(content_json: bytes) -> bytes:
+    return zlib.compress(content_json)
+
+
+def decompress_content_json(content_compressed: bytes) -> bytes:
+    return zlib.decompress(content_compressed)
+
+
+def _get_content(response: CachedResponse) -> Mapping[str, Any]:
+    # the fields "content" and "content_compressed" must have been fetched
+    if response.content_compressed is not None:
+        return orjson.loads(decompress_content_json(response.content_compressed))  # type: ignore
+    return response.content
+
+
 # Note: we let the exceptions throw (ie DocumentTooLarge): it's the responsibility of the caller to manage them
 def upsert_response(
     kind: str,
@@ -137,9 +175,22 @@ def upsert_response(
     dataset_git_revision: Optional[str] = None,
     progress: Optional[float] = None,
     updated_at: Optional[datetime] = None,
+    compress_content: bool = False,
 ) -> None:
+    """Create or update a cache entry.
+
+    The content is stored only once: as is (in content), or, if compress_content is True, serialized to JSON and
+    compressed (in content_compressed), which reduces the size of the large responses in the database. Don't set it
+    for the processing steps whose content is read in the database queries (the config names and the split names).
+    Storing several representations of the content would multiply the size of the document, and the valid responses
+    could then exceed the maximum size of a MongoDB document.
+    """
+    content_json = orjson_dumps(content=content)
     CachedResponse.objects(kind=kind, dataset=dataset, config=config, split=split).upsert_one(
-        content=content,
+        content=None if compress_content else content,
+        content_json=None,
+        content_compressed=compress_content_json(content_json) if compress_content else None,
+        content_hash=get_content_hash(content_json),
         http_status=http_status,
         error_code=error_code,
         details=details,
@@ -160,6 +211,7 @@ def upsert_response_params(
     job_runner_version: Optional[int] = None,
     progress: Optional[float] = None,
     updated_at: Optional[datetime] = None,
+    compress_content: bool = False,
 ) -> None:
     upsert_response(
         kind=kind,
@@ -174,6 +226,7 @@ def upsert_response_params(
         job_runner_version=job_runner_version,
         progress=progress,
         updated_at=updated_at,
+        compress_content=compress_content,
     )
 
 
@@ -242,6 +295,55 @@ def get_response_metadata(
     }
 
 
+class CacheEntryJson(CacheEntryMetadata):
+    content_json: bytes
+    content_hash: str
+
+
+# Note: we let the exceptions throw (ie DoesNotExist): it's the responsibility of the caller to manage them
+def get_response_json(
+    kind: str, dataset: str, config: Optional[str] = None, split: Optional[str] = None
+) -> CacheEntryJson:
+    """Get a cached response, with its content serialized to JSON instead of the content itself.
+
+    If the content is compressed, it's decompressed here. Else, the content is serialized here, unless the JSON has
+    been stored along with the content by an earlier version.
+    """
+    response = (
+        CachedResponse.objects(kind=kind, dataset=dataset, config=config, split=split)
+        .only(
+            "http_status",
+            "error_code",
+            "job_runner_version",
+            "dataset_git_revision",
+            "progress",
+            "updated_at",
+            "content",
+            "content_json",
+            "content_compressed",
+            "content_hash",
+        )
+        .get()
+    )
+    if response.content_compressed is not None:
+        content_json = decompress_content_json(response.content_compressed)
+    elif response.content_json is not None:
+        content_json = response.content_json
+    else:
+        content_json = orjson_dumps(content=response.content)
+    content_hash = response.content_hash or get_content_hash(content_json)
+    return {
+        "http_status": response.http_status,
+        "error_code": response.error_code,
+        "dataset_git_revision": response.dataset_git_revision,
+        "job_runner_version": response.job_runner_version,
+        "progress": response.progress,
+        "updated_at": response.updated_at,
+        "content_json": content_json,
+        "content_hash": content_hash,
+    }
+
+
 class CacheEntry(CacheEntryWithoutContent):
     content: Mapping[str, Any]
 
@@ -286,11 +388,19 @@ class CachedArtifactError(Exception):
 def get_response(kind: str, dataset: str, config: Optional[str] = None, split: Optional[str] = None) -> CacheEntry:
     response = (
         CachedResponse.objects(kind=kind, dataset=dataset, config=config, split=split)
-        .only("content", "http_status", "error_code", "job_runner_version", "dataset_git_revision", "progress")
+        .only(
+            "content",
+            "content_compressed",
+            "http_status",
+            "error_code",
+            "job_runner_version",
+            "dataset_git_revision",
+            "progress",
+        )
         .get()
     )
     return {
-        "content": response.content,
+        "content": _get_content(response),
         "http_status": response.http_status,
         "error_code": response.error_code,
         "job_runner_version": response.job_runner_version,
@@ -306,12 +416,19 @@ def get_response_with_details(
     response = (
         CachedResponse.objects(kind=kind, dataset=dataset, config=config, split=split)
         .only(
-            "content", "http_status", "error_code", "job_runner_version", "dataset_git_revision", "progress", "details"
+            "content",
+            "content_compressed",
+            "http_status",
+            "error_code",
+            "job_runner_version",
+            "dataset_git_revision",
+            "progress",
+            "details",
         )
         .get()
     )
     return {
-        "content": response.content,
+        "content": _get_content(response),
         "http_status": response.http_status,
         "error_code": response.error_code,
         "job_runner_version": response.job_runner_version,
@@ -324,25 +441,29 @@ def get_response_with_details(
 CACHED_RESPONSE_NOT_FOUND = "CachedResponseNotFound"
 
 
+def get_missing_error_response(
+    kind: str, dataset: str, config: Optional[str] = None, split: Optional[str] = None
+) -> CacheEntryWithDetails:
+    return CacheEntryWithDetails(
+        content={
+            "error": f"Cached response not found for kind {kind}, dataset {dataset}, config {config}, split {split}"
+        },
+        http_status=HTTPStatus.NOT_FOUND,
+        error_code=CACHED_RESPONSE_NOT_FOUND,
+        dataset_git_revision=None,
+        job_runner_version=None,
+        progress=None,
+        details={},
+    )
+
+
 def get_response_or_missing_error(
     kind: str, dataset: str, config: Optional[str] = None, split: Optional[str] = None
 ) -> CacheEntryWithDetails:
     try:
         response = get_response_with_details(kind=kind, dataset=dataset, config=config, split=split)
     except DoesNotExist:
-        response = CacheEntryWithDetails(
-            content={
-                "error": (
-                    f"Cached response not found for kind {kind}, dataset {dataset}, config {config}, split {split}"
-                )
-            },
-            http_status=HTTPStatus.NOT_FOUND,
-            error_code=CACHED_RESPONSE_NOT_FOUND,
-            dataset_git_revision=None,
-            job_runner_version=None,
-            progress=None,
-            details={},
-        )
+        response = get_missing_error_response(kind=kind, dataset=dataset, config=config, split=split)
     return response
 
 
@@ -352,16 +473,32 @@ class BestResponse:
     response: CacheEntryWithDetails
 
 
-def get_best_response(
+@dataclass
+class BestResponseKind:
+    kind: str
+    updated_at: Optional[datetime]
+    # the following fields are None if the response is a cache miss, and content_hash is also None if the response has
+    # been cached before the JSON was stored along with the content
+    http_status: Optional[HTTPStatus] = None
+    error_code: Optional[str] = None
+    dataset_git_revision: Optional[str] = None
+    job_runner_version: Optional[int] = None
+    content_hash: Optional[str] = None
+
+
+def get_best_response_kind(
     kinds: List[str], dataset: str, config: Optional[str] = None, split: Optional[str] = None
-) -> BestResponse:
+) -> BestResponseKind:
     """
-    Get the best response from a list of cache kinds.
+    Get the kind of the best response from a list of cache kinds, without fetching the content of the responses.
 
     Best means:
     - the first success response with the highest progress,
     - else: the first error response (including cache miss)
 
+    The candidates are compared with one query that only gets their metadata (status, progress, update date...),
+    not their content.
+
     Args:
         kinds (`List[str]`):
             A non-empty list of cache kinds to look responses for.
@@ -372,32 +509,97 @@ def get_best_response(
         split (`str`, optional):
             A split name.
     Returns:
-        BestResponse: The best response (object with fields: kind and response). The response can be an error,
-          including a cache miss (error code: `CachedResponseNotFound`)
+        BestResponseKind: The kind of the best response, and its metadata (None if the response is a cache miss).
     """
     if not kinds:
         raise ValueError("kinds must be a non-empty list")
-    best_response_candidates = [
-        BestResponse(
-            kind=kind, response=get_response_or_missing_error(kind=kind, dataset=dataset, config=config, split=split)
+    responses_by_kind: Dict[str, CachedResponse] = {
+        response.kind: response
+        for response in CachedResponse.objects(kind__in=kinds, dataset=dataset, config=config, split=split).only(
+            "kind",
+            "http_status",
+            "progress",
+            "updated_at",
+            "error_code",
+            "dataset_git_revision",
+            "job_runner_version",
+            "content_hash",
         )
-        for kind in kinds
-    ]
+    }
     max_index = 0
     max_value = float("-inf")
-    for index, candidate in enumerate(best_response_candidates):
-        if candidate.response["http_status"] >= HTTPStatus.BAD_REQUEST.value:
+    for index, kind in enumerate(kinds):
+        if kind not in responses_by_kind:
+            # a cache miss is an error response
+            continue
+        response = responses_by_kind[kind]
+        if response.http_status >= HTTPStatus.BAD_REQUEST.value:
             # only the first error response is considered
             continue
-        value = (
-            0.0
-            if candidate.response["progress"] is None or candidate.response["progress"] < 0.0
-            else candidate.response["progress"]
-        )
+        value = 0.0 if response.progress is None or response.progress < 0.0 else response.progress
         if value > max_value:
             max_value = value
             max_index = index
-    return best_response_candidates[max_index]
+    best_kind = kinds[max_index]
+    if best_kind not in responses_by_kind:
+        return BestResponseKind(kind=best_kind, updated_at=None)
+    best_response = responses_by_kind[best_kind]
+    return BestResponseKind(
+        kind=best_kind,
+        updated_at=best_response.updated_at,
+        http_status=best_response.http_status,
+        error_code=best_response.error_code,
+        dataset_git_revision=best_response.dataset_git_revision,
+        job_runner_version=best_response.job_runner_version,
+        content_hash=best_response.content_hash,
+    )
+
+
+def get_best_response(
+    kinds: List[str], dataset: str, config: Optional[str] = None, split: Optional[str] = None
+) -> BestResponse:
+    """
+    Get the best response from a list of cache kinds.
+
+    Best means:
+    - the first success response with the highest progress,
+    - else: the first error response (including cache miss)
+
+    The candidates are compared with one query that only gets their status and progress (see
+    `get_best_response_kind`), then the content and details are fetched for the best response only.
+
+    Args:
+        kinds (`List[str]`):
+            A non-empty list of cache kinds to look responses for.
+        dataset (`str`):
+            A namespace (user or an organization) and a repo name separated by a `/`.
+        config (`str`, optional):
+            A config name.
+        split (`str`, optional):
+            A split name.
+    Returns:
+        BestResponse: The best response (object with fields: kind and response). The response can be an error,
+          including a cache miss (error code: `CachedResponseNotFound`)
+    """
+    best_response_kind = get_best_response_kind(kinds=kinds, dataset=dataset, config=config, split=split)
+    return get_response_for_best_response_kind(
+        best_response_kind=best_response_kind, dataset=dataset, config=config, split=split
+    )
+
+
+def get_response_for_best_response_kind(
+    best_response_kind: BestResponseKind, dataset: str, config: Optional[str] = None, split: Optional[str] = None
+) -> BestResponse:
+    """Get the content and details of the best response, as selected by `get_best_response_kind`."""
+    kind = best_response_kind.kind
+    return BestResponse(
+        kind=kind,
+        response=(
+            get_missing_error_response(kind=kind, dataset=dataset, config=config, split=split)
+            if best_response_kind.updated_at is None
+            else get_response_or_missing_error(kind=kind, dataset=dataset, config=config, split=split)
+        ),
+    )
 
 
 def get_previous_step_or_raise(
@@ -421,16 +623,134 @@ def get_valid_datasets(kind: str) -> Set[str]:
     return set(CachedResponse.objects(kind=kind, http_status=HTTPStatus.OK).distinct("dataset"))
 
 
+class ValidDatasetsContent(TypedDict):
+    valid: List[str]
+    preview: List[str]
+    viewer: List[str]
+
+
+def compute_valid_datasets(viewer_kinds: List[str], preview_kinds: List[str]) -> ValidDatasetsContent:
+    """Compute the lists of the valid datasets.
+
+    A dataset supports the viewer (resp. the preview) if at least one response of any of the viewer (resp. preview)
+    kinds is a success. The preview list only contains the datasets that don't support the viewer.
+
+    Args:
+        viewer_kinds (`List[str]`): The cache kinds that enable the viewer.
+        preview_kinds (`List[str]`): The cache kinds that enable the preview.
+
+    Returns:
+        ValidDatasetsContent: The sorted lists of the valid datasets, the datasets that only support the preview,
+          and the datasets that support the viewer.
+    """
+    viewer_set: Set[str] = set().union(*[get_valid_datasets(kind=kind) for kind in viewer_kinds])
+    preview_set: Set[str] = (
+        set().union(*[get_valid_datasets(kind=kind) for kind in preview_kinds]).difference(viewer_set)
+    )
+    return ValidDatasetsContent(
+        valid=sorted(set.union(viewer_set, preview_set)),
+        preview=sorted(preview_set),
+        viewer=sorted(viewer_set),
+    )
+
+
+class ValidDatasetsSnapshot(Document):
+    """The lists of the valid datasets, precomputed from the cache entries.
+
+    The collection contains at most one document, replaced every time the lists are computed again.
+
+    Args:
+        content_json (`bytes`): The lists of the valid datasets (see `ValidDatasetsContent`), serialized to JSON.
+        content_hash (`str`): The SHA-256 hash of content_json.
+        updated_at (`datetime`): When the lists have been computed.
+    """
+
+    id = ObjectIdField(db_field="_id", primary_key=True, default=ObjectId)
+
+    content_json = BinaryField(required=True)
+    content_hash = StringField(required=True)
+    updated_at = DateTimeField(default=get_datetime)
+
+    meta = {
+        "collection": CACHE_COLLECTION_VALID_DATASETS,
+        "db_alias": CACHE_MONGOENGINE_ALIAS,
+    }
+    objects = QuerySetManager["ValidDatasetsSnapshot"]()
+
+
+def update_valid_datasets_snapshot(viewer_kinds: List[str], preview_kinds: List[str]) -> ValidDatasetsContent:
+    """Compute the lists of the valid datasets, and store them, serialized to JSON, in place of the previous ones."""
+    content = compute_valid_datasets(viewer_kinds=viewer_kinds, preview_kinds=preview_kinds)
+    content_json = orjson_dumps(content=content)
+    ValidDatasetsSnapshot.objects().upsert_one(
+        content_json=content_json, content_hash=get_content_hash(content_json), updated_at=get_datetime()
+    )
+    return content
+
+
+class ValidDatasetsSnapshotEntry(TypedDict):
+    content_json: bytes
+    content_hash: str
+    updated_at: datetime
+
+
+def get_valid_datasets_snapshot(max_age_seconds: Optional[float] = None) -> Optional[ValidDatasetsSnapshotEntry]:
+    """Get the precomputed lists of the valid datasets.
+
+    Args:
+        max_age_seconds (`float`, optional): If set, the lists computed more than this number of seconds ago are
+          ignored.
+
+    Returns:
+        Optional[ValidDatasetsSnapshotEntry]: The lists serialized to JSON, or None if they have never been computed
+          (or are too old).
+    """
+    snapshots = (
+        ValidDatasetsSnapshot.objects()
+        if max_age_seconds is None
+        else ValidDatasetsSnapshot.objects(updated_at__gte=get_datetime() - timedelta(seconds=max_age_seconds))
+    )
+    snapshot = snapshots.first()
+    if snapshot is None:
+        return None
+    return {
+        "content_json": snapshot.content_json,
+        "content_hash": snapshot.content_hash,
+        "updated_at": snapshot.updated_at,
+    }
+
+
 def get_validity_by_kind(dataset: str, kinds: Optional[List[str]] = None) -> Mapping[str, bool]:
-    # TODO: rework with aggregate
+    """Get, for every kind of the dataset's cache entries, if at least one of them is a success.
+
+    The entries are grouped by kind on the server, with one aggregation.
+
+    Args:
+        dataset (`str`): The dataset.
+        kinds (`List[str]`, optional): If set, only these kinds are considered.
+
+    Returns:
+        Mapping[str, bool]: The validity of every kind that has at least one cache entry for the dataset, sorted by
+          kind.
+    """
     entries = (
         CachedResponse.objects(dataset=dataset)
         if kinds is None
         else CachedResponse.objects(dataset=dataset, kind__in=kinds)
-    ).only("kind", "http_status")
+    )
     return {
-        str(kind): entries(kind=kind, http_status=HTTPStatus.OK).first() is not None
-        for kind in sorted(entries.distinct("kind"))
+        str(result["_id"]): bool(result["is_valid"])
+        for result in entries.aggregate(
+            [
+                {
+                    "$group": {
+                        "_id": "$kind",
+                        "is_valid": {"$max": {"$eq": ["$http_status", HTTPStatus.OK.value]}},
+                    }
+                },
+                {"$sort": {"_id": 1}},
+            ]
+        )
     }
 
 
@@ -463,6 +783,116 @@ def get_responses_count_by_kind_status_and_error_code() -> List[CountEntry]:
     ]
 
 
+# cache_maintenance backfill
+
+
+class DatasetCacheFreshness(TypedDict):
+    dataset: str
+    num_entries: int
+    num_stale_entries: int
+    git_revisions: List[Optional[str]]
+    num_configs: int
+    num_splits: int
+
+
+def _get_size_if_array(field: str) -> Dict[str, Any]:
+    return {"$cond": [{"$isArray": field}, {"$size": field}, 0]}
+
+
+def get_datasets_cache_freshness(
+    datasets: List[str],
+    job_runner_version_by_kind: Mapping[str, int],
+    config_names_kinds: List[str],
+    split_names_kinds: List[str],
+    error_codes_to_retry: Optional[List[str]] = None,
+) -> List[DatasetCacheFreshness]:
+    """Summarize the freshness of the cache entries of datasets, with one aggregation on the server.
+
+    Args:
+        datasets (List[str]): the dataset names
+        job_runner_version_by_kind (Mapping[str, int]): the current job runner version of every cache kind. The cache
+          entries of other kinds are ignored.
+        config_names_kinds (List[str]): the cache kinds that provide the config names of a dataset
+        split_names_kinds (List[str]): the cache kinds that provide the split names of a config
+        error_codes_to_retry (List[str], optional): the error codes for which the jobs should be retried
+
+    Returns:
+        List[DatasetCacheFreshness]: for every dataset that has cache entries: the number of entries, the number of
+          stale entries (obsolete job runner version, or error to retry), the git revisions of the entries, the number
+          of configs (from the config names entries), and the total number of splits (from the split names entries)
+    """
+    if not datasets:
+        return []
+    is_job_runner_obsolete = {
+        "$lt": [
+            "$job_runner_version",
+            {
+                "$switch": {
+                    "branches": [
+                        {"case": {"$eq": ["$kind", kind]}, "then": version}
+                        for kind, version in job_runner_version_by_kind.items()
+                    ],
+                    "default": 0,
+                }
+            },
+        ]
+    }  # note that a null or missing job_runner_version is lower than any number
+    is_error_to_retry = {
+        "$and": [{"$gte": ["$http_status", 400]}, {"$in": ["$error_code", error_codes_to_retry or []]}]
+    }
+    pipeline: List[Dict[str, Any]] = [
+        {
+            "$group": {
+                "_id": {"dataset": "$dataset", "config": "$config"},
+                "num_entries": {"$sum": 1},
+                "num_stale_entries": {"$sum": {"$cond": [{"$or": [is_job_runner_obsolete, is_error_to_retry]}, 1, 0]}},
+                "git_revisions": {"$addToSet": {"$ifNull": ["$dataset_git_revision", None]}},
+                # ^ $addToSet ignores the missing values
+                "num_configs": {
+                    "$max": {
+                        "$cond": [
+                            {"$in": ["$kind", config_names_kinds]},
+                            _get_size_if_array("$content.config_names"),
+                            0,
+                        ]
+                    }
+                },
+                "num_splits": {
+                    "$max": {
+                        "$cond": [{"$in": ["$kind", split_names_kinds]}, _get_size_if_array("$content.splits"), 0]
+                    }
+                },
+            }
+        },
+        {
+            "$group": {
+                "_id": "$_id.dataset",
+                "num_entries": {"$sum": "$num_entries"},
+                "num_stale_entries": {"$sum": "$num_stale_entries"},
+                "git_revisions": {"$push": "$git_revisions"},
+                "num_configs": {"$max": "$num_configs"},
+                "num_splits": {"$sum": "$num_splits"},
+            }
+        },
+    ]
+    return [
+        {
+            "dataset": result["_id"],
+            "num_entries": result["num_entries"],
+            "num_stale_entries": result["num_stale_entries"],
+            "git_revisions": sorted(
+                {git_revision for git_revisions in result["git_revisions"] for git_revision in git_revisions},
+                key=str,
+            ),
+            "num_configs": result["num_configs"],
+            "num_splits": result["num_splits"],
+        }
+        for result in CachedResponse.objects(
+            dataset__in=datasets, kind__in=list(job_runner_version_by_kind)
+        ).aggregate(pipeline, allowDiskUse=True)
+    ]
+
+
 # /cache-reports/... endpoints
 
 
@@ -526,7 +956,7 @@ def get_cache_reports(kind: str, cursor: Optional[str], limit: int) -> CacheRepo
             raise InvalidCursor("Invalid cursor.") from err
     if limit <= 0:
         raise InvalidLimit("Invalid limit.")
-    objects = list(queryset.order_by("+id").exclude("content").limit(limit))
+    objects = list(queryset.order_by("+id").exclude("content", "content_json", "content_compressed").limit(limit))
     return {
         "cache_reports": [
             {
@@ -558,7 +988,9 @@ def get_outdated_split_full_names_for_step(kind: str, current_version: int) -> L
 
 
 def get_dataset_responses_without_content_for_kind(kind: str, dataset: str) -> List[CacheReport]:
-    responses = CachedResponse.objects(kind=kind, dataset=dataset).exclude("content")
+    responses = CachedResponse.objects(kind=kind, dataset=dataset).exclude(
+        "content", "content_json", "content_compressed"
+    )
     return [
         {
             "kind": response.kind,
@@ -619,7 +1051,7 @@ def get_cache_reports_with_content(kind: str, cursor: Optional[str], limit: int)
             raise InvalidCursor("Invalid cursor.") from err
     if limit <= 0:
         raise InvalidLimit("Invalid limit.")
-    objects = list(queryset.order_by("+id").limit(limit))
+    objects = list(queryset.order_by("+id").exclude("content_json").limit(limit))
     return {
         "cache_reports_with_content": [
             {
@@ -629,7 +1061,7 @@ def get_cache_reports_with_content(kind: str, cursor: Optional[str], limit: int)
                 "split": object.split,
                 "http_status": object.http_status.value,
                 "error_code": object.error_code,
-                "content": object.content,
+                "content": _get_content(object),
                 "job_runner_version": object.job_runner_version,
                 "dataset_git_revision": object.dataset_git_revision,
                 "details": object.details,
@@ -671,10 +1103,25 @@ def _get_df(entries: List[CacheEntryFullMetadata]) -> pd.DataFrame:
     # ^ does not seem optimal at all, but I get the types right
 
 
-def get_cache_entries_df(dataset: str, cache_kinds: Optional[List[str]] = None) -> pd.DataFrame:
-    filters = {}
+def get_cache_entries_df(
+    dataset: str, cache_kinds: Optional[List[str]] = None, config: Optional[str] = None
+) -> pd.DataFrame:
+    """Get the cache entries of a dataset, as a DataFrame.
+
+    Args:
+        dataset (str): the dataset name
+        cache_kinds (List[str], optional): if set, only the cache entries of these kinds are returned
+        config (str, optional): if set, only the cache entries of this config, and the dataset-level cache entries,
+          are returned
+
+    Returns:
+        pd.DataFrame: the cache entries
+    """
+    filters: Dict[str, Any] = {}
     if cache_kinds:
         filters["kind__in"] = cache_kinds
+    if config is not None:
+        filters["config__in"] = [config, None]
     return _get_df(
         [
             {
@@ -709,6 +1156,31 @@ def has_some_cache(dataset: str) -> bool:
     return CachedResponse.objects(dataset=dataset).count() > 0
 
 
+def get_dataset_git_revisions(dataset: str) -> Set[Optional[str]]:
+    """Get the distinct git revisions of the cache entries of a dataset."""
+    return set(CachedResponse.objects(dataset=dataset).distinct("dataset_git_revision"))
+
+
+def update_dataset_git_revision(dataset: str, old_revision: str, new_revision: str) -> int:
+    """
+    Set the git revision of the cache entries of a dataset, without changing their content.
+
+    Only the entries computed for the old revision are updated, in one query. Use it only when the changes between
+    both revisions cannot affect the content of the entries.
+
+    Args:
+        dataset (`str`): the dataset
+        old_revision (`str`): the git revision of the entries to update
+        new_revision (`str`): the new git revision
+
+    Returns:
+        `int`: the number of updated entries
+    """
+    return CachedResponse.objects(dataset=dataset, dataset_git_revision=old_revision).update(
+        set__dataset_git_revision=new_revision
+    )
+
+
 def fetch_names(
     dataset: str, config: Optional[str], cache_kinds: List[str], names_field: str, name_field: str
 ) -> List[str]:
@@ -729,21 +1201,166 @@ def fetch_names(
         List[str]: The list of names.
     """
     try:
-        names = []
         best_response = get_best_response(kinds=cache_kinds, dataset=dataset, config=config)
-        for name_item in best_response.response["content"][names_field]:
-            name = name_item[name_field]
-            if not isinstance(name, str):
-                raise ValueError(f"Invalid name: {name}, type should be str, got: {type(name)}")
-            names.append(name)
-        return names
+        return _get_names(best_response.response["content"][names_field], name_field=name_field)
     except Exception:
         return []
 
 
+def _get_names(name_items: Any, name_field: str) -> List[str]:
+    names = []
+    for name_item in name_items:
+        name = name_item[name_field]
+        if not isinstance(name, str):
+            raise ValueError(f"Invalid name: {name}, type should be str, got: {type(name)}")
+        names.append(name)
+    return names
+
+
+class DatasetNames(NamedTuple):
+    """The config names of a dataset, and the split names of its configs, as found in the cache."""
+
+    config_names: List[str]
+    split_names_by_config: Dict[str, List[str]]
+
+
+class _NamesResponse(NamedTuple):
+    http_status: int
+    progress: Optional[float]
+    name_items: Any
+
+
+def _get_best_names(
+    names_response_by_kind: Mapping[str, _NamesResponse], cache_kinds: List[str], name_field: str
+) -> List[str]:
+    """Same as fetch_names, but on responses that have already been fetched (see get_best_response).
+
+    The missing responses are considered as errors, and an error response has no names.
+    """
+    best_response: Optional[_NamesResponse] = None
+    max_value = float("-inf")
+    for kind in cache_kinds:
+        response = names_response_by_kind.get(kind)
+        if response is None or response.http_status >= HTTPStatus.BAD_REQUEST.value:
+            continue
+        value = 0.0 if response.progress is None or response.progress < 0.0 else response.progress
+        if value > max_value:
+            max_value = value
+            best_response = response
+    if best_response is None:
+        return []
+    try:
+        return _get_names(best_response.name_items, name_field=name_field)
+    except Exception:
+        return []
+
+
+def get_cache_entries_df_and_names(
+    dataset: str,
+    config_names_kinds: List[str],
+    split_names_kinds: List[str],
+    cache_kinds: Optional[List[str]] = None,
+    config: Optional[str] = None,
+) -> Tuple[pd.DataFrame, DatasetNames]:
+    """Get the cache entries of a dataset, as a DataFrame, and the config and split names, in one query.
+
+    Only the list of names is projected from the content of the cache entries that provide the config names or the
+    split names, and no content is fetched for the other cache entries. The names are chosen as in fetch_names.
+
+    Args:
+        dataset (str): the dataset name
+        config_names_kinds (List[str]): the cache kinds that provide the config names, eg ["dataset-config-names"]
+        split_names_kinds (List[str]): the cache kinds that provide the split names, eg
+          ["config-split-names-from-streaming", "config-split-names-from-info"]
+        cache_kinds (List[str], optional): if set, only the cache entries of these kinds are returned in the DataFrame
+        config (str, optional): if set, only the cache entries of this config, and the dataset-level cache entries,
+          are returned, and only the split names of this config
+
+    Returns:
+        Tuple[pd.DataFrame, DatasetNames]: the cache entries (same as get_cache_entries_df), and the config and split
+          names
+    """
+    filters: Dict[str, Any] = {}
+    if cache_kinds:
+        filters["kind__in"] = sorted(set(cache_kinds).union(config_names_kinds, split_names_kinds))
+    if config is not None:
+        filters["config__in"] = [config, None]
+    cache_kinds_set = set(cache_kinds) if cache_kinds else None
+    entries: List[CacheEntryFullMetadata] = []
+    config_names_response_by_kind: Dict[str, _NamesResponse] = {}
+    split_names_response_by_kind_by_config: Dict[str, Dict[str, _NamesResponse]] = {}
+    for response in CachedResponse.objects(dataset=dataset, **filters).aggregate(
+        [
+            {
+                "$project": {
+                    "_id": 0,
+                    "kind": 1,
+                    "dataset": 1,
+                    "config": 1,
+                    "split": 1,
+                    "http_status": 1,
+                    "error_code": 1,
+                    "dataset_git_revision": 1,
+                    "job_runner_version": 1,
+                    "progress": 1,
+                    "updated_at": 1,
+                    "name_items": {
+                        "$switch": {
+                            "branches": [
+                                {"case": {"$in": ["$kind", config_names_kinds]}, "then": "$content.config_names"},
+                                {"case": {"$in": ["$kind", split_names_kinds]}, "then": "$content.splits"},
+                            ],
+                            "default": "$$REMOVE",
+                        }
+                    },
+                }
+            },
+        ]
+    ):
+        kind = response["kind"]
+        response_config = response.get("config")
+        response_split = response.get("split")
+        if cache_kinds_set is None or kind in cache_kinds_set:
+            entries.append(
+                {
+                    "kind": kind,
+                    "dataset": response["dataset"],
+                    "config": response_config,
+                    "split": response_split,
+                    "http_status": HTTPStatus(response["http_status"]),
+                    "error_code": response.get("error_code"),
+                    "dataset_git_revision": response.get("dataset_git_revision"),
+                    "job_runner_version": response.get("job_runner_version"),
+                    "progress": response.get("progress"),
+                    "updated_at": response["updated_at"],
+                }
+            )
+        names_response = _NamesResponse(
+            http_status=response["http_status"],
+            progress=response.get("progress"),
+            name_items=response.get("name_items"),
+        )
+        if kind in config_names_kinds and response_config is None and response_split is None:
+            config_names_response_by_kind[kind] = names_response
+        elif kind in split_names_kinds and response_config is not None and response_split is None:
+            split_names_response_by_kind_by_config.setdefault(response_config, {})[kind] = names_response
+    return _get_df(entries), DatasetNames(
+        config_names=_get_best_names(
+            config_names_response_by_kind, cache_kinds=config_names_kinds, name_field="config"
+        ),
+        split_names_by_config={
+            split_names_config: _get_best_names(
+                split_names_response_by_kind, cache_kinds=split_names_kinds, name_field="split"
+            )
+            for split_names_config, split_names_response_by_kind in split_names_response_by_kind_by_config.items()
+        },
+    )
+
+
 # only for the tests
 def _clean_cache_database() -> None:
     CachedResponse.drop_collection()  # type: ignore
+    ValidDatasetsSnapshot.drop_collection()  # type: ignore
 
 
 # explicit re-export
@@ -2,18 +2,171 @@
 # Copyright 2023 The HuggingFace Authors.
 
 import logging
+from collections import defaultdict
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional
+from datetime import datetime
+from http import HTTPStatus
+from typing import Any, DefaultDict, Dict, List, NamedTuple, Optional, Set, Tuple
 
 import pandas as pd
 
-from libcommon.processing_graph import Artifact, ProcessingGraph
+from libcommon.processing_graph import (
+    Artifact,
+    ProcessingGraph,
+    ProcessingSteps,
+)
 from libcommon.prometheus import StepProfiler
-from libcommon.simple_cache import CacheEntryMetadata, fetch_names
+from libcommon.simple_cache import CacheEntryMetadata, DatasetNames, fetch_names
+from libcommon.utils import Priority, Status
 
 # TODO: assets, cached_assets, parquet files
 
 
+class PendingJob(NamedTuple):
+    """A pending (waiting or started) job, as a compact record."""
+
+    job_id: str
+    type: str
+    revision: str
+    config: Optional[str]
+    split: Optional[str]
+    priority: str
+    status: str
+    created_at: datetime
+
+
+class CacheEntry(NamedTuple):
+    """A cache entry (without content), as a compact record."""
+
+    kind: str
+    config: Optional[str]
+    split: Optional[str]
+    http_status: HTTPStatus
+    error_code: Optional[str]
+    job_runner_version: Optional[int]
+    dataset_git_revision: Optional[str]
+    progress: Optional[float]
+    updated_at: datetime
+
+
+ArtifactKey = Tuple[str, Optional[str], Optional[str]]
+# ^ (job type or cache kind, config, split)
+PendingJobsIndex = Dict[ArtifactKey, List[PendingJob]]
+CacheEntriesIndex = Dict[ArtifactKey, List[CacheEntry]]
+
+
+def _none_if_na(value: Any) -> Any:
+    return None if pd.isna(value) else value
+
+
+def get_pending_jobs_index(pending_jobs_df: pd.DataFrame, revision: str) -> PendingJobsIndex:
+    """Group the pending jobs of a revision by artifact, in one pass.
+
+    The jobs for other revisions are ignored (they don't belong to any artifact state).
+
+    Args:
+        pending_jobs_df (`pd.DataFrame`): The pending jobs of the dataset, as returned by Queue.get_pending_jobs_df.
+        revision (`str`): The revision of the dataset.
+
+    Returns:
+        `PendingJobsIndex`: The pending jobs, indexed by (job type, config, split).
+    """
+    index: DefaultDict[ArtifactKey, List[PendingJob]] = defaultdict(list)
+    for job_id, job_type, job_revision, config, split, priority, status, created_at in zip(
+        pending_jobs_df["job_id"],
+        pending_jobs_df["type"],
+        pending_jobs_df["revision"],
+        pending_jobs_df["config"],
+        pending_jobs_df["split"],
+        pending_jobs_df["priority"],
+        pending_jobs_df["status"],
+        pending_jobs_df["created_at"],
+    ):
+        if job_revision != revision:
+            continue
+        config = _none_if_na(config)
+        split = _none_if_na(split)
+        index[(job_type, config, split)].append(
+            PendingJob(
+                job_id=job_id,
+                type=job_type,
+                revision=job_revision,
+                config=config,
+                split=split,
+                priority=priority,
+                status=status,
+                created_at=created_at,
+            )
+        )
+    return dict(index)
+
+
+def get_cache_entries_index(cache_entries_df: pd.DataFrame) -> CacheEntriesIndex:
+    """Group the cache entries by artifact, in one pass.
+
+    Args:
+        cache_entries_df (`pd.DataFrame`): The cache entries of the dataset, as returned by get_cache_entries_df.
+
+    Returns:
+        `CacheEntriesIndex`: The cache entries, indexed by (cache kind, config, split).
+    """
+    index: DefaultDict[ArtifactKey, List[CacheEntry]] = defaultdict(list)
+    for (
+        kind,
+        config,
+        split,
+        http_status,
+        error_code,
+        job_runner_version,
+        dataset_git_revision,
+        progress,
+        updated_at,
+    ) in zip(
+        cache_entries_df["kind"],
+        cache_entries_df["config"],
+        cache_entries_df["split"],
+        cache_entries_df["http_status"],
+        cache_entries_df["error_code"],
+        cache_entries_df["job_runner_version"],
+        cache_entries_df["dataset_git_revision"],
+        cache_entries_df["progress"],
+        cache_entries_df["updated_at"],
+    ):
+        config = _none_if_na(config)
+        split = _none_if_na(split)
+        job_runner_version = _none_if_na(job_runner_version)
+        progress = _none_if_na(progress)
+        index[(kind, config, split)].append(
+            CacheEntry(
+                kind=kind,
+                config=config,
+                split=split,
+                http_status=HTTPStatus(int(http_status)),
+                error_code=_none_if_na(error_code),
+                job_runner_version=None if job_runner_version is None else int(job_runner_version),
+                dataset_git_revision=_none_if_na(dataset_git_revision),
+                progress=None if progress is None else float(progress),
+                updated_at=updated_at,
+            )
+        )
+    return dict(index)
+
+
+def filter_processing_steps(
+    processing_steps: ProcessingSteps, processing_step_names: Optional[Set[str]]
+) -> ProcessingSteps:
+    """Only keep the processing steps whose name is in processing_step_names (all of them if it's None)."""
+    if processing_step_names is None:
+        return processing_steps
+    return tuple(
+        processing_step for processing_step in processing_steps if processing_step.name in processing_step_names
+    )
+
+
+STATUS_RANK = {Status.STARTED.value: 0, Status.WAITING.value: 1}
+PRIORITY_RANK = {Priority.NORMAL.value: 0, Priority.LOW.value: 1}
+
+
 @dataclass
 class JobState:
     """The state of a job for a given input."""
@@ -23,19 +176,20 @@ class JobState:
     config: Optional[str]
     split: Optional[str]
     job_type: str
-    pending_jobs_df: pd.DataFrame
+    pending_jobs: List[PendingJob]
 
-    valid_pending_jobs_df: pd.DataFrame = field(
-        init=False
-    )  # contains at most one row (but the logic does not depend on it)
+    valid_pending_job: Optional[PendingJob] = field(init=False)
+    # ^ the logic does not depend on the number of pending jobs
     is_in_process: bool = field(init=False)
 
     def __post_init__(self) -> None:
-        self.valid_pending_jobs_df = self.pending_jobs_df.sort_values(
-            ["status", "priority", "created_at"], ascending=[False, False, True]
-        ).head(1)
-        # ^ only keep the first valid job, if any, in order of priority
-        self.is_in_process = not self.valid_pending_jobs_df.empty
+        self.valid_pending_job = min(
+            self.pending_jobs,
+            key=lambda job: (STATUS_RANK.get(job.status, 2), PRIORITY_RANK.get(job.priority, 2), job.created_at),
+            default=None,
+        )
+        # ^ only keep the first valid job, if any, in order of priority: started, then normal, then oldest
+        self.is_in_process = self.valid_pending_job is not None
 
 
 @dataclass
@@ -46,7 +200,7 @@ class CacheState:
     config: Optional[str]
     split: Optional[str]
     cache_kind: str
-    cache_entries_df: pd.DataFrame
+    cache_entries: List[CacheEntry]
     job_runner_version: int
     error_codes_to_retry: Optional[List[str]] = None
 
@@ -55,21 +209,21 @@ class CacheState:
     is_success: bool = field(init=False)
 
     def __post_init__(self) -> None:
-        if len(self.cache_entries_df) > 1:
+        if len(self.cache_entries) > 1:
             logging.warning(
                 f"More than one cache entry found for {self.dataset}, {self.config}, {self.split}, {self.cache_kind}"
             )
-        if len(self.cache_entries_df) == 0:
+        if len(self.cache_entries) == 0:
             self.cache_entry_metadata = None
         else:
-            entry = self.cache_entries_df.iloc[0]
+            entry = self.cache_entries[0]
             self.cache_entry_metadata = CacheEntryMetadata(
-                http_status=entry["http_status"],
-                error_code=None if entry["error_code"] is pd.NA else entry["error_code"],
-                job_runner_version=None if entry["job_runner_version"] is pd.NA else entry["job_runner_version"],
-                dataset_git_revision=None if entry["dataset_git_revision"] is pd.NA else entry["dataset_git_revision"],
-                updated_at=entry["updated_at"],
-                progress=None if entry["progress"] is pd.NA else entry["progress"],
+                http_status=entry.http_status,
+                error_code=entry.error_code,
+                job_runner_version=entry.job_runner_version,
+                dataset_git_revision=entry.dataset_git_revision,
+                updated_at=entry.updated_at,
+                progress=entry.progress,
             )
 
         """Whether the cache entry exists."""
@@ -109,8 +263,8 @@ class CacheState:
 class ArtifactState(Artifact):
     """The state of an artifact."""
 
-    pending_jobs_df: pd.DataFrame
-    cache_entries_df: pd.DataFrame
+    pending_jobs: List[PendingJob]
+    cache_entries: List[CacheEntry]
     error_codes_to_retry: Optional[List[str]] = None
 
     job_state: JobState = field(init=False)
@@ -124,7 +278,7 @@ class ArtifactState(Artifact):
             revision=self.revision,
             config=self.config,
             split=self.split,
-            pending_jobs_df=self.pending_jobs_df,
+            pending_jobs=self.pending_jobs,
         )
         self.cache_state = CacheState(
             cache_kind=self.processing_step.cache_kind,
@@ -133,7 +287,7 @@ class ArtifactState(Artifact):
             split=self.split,
             job_runner_version=self.processing_step.job_runner_version,
             error_codes_to_retry=self.error_codes_to_retry,
-            cache_entries_df=self.cache_entries_df,
+            cache_entries=self.cache_entries,
         )
 
 
@@ -146,9 +300,10 @@ class SplitState:
     config: str
     split: str
     processing_graph: ProcessingGraph
-    pending_jobs_df: pd.DataFrame
-    cache_entries_df: pd.DataFrame
+    pending_jobs_index: PendingJobsIndex
+    cache_entries_index: CacheEntriesIndex
     error_codes_to_retry: Optional[List[str]] = None
+    processing_step_names: Optional[Set[str]] = None
 
     artifact_state_by_step: Dict[str, ArtifactState] = field(init=False)
 
@@ -161,10 +316,12 @@ class SplitState:
                 config=self.config,
                 split=self.split,
                 error_codes_to_retry=self.error_codes_to_retry,
-                pending_jobs_df=self.pending_jobs_df[self.pending_jobs_df["type"] == processing_step.job_type],
-                cache_entries_df=self.cache_entries_df[self.cache_entries_df["kind"] == processing_step.cache_kind],
+                pending_jobs=self.pending_jobs_index.get((processing_step.job_type, self.config, self.split), []),
+                cache_entries=self.cache_entries_index.get((processing_step.cache_kind, self.config, self.split), []),
+            )
+            for processing_step in filter_processing_steps(
+                self.processing_graph.get_input_type_processing_steps(input_type="split"), self.processing_step_names
             )
-            for processing_step in self.processing_graph.get_input_type_processing_steps(input_type="split")
         }
 
 
@@ -176,9 +333,11 @@ class ConfigState:
     revision: str
     config: str
     processing_graph: ProcessingGraph
-    pending_jobs_df: pd.DataFrame
-    cache_entries_df: pd.DataFrame
+    pending_jobs_index: PendingJobsIndex
+    cache_entries_index: CacheEntriesIndex
     error_codes_to_retry: Optional[List[str]] = None
+    processing_step_names: Optional[Set[str]] = None
+    dataset_names: Optional[DatasetNames] = None
 
     split_names: List[str] = field(init=False)
     split_states: List[SplitState] = field(init=False)
@@ -198,31 +357,41 @@ class ConfigState:
                     config=self.config,
                     split=None,
                     error_codes_to_retry=self.error_codes_to_retry,
-                    pending_jobs_df=self.pending_jobs_df[
-                        (self.pending_jobs_df["split"].isnull())
-                        & (self.pending_jobs_df["type"] == processing_step.job_type)
-                    ],
-                    cache_entries_df=self.cache_entries_df[
-                        self.cache_entries_df["kind"] == processing_step.cache_kind
-                    ],
+                    pending_jobs=self.pending_jobs_index.get((processing_step.job_type, self.config, None), []),
+                    cache_entries=self.cache_entries_index.get((processing_step.cache_kind, self.config, None), []),
+                )
+                for processing_step in filter_processing_steps(
+                    self.processing_graph.get_input_type_processing_steps(input_type="config"),
+                    self.processing_step_names,
                 )
-                for processing_step in self.processing_graph.get_input_type_processing_steps(input_type="config")
             }
 
+        if not filter_processing_steps(
+            self.processing_graph.get_input_type_processing_steps(input_type="split"), self.processing_step_names
+        ):
+            # no split-level step to backfill: no need to fetch the split names
+            self.split_names = []
+            self.split_states = []
+            return
+
         with StepProfiler(
             method="ConfigState.__post_init__",
             step="get_split_names",
             context=f"dataset={self.dataset},config={self.config}",
         ):
-            self.split_names = fetch_names(
-                dataset=self.dataset,
-                config=self.config,
-                cache_kinds=[
-                    processing_step.cache_kind
-                    for processing_step in self.processing_graph.get_config_split_names_processing_steps()
-                ],
-                names_field="splits",
-                name_field="split",
+            self.split_names = (
+                fetch_names(
+                    dataset=self.dataset,
+                    config=self.config,
+                    cache_kinds=[
+                        processing_step.cache_kind
+                        for processing_step in self.processing_graph.get_config_split_names_processing_steps()
+                    ],
+                    names_field="splits",
+                    name_field="split",
+                )
+                if self.dataset_names is None
+                else self.dataset_names.split_names_by_config.get(self.config, [])
             )  # Note that we use the cached content even the revision is different (ie. maybe obsolete)
 
         with StepProfiler(
@@ -238,8 +407,9 @@ class ConfigState:
                     split_name,
                     processing_graph=self.processing_graph,
                     error_codes_to_retry=self.error_codes_to_retry,
-                    pending_jobs_df=self.pending_jobs_df[self.pending_jobs_df["split"] == split_name],
-                    cache_entries_df=self.cache_entries_df[self.cache_entries_df["split"] == split_name],
+                    pending_jobs_index=self.pending_jobs_index,
+                    cache_entries_index=self.cache_entries_index,
+                    processing_step_names=self.processing_step_names,
                 )
                 for split_name in self.split_names
             ]
@@ -247,7 +417,17 @@ class ConfigState:
 
 @dataclass
 class DatasetState:
-    """The state of a dataset."""
+    """The state of a dataset.
+
+    The pending jobs and the cache entries are grouped by artifact once (see get_pending_jobs_index and
+    get_cache_entries_index), then every artifact state gets its jobs and cache entries with a dict lookup.
+
+    If processing_step_names is set, only the artifact states of these processing steps are computed, and the config
+    and split names are only fetched if needed. If config is also set, only the state of this config is computed.
+
+    If dataset_names is set (see get_cache_entries_df_and_names), the config and split names are read from it, instead
+    of being fetched from the cache for the dataset and for every config.
+    """
 
     dataset: str
     revision: str
@@ -255,54 +435,89 @@ class DatasetState:
     pending_jobs_df: pd.DataFrame
     cache_entries_df: pd.DataFrame
     error_codes_to_retry: Optional[List[str]] = None
+    processing_step_names: Optional[Set[str]] = None
+    config: Optional[str] = None
+    dataset_names: Optional[DatasetNames] = None
 
+    pending_jobs_index: PendingJobsIndex = field(init=False)
+    cache_entries_index: CacheEntriesIndex = field(init=False)
     config_names: List[str] = field(init=False)
     config_states: List[ConfigState] = field(init=False)
     artifact_state_by_step: Dict[str, ArtifactState] = field(init=False)
 
+    def _build_indexes(self) -> None:
+        with StepProfiler(
+            method="DatasetState.__post_init__",
+            step="build_indexes",
+            context=f"dataset={self.dataset}",
+        ):
+            self.pending_jobs_index = get_pending_jobs_index(
+                pending_jobs_df=self.pending_jobs_df, revision=self.revision
+            )
+            self.cache_entries_index = get_cache_entries_index(cache_entries_df=self.cache_entries_df)
+
+    def _get_dataset_level_artifact_states(self, processing_steps: ProcessingSteps) -> Dict[str, ArtifactState]:
+        return {
+            processing_step.name: ArtifactState(
+                processing_step=processing_step,
+                dataset=self.dataset,
+                revision=self.revision,
+                config=None,
+                split=None,
+                error_codes_to_retry=self.error_codes_to_retry,
+                pending_jobs=self.pending_jobs_index.get((processing_step.job_type, None, None), []),
+                cache_entries=self.cache_entries_index.get((processing_step.cache_kind, None, None), []),
+            )
+            for processing_step in processing_steps
+        }
+
     def __post_init__(self) -> None:
+        self._build_indexes()
         with StepProfiler(
             method="DatasetState.__post_init__",
             step="get_dataset_level_artifact_states",
             context=f"dataset={self.dataset}",
         ):
-            self.artifact_state_by_step = {
-                processing_step.name: ArtifactState(
-                    processing_step=processing_step,
-                    dataset=self.dataset,
-                    revision=self.revision,
-                    config=None,
-                    split=None,
-                    error_codes_to_retry=self.error_codes_to_retry,
-                    pending_jobs_df=self.pending_jobs_df[
-                        (self.pending_jobs_df["revision"] == self.revision)
-                        & (self.pending_jobs_df["config"].isnull())
-                        & (self.pending_jobs_df["split"].isnull())
-                        & (self.pending_jobs_df["type"] == processing_step.job_type)
-                    ],
-                    cache_entries_df=self.cache_entries_df[
-                        (self.cache_entries_df["kind"] == processing_step.cache_kind)
-                        & (self.cache_entries_df["config"].isnull())
-                        & (self.cache_entries_df["split"].isnull())
-                    ],
+            self.artifact_state_by_step = self._get_dataset_level_artifact_states(
+                filter_processing_steps(
+                    self.processing_graph.get_input_type_processing_steps(input_type="dataset"),
+                    self.processing_step_names,
                 )
-                for processing_step in self.processing_graph.get_input_type_processing_steps(input_type="dataset")
-            }
+            )
+
+            if not filter_processing_steps(
+                self.processing_graph.get_input_type_processing_steps(input_type="config")
+                + self.processing_graph.get_input_type_processing_steps(input_type="split"),
+                self.processing_step_names,
+            ):
+                # no config-level or split-level step to backfill: no need to fetch the config names
+                self.config_names = []
+                self.config_states = []
+                return
 
             with StepProfiler(
                 method="DatasetState.__post_init__",
                 step="get_config_names",
                 context=f"dataset={self.dataset}",
             ):
-                self.config_names = fetch_names(
-                    dataset=self.dataset,
-                    config=None,
-                    cache_kinds=[
-                        step.cache_kind for step in self.processing_graph.get_dataset_config_names_processing_steps()
-                    ],
-                    names_field="config_names",
-                    name_field="config",
+                self.config_names = (
+                    fetch_names(
+                        dataset=self.dataset,
+                        config=None,
+                        cache_kinds=[
+                            step.cache_kind
+                            for step in self.processing_graph.get_dataset_config_names_processing_steps()
+                        ],
+                        names_field="config_names",
+                        name_field="config",
+                    )
+                    if self.dataset_names is None
+                    else self.dataset_names.config_names
                 )  # Note that we use the cached content even the revision is different (ie. maybe obsolete)
+                if self.config is not None:
+                    self.config_names = [
+                        config_name for config_name in self.config_names if config_name == self.config
+                    ]
 
             with StepProfiler(
                 method="DatasetState.__post_init__",
@@ -316,11 +531,10 @@ class DatasetState:
                         config=config_name,
                         processing_graph=self.processing_graph,
                         error_codes_to_retry=self.error_codes_to_retry,
-                        pending_jobs_df=self.pending_jobs_df[
-                            (self.pending_jobs_df["revision"] == self.revision)
-                            & (self.pending_jobs_df["config"] == config_name)
-                        ],
-                        cache_entries_df=self.cache_entries_df[self.cache_entries_df["config"] == config_name],
+                        pending_jobs_index=self.pending_jobs_index,
+                        cache_entries_index=self.cache_entries_index,
+                        processing_step_names=self.processing_step_names,
+                        dataset_names=self.dataset_names,
                     )
                     for config_name in self.config_names
                 ]
@@ -331,33 +545,15 @@ class FirstStepsDatasetState(DatasetState):
     """The state of the first dataset steps."""
 
     def __post_init__(self) -> None:
+        self._build_indexes()
         with StepProfiler(
             method="FirstStepsDatasetState.__post_init__",
             step="get_dataset_level_artifact_states",
             context=f"dataset={self.dataset}",
         ):
-            self.artifact_state_by_step = {
-                processing_step.name: ArtifactState(
-                    processing_step=processing_step,
-                    dataset=self.dataset,
-                    revision=self.revision,
-                    config=None,
-                    split=None,
-                    error_codes_to_retry=self.error_codes_to_retry,
-                    pending_jobs_df=self.pending_jobs_df[
-                        (self.pending_jobs_df["revision"] == self.revision)
-                        & (self.pending_jobs_df["config"].isnull())
-                        & (self.pending_jobs_df["split"].isnull())
-                        & (self.pending_jobs_df["type"] == processing_step.job_type)
-                    ],
-                    cache_entries_df=self.cache_entries_df[
-                        (self.cache_entries_df["kind"] == processing_step.cache_kind)
-                        & (self.cache_entries_df["config"].isnull())
-                        & (self.cache_entries_df["split"].isnull())
-                    ],
-                )
-                for processing_step in self.processing_graph.get_first_processing_steps()
-            }
+            self.artifact_state_by_step = self._get_dataset_level_artifact_states(
+                self.processing_graph.get_first_processing_steps()
+            )
 
             self.config_names = []
             self.config_states = []
@@ -6,9 +6,11 @@ from typing import List, Optional, Set, Tuple
 
 import pytest
 
+from libcommon.orchestrator import get_up_to_date_datasets
 from libcommon.processing_graph import ProcessingGraph
 from libcommon.queue import Queue
 from libcommon.resources import CacheMongoResource, QueueMongoResource
+from libcommon.simple_cache import delete_response
 from libcommon.utils import Priority, Status
 
 from .utils import (
@@ -42,8 +44,12 @@ from .utils import (
     SPLIT_NAME_1,
     SPLIT_NAMES,
     STEP_CA,
+    STEP_CB,
     STEP_DA,
+    STEP_DB,
     STEP_DD,
+    STEP_DE,
+    STEP_DG,
     STEP_DI,
     STEP_SA,
     assert_dataset_backfill_plan,
@@ -571,6 +577,145 @@ def test_plan_fan_in_updated(
     )
 
 
+@pytest.mark.parametrize(
+    "processing_graph,updated_artifact,processing_step_name,config,config_names,up_to_date,is_outdated_by_parent",
+    [
+        (
+            PROCESSING_GRAPH_GENEALOGY,
+            (STEP_DB, None, None),
+            STEP_DB,
+            None,
+            [],
+            [ARTIFACT_DB],
+            [ARTIFACT_DC, ARTIFACT_DD],
+        ),
+        (
+            PROCESSING_GRAPH_FAN_IN_OUT,
+            (STEP_CA, CONFIG_NAME_1, None),
+            STEP_CA,
+            CONFIG_NAME_1,
+            # ^ ignored, because DE and DF are dataset-level descendants, that depend on all the configs
+            CONFIG_NAMES,
+            [
+                ARTIFACT_CA_1,
+                ARTIFACT_CA_2,
+                ARTIFACT_SA_2_1,
+                ARTIFACT_SA_2_2,
+                ARTIFACT_CB_1,
+                ARTIFACT_CB_2,
+                ARTIFACT_DF,
+            ],
+            [ARTIFACT_SA_1_1, ARTIFACT_SA_1_2, ARTIFACT_DE],
+        ),
+        (
+            PROCESSING_GRAPH_FAN_IN_OUT,
+            (STEP_SA, CONFIG_NAME_1, SPLIT_NAME_1),
+            STEP_CB,
+            CONFIG_NAME_1,
+            [CONFIG_NAME_1],
+            [],
+            [ARTIFACT_CB_1],
+        ),
+    ],
+)
+def test_plan_incremental(
+    processing_graph: ProcessingGraph,
+    updated_artifact: Tuple[str, Optional[str], Optional[str]],
+    processing_step_name: str,
+    config: Optional[str],
+    config_names: List[str],
+    up_to_date: List[str],
+    is_outdated_by_parent: List[str],
+) -> None:
+    compute_all(processing_graph=processing_graph)
+
+    step, updated_config, updated_split = updated_artifact
+    put_cache(step=step, dataset=DATASET_NAME, revision=REVISION_NAME, config=updated_config, split=updated_split)
+
+    # only the given step and its descendants are analyzed
+    dataset_backfill_plan = get_dataset_backfill_plan(
+        processing_graph=processing_graph, processing_step_name=processing_step_name, config=config
+    )
+    assert_dataset_backfill_plan(
+        dataset_backfill_plan=dataset_backfill_plan,
+        config_names=config_names,
+        cache_status={
+            "cache_has_different_git_revision": [],
+            "cache_is_outdated_by_parent": is_outdated_by_parent,
+            "cache_is_empty": [],
+            "cache_is_error_to_retry": [],
+            "cache_is_job_runner_obsolete": [],
+            "up_to_date": up_to_date,
+        },
+        queue_status={"in_process": []},
+        tasks=[f"CreateJobs,{len(is_outdated_by_parent)}"],
+    )
+
+
+@pytest.mark.parametrize(
+    "processing_graph,error_step",
+    [
+        (PROCESSING_GRAPH_GENEALOGY, STEP_DB),
+        (PROCESSING_GRAPH_FAN_IN_OUT, STEP_DE),
+        (PROCESSING_GRAPH_PARALLEL, STEP_DG),
+    ],
+)
+def test_get_up_to_date_datasets(processing_graph: ProcessingGraph, error_step: str) -> None:
+    other_dataset = "other_dataset"
+    dataset_revisions = {DATASET_NAME: REVISION_NAME, other_dataset: REVISION_NAME}
+    assert get_up_to_date_datasets(dataset_revisions=dataset_revisions, processing_graph=processing_graph) == set()
+
+    compute_all(processing_graph=processing_graph)
+    put_cache(step=STEP_DA, dataset=other_dataset, revision=REVISION_NAME)
+    # ^ only the first step has been computed for the other dataset
+    assert get_up_to_date_datasets(dataset_revisions=dataset_revisions, processing_graph=processing_graph) == {
+        DATASET_NAME
+    }
+    # the dataset has a new revision
+    assert (
+        get_up_to_date_datasets(
+            dataset_revisions={DATASET_NAME: OTHER_REVISION_NAME}, processing_graph=processing_graph
+        )
+        == set()
+    )
+    # an artifact has been computed by an old version of the job runner
+    put_cache(step=STEP_DA, dataset=DATASET_NAME, revision=REVISION_NAME, use_old_job_runner_version=True)
+    assert get_up_to_date_datasets(dataset_revisions=dataset_revisions, processing_graph=processing_graph) == set()
+    put_cache(step=STEP_DA, dataset=DATASET_NAME, revision=REVISION_NAME)
+    # an artifact is an error to retry
+    put_cache(step=error_step, dataset=DATASET_NAME, revision=REVISION_NAME, error_code="ERROR_CODE_TO_RETRY")
+    assert get_up_to_date_datasets(dataset_revisions=dataset_revisions, processing_graph=processing_graph) == {
+        DATASET_NAME
+    }
+    assert (
+        get_up_to_date_datasets(
+            dataset_revisions=dataset_revisions,
+            processing_graph=processing_graph,
+            error_codes_to_retry=["ERROR_CODE_TO_RETRY"],
+        )
+        == set()
+    )
+
+
+def test_get_up_to_date_datasets_missing_artifact() -> None:
+    compute_all(processing_graph=PROCESSING_GRAPH_FAN_IN_OUT)
+    dataset_revisions = {DATASET_NAME: REVISION_NAME}
+    assert get_up_to_date_datasets(
+        dataset_revisions=dataset_revisions, processing_graph=PROCESSING_GRAPH_FAN_IN_OUT
+    ) == {DATASET_NAME}
+
+    delete_response(kind=STEP_SA, dataset=DATASET_NAME, config=CONFIG_NAME_1, split=SPLIT_NAME_1)
+    assert (
+        get_up_to_date_datasets(dataset_revisions=dataset_revisions, processing_graph=PROCESSING_GRAPH_FAN_IN_OUT)
+        == set()
+    )
+
+
+def test_plan_incremental_unknown_step() -> None:
+    with pytest.raises(ValueError):
+        get_dataset_backfill_plan(processing_graph=PROCESSING_GRAPH_GENEALOGY, processing_step_name="unknown")
+
+
 @pytest.mark.parametrize(
     "processing_graph,initial,up_to_date,is_empty,unknown",
     [
@@ -696,64 +841,25 @@ NORMAL_STARTED_NEW = (Priority.NORMAL, Status.STARTED, NEW)
     "existing_jobs,expected_create_job,expected_delete_jobs,expected_jobs_after_backfill",
     [
         ([], True, False, [(Priority.LOW, Status.WAITING, None)]),
+        # note that there cannot be more than one waiting job for the same unicity_id (unique partial index)
         (
-            [
-                LOW_WAITING_OLD,
-                LOW_WAITING_NEW,
-                LOW_STARTED_OLD,
-                LOW_STARTED_NEW,
-                NORMAL_WAITING_OLD,
-                NORMAL_WAITING_NEW,
-                NORMAL_STARTED_OLD,
-                NORMAL_STARTED_NEW,
-            ],
+            [NORMAL_WAITING_OLD, LOW_STARTED_OLD, LOW_STARTED_NEW, NORMAL_STARTED_OLD, NORMAL_STARTED_NEW],
             False,
             True,
             [NORMAL_STARTED_OLD],
         ),
         (
-            [
-                LOW_WAITING_OLD,
-                LOW_WAITING_NEW,
-                LOW_STARTED_OLD,
-                LOW_STARTED_NEW,
-                NORMAL_WAITING_OLD,
-                NORMAL_WAITING_NEW,
-                NORMAL_STARTED_NEW,
-            ],
+            [NORMAL_WAITING_OLD, LOW_STARTED_OLD, LOW_STARTED_NEW, NORMAL_STARTED_NEW],
             False,
             True,
             [NORMAL_STARTED_NEW],
         ),
-        (
-            [
-                LOW_WAITING_OLD,
-                LOW_WAITING_NEW,
-                LOW_STARTED_OLD,
-                LOW_STARTED_NEW,
-                NORMAL_WAITING_OLD,
-                NORMAL_WAITING_NEW,
-            ],
-            False,
-            True,
-            [LOW_STARTED_OLD],
-        ),
-        (
-            [LOW_WAITING_OLD, LOW_WAITING_NEW, LOW_STARTED_NEW, NORMAL_WAITING_OLD, NORMAL_WAITING_NEW],
-            False,
-            True,
-            [LOW_STARTED_NEW],
-        ),
-        (
-            [LOW_WAITING_OLD, LOW_WAITING_NEW, NORMAL_WAITING_OLD, NORMAL_WAITING_NEW],
-            False,
-            True,
-            [NORMAL_WAITING_OLD],
-        ),
-        ([LOW_WAITING_OLD, LOW_WAITING_NEW, NORMAL_WAITING_NEW], False, True, [NORMAL_WAITING_NEW]),
-        ([LOW_WAITING_OLD, LOW_WAITING_NEW], False, True, [LOW_WAITING_OLD]),
+        ([NORMAL_WAITING_OLD, LOW_STARTED_OLD, LOW_STARTED_NEW], False, True, [LOW_STARTED_OLD]),
+        ([NORMAL_WAITING_OLD, LOW_STARTED_NEW], False, True, [LOW_STARTED_NEW]),
+        ([NORMAL_WAITING_OLD], False, False, [NORMAL_WAITING_OLD]),
+        ([NORMAL_WAITING_NEW], False, False, [NORMAL_WAITING_NEW]),
+        ([LOW_WAITING_OLD], False, False, [LOW_WAITING_OLD]),
         ([LOW_WAITING_NEW], False, False, [LOW_WAITING_NEW]),
-        ([LOW_WAITING_NEW] * 5, False, True, [LOW_WAITING_NEW]),
     ],
 )
 def test_delete_jobs(
@@ -765,7 +871,8 @@ def test_delete_jobs(
     processing_graph = PROCESSING_GRAPH_ONE_STEP
 
     queue = Queue()
-    for job_spec in existing_jobs:
+    # create the started jobs first: a waiting job would prevent adding another one for the same unicity_id
+    for job_spec in sorted(existing_jobs, key=lambda spec: spec[1] != Status.STARTED):
         (priority, status, created_at) = job_spec
         job = queue._add_job(job_type=STEP_DA, dataset="dataset", revision="revision", priority=priority)
         if created_at is not None:
@@ -0,0 +1,96 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2023 The HuggingFace Authors.
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+import pytest
+import requests
+
+from libcommon.config import HttpClientConfig
+from libcommon.http_client import (
+    CircuitBreaker,
+    CircuitOpenError,
+    PoolTimeoutError,
+    create_http_session,
+)
+
+
+def test_circuit_breaker() -> None:
+    circuit_breaker = CircuitBreaker(failure_threshold=2, reset_seconds=0.1, slow_call_seconds=1)
+    assert circuit_breaker.allow_request()
+    circuit_breaker.record(duration=0.01, success=False)
+    assert circuit_breaker.allow_request()
+    # a success resets the count of consecutive failures
+    circuit_breaker.record(duration=0.01, success=True)
+    circuit_breaker.record(duration=0.01, success=False)
+    assert not circuit_breaker.is_open
+    # a slow call is a failure
+    circuit_breaker.record(duration=2, success=True)
+    assert circuit_breaker.is_open
+    assert not circuit_breaker.allow_request()
+    time.sleep(0.2)
+    # half-open: only one request is let through
+    assert circuit_breaker.allow_request()
+    assert not circuit_breaker.allow_request()
+    circuit_breaker.record(duration=0.01, success=True)
+    assert not circuit_breaker.is_open
+    assert circuit_breaker.allow_request()
+
+
+def test_circuit_breaker_reopens_after_failed_probe() -> None:
+    circuit_breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.1, slow_call_seconds=1)
+    circuit_breaker.record(duration=0.01, success=False)
+    time.sleep(0.2)
+    assert circuit_breaker.allow_request()
+    circuit_breaker.record(duration=0.01, success=False)
+    assert not circuit_breaker.allow_request()
+
+
+def test_http_session_opens_the_circuit() -> None:
+    session = create_http_session(
+        config=HttpClientConfig(circuit_breaker_failure_threshold=2, circuit_breaker_reset_seconds=60)
+    )
+    # nothing listens on this port: the connection is refused
+    url = "http://127.0.0.1:1/"
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.ConnectionError) as exc_info:
+            session.get(url, timeout=1)
+        assert not isinstance(exc_info.value, CircuitOpenError)
+    with pytest.raises(CircuitOpenError):
+        session.get(url, timeout=1)
+
+
+def test_http_session_bounds_the_wait_for_a_free_connection() -> None:
+    class SlowHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            time.sleep(1)
+            self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *args: Any) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    session = create_http_session(config=HttpClientConfig(max_connections_per_host=1))
+    try:
+        # the only connection of the pool is used by a slow request
+        slow_request = threading.Thread(target=session.get, args=(url,), kwargs={"timeout": 5})
+        slow_request.start()
+        time.sleep(0.2)
+        start = time.perf_counter()
+        with pytest.raises(PoolTimeoutError):
+            session.get(url, timeout=0.2)
+        # the request waited for the connect timeout, not for the slow request to finish
+        assert time.perf_counter() - start < 0.7
+        slow_request.join()
+        # the connection is free again
+        assert session.get(url, timeout=5).status_code == 200
+    finally:
+        server.shutdown()
+        server.server_close()
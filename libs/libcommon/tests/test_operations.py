@@ -0,0 +1,54 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2023 The HuggingFace Authors.
+
+from unittest.mock import patch
+
+import pytest
+
+from libcommon.operations import buffer_dataset_update, process_dataset_updates
+from libcommon.queue import DatasetUpdate
+from libcommon.resources import QueueMongoResource
+
+from .utils import PROCESSING_GRAPH
+
+
+@pytest.fixture(autouse=True)
+def queue_mongo_resource_autouse(queue_mongo_resource: QueueMongoResource) -> QueueMongoResource:
+    return queue_mongo_resource
+
+
+def process(debounce_seconds: float) -> int:
+    return process_dataset_updates(
+        processing_graph=PROCESSING_GRAPH, debounce_seconds=debounce_seconds, max_wait_seconds=60, lock_seconds=600
+    )
+
+
+def test_process_dataset_updates() -> None:
+    buffer_dataset_update(dataset="dataset", revision="revision1")
+    buffer_dataset_update(dataset="dataset", revision="revision2")
+    with patch("libcommon.operations.backfill_dataset") as backfill_dataset_mock:
+        # the update has not settled yet
+        assert process(debounce_seconds=60) == 0
+        backfill_dataset_mock.assert_not_called()
+        # the dataset is backfilled once, with the latest revision, and the update is deleted
+        assert process(debounce_seconds=0) == 1
+    backfill_dataset_mock.assert_called_once()
+    assert backfill_dataset_mock.call_args.kwargs["dataset"] == "dataset"
+    assert backfill_dataset_mock.call_args.kwargs["revision"] == "revision2"
+    assert DatasetUpdate.objects().count() == 0
+
+
+def test_process_dataset_updates_backfill_error() -> None:
+    buffer_dataset_update(dataset="dataset", revision="revision")
+    with patch("libcommon.operations.backfill_dataset", side_effect=RuntimeError("backfill error")):
+        assert process(debounce_seconds=0) == 0
+    # the update is kept, and locked: it will be processed again once the lock has expired
+    assert DatasetUpdate.objects(dataset="dataset").get().locked_until is not None
+    with patch("libcommon.operations.backfill_dataset") as backfill_dataset_mock:
+        assert process(debounce_seconds=0) == 0
+        backfill_dataset_mock.assert_not_called()
+    DatasetUpdate.objects(dataset="dataset").update_one(unset__locked_until=True)
+    with patch("libcommon.operations.backfill_dataset") as backfill_dataset_mock:
+        assert process(debounce_seconds=0) == 1
+    backfill_dataset_mock.assert_called_once()
+    assert DatasetUpdate.objects().count() == 0
@@ -2,16 +2,20 @@
 # Copyright 2023 The HuggingFace Authors.
 
 from http import HTTPStatus
-from typing import List
+from typing import List, Set
 
 import pytest
 
-from libcommon.orchestrator import AfterJobPlan, DatasetOrchestrator
+from libcommon.orchestrator import (
+    AfterJobPlan,
+    DatasetOrchestrator,
+    finish_crashed_jobs,
+)
 from libcommon.processing_graph import Artifact, ProcessingGraph
 from libcommon.queue import Job, Queue
 from libcommon.resources import CacheMongoResource, QueueMongoResource
-from libcommon.simple_cache import CachedResponse, upsert_response_params
-from libcommon.utils import JobOutput, JobResult, Priority, Status
+from libcommon.simple_cache import CachedResponse, get_response, upsert_response_params
+from libcommon.utils import JobInfo, JobOutput, JobResult, Priority, Status
 
 from .utils import (
     ARTIFACT_CA_1,
@@ -23,19 +27,23 @@ from .utils import (
     ARTIFACT_DE,
     ARTIFACT_DG,
     ARTIFACT_DH,
+    CONFIG_NAME_2,
     CONFIG_NAMES_CONTENT,
     DATASET_NAME,
     JOB_RUNNER_VERSION,
+    OTHER_REVISION_NAME,
     PROCESSING_GRAPH_FAN_IN_OUT,
     PROCESSING_GRAPH_GENEALOGY,
     PROCESSING_GRAPH_ONE_STEP,
     PROCESSING_GRAPH_PARALLEL,
     REVISION_NAME,
+    STEP_CA,
     STEP_CB,
     STEP_DA,
     STEP_DC,
     STEP_DD,
     artifact_id_to_job_info,
+    compute_all,
 )
 
 
@@ -103,15 +111,15 @@ def test_after_job_plan(
 
 def test_after_job_plan_delete() -> None:
     job_info = artifact_id_to_job_info(ARTIFACT_DA)
-    # create two jobs for DG, and none for DH
-    # one job should be deleted for DG, and one should be created for DH
+    # create two jobs for DG (they are deduplicated, only one waiting job is stored), and none for DH
+    # the job should be kept for DG, and one should be created for DH
     Queue().create_jobs([artifact_id_to_job_info(ARTIFACT_DG)] * 2)
 
     after_job_plan = AfterJobPlan(
         processing_graph=PROCESSING_GRAPH_PARALLEL,
         job_info=job_info,
     )
-    assert after_job_plan.as_response() == ["CreateJobs,1", "DeleteJobs,1"]
+    assert after_job_plan.as_response() == ["CreateJobs,1"]
 
     after_job_plan.run()
     pending_jobs_df = Queue().get_pending_jobs_df(dataset=DATASET_NAME)
@@ -129,6 +137,49 @@ def test_after_job_plan_delete() -> None:
     assert artifact_ids == [ARTIFACT_DG, ARTIFACT_DH]
 
 
+def test_after_job_plan_fan_out_pending_jobs() -> None:
+    job_info = artifact_id_to_job_info(ARTIFACT_DA)
+    upsert_response_params(
+        # inputs
+        kind=STEP_DA,
+        job_params=job_info["params"],
+        job_runner_version=JOB_RUNNER_VERSION,
+        # output
+        content=CONFIG_NAMES_CONTENT,
+        http_status=HTTPStatus.OK,
+        error_code=None,
+        details=None,
+        progress=1.0,
+    )
+    # a pending job exists for CA_1 (it should be kept), and for CA_2 but for another revision (it should be replaced)
+    Queue().create_jobs(
+        [
+            artifact_id_to_job_info(ARTIFACT_CA_1),
+            artifact_id_to_job_info(f"{STEP_CA},{DATASET_NAME},other_revision,{CONFIG_NAME_2}"),
+        ]
+    )
+
+    after_job_plan = AfterJobPlan(
+        processing_graph=PROCESSING_GRAPH_FAN_IN_OUT,
+        job_info=job_info,
+    )
+    assert after_job_plan.as_response() == ["CreateJobs,1", "DeleteJobs,1"]
+
+    after_job_plan.run()
+    pending_jobs_df = Queue().get_pending_jobs_df(dataset=DATASET_NAME)
+    artifact_ids = [
+        Artifact.get_id(
+            dataset=row["dataset"],
+            revision=row["revision"],
+            config=row["config"],
+            split=row["split"],
+            processing_step_name=row["type"],
+        )
+        for _, row in pending_jobs_df.iterrows()
+    ]
+    assert sorted(artifact_ids) == [ARTIFACT_CA_1, ARTIFACT_CA_2]
+
+
 @pytest.mark.parametrize(
     "processing_graph,artifacts_to_create",
     [
@@ -178,7 +229,8 @@ def test_finish_job(
     assert CachedResponse.objects(dataset=DATASET_NAME).count() == 1
     cached_response = CachedResponse.objects(dataset=DATASET_NAME).first()
     assert cached_response
-    assert cached_response.content == CONFIG_NAMES_CONTENT
+    # the content is compressed if the step doesn't provide names
+    assert get_response(kind=STEP_DA, dataset=DATASET_NAME)["content"] == CONFIG_NAMES_CONTENT
     assert cached_response.http_status == HTTPStatus.OK
     assert cached_response.error_code is None
     assert cached_response.details == {}
@@ -253,6 +305,43 @@ def test_set_revision_handle_existing_jobs(
     assert set(artifact_ids) == set(first_artifacts)
 
 
+@pytest.mark.parametrize(
+    "changed_paths,expected_in_place",
+    [
+        (set(), True),
+        ({".gitattributes", "docs/notes.md"}, True),
+        ({"README.md"}, False),
+        ({"notes.md", "data/train.csv"}, False),
+    ],
+)
+def test_set_revision_without_data_changes(changed_paths: Set[str], expected_in_place: bool) -> None:
+    compute_all(processing_graph=PROCESSING_GRAPH_GENEALOGY)
+    num_cache_entries = CachedResponse.objects(dataset=DATASET_NAME).count()
+
+    def get_changed_paths(dataset: str, old_revision: str, new_revision: str) -> Set[str]:
+        assert (dataset, old_revision, new_revision) == (DATASET_NAME, REVISION_NAME, OTHER_REVISION_NAME)
+        return changed_paths
+
+    dataset_orchestrator = DatasetOrchestrator(dataset=DATASET_NAME, processing_graph=PROCESSING_GRAPH_GENEALOGY)
+    dataset_orchestrator.set_revision(
+        revision=OTHER_REVISION_NAME,
+        priority=Priority.NORMAL,
+        error_codes_to_retry=[],
+        get_changed_paths=get_changed_paths,
+    )
+
+    num_pending_jobs = len(Queue().get_pending_jobs_df(dataset=DATASET_NAME))
+    num_updated_entries = CachedResponse.objects(
+        dataset=DATASET_NAME, dataset_git_revision=OTHER_REVISION_NAME
+    ).count()
+    if expected_in_place:
+        assert num_pending_jobs == 0
+        assert num_updated_entries == num_cache_entries
+    else:
+        assert num_pending_jobs == 2
+        assert num_updated_entries == 0
+
+
 @pytest.mark.parametrize(
     "processing_graph,pending_artifacts,processing_step_names,expected_has_pending_ancestor_jobs",
     [
@@ -274,3 +363,69 @@ def test_has_pending_ancestor_jobs(
 
     dataset_orchestrator = DatasetOrchestrator(dataset=DATASET_NAME, processing_graph=processing_graph)
     assert dataset_orchestrator.has_pending_ancestor_jobs(processing_step_names) == expected_has_pending_ancestor_jobs
+
+
+def get_crashed_job_result(job_info: JobInfo) -> JobResult:
+    return JobResult(
+        job_info=job_info,
+        job_runner_version=JOB_RUNNER_VERSION,
+        is_success=False,
+        output=JobOutput(
+            content={"error": "the job crashed"},
+            http_status=HTTPStatus.NOT_IMPLEMENTED,
+            error_code="JobManagerCrashedError",
+            details=None,
+            progress=1.0,
+        ),
+    )
+
+
+def test_finish_crashed_jobs() -> None:
+    queue = Queue()
+    queue.upsert_job(job_type=STEP_DA, dataset=DATASET_NAME, revision=REVISION_NAME)
+    crashed_job_info = queue.start_job()
+    queue.upsert_job(job_type=STEP_DA, dataset="other_dataset", revision=REVISION_NAME)
+    finished_job_info = queue.start_job()
+    # the second job finishes before the crashed jobs are finished: it's not killed, and its cache entry is kept
+    DatasetOrchestrator(dataset="other_dataset", processing_graph=PROCESSING_GRAPH_ONE_STEP).finish_job(
+        job_result=JobResult(
+            job_info=finished_job_info,
+            job_runner_version=JOB_RUNNER_VERSION,
+            is_success=True,
+            output=JobOutput(
+                content=CONFIG_NAMES_CONTENT, http_status=HTTPStatus.OK, error_code=None, details=None, progress=1.0
+            ),
+        )
+    )
+
+    assert (
+        finish_crashed_jobs(
+            job_results=[get_crashed_job_result(crashed_job_info), get_crashed_job_result(finished_job_info)],
+            processing_graph=PROCESSING_GRAPH_ONE_STEP,
+        )
+        == 1
+    )
+    assert Job.objects(pk=crashed_job_info["job_id"]).get().status == Status.ERROR
+    assert Job.objects(pk=finished_job_info["job_id"]).get().status == Status.SUCCESS
+    assert CachedResponse.objects(dataset=DATASET_NAME).get().http_status == HTTPStatus.NOT_IMPLEMENTED
+    assert CachedResponse.objects(dataset="other_dataset").get().http_status == HTTPStatus.OK
+
+
+def test_finish_crashed_jobs_unknown_job_type() -> None:
+    queue = Queue()
+    queue.upsert_job(job_type=STEP_DA, dataset=DATASET_NAME, revision=REVISION_NAME)
+    job_info = queue.start_job()
+    queue.upsert_job(job_type="unknown_type", dataset="other_dataset", revision=REVISION_NAME)
+    unknown_job_info = queue.start_job()
+
+    assert (
+        finish_crashed_jobs(
+            job_results=[get_crashed_job_result(unknown_job_info), get_crashed_job_result(job_info)],
+            processing_graph=PROCESSING_GRAPH_ONE_STEP,
+        )
+        == 2
+    )
+    # both jobs have been killed, but only the response of the known job type has been cached
+    assert Job.objects(status=Status.ERROR).count() == 2
+    assert CachedResponse.objects().count() == 1
+    assert CachedResponse.objects(dataset=DATASET_NAME).get().http_status == HTTPStatus.NOT_IMPLEMENTED
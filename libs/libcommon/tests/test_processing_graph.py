@@ -1,6 +1,7 @@
 # SPDX-License-Identifier: Apache-2.0
 # Copyright 2022 The HuggingFace Authors.
 
+from dataclasses import FrozenInstanceError
 from typing import List
 
 import pytest
@@ -9,11 +10,12 @@ from libcommon.config import ProcessingGraphConfig
 from libcommon.processing_graph import (
     ProcessingGraph,
     ProcessingGraphSpecification,
-    ProcessingStep,
+    ProcessingStepDoesNotExist,
+    ProcessingSteps,
 )
 
 
-def assert_lists_are_equal(a: List[ProcessingStep], b: List[str]) -> None:
+def assert_lists_are_equal(a: ProcessingSteps, b: List[str]) -> None:
     assert sorted(processing_step.name for processing_step in a) == sorted(b)
 
 
@@ -29,6 +31,27 @@ def assert_step(
     assert_lists_are_equal(graph.get_ancestors(processing_step_name), ancestors)
 
 
+def test_get_descendants() -> None:
+    a = "step_a"
+    b = "step_b"
+    c = "step_c"
+    d = "step_d"
+    specification: ProcessingGraphSpecification = {
+        a: {"input_type": "dataset", "job_runner_version": 1},
+        b: {"input_type": "dataset", "triggered_by": a, "job_runner_version": 1},
+        c: {"input_type": "dataset", "triggered_by": b, "job_runner_version": 1},
+        d: {"input_type": "dataset", "job_runner_version": 1},
+    }
+    graph = ProcessingGraph(ProcessingGraphConfig(specification).specification)
+
+    assert_lists_are_equal(graph.get_descendants(a), [b, c])
+    assert_lists_are_equal(graph.get_descendants(b), [c])
+    assert_lists_are_equal(graph.get_descendants(c), [])
+    assert_lists_are_equal(graph.get_descendants(d), [])
+    with pytest.raises(ProcessingStepDoesNotExist):
+        graph.get_descendants("unknown")
+
+
 def test_graph() -> None:
     a = "step_a"
     b = "step_b"
@@ -319,3 +342,67 @@ def test_default_graph_provide_config_split_names(graph: ProcessingGraph) -> Non
         graph.get_config_split_names_processing_steps(),
         ["config-split-names-from-streaming", "config-split-names-from-info"],
     )
+
+
+def test_default_graph_compress_content(graph: ProcessingGraph) -> None:
+    # only the content of the steps that provide names is not compressed
+    assert_lists_are_equal(
+        tuple(
+            processing_step
+            for processing_step in graph.get_processing_steps()
+            if not processing_step.compress_content
+        ),
+        [
+            "dataset-config-names",
+            "config-split-names-from-streaming",
+            "config-split-names-from-info",
+        ],
+    )
+
+
+def test_compress_content_can_be_disabled() -> None:
+    specification: ProcessingGraphSpecification = {
+        "step_a": {"input_type": "dataset"},
+        "step_b": {"input_type": "dataset", "compress_content": False},
+        "step_c": {"input_type": "dataset", "provides_dataset_config_names": True},
+    }
+    graph = ProcessingGraph(ProcessingGraphConfig(specification).specification)
+    assert graph.get_processing_step("step_a").compress_content
+    assert not graph.get_processing_step("step_b").compress_content
+    assert not graph.get_processing_step("step_c").compress_content
+
+
+def test_compress_content_of_names_is_not_allowed() -> None:
+    specification: ProcessingGraphSpecification = {
+        "step_a": {"input_type": "dataset", "provides_dataset_config_names": True, "compress_content": True},
+    }
+    with pytest.raises(ValueError):
+        ProcessingGraph(ProcessingGraphConfig(specification).specification)
+
+
+def test_graph_is_frozen() -> None:
+    a = "step_a"
+    b = "step_b"
+    c = "step_c"
+    specification: ProcessingGraphSpecification = {
+        a: {"input_type": "dataset", "job_runner_version": 1},
+        b: {"input_type": "dataset", "triggered_by": a, "job_runner_version": 1},
+        c: {"input_type": "dataset", "triggered_by": [a, b], "job_runner_version": 1},
+    }
+    graph = ProcessingGraph(ProcessingGraphConfig(specification).specification)
+
+    # the results are precomputed, and the processing steps are shared
+    assert graph.get_children(a) is graph.get_children(a)
+    assert graph.get_topologically_ordered_processing_steps() is graph.get_processing_steps(order="topological")
+    assert graph.get_children(a)[0] is graph.get_processing_step(b)
+    assert graph.get_parents(c)[0] is graph.get_processing_step(a)
+    # the ancestors and the descendants are ordered topologically
+    assert [step.name for step in graph.get_ancestors(c)] == [a, b]
+    assert [step.name for step in graph.get_descendants(a)] == [b, c]
+    # the processing steps are immutable
+    with pytest.raises(FrozenInstanceError):
+        graph.get_processing_step(a).job_runner_version = 2  # type: ignore
+    with pytest.raises(ProcessingStepDoesNotExist):
+        graph.get_processing_step("unknown")
+    with pytest.raises(ProcessingStepDoesNotExist):
+        graph.get_children("unknown")
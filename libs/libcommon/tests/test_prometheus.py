@@ -7,14 +7,16 @@ from typing import Dict, Optional
 
 import pytest
 
-from libcommon.metrics import CacheTotalMetric, JobTotalMetric
+from libcommon.metrics import BackfillProgressMetric, CacheTotalMetric, JobTotalMetric
 from libcommon.prometheus import (
     ASSETS_DISK_USAGE,
+    BACKFILL_PROGRESS_TOTAL,
     QUEUE_JOBS_TOTAL,
     RESPONSES_IN_CACHE_TOTAL,
     Prometheus,
     StepProfiler,
     update_assets_disk_usage,
+    update_backfill_progress_total,
     update_queue_jobs_total,
     update_responses_in_cache_total,
 )
@@ -205,6 +207,41 @@ def test_queue_metrics(metrics_mongo_resource: MetricsMongoResource) -> None:
     )
 
 
+def test_backfill_metrics(metrics_mongo_resource: MetricsMongoResource) -> None:
+    BACKFILL_PROGRESS_TOTAL.clear()
+
+    backfill_metric = {
+        "shard": 0,
+        "num_shards": 2,
+        "total_datasets": 10,
+        "analyzed_datasets": 4,
+        "backfilled_datasets": 1,
+        "created_jobs": 3,
+    }
+
+    collection = BackfillProgressMetric._get_collection()
+    collection.insert_one(backfill_metric)
+
+    metrics = get_metrics()
+    assert (
+        metrics.forge_metric_key(
+            name="backfill_progress_total",
+            content={"shard": "0/2", "type": "analyzed_datasets"},
+        )
+        not in metrics.metrics
+    )
+
+    update_backfill_progress_total()
+
+    metrics = get_metrics()
+    name = metrics.forge_metric_key(
+        name="backfill_progress_total",
+        content={"shard": "0/2", "type": "analyzed_datasets"},
+    )
+    assert name in metrics.metrics
+    assert metrics.metrics[name] == 4
+
+
 @pytest.mark.parametrize("usage_type", ["total", "used", "free", "percent"])
 def test_assets_metrics(usage_type: str, tmp_path: Path) -> None:
     ASSETS_DISK_USAGE.clear()
@@ -5,16 +5,32 @@ import os
 from datetime import datetime, timedelta
 from multiprocessing import Pool
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional
 from unittest.mock import patch
 
 import pytest
 import pytz
-
-from libcommon.constants import QUEUE_TTL_SECONDS
-from libcommon.queue import EmptyQueueError, Job, Lock, Queue, lock
+from mongoengine.context_managers import query_counter  # type: ignore
+from mongoengine.errors import NotUniqueError
+
+from libcommon.constants import QUEUE_MONGOENGINE_ALIAS, QUEUE_TTL_SECONDS
+from libcommon.queue import (
+    CANDIDATE_JOBS_BATCH_SIZE,
+    DatasetUpdate,
+    EmptyQueueError,
+    Job,
+    Lock,
+    Queue,
+    add_dataset_update,
+    claim_dataset_updates,
+    finish_dataset_update,
+    get_weighted_random_order,
+    lock,
+)
 from libcommon.resources import QueueMongoResource
-from libcommon.utils import Priority, Status, get_datetime
+from libcommon.utils import JobInfo, Priority, Status, get_datetime
+
+from .utils import PROCESSING_GRAPH, STEP_CONFIG_B, STEP_SPLIT_C
 
 
 def get_old_datetime() -> datetime:
@@ -34,8 +50,9 @@ def test__add_job() -> None:
     queue = Queue()
     # add a job
     queue._add_job(job_type=test_type, dataset=test_dataset, revision=test_revision)
-    # a second call adds a second waiting job
-    queue._add_job(job_type=test_type, dataset=test_dataset, revision=test_revision)
+    # a second call fails: only one waiting job is allowed for the same unicity_id (unique partial index)
+    with pytest.raises(NotUniqueError):
+        queue._add_job(job_type=test_type, dataset=test_dataset, revision=test_revision)
     assert queue.is_job_in_process(job_type=test_type, dataset=test_dataset, revision=test_revision)
     # get and start the first job
     job_info = queue.start_job()
@@ -46,7 +63,6 @@ def test__add_job() -> None:
     assert job_info["params"]["split"] is None
     assert queue.is_job_in_process(job_type=test_type, dataset=test_dataset, revision=test_revision)
     # adding the job while the first one has not finished yet adds another waiting job
-    # (there are no limits to the number of waiting jobs)
     queue._add_job(job_type=test_type, dataset=test_dataset, revision=test_revision)
     with pytest.raises(EmptyQueueError):
         # but: it's not possible to start two jobs with the same arguments
@@ -57,9 +73,6 @@ def test__add_job() -> None:
     assert queue.is_job_in_process(job_type=test_type, dataset=test_dataset, revision=test_revision)
     # process the second job
     job_info = queue.start_job()
-    queue.finish_job(job_id=job_info["job_id"], is_success=True)
-    # and the third one
-    job_info = queue.start_job()
     other_job_id = ("1" if job_info["job_id"][0] == "0" else "0") + job_info["job_id"][1:]
     # trying to finish another job fails silently (with a log)
     queue.finish_job(job_id=other_job_id, is_success=True)
@@ -80,12 +93,13 @@ def test_upsert_job() -> None:
     # get the queue
     queue = Queue()
     # upsert a job
-    queue.upsert_job(job_type=test_type, dataset=test_dataset, revision=test_revision_1)
-    # a second call creates a second waiting job, and the first one is cancelled
-    queue.upsert_job(job_type=test_type, dataset=test_dataset, revision=test_revision_1)
-    # a third call, with a different revision, creates a third waiting job, and the second one is cancelled
-    # because the unicity_id is the same
-    queue.upsert_job(job_type=test_type, dataset=test_dataset, revision=test_revision_2)
+    job = queue.upsert_job(job_type=test_type, dataset=test_dataset, revision=test_revision_1)
+    # a second call updates the waiting job, instead of creating a second one
+    assert queue.upsert_job(job_type=test_type, dataset=test_dataset, revision=test_revision_1).pk == job.pk
+    # a third call, with a different revision, updates the revision of the waiting job, because the unicity_id is
+    # the same
+    assert queue.upsert_job(job_type=test_type, dataset=test_dataset, revision=test_revision_2).pk == job.pk
+    assert Job.objects(dataset=test_dataset).count() == 1
     assert queue.is_job_in_process(job_type=test_type, dataset=test_dataset, revision=test_revision_2)
     # get and start the last job
     job_info = queue.start_job()
@@ -114,6 +128,59 @@ def test_upsert_job() -> None:
         queue.start_job()
 
 
+def test_upsert_jobs() -> None:
+    test_type = "test_type"
+    test_dataset = "test_dataset"
+    test_revision = "test_revision"
+    queue = Queue()
+    queue.upsert_job(job_type=test_type, dataset=test_dataset, revision=test_revision, config="config1")
+    queue.upsert_job(
+        job_type=test_type, dataset=test_dataset, revision=test_revision, config="config2", priority=Priority.LOW
+    )
+    job_infos: List[JobInfo] = [
+        {
+            "job_id": "not used",
+            "type": test_type,
+            "params": {"dataset": test_dataset, "revision": test_revision, "config": config, "split": None},
+            "priority": Priority.LOW,
+        }
+        for config in ["config1", "config2", "config3"]
+    ]
+    assert queue.upsert_jobs(job_infos=[]) == 0
+    assert queue.upsert_jobs(job_infos=job_infos) == 3
+    # the existing waiting jobs have been updated, not replaced
+    assert Job.objects(status=Status.CANCELLED).count() == 0
+    assert Job.objects(status=Status.WAITING).count() == 3
+    # the priority NORMAL has been kept: the priority is never lowered
+    assert Job.objects(status=Status.WAITING, config="config1").get().priority == Priority.NORMAL
+    assert Job.objects(status=Status.WAITING, config="config2").get().priority == Priority.LOW
+    assert Job.objects(status=Status.WAITING, config="config3").get().priority == Priority.LOW
+    # the priority is bumped to NORMAL if requested
+    job_infos[2]["priority"] = Priority.NORMAL
+    assert queue.upsert_jobs(job_infos=job_infos) == 3
+    assert Job.objects(status=Status.WAITING, config="config3").get().priority == Priority.NORMAL
+    # the same job can be upserted twice in the same call, only one waiting job is created
+    assert queue.upsert_jobs(job_infos=[job_infos[0], job_infos[0]]) == 2
+    assert Job.objects(status=Status.WAITING).count() == 3
+
+
+def test_create_jobs_deduplicates_waiting_jobs() -> None:
+    job_info: JobInfo = {
+        "job_id": "not used",
+        "type": "test_type",
+        "params": {"dataset": "test_dataset", "revision": "test_revision", "config": None, "split": None},
+        "priority": Priority.LOW,
+    }
+    queue = Queue()
+    assert queue.create_jobs([job_info] * 5) == 5
+    assert Job.objects(status=Status.WAITING).count() == 1
+    queue.start_job()
+    # a started job does not prevent to create a waiting job with the same unicity_id
+    assert queue.create_jobs([job_info] * 2) == 2
+    assert Job.objects(status=Status.WAITING).count() == 1
+    assert Job.objects(status=Status.STARTED).count() == 1
+
+
 @pytest.mark.parametrize(
     "statuses_to_cancel, expected_remaining_number",
     [
@@ -131,8 +198,8 @@ def test_cancel_jobs(statuses_to_cancel: Optional[List[Status]], expected_remain
     test_revision_2 = "test_revision_2"
     queue = Queue()
     queue._add_job(job_type=test_type, dataset=test_dataset, revision=test_revision_1)
-    queue._add_job(job_type=test_type, dataset=test_dataset, revision=test_revision_2)
     queue.start_job()
+    queue._add_job(job_type=test_type, dataset=test_dataset, revision=test_revision_2)
 
     canceled_job_dicts = queue.cancel_jobs(
         job_type=test_type, dataset=test_dataset, statuses_to_cancel=statuses_to_cancel
@@ -186,7 +253,7 @@ def test_cancel_jobs_by_job_id_wrong_format() -> None:
     assert queue.cancel_jobs_by_job_id(job_ids=["not_a_valid_job_id"]) == 0
 
 
-def check_job(queue: Queue, expected_dataset: str, expected_split: str, expected_priority: Priority) -> None:
+def check_job(queue: Queue, expected_dataset: str, expected_split: Optional[str], expected_priority: Priority) -> None:
     job_info = queue.start_job()
     assert job_info["params"]["dataset"] == expected_dataset
     assert job_info["params"]["split"] == expected_split
@@ -237,26 +304,154 @@ def test_priority_logic() -> None:
         split="split1",
         priority=Priority.LOW,
     )
+    check_job(queue=queue, expected_dataset="dataset1", expected_split="split1", expected_priority=Priority.NORMAL)
+    # ^ the last upsert_job call did not move its creation date: it's the oldest job
+    check_job(queue=queue, expected_dataset="dataset2", expected_split="split2", expected_priority=Priority.NORMAL)
+    check_job(queue=queue, expected_dataset="dataset3", expected_split="split1", expected_priority=Priority.NORMAL)
+    # ^ before the other "dataset3" jobs because its priority is higher (upsert_job never lowers the priority)
     check_job(
         queue=queue, expected_dataset="dataset1/dataset", expected_split="split1", expected_priority=Priority.NORMAL
     )
-    check_job(queue=queue, expected_dataset="dataset2", expected_split="split2", expected_priority=Priority.NORMAL)
-    check_job(queue=queue, expected_dataset="dataset3", expected_split="split1", expected_priority=Priority.NORMAL)
-    # ^ before the other "dataset3" jobs because its priority is higher (it inherited Priority.NORMAL in upsert_job)
+    # ^ same namespace as dataset1, goes after namespaces without any started job
     check_job(queue=queue, expected_dataset="dataset1", expected_split="split2", expected_priority=Priority.NORMAL)
-    # ^ same namespace as dataset1/dataset, goes after namespaces without any started job
-    check_job(queue=queue, expected_dataset="dataset1", expected_split="split1", expected_priority=Priority.NORMAL)
-    # ^ comes after the other "dataset1" jobs because the last upsert_job call moved its creation date
+    # ^ the namespace "dataset1" has now more started jobs than the others
+    check_job(queue=queue, expected_dataset="dataset2", expected_split="split1", expected_priority=Priority.LOW)
+    # ^ comes after the other "dataset2" jobs because its priority is lower
     check_job(
         queue=queue, expected_dataset="dataset2/dataset", expected_split="split1", expected_priority=Priority.LOW
     )
-    # ^ comes after the other "dataset2" jobs because its priority is lower
-    check_job(queue=queue, expected_dataset="dataset2", expected_split="split1", expected_priority=Priority.LOW)
     # ^ the rest of the rules apply for Priority.LOW jobs
     with pytest.raises(EmptyQueueError):
         queue.start_job()
 
 
+def test_priority_aging() -> None:
+    test_type = "test_type"
+    test_revision = "test_revision"
+    with patch("libcommon.queue.get_datetime", get_old_datetime):
+        Queue().upsert_job(
+            job_type=test_type, dataset="dataset1", revision=test_revision, split="split1", priority=Priority.LOW
+        )
+    Queue().upsert_job(job_type=test_type, dataset="dataset2", revision=test_revision, split="split1")
+    Queue().upsert_job(
+        job_type=test_type, dataset="dataset3", revision=test_revision, split="split1", priority=Priority.LOW
+    )
+    queue = Queue(priority_aging_seconds=3600)
+    check_job(queue=queue, expected_dataset="dataset1", expected_split="split1", expected_priority=Priority.LOW)
+    # ^ the LOW job has been waiting for more than one hour: it's considered as NORMAL, and it's the oldest one
+    check_job(queue=queue, expected_dataset="dataset2", expected_split="split1", expected_priority=Priority.NORMAL)
+    check_job(queue=queue, expected_dataset="dataset3", expected_split="split1", expected_priority=Priority.LOW)
+    with pytest.raises(EmptyQueueError):
+        queue.start_job()
+
+
+def test_weighted_fair_queuing() -> None:
+    test_revision = "test_revision"
+    queue = Queue()
+    queue.upsert_job(job_type="type_a", dataset="dataset1", revision=test_revision, priority=Priority.LOW)
+    queue.upsert_job(job_type="type_a", dataset="dataset2", revision=test_revision)
+    queue.upsert_job(job_type="type_b", dataset="dataset3", revision=test_revision)
+    # with the same random draw for all the classes, the order only depends on the weights
+    with patch("libcommon.queue.random.random", return_value=0.5):
+        queue = Queue(priority_weights={Priority.LOW: 4}, job_type_weights={"type_a": 2})
+        check_job(queue=queue, expected_dataset="dataset1", expected_split=None, expected_priority=Priority.LOW)
+        # ^ weight 8 for (LOW, type_a), vs 2 for (NORMAL, type_a) and 1 for (NORMAL, type_b)
+        check_job(queue=queue, expected_dataset="dataset2", expected_split=None, expected_priority=Priority.NORMAL)
+        check_job(queue=queue, expected_dataset="dataset3", expected_split=None, expected_priority=Priority.NORMAL)
+        with pytest.raises(EmptyQueueError):
+            queue.start_job()
+
+
+def test_get_weighted_job_classes() -> None:
+    test_revision = "test_revision"
+    queue = Queue()
+    queue.upsert_job(job_type="type_a", dataset="dataset1", revision=test_revision)
+    queue.upsert_job(job_type="type_b", dataset="dataset2", revision=test_revision, priority=Priority.LOW)
+    with patch("libcommon.queue.get_datetime", get_old_datetime):
+        queue.upsert_job(job_type="type_c", dataset="dataset3", revision=test_revision, priority=Priority.LOW)
+    queue = Queue(job_type_weights={"type_a": 2}, priority_aging_seconds=3600)
+    # only the non-empty classes are returned, and the old LOW job is considered as NORMAL
+    assert sorted(queue._get_weighted_job_classes(aging_limit=queue._get_aging_limit())) == [
+        (Priority.LOW, ["type_b"]),
+        (Priority.NORMAL, ["type_a"]),
+        (Priority.NORMAL, ["type_c"]),
+    ]
+    assert queue._get_weighted_job_classes(job_types_only=["type_d"]) == []
+
+
+def test_skip_jobs_with_pending_ancestors() -> None:
+    test_revision = "test_revision"
+    queue = Queue()
+    queue.upsert_job(
+        job_type=STEP_SPLIT_C, dataset="dataset", revision=test_revision, config="config1", split="split1"
+    )
+    queue.upsert_job(
+        job_type=STEP_SPLIT_C, dataset="dataset", revision=test_revision, config="config2", split="split1"
+    )
+    queue.upsert_job(job_type=STEP_CONFIG_B, dataset="dataset", revision=test_revision, config="config1")
+    queue = Queue(processing_graph=PROCESSING_GRAPH)
+    check_job(queue=queue, expected_dataset="dataset", expected_split="split1", expected_priority=Priority.NORMAL)
+    # ^ the split job for config2: the split job for config1 is blocked by the waiting config1 job (its parent)
+    job_info = queue.start_job()
+    assert job_info["type"] == STEP_CONFIG_B
+    with pytest.raises(EmptyQueueError):
+        queue.start_job()
+    # ^ the split job for config1 is still blocked, since its parent job is started
+    queue.finish_job(job_id=job_info["job_id"], is_success=True)
+    job_info = queue.start_job()
+    assert job_info["type"] == STEP_SPLIT_C
+    assert job_info["params"]["config"] == "config1"
+
+
+def test_skip_many_jobs_with_pending_ancestors() -> None:
+    test_revision = "test_revision"
+    queue = Queue()
+    queue.upsert_jobs(
+        [
+            {
+                "job_id": "not used",
+                "type": STEP_SPLIT_C,
+                "params": {"dataset": "dataset", "revision": test_revision, "config": "config1", "split": f"split{i}"},
+                "priority": Priority.NORMAL,
+            }
+            for i in range(10 * CANDIDATE_JOBS_BATCH_SIZE)
+        ]
+    )
+    queue.upsert_job(job_type=STEP_CONFIG_B, dataset="dataset", revision=test_revision, config="config1")
+    queue = Queue(processing_graph=PROCESSING_GRAPH)
+    # the blocked split jobs are skipped at once: the number of queries doesn't depend on their number
+    with query_counter(alias=QUEUE_MONGOENGINE_ALIAS) as counter:
+        job_info = queue.start_job()
+    assert job_info["type"] == STEP_CONFIG_B
+    assert counter <= 20
+    with query_counter(alias=QUEUE_MONGOENGINE_ALIAS) as counter:
+        with pytest.raises(EmptyQueueError):
+            queue.start_job()
+    assert counter <= 20
+
+
+def test_weighted_fair_queuing_invalid_weights() -> None:
+    with pytest.raises(ValueError):
+        Queue(priority_weights={Priority.LOW: 0})
+    with pytest.raises(ValueError):
+        Queue(job_type_weights={"type_a": -1})
+
+
+@pytest.mark.parametrize(
+    "weights,expected_first_key_ratio",
+    [
+        ({"a": 1.0, "b": 1.0}, 0.5),
+        ({"a": 3.0, "b": 1.0}, 0.75),
+        ({"a": 1.0, "b": 9.0}, 0.1),
+    ],
+)
+def test_get_weighted_random_order(weights: Dict[str, float], expected_first_key_ratio: float) -> None:
+    n = 10_000
+    first_keys = [get_weighted_random_order(weights)[0] for _ in range(n)]
+    assert sorted(get_weighted_random_order(weights)) == sorted(weights)
+    assert first_keys.count("a") / n == pytest.approx(expected_first_key_ratio, abs=0.03)
+
+
 @pytest.mark.parametrize(
     "job_type,job_types_blocked,job_types_only,should_raise",
     [
@@ -376,6 +571,61 @@ def test_queue_get_zombies() -> None:
     assert queue.get_zombies(max_seconds_without_heartbeat=9999999) == []
 
 
+def test_queue_heartbeat_not_started() -> None:
+    job_type = "test_type"
+    queue = Queue()
+    job = queue.upsert_job(job_type=job_type, dataset="dataset1", revision="revision", config="config", split="split1")
+    queue.heartbeat(job.pk)
+    job.reload()
+    assert job.last_heartbeat is None
+
+
+def test_queue_kill_zombies() -> None:
+    job_type = "test_type"
+    queue = Queue()
+    with patch("libcommon.queue.get_datetime", get_old_datetime):
+        zombie = queue.upsert_job(
+            job_type=job_type, dataset="dataset1", revision="revision", config="config", split="split1"
+        )
+        queue.start_job(job_types_only=[job_type])
+    another_job = queue.upsert_job(
+        job_type=job_type, dataset="dataset1", revision="revision", config="config", split="split2"
+    )
+    queue.start_job(job_types_only=[job_type])
+
+    assert queue.kill_zombies([]) == []
+    zombies = queue.get_zombies(max_seconds_without_heartbeat=10)
+    assert queue.kill_zombies(zombies) == [str(zombie.pk)]
+    zombie.reload()
+    another_job.reload()
+    assert zombie.status == Status.ERROR
+    assert zombie.finished_at is not None
+    assert another_job.status == Status.STARTED
+    # the zombie is not started anymore: it's ignored
+    assert queue.kill_zombies(zombies) == []
+    assert queue.get_zombies(max_seconds_without_heartbeat=10) == []
+
+
+def test_queue_kill_many_zombies() -> None:
+    job_type = "test_type"
+    queue = Queue()
+    with patch("libcommon.queue.get_datetime", get_old_datetime):
+        for split in ["split1", "split2", "split3"]:
+            queue.upsert_job(job_type=job_type, dataset="dataset", revision="revision", config="config", split=split)
+            queue.start_job(job_types_only=[job_type])
+    zombies = queue.get_zombies(max_seconds_without_heartbeat=10)
+    assert len(zombies) == 3
+    # a zombie finishes in the meantime: it's not killed
+    assert queue.finish_job(job_id=zombies[0]["job_id"], is_success=True)
+    # the zombies are killed at once, whatever their number
+    with query_counter(alias=QUEUE_MONGOENGINE_ALIAS) as counter:
+        killed_job_ids = queue.kill_zombies(zombies)
+    assert counter == 2
+    assert sorted(killed_job_ids) == sorted(zombie["job_id"] for zombie in zombies[1:])
+    assert Job.objects(status=Status.ERROR).count() == 2
+    assert Job.objects(status=Status.SUCCESS).count() == 1
+
+
 def test_has_ttl_index_on_finished_at_field() -> None:
     ttl_index_names = [
         name
@@ -413,3 +663,32 @@ def test_lock(tmp_path_factory: pytest.TempPathFactory, queue_mongo_resource: Qu
     with open(tmp_file, "r") as f:
         assert int(f.read()) == expected
     Lock.objects(key="test_lock").delete()
+
+
+def test_dataset_updates() -> None:
+    # two events for the same dataset are coalesced, and only the latest revision is kept
+    with patch("libcommon.queue.get_datetime", get_old_datetime):
+        add_dataset_update(dataset="dataset1", revision="revision1")
+        add_dataset_update(dataset="dataset1", revision="revision2")
+    add_dataset_update(dataset="dataset2", revision="revision1")
+    assert DatasetUpdate.objects().count() == 2
+
+    # only the settled update is claimed
+    updates = claim_dataset_updates(debounce_seconds=60, max_wait_seconds=3600, lock_seconds=600, limit=10)
+    assert [(update["dataset"], update["revision"], update["num_events"]) for update in updates] == [
+        ("dataset1", "revision2", 2)
+    ]
+    # a claimed update cannot be claimed again
+    other_updates = claim_dataset_updates(debounce_seconds=0, max_wait_seconds=3600, lock_seconds=600, limit=10)
+    assert [update["dataset"] for update in other_updates] == ["dataset2"]
+    assert finish_dataset_update(other_updates[0])
+
+    # a new event is received while the update is processed: the update stays locked until it's finished, and it's
+    # kept, to be processed again
+    add_dataset_update(dataset="dataset1", revision="revision3")
+    assert not claim_dataset_updates(debounce_seconds=0, max_wait_seconds=3600, lock_seconds=600, limit=10)
+    assert not finish_dataset_update(updates[0])
+    updates = claim_dataset_updates(debounce_seconds=0, max_wait_seconds=3600, lock_seconds=600, limit=10)
+    assert [(update["dataset"], update["revision"]) for update in updates] == [("dataset1", "revision3")]
+    assert finish_dataset_update(updates[0])
+    assert DatasetUpdate.objects().count() == 0
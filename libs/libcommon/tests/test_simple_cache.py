@@ -1,6 +1,7 @@
 # SPDX-License-Identifier: Apache-2.0
 # Copyright 2022 The HuggingFace Authors.
 
+import hashlib
 from datetime import datetime
 from http import HTTPStatus
 from time import process_time
@@ -11,6 +12,7 @@ from pymongo.errors import DocumentTooLarge
 
 from libcommon.resources import CacheMongoResource
 from libcommon.simple_cache import (
+    BestResponseKind,
     CachedArtifactError,
     CachedResponse,
     CacheReportsPage,
@@ -18,22 +20,31 @@ from libcommon.simple_cache import (
     DoesNotExist,
     InvalidCursor,
     InvalidLimit,
+    ValidDatasetsSnapshot,
+    compute_valid_datasets,
     delete_dataset_responses,
     delete_response,
     fetch_names,
     get_best_response,
+    get_best_response_kind,
+    get_cache_entries_df_and_names,
     get_cache_reports,
     get_cache_reports_with_content,
     get_dataset_responses_without_content_for_kind,
     get_outdated_split_full_names_for_step,
     get_response,
+    get_response_json,
+    get_response_metadata,
     get_response_with_details,
     get_response_without_content,
     get_responses_count_by_kind_status_and_error_code,
     get_valid_datasets,
+    get_valid_datasets_snapshot,
     get_validity_by_kind,
+    update_valid_datasets_snapshot,
     upsert_response,
 )
+from libcommon.utils import orjson_dumps
 
 from .utils import CONFIG_NAME_1, CONTENT_ERROR, DATASET_NAME
 
@@ -217,6 +228,22 @@ def test_big_row() -> None:
         )
 
 
+@pytest.mark.parametrize("compress_content", [False, True])
+def test_upsert_response_near_max_content_size(compress_content: bool) -> None:
+    # the workers accept a content of up to 10MB serialized to JSON (WORKER_CONTENT_MAX_BYTES): it must fit in a
+    # MongoDB document (16MB), so the content must not be stored more than once
+    kind = "test_kind"
+    dataset = "test_dataset"
+    content = {"rows": [{"row_idx": idx, "row": {"text": "a" * 1_000}} for idx in range(9_500)]}
+    content_json = orjson_dumps(content=content)
+    assert 9_000_000 < len(content_json) < 10_000_000
+    upsert_response(
+        kind=kind, dataset=dataset, content=content, http_status=HTTPStatus.OK, compress_content=compress_content
+    )
+    assert get_response(kind=kind, dataset=dataset)["content"] == content
+    assert get_response_json(kind=kind, dataset=dataset)["content_json"] == content_json
+
+
 def test_get_valid_dataset_names_empty() -> None:
     assert not get_valid_datasets(kind="test_kind")
 
@@ -267,6 +294,38 @@ def test_get_valid_dataset_names_only_invalid_responses() -> None:
     assert not get_valid_datasets(kind=kind)
 
 
+def test_update_valid_datasets_snapshot() -> None:
+    viewer_kind = "viewer_kind"
+    preview_kind = "preview_kind"
+    assert get_valid_datasets_snapshot() is None
+
+    upsert_response(kind=viewer_kind, dataset="dataset_a", content={}, http_status=HTTPStatus.OK)
+    upsert_response(kind=preview_kind, dataset="dataset_a", content={}, http_status=HTTPStatus.OK)
+    upsert_response(kind=preview_kind, dataset="dataset_b", content={}, http_status=HTTPStatus.OK)
+    expected_content = {"valid": ["dataset_a", "dataset_b"], "preview": ["dataset_b"], "viewer": ["dataset_a"]}
+    assert compute_valid_datasets(viewer_kinds=[viewer_kind], preview_kinds=[preview_kind]) == expected_content
+    assert update_valid_datasets_snapshot(viewer_kinds=[viewer_kind], preview_kinds=[preview_kind]) == expected_content
+
+    snapshot = get_valid_datasets_snapshot(max_age_seconds=60)
+    assert snapshot is not None
+    assert snapshot["content_json"] == orjson_dumps(expected_content)
+    assert snapshot["content_hash"] == hashlib.sha256(snapshot["content_json"]).hexdigest()
+
+    # the snapshot is replaced
+    upsert_response(kind=viewer_kind, dataset="dataset_b", content={}, http_status=HTTPStatus.OK)
+    update_valid_datasets_snapshot(viewer_kinds=[viewer_kind], preview_kinds=[preview_kind])
+    assert ValidDatasetsSnapshot.objects().count() == 1
+    snapshot = get_valid_datasets_snapshot()
+    assert snapshot is not None
+    assert snapshot["content_json"] == orjson_dumps(
+        {"valid": ["dataset_a", "dataset_b"], "preview": [], "viewer": ["dataset_a", "dataset_b"]}
+    )
+
+    # a too old snapshot is ignored
+    ValidDatasetsSnapshot.objects().update(updated_at=datetime(2023, 1, 1))
+    assert get_valid_datasets_snapshot(max_age_seconds=60) is None
+
+
 def test_get_validity_by_kind_empty() -> None:
     assert not get_validity_by_kind(dataset="dataset")
 
@@ -653,6 +712,8 @@ class EntrySpec(TypedDict):
         (["error1", "error2"], ["kind2", "kind1"], "dataset", None, "error2"),
         # - if no response is found, an error response is returned
         ([], ["kind1"], "dataset", None, "cache_miss"),
+        ([], ["kind1", "kind2"], "dataset", None, "cache_miss"),
+        (["error2"], ["kind1", "kind2"], "dataset", None, "cache_miss"),
         (["ok_config1"], ["kind1"], "dataset", None, "cache_miss"),
         (["ok1"], ["kind1"], "dataset", "config", "cache_miss"),
     ],
@@ -742,6 +803,65 @@ def test_get_best_response(
     assert best_response.response["progress"] == entries[best_entry]["progress"]
 
 
+def test_get_response_json() -> None:
+    kind = "test_kind"
+    dataset = "test_dataset"
+    with pytest.raises(DoesNotExist):
+        get_response_json(kind=kind, dataset=dataset)
+
+    upsert_response(kind=kind, dataset=dataset, content={"key": "value"}, http_status=HTTPStatus.OK)
+    response = get_response_json(kind=kind, dataset=dataset)
+    assert response["content_json"] == b'{"key":"value"}'
+    assert response["content_hash"] == hashlib.sha256(b'{"key":"value"}').hexdigest()
+    assert response["http_status"] == HTTPStatus.OK
+
+    # a response cached before the JSON was stored along with the content
+    CachedResponse.objects(kind=kind, dataset=dataset).update(unset__content_json=True, unset__content_hash=True)
+    assert get_response_json(kind=kind, dataset=dataset) == response
+
+
+def test_upsert_response_compress_content() -> None:
+    kind = "test_kind"
+    dataset = "test_dataset"
+    content = {"rows": [{"row_idx": idx, "row": {"text": "hello"}} for idx in range(100)]}
+    upsert_response(kind=kind, dataset=dataset, content=content, http_status=HTTPStatus.OK, compress_content=True)
+    cached_response = CachedResponse.objects(kind=kind, dataset=dataset).get()
+    assert not cached_response.content
+    assert cached_response.content_json is None
+    assert len(cached_response.content_compressed) < len(orjson_dumps(content=content))
+
+    assert get_response(kind=kind, dataset=dataset)["content"] == content
+    assert get_response_with_details(kind=kind, dataset=dataset)["content"] == content
+    assert get_best_response(kinds=[kind], dataset=dataset).response["content"] == content
+    assert (
+        get_cache_reports_with_content(kind=kind, cursor=None, limit=1)["cache_reports_with_content"][0]["content"]
+        == content
+    )
+    response = get_response_json(kind=kind, dataset=dataset)
+    assert response["content_json"] == orjson_dumps(content=content)
+    assert response["content_hash"] == hashlib.sha256(orjson_dumps(content=content)).hexdigest()
+
+    # the content is not compressed anymore if the response is cached again without compression
+    upsert_response(kind=kind, dataset=dataset, content=content, http_status=HTTPStatus.OK)
+    cached_response = CachedResponse.objects(kind=kind, dataset=dataset).get()
+    assert cached_response.content
+    assert cached_response.content_compressed is None
+    assert get_response_json(kind=kind, dataset=dataset) == response
+
+
+def test_get_best_response_kind() -> None:
+    dataset = "dataset"
+    assert get_best_response_kind(["kind1", "kind2"], dataset) == BestResponseKind(kind="kind1", updated_at=None)
+
+    upsert_response(kind="kind1", dataset=dataset, http_status=HTTPStatus.INTERNAL_SERVER_ERROR, content={})
+    upsert_response(kind="kind2", dataset=dataset, http_status=HTTPStatus.OK, content={})
+    best_response_kind = get_best_response_kind(["kind1", "kind2"], dataset)
+    assert best_response_kind.kind == "kind2"
+    assert best_response_kind.updated_at == get_response_metadata(kind="kind2", dataset=dataset)["updated_at"]
+    assert best_response_kind.http_status == HTTPStatus.OK
+    assert best_response_kind.content_hash == get_response_json(kind="kind2", dataset=dataset)["content_hash"]
+
+
 def test_cached_artifact_error() -> None:
     dataset = "dataset"
     config = "config"
@@ -818,19 +938,19 @@ NAMES_RESPONSE_OK = ResponseSpec(
 RESPONSE_ERROR = ResponseSpec(content=CONTENT_ERROR, http_status=HTTPStatus.INTERNAL_SERVER_ERROR)
 
 
-@pytest.mark.parametrize(
-    "cache_kinds,response_spec_by_kind,expected_names",
-    [
-        ([], {}, []),
-        ([CACHE_KIND_A], {}, []),
-        ([CACHE_KIND_A], {CACHE_KIND_A: RESPONSE_ERROR}, []),
-        ([CACHE_KIND_A], {CACHE_KIND_A: NAMES_RESPONSE_OK}, NAMES),
-        ([CACHE_KIND_A, CACHE_KIND_B], {CACHE_KIND_A: NAMES_RESPONSE_OK}, NAMES),
-        ([CACHE_KIND_A, CACHE_KIND_B], {CACHE_KIND_A: NAMES_RESPONSE_OK, CACHE_KIND_B: RESPONSE_ERROR}, NAMES),
-        ([CACHE_KIND_A, CACHE_KIND_B], {CACHE_KIND_A: NAMES_RESPONSE_OK, CACHE_KIND_B: NAMES_RESPONSE_OK}, NAMES),
-        ([CACHE_KIND_A, CACHE_KIND_B], {CACHE_KIND_A: RESPONSE_ERROR, CACHE_KIND_B: RESPONSE_ERROR}, []),
-    ],
-)
+FETCH_NAMES_CASES = [
+    ([], {}, []),
+    ([CACHE_KIND_A], {}, []),
+    ([CACHE_KIND_A], {CACHE_KIND_A: RESPONSE_ERROR}, []),
+    ([CACHE_KIND_A], {CACHE_KIND_A: NAMES_RESPONSE_OK}, NAMES),
+    ([CACHE_KIND_A, CACHE_KIND_B], {CACHE_KIND_A: NAMES_RESPONSE_OK}, NAMES),
+    ([CACHE_KIND_A, CACHE_KIND_B], {CACHE_KIND_A: NAMES_RESPONSE_OK, CACHE_KIND_B: RESPONSE_ERROR}, NAMES),
+    ([CACHE_KIND_A, CACHE_KIND_B], {CACHE_KIND_A: NAMES_RESPONSE_OK, CACHE_KIND_B: NAMES_RESPONSE_OK}, NAMES),
+    ([CACHE_KIND_A, CACHE_KIND_B], {CACHE_KIND_A: RESPONSE_ERROR, CACHE_KIND_B: RESPONSE_ERROR}, []),
+]
+
+
+@pytest.mark.parametrize("cache_kinds,response_spec_by_kind,expected_names", FETCH_NAMES_CASES)
 def test_fetch_names(
     cache_kinds: List[str],
     response_spec_by_kind: Mapping[str, Mapping[str, Any]],
@@ -855,3 +975,51 @@ def test_fetch_names(
         )
         == expected_names
     )
+
+
+@pytest.mark.parametrize("cache_kinds,response_spec_by_kind,expected_names", FETCH_NAMES_CASES)
+def test_get_cache_entries_df_and_names(
+    cache_kinds: List[str],
+    response_spec_by_kind: Mapping[str, Mapping[str, Any]],
+    expected_names: List[str],
+) -> None:
+    split_names_content = {
+        "splits": [{"dataset": DATASET_NAME, "config": CONFIG_NAME_1, "split": name} for name in NAMES]
+    }
+    config_names_content = {"config_names": [{"dataset": DATASET_NAME, "config": name} for name in NAMES]}
+    for kind, response_spec in response_spec_by_kind.items():
+        is_ok = response_spec["http_status"] == HTTPStatus.OK
+        # the same kind provides the config names (at dataset level) and the split names (at config level)
+        upsert_response(
+            kind=kind,
+            dataset=DATASET_NAME,
+            config=None,
+            split=None,
+            content=config_names_content if is_ok else response_spec["content"],
+            http_status=response_spec["http_status"],
+        )
+        upsert_response(
+            kind=kind,
+            dataset=DATASET_NAME,
+            config=CONFIG_NAME_1,
+            split=None,
+            content=split_names_content if is_ok else response_spec["content"],
+            http_status=response_spec["http_status"],
+        )
+    upsert_response(
+        kind="other_kind", dataset=DATASET_NAME, config=None, split=None, content={}, http_status=HTTPStatus.OK
+    )
+
+    cache_entries_df, dataset_names = get_cache_entries_df_and_names(
+        dataset=DATASET_NAME, config_names_kinds=cache_kinds, split_names_kinds=cache_kinds
+    )
+    assert dataset_names.config_names == expected_names
+    assert dataset_names.split_names_by_config.get(CONFIG_NAME_1, []) == expected_names
+    assert len(cache_entries_df) == 2 * len(response_spec_by_kind) + 1
+
+    # the cache entries can be filtered, but the names are always fetched
+    cache_entries_df, dataset_names = get_cache_entries_df_and_names(
+        dataset=DATASET_NAME, config_names_kinds=cache_kinds, split_names_kinds=cache_kinds, cache_kinds=["other_kind"]
+    )
+    assert dataset_names.config_names == expected_names
+    assert cache_entries_df["kind"].tolist() == ["other_kind"]
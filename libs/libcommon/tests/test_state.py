@@ -1,8 +1,9 @@
 # SPDX-License-Identifier: Apache-2.0
 # Copyright 2023 The HuggingFace Authors.
 
+from datetime import datetime
 from http import HTTPStatus
-from typing import Optional
+from typing import List, Optional
 
 import pytest
 
@@ -15,15 +16,21 @@ from libcommon.simple_cache import (
 )
 from libcommon.state import (
     ArtifactState,
+    CacheEntry,
     CacheState,
     ConfigState,
     DatasetState,
+    JobState,
     SplitState,
+    get_cache_entries_index,
+    get_pending_jobs_index,
 )
+from libcommon.utils import FlatJobInfo, Priority, Status
 
 from .utils import (
     CACHE_KIND,
     CONFIG_NAME_1,
+    CONFIG_NAME_2,
     CONFIG_NAMES,
     CONFIG_NAMES_CONTENT,
     DATASET_NAME,
@@ -46,6 +53,10 @@ def cache_mongo_resource_autouse(cache_mongo_resource: CacheMongoResource) -> Ca
     return cache_mongo_resource
 
 
+def get_cache_entries(dataset: str, config: Optional[str], split: Optional[str], cache_kind: str) -> List[CacheEntry]:
+    return get_cache_entries_index(get_cache_entries_df(dataset=dataset)).get((cache_kind, config, split), [])
+
+
 @pytest.mark.parametrize(
     "dataset,config,split,cache_kind",
     [
@@ -60,7 +71,7 @@ def test_cache_state_exists(dataset: str, config: Optional[str], split: Optional
         config=config,
         split=split,
         cache_kind=cache_kind,
-        cache_entries_df=get_cache_entries_df(dataset=dataset),
+        cache_entries=get_cache_entries(dataset=dataset, config=config, split=split, cache_kind=cache_kind),
         job_runner_version=JOB_RUNNER_VERSION,
     ).exists
     upsert_response(
@@ -71,7 +82,7 @@ def test_cache_state_exists(dataset: str, config: Optional[str], split: Optional
         config=config,
         split=split,
         cache_kind=cache_kind,
-        cache_entries_df=get_cache_entries_df(dataset=dataset),
+        cache_entries=get_cache_entries(dataset=dataset, config=config, split=split, cache_kind=cache_kind),
         job_runner_version=JOB_RUNNER_VERSION,
     ).exists
     delete_response(kind=cache_kind, dataset=dataset, config=config, split=split)
@@ -80,7 +91,7 @@ def test_cache_state_exists(dataset: str, config: Optional[str], split: Optional
         config=config,
         split=split,
         cache_kind=cache_kind,
-        cache_entries_df=get_cache_entries_df(dataset=dataset),
+        cache_entries=get_cache_entries(dataset=dataset, config=config, split=split, cache_kind=cache_kind),
         job_runner_version=JOB_RUNNER_VERSION,
     ).exists
 
@@ -99,7 +110,7 @@ def test_cache_state_is_success(dataset: str, config: Optional[str], split: Opti
         config=config,
         split=split,
         cache_kind=cache_kind,
-        cache_entries_df=get_cache_entries_df(dataset=dataset),
+        cache_entries=get_cache_entries(dataset=dataset, config=config, split=split, cache_kind=cache_kind),
         job_runner_version=JOB_RUNNER_VERSION,
     ).is_success
     upsert_response(
@@ -110,7 +121,7 @@ def test_cache_state_is_success(dataset: str, config: Optional[str], split: Opti
         config=config,
         split=split,
         cache_kind=cache_kind,
-        cache_entries_df=get_cache_entries_df(dataset=dataset),
+        cache_entries=get_cache_entries(dataset=dataset, config=config, split=split, cache_kind=cache_kind),
         job_runner_version=JOB_RUNNER_VERSION,
     ).is_success
     upsert_response(
@@ -126,7 +137,7 @@ def test_cache_state_is_success(dataset: str, config: Optional[str], split: Opti
         config=config,
         split=split,
         cache_kind=cache_kind,
-        cache_entries_df=get_cache_entries_df(dataset=dataset),
+        cache_entries=get_cache_entries(dataset=dataset, config=config, split=split, cache_kind=cache_kind),
         job_runner_version=JOB_RUNNER_VERSION,
     ).is_success
     delete_response(kind=cache_kind, dataset=dataset, config=config, split=split)
@@ -135,7 +146,7 @@ def test_cache_state_is_success(dataset: str, config: Optional[str], split: Opti
         config=config,
         split=split,
         cache_kind=cache_kind,
-        cache_entries_df=get_cache_entries_df(dataset=dataset),
+        cache_entries=get_cache_entries(dataset=dataset, config=config, split=split, cache_kind=cache_kind),
         job_runner_version=JOB_RUNNER_VERSION,
     ).is_success
 
@@ -153,8 +164,8 @@ def test_artifact_state() -> None:
         config=config,
         split=split,
         processing_step=processing_step,
-        pending_jobs_df=Queue().get_pending_jobs_df(dataset=dataset),
-        cache_entries_df=get_cache_entries_df(dataset=dataset),
+        pending_jobs=[],
+        cache_entries=[],
     )
     assert artifact_state.id == f"{processing_step_name},{dataset},{revision}"
     assert not artifact_state.cache_state.exists
@@ -174,8 +185,8 @@ def test_split_state() -> None:
         config=config,
         split=split,
         processing_graph=PROCESSING_GRAPH,
-        pending_jobs_df=Queue()._get_df(jobs=[]),
-        cache_entries_df=get_cache_entries_df(dataset=dataset),
+        pending_jobs_index={},
+        cache_entries_index=get_cache_entries_index(get_cache_entries_df(dataset=dataset)),
     )
 
     assert split_state.dataset == dataset
@@ -212,8 +223,8 @@ def test_config_state_as_dict() -> None:
         revision=revision,
         config=config,
         processing_graph=PROCESSING_GRAPH,
-        pending_jobs_df=Queue()._get_df(jobs=[]),
-        cache_entries_df=get_cache_entries_df(dataset=dataset),
+        pending_jobs_index={},
+        cache_entries_index=get_cache_entries_index(get_cache_entries_df(dataset=dataset)),
     )
 
     assert config_state.dataset == dataset
@@ -280,3 +291,50 @@ def test_dataset_state_as_dict() -> None:
     assert len(dataset_state.config_states) == len(CONFIG_NAMES)
     assert dataset_state.config_states[0].config == CONFIG_NAMES[0]
     assert dataset_state.config_states[1].config == CONFIG_NAMES[1]
+
+
+def get_flat_job_info(
+    job_id: str, revision: str, config: Optional[str], priority: Priority, status: Status, created_at: datetime
+) -> FlatJobInfo:
+    return {
+        "job_id": job_id,
+        "type": "config-b",
+        "dataset": DATASET_NAME,
+        "revision": revision,
+        "config": config,
+        "split": None,
+        "priority": priority.value,
+        "status": status.value,
+        "created_at": created_at,
+    }
+
+
+def test_pending_jobs_index_and_job_state() -> None:
+    pending_jobs_df = Queue()._get_df(
+        jobs=[
+            get_flat_job_info("a", REVISION_NAME, CONFIG_NAME_1, Priority.LOW, Status.WAITING, datetime(2023, 1, 1)),
+            get_flat_job_info(
+                "b", REVISION_NAME, CONFIG_NAME_1, Priority.NORMAL, Status.WAITING, datetime(2023, 1, 2)
+            ),
+            get_flat_job_info("c", REVISION_NAME, CONFIG_NAME_1, Priority.LOW, Status.STARTED, datetime(2023, 1, 3)),
+            get_flat_job_info("d", REVISION_NAME, CONFIG_NAME_2, Priority.LOW, Status.WAITING, datetime(2023, 1, 1)),
+            get_flat_job_info("e", "other", CONFIG_NAME_2, Priority.NORMAL, Status.STARTED, datetime(2023, 1, 1)),
+        ]
+    )
+    pending_jobs_index = get_pending_jobs_index(pending_jobs_df=pending_jobs_df, revision=REVISION_NAME)
+    assert sorted(pending_jobs_index) == [("config-b", CONFIG_NAME_1, None), ("config-b", CONFIG_NAME_2, None)]
+    # ^ the job for the other revision is ignored
+    assert [job.job_id for job in pending_jobs_index[("config-b", CONFIG_NAME_1, None)]] == ["a", "b", "c"]
+
+    job_state = JobState(
+        dataset=DATASET_NAME,
+        revision=REVISION_NAME,
+        config=CONFIG_NAME_1,
+        split=None,
+        job_type="config-b",
+        pending_jobs=pending_jobs_index[("config-b", CONFIG_NAME_1, None)],
+    )
+    assert job_state.is_in_process
+    assert job_state.valid_pending_job is not None
+    assert job_state.valid_pending_job.job_id == "c"
+    # ^ the started job is preferred, then the normal priority, then the oldest job
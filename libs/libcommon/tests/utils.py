@@ -209,12 +209,16 @@ def get_dataset_backfill_plan(
     dataset: str = DATASET_NAME,
     revision: str = REVISION_NAME,
     error_codes_to_retry: Optional[List[str]] = None,
+    processing_step_name: Optional[str] = None,
+    config: Optional[str] = None,
 ) -> DatasetBackfillPlan:
     return DatasetBackfillPlan(
         dataset=dataset,
         revision=revision,
         processing_graph=processing_graph,
         error_codes_to_retry=error_codes_to_retry,
+        processing_step_name=processing_step_name,
+        config=config,
     )
 
 
@@ -2,6 +2,7 @@
 # Copyright 2022 The HuggingFace Authors.
 
 import uvicorn
+from libcommon.http_client import init_http_client
 from libcommon.log import init_logging
 from libcommon.processing_graph import ProcessingGraph
 from libcommon.resources import (
@@ -38,6 +39,8 @@ def create_app() -> Starlette:
 
     init_logging(level=app_config.log.level)
     # ^ set first to have logs as soon as possible
+    init_http_client(config=app_config.http_client)
+    # ^ the outbound requests (including huggingface_hub ones) share one pool of connections
     assets_directory = init_assets_dir(directory=app_config.assets.storage_directory)
     if not exists(assets_directory):
         raise RuntimeError("The assets storage directory could not be accessed. Exiting.")
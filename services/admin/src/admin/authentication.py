@@ -3,7 +3,7 @@
 
 from typing import Literal, Optional
 
-import requests
+from libcommon.http_client import get_http_session
 from requests import PreparedRequest
 from requests.auth import AuthBase
 from starlette.requests import Request
@@ -51,7 +51,7 @@ def auth_check(
     if organization is None or external_auth_url is None:
         return True
     try:
-        response = requests.get(external_auth_url, auth=RequestAuth(request), timeout=hf_timeout_seconds)
+        response = get_http_session().get(external_auth_url, auth=RequestAuth(request), timeout=hf_timeout_seconds)
     except Exception as err:
         raise RuntimeError("External authentication check failed", err) from err
     if response.status_code == 200:
@@ -9,6 +9,7 @@ from libcommon.config import (
     AssetsConfig,
     CacheConfig,
     CommonConfig,
+    HttpClientConfig,
     LogConfig,
     MetricsConfig,
     ProcessingGraphConfig,
@@ -83,6 +84,7 @@ class AppConfig:
     assets: AssetsConfig = field(default_factory=AssetsConfig)
     cache: CacheConfig = field(default_factory=CacheConfig)
     common: CommonConfig = field(default_factory=CommonConfig)
+    http_client: HttpClientConfig = field(default_factory=HttpClientConfig)
     log: LogConfig = field(default_factory=LogConfig)
     processing_graph: ProcessingGraphConfig = field(default_factory=ProcessingGraphConfig)
     queue: QueueConfig = field(default_factory=QueueConfig)
@@ -95,6 +97,7 @@ class AppConfig:
             common=common_config,
             assets=AssetsConfig.from_env(),
             cache=CacheConfig.from_env(),
+            http_client=HttpClientConfig.from_env(),
             log=LogConfig.from_env(),
             processing_graph=ProcessingGraphConfig.from_env(),
             queue=QueueConfig.from_env(),
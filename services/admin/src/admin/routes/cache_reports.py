@@ -5,6 +5,7 @@ import logging
 from typing import Optional
 
 from libcommon.simple_cache import InvalidCursor, InvalidLimit, get_cache_reports
+from starlette.concurrency import run_in_threadpool
 from starlette.requests import Request
 from starlette.responses import Response
 
@@ -32,7 +33,8 @@ def create_cache_reports_endpoint(
             cursor = request.query_params.get("cursor") or ""
             logging.info(f"Cache reports for {cache_kind}, cursor={cursor}")
             # if auth_check fails, it will raise an exception that will be caught below
-            auth_check(
+            await run_in_threadpool(
+                auth_check,
                 external_auth_url=external_auth_url,
                 request=request,
                 organization=organization,
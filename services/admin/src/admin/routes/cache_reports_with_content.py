@@ -9,6 +9,7 @@ from libcommon.simple_cache import (
     InvalidLimit,
     get_cache_reports_with_content,
 )
+from starlette.concurrency import run_in_threadpool
 from starlette.requests import Request
 from starlette.responses import Response
 
@@ -36,7 +37,8 @@ def create_cache_reports_with_content_endpoint(
             cursor = request.query_params.get("cursor") or ""
             logging.info(f"Cache reports with content for {cache_kind}, cursor={cursor}")
             # if auth_check fails, it will raise an exception that will be caught below
-            auth_check(
+            await run_in_threadpool(
+                auth_check,
                 external_auth_url=external_auth_url,
                 request=request,
                 organization=organization,
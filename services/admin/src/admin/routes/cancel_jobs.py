@@ -5,6 +5,7 @@ import logging
 from typing import Optional
 
 from libcommon.queue import Queue
+from starlette.concurrency import run_in_threadpool
 from starlette.requests import Request
 from starlette.responses import Response
 
@@ -29,7 +30,8 @@ def create_cancel_jobs_endpoint(
             logging.info(f"/cancel-jobs/{job_type}")
 
             # if auth_check fails, it will raise an exception that will be caught below
-            auth_check(
+            await run_in_threadpool(
+                auth_check,
                 external_auth_url=external_auth_url,
                 request=request,
                 organization=organization,
@@ -7,14 +7,16 @@ from typing import Optional
 from libcommon.dataset import get_dataset_git_revision
 from libcommon.exceptions import CustomError
 from libcommon.orchestrator import DatasetOrchestrator
-from libcommon.processing_graph import ProcessingGraph
+from libcommon.processing_graph import ProcessingGraph, ProcessingStepDoesNotExist
 from libcommon.utils import Priority
+from starlette.concurrency import run_in_threadpool
 from starlette.requests import Request
 from starlette.responses import Response
 
 from admin.authentication import auth_check
 from admin.utils import (
     Endpoint,
+    InvalidParameterError,
     MissingRequiredParameterError,
     UnexpectedError,
     are_valid_parameters,
@@ -36,21 +38,43 @@ def create_dataset_backfill_endpoint(
             dataset = request.query_params.get("dataset")
             if not are_valid_parameters([dataset]) or not dataset:
                 raise MissingRequiredParameterError("Parameter 'dataset' is required")
-            logging.info(f"/dataset-backfill, dataset={dataset}")
+            # optional: only backfill a processing step and its descendants, and, optionally, for one config
+            processing_step_name = request.query_params.get("processing_step")
+            config = request.query_params.get("config")
+            if processing_step_name is not None:
+                try:
+                    processing_graph.get_processing_step(processing_step_name)
+                except ProcessingStepDoesNotExist as e:
+                    raise InvalidParameterError(f"Processing step '{processing_step_name}' does not exist") from e
+            elif config is not None:
+                raise InvalidParameterError("Parameter 'config' requires the parameter 'processing_step'")
+            logging.info(
+                f"/dataset-backfill, dataset={dataset}, processing_step={processing_step_name}, config={config}"
+            )
 
             # if auth_check fails, it will raise an exception that will be caught below
-            auth_check(
+            await run_in_threadpool(
+                auth_check,
                 external_auth_url=external_auth_url,
                 request=request,
                 organization=organization,
                 hf_timeout_seconds=hf_timeout_seconds,
             )
 
-            dataset_git_revision = get_dataset_git_revision(
-                dataset=dataset, hf_endpoint=hf_endpoint, hf_token=hf_token, hf_timeout_seconds=hf_timeout_seconds
+            dataset_git_revision = await run_in_threadpool(
+                get_dataset_git_revision,
+                dataset=dataset,
+                hf_endpoint=hf_endpoint,
+                hf_token=hf_token,
+                hf_timeout_seconds=hf_timeout_seconds,
             )
             dataset_orchestrator = DatasetOrchestrator(dataset=dataset, processing_graph=processing_graph)
-            dataset_orchestrator.backfill(revision=dataset_git_revision, priority=Priority.NORMAL)
+            dataset_orchestrator.backfill(
+                revision=dataset_git_revision,
+                priority=Priority.NORMAL,
+                processing_step_name=processing_step_name,
+                config=config,
+            )
             return get_json_ok_response(
                 {"status": "ok", "message": "Backfilling dataset."},
                 max_age=0,
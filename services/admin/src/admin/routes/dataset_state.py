@@ -7,6 +7,7 @@ from typing import Optional
 from libcommon.dataset import get_dataset_git_revision
 from libcommon.orchestrator import DatasetBackfillPlan
 from libcommon.processing_graph import ProcessingGraph
+from starlette.concurrency import run_in_threadpool
 from starlette.requests import Request
 from starlette.responses import Response
 
@@ -39,15 +40,20 @@ def create_dataset_backfill_plan_endpoint(
             logging.info(f"/dataset-backfill-plan, dataset={dataset}")
 
             # if auth_check fails, it will raise an exception that will be caught below
-            auth_check(
+            await run_in_threadpool(
+                auth_check,
                 external_auth_url=external_auth_url,
                 request=request,
                 organization=organization,
                 hf_timeout_seconds=hf_timeout_seconds,
             )
 
-            dataset_git_revision = get_dataset_git_revision(
-                dataset=dataset, hf_endpoint=hf_endpoint, hf_token=hf_token, hf_timeout_seconds=hf_timeout_seconds
+            dataset_git_revision = await run_in_threadpool(
+                get_dataset_git_revision,
+                dataset=dataset,
+                hf_endpoint=hf_endpoint,
+                hf_token=hf_token,
+                hf_timeout_seconds=hf_timeout_seconds,
             )
             dataset_backfill_plan = DatasetBackfillPlan(
                 dataset=dataset,
@@ -8,6 +8,7 @@ from libcommon.dataset import get_dataset_git_revision
 from libcommon.exceptions import CustomError
 from libcommon.processing_graph import InputType
 from libcommon.queue import Queue
+from starlette.concurrency import run_in_threadpool
 from starlette.requests import Request
 from starlette.responses import Response
 
@@ -52,13 +53,16 @@ def create_force_refresh_endpoint(
             logging.info(f"/force-refresh/{job_type}, dataset={dataset}, config={config}, split={split}")
 
             # if auth_check fails, it will raise an exception that will be caught below
-            auth_check(
+            await run_in_threadpool(
+                auth_check,
                 external_auth_url=external_auth_url,
                 request=request,
                 organization=organization,
                 hf_timeout_seconds=hf_timeout_seconds,
             )
-            revision = get_dataset_git_revision(dataset=dataset, hf_endpoint=hf_endpoint, hf_token=hf_token)
+            revision = await run_in_threadpool(
+                get_dataset_git_revision, dataset=dataset, hf_endpoint=hf_endpoint, hf_token=hf_token
+            )
             Queue().upsert_job(job_type=job_type, dataset=dataset, revision=revision, config=config, split=split)
             return get_json_ok_response(
                 {"status": "ok"},
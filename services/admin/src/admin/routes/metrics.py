@@ -6,6 +6,7 @@ import logging
 from libcommon.prometheus import (
     Prometheus,
     update_assets_disk_usage,
+    update_backfill_progress_total,
     update_queue_jobs_total,
     update_responses_in_cache_total,
 )
@@ -24,6 +25,7 @@ def create_metrics_endpoint(assets_directory: StrPath) -> Endpoint:
         logging.info("/metrics")
         update_queue_jobs_total()
         update_responses_in_cache_total()
+        update_backfill_progress_total()
         update_assets_disk_usage(assets_directory=assets_directory)
         return Response(prometheus.getLatestContent(), headers={"Content-Type": CONTENT_TYPE_LATEST})
 
@@ -6,6 +6,7 @@ from typing import Optional
 
 from libcommon.processing_graph import ProcessingGraph
 from libcommon.queue import Queue
+from starlette.concurrency import run_in_threadpool
 from starlette.requests import Request
 from starlette.responses import Response
 
@@ -30,7 +31,8 @@ def create_pending_jobs_endpoint(
         logging.info("/pending-jobs")
         try:
             # if auth_check fails, it will raise an exception that will be caught below
-            auth_check(
+            await run_in_threadpool(
+                auth_check,
                 external_auth_url=external_auth_url,
                 request=request,
                 organization=organization,
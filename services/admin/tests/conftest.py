@@ -3,6 +3,7 @@
 
 from typing import Iterator
 
+from libcommon.http_client import init_http_client
 from libcommon.metrics import _clean_metrics_database
 from libcommon.processing_graph import ProcessingGraph
 from libcommon.queue import _clean_queue_database
@@ -53,6 +54,12 @@ def assets_directory(app_config: AppConfig) -> StrPath:
     return init_assets_dir(directory=app_config.assets.storage_directory)
 
 
+@fixture(autouse=True)
+def http_client(app_config: AppConfig) -> None:
+    # the circuit breakers must not be shared between the tests
+    init_http_client(config=app_config.http_client)
+
+
 @fixture(autouse=True)
 def cache_mongo_resource(app_config: AppConfig) -> Iterator[CacheMongoResource]:
     with CacheMongoResource(database=app_config.cache.mongo_database, host=app_config.cache.mongo_url) as resource:
@@ -1,7 +1,7 @@
 # SPDX-License-Identifier: Apache-2.0
 # Copyright 2022 The HuggingFace Authors.
 
-from typing import Optional
+from typing import Dict, Optional
 
 import pytest
 from libcommon.processing_graph import ProcessingGraph
@@ -82,6 +82,19 @@ def test_dataset_status(client: TestClient, processing_graph: ProcessingGraph) -
         assert not json[processing_step.job_type]["jobs"]
 
 
+@pytest.mark.parametrize(
+    "params",
+    [
+        {},
+        {"dataset": "test-dataset", "processing_step": "does-not-exist"},
+        {"dataset": "test-dataset", "config": "config"},
+    ],
+)
+def test_dataset_backfill_invalid_parameters(client: TestClient, params: Dict[str, str]) -> None:
+    response = client.request("post", "/dataset-backfill", params=params)
+    assert response.status_code == 422
+
+
 @pytest.mark.parametrize(
     "cursor,http_status,error_code",
     [
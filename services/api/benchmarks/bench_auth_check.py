@@ -0,0 +1,102 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2023 The HuggingFace Authors.
+
+"""Benchmark the authentication hot path for the requests that carry a JWT in the X-Api-Key header.
+
+A client reuses the same short-lived JWT for many consecutive requests. Two situations are compared, with the
+algorithm used by the Hub (EdDSA) and with RS256:
+- uncached: the cache of the verified JWT is cleared before every call, so that the signature is verified every time
+  (the previous behavior).
+- cached: the signature is verified on the first call, then the claims are read from the cache.
+
+No database and no network access are required: the JWT bypasses the external authentication service.
+
+Usage:
+    poetry run python benchmarks/bench_auth_check.py [--calls 10000]
+"""
+
+import argparse
+import time
+from typing import Callable, Tuple, Union
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+from starlette.datastructures import Headers
+from starlette.requests import Request
+
+from api.authentication import auth_check
+from api.jwt_token import VERIFIED_JWT_CACHE
+
+DATASET = "user/dataset"
+EXTERNAL_AUTH_URL = "https://auth.check/%s"
+
+
+def get_keys(algorithm: str) -> Tuple[Union[ed25519.Ed25519PrivateKey, rsa.RSAPrivateKey], str]:
+    private_key: Union[ed25519.Ed25519PrivateKey, rsa.RSAPrivateKey] = (
+        ed25519.Ed25519PrivateKey.generate()
+        if algorithm == "EdDSA"
+        else rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    )
+    public_key = (
+        private_key.public_key()
+        .public_bytes(encoding=serialization.Encoding.PEM, format=serialization.PublicFormat.SubjectPublicKeyInfo)
+        .decode("utf-8")
+    )
+    return private_key, public_key
+
+
+def create_request(token: str) -> Request:
+    return Request(
+        {
+            "type": "http",
+            "path": "/rows",
+            "headers": Headers({"X-Api-Key": token}).raw,
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "https",
+            "client": ("127.0.0.1", 8080),
+            "server": ("some.server", 443),
+        }
+    )
+
+
+def measure(function: Callable[[], None], calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        function()
+    return (time.perf_counter() - start) / calls
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=10_000)
+    args = parser.parse_args()
+
+    for algorithm in ["EdDSA", "RS256"]:
+        private_key, public_key = get_keys(algorithm)
+        token = jwt.encode(
+            {"sub": f"datasets/{DATASET}", "read": True, "exp": time.time() + 3600}, private_key, algorithm=algorithm
+        )
+        request = create_request(token)
+
+        def check() -> None:
+            auth_check(
+                DATASET,
+                external_auth_url=EXTERNAL_AUTH_URL,
+                request=request,
+                hf_jwt_public_key=public_key,
+                hf_jwt_algorithm=algorithm,
+            )
+
+        def check_uncached() -> None:
+            VERIFIED_JWT_CACHE.clear()
+            check()
+
+        for name, function in [("uncached", check_uncached), ("cached", check)]:
+            duration = measure(function, calls=args.calls)
+            print(f"{algorithm:<6} {name:<9} {duration * 1e6:10.1f} µs per call")
+
+
+if __name__ == "__main__":
+    main()
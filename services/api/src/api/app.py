@@ -2,6 +2,7 @@
 # Copyright 2022 The HuggingFace Authors.
 
 import uvicorn
+from libcommon.http_client import init_http_client
 from libcommon.log import init_logging
 from libcommon.processing_graph import ProcessingGraph
 from libcommon.resources import CacheMongoResource, QueueMongoResource, Resource
@@ -13,14 +14,16 @@ from starlette.middleware.gzip import GZipMiddleware
 from starlette.routing import Route
 from starlette_prometheus import PrometheusMiddleware
 
+from api.authentication import AuthCheckCache
 from api.config import AppConfig, EndpointConfig, UvicornConfig
 from api.jwt_token import fetch_jwt_public_key
+from api.response_cache import ResponseCache
 from api.routes.endpoint import EndpointsDefinition, create_endpoint
 from api.routes.healthcheck import healthcheck_endpoint
 from api.routes.metrics import create_metrics_endpoint
 from api.routes.rows import create_rows_endpoint
 from api.routes.valid import create_valid_endpoint
-from api.routes.webhook import create_webhook_endpoint
+from api.routes.webhook import DatasetUpdatesConsumer, create_webhook_endpoint
 
 
 def create_app() -> Starlette:
@@ -32,6 +35,8 @@ def create_app() -> Starlette:
 def create_app_with_config(app_config: AppConfig, endpoint_config: EndpointConfig) -> Starlette:
     init_logging(level=app_config.log.level)
     # ^ set first to have logs as soon as possible
+    init_http_client(config=app_config.http_client)
+    # ^ the outbound requests (including huggingface_hub ones) share one pool of connections
     cached_assets_directory = init_cached_assets_dir(directory=app_config.cached_assets.storage_directory)
     parquet_metadata_directory = init_parquet_metadata_dir(directory=app_config.parquet_metadata.storage_directory)
     if not exists(cached_assets_directory):
@@ -65,6 +70,30 @@ def create_app_with_config(app_config: AppConfig, endpoint_config: EndpointConfi
     if not queue_resource.is_available():
         raise RuntimeError("The connection to the queue database could not be established. Exiting.")
 
+    # the webhook updates are coalesced per dataset, then backfilled in the background, unless the debounce is disabled
+    buffer_updates = app_config.api.webhook_debounce_seconds > 0
+    dataset_updates_consumer = DatasetUpdatesConsumer(
+        processing_graph=processing_graph,
+        debounce_seconds=app_config.api.webhook_debounce_seconds,
+        max_wait_seconds=app_config.api.webhook_max_wait_seconds,
+        interval_seconds=app_config.api.webhook_consumer_interval_seconds,
+        hf_endpoint=app_config.common.hf_endpoint,
+        hf_token=app_config.common.hf_token,
+    )
+
+    # the decisions of the external authentication service are cached for a short time, unless the TTL is 0
+    auth_check_cache = (
+        AuthCheckCache(ttl_seconds=app_config.api.auth_cache_ttl_seconds, max_size=app_config.api.auth_cache_max_size)
+        if app_config.api.auth_cache_ttl_seconds > 0
+        else None
+    )
+    # the serialized cached responses are kept in memory, and served while they are up to date, unless the budget is 0
+    response_cache = (
+        ResponseCache(max_bytes=app_config.api.response_cache_max_bytes)
+        if app_config.api.response_cache_max_bytes > 0
+        else None
+    )
+
     routes = [
         Route(
             endpoint_name,
@@ -78,6 +107,8 @@ def create_app_with_config(app_config: AppConfig, endpoint_config: EndpointConfi
                 hf_jwt_algorithm=app_config.api.hf_jwt_algorithm,
                 external_auth_url=app_config.api.external_auth_url,
                 hf_timeout_seconds=app_config.api.hf_timeout_seconds,
+                auth_check_cache=auth_check_cache,
+                response_cache=response_cache,
                 max_age_long=app_config.api.max_age_long,
                 max_age_short=app_config.api.max_age_short,
             ),
@@ -90,6 +121,7 @@ def create_app_with_config(app_config: AppConfig, endpoint_config: EndpointConfi
                 processing_graph=processing_graph,
                 max_age_long=app_config.api.max_age_long,
                 max_age_short=app_config.api.max_age_short,
+                valid_datasets_max_age_seconds=app_config.api.valid_datasets_max_age_seconds,
             ),
         ),
         # ^ called by https://github.com/huggingface/model-evaluator
@@ -99,7 +131,11 @@ def create_app_with_config(app_config: AppConfig, endpoint_config: EndpointConfi
         Route(
             "/webhook",
             endpoint=create_webhook_endpoint(
-                processing_graph=processing_graph, hf_webhook_secret=app_config.api.hf_webhook_secret
+                processing_graph=processing_graph,
+                hf_webhook_secret=app_config.api.hf_webhook_secret,
+                buffer_updates=buffer_updates,
+                hf_endpoint=app_config.common.hf_endpoint,
+                hf_token=app_config.common.hf_token,
             ),
             methods=["POST"],
         ),
@@ -116,13 +152,19 @@ def create_app_with_config(app_config: AppConfig, endpoint_config: EndpointConfi
                 hf_jwt_algorithm=app_config.api.hf_jwt_algorithm,
                 external_auth_url=app_config.api.external_auth_url,
                 hf_timeout_seconds=app_config.api.hf_timeout_seconds,
+                auth_check_cache=auth_check_cache,
                 max_age_long=app_config.api.max_age_long,
                 max_age_short=app_config.api.max_age_short,
             ),
         ),
     ]
 
-    return Starlette(routes=routes, middleware=middleware, on_shutdown=[resource.release for resource in resources])
+    return Starlette(
+        routes=routes,
+        middleware=middleware,
+        on_startup=[dataset_updates_consumer.start] if buffer_updates else [],
+        on_shutdown=[dataset_updates_consumer.stop] + [resource.release for resource in resources],
+    )
 
 
 def start() -> None:
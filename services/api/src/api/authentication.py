@@ -1,11 +1,16 @@
 # SPDX-License-Identifier: Apache-2.0
 # Copyright 2022 The HuggingFace Authors.
 
+import hashlib
 import logging
-from typing import Literal, Optional
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Literal, Optional, Tuple
 
-import requests
+from libcommon.http_client import get_http_session
 from libcommon.prometheus import StepProfiler
+from prometheus_client import Counter
 from requests import PreparedRequest
 from requests.auth import AuthBase
 from starlette.requests import Request
@@ -38,6 +43,119 @@ class RequestAuth(AuthBase):
         return r
 
 
+AUTH_CHECK_CACHE_LOOKUPS_TOTAL = Counter(
+    "auth_check_cache_lookups_total",
+    "Number of lookups in the cache of the authorization decisions, by result (hit, miss or coalesced)",
+    ["result"],
+)
+
+# the decisions of the external authentication service that can be cached. The other responses (errors, timeouts) are
+# never cached.
+CACHEABLE_STATUS_CODES = {200, 401, 403, 404}
+
+AuthCheckCacheKey = Tuple[str, str]
+
+
+def get_auth_check_cache_key(dataset: str, auth: RequestAuth) -> AuthCheckCacheKey:
+    """The key is the dataset and a hash of the credentials: the credentials are not stored in memory."""
+    credentials = f"{auth.cookie or ''}\n{auth.authorization or ''}"
+    return dataset, hashlib.sha256(credentials.encode("utf-8")).hexdigest()
+
+
+class AuthCheckCache:
+    """A bounded in-process cache of the decisions of the external authentication service.
+
+    The entries expire after ttl_seconds, and the least recently used entries are evicted when there are more than
+    max_size entries. The concurrent checks for the same key are coalesced (single-flight): only one request is sent
+    to the external authentication service, and the other threads wait for its decision.
+
+    It is thread-safe.
+    """
+
+    def __init__(self, ttl_seconds: float, max_size: int) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._entries: "OrderedDict[AuthCheckCacheKey, Tuple[float, int]]" = OrderedDict()
+        # ^ key -> (expiration time, status code)
+        self._in_flight: Dict[AuthCheckCacheKey, threading.Event] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key: AuthCheckCacheKey) -> Optional[int]:
+        # must be called with the lock
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, status_code = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return status_code
+
+    def _set(self, key: AuthCheckCacheKey, status_code: int) -> None:
+        # must be called with the lock
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, status_code)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def get_status_code(self, key: AuthCheckCacheKey, fetch: Callable[[], int]) -> int:
+        """Get the cached status code for the key, or call fetch to get it, and cache it if it's a decision.
+
+        Args:
+            key (AuthCheckCacheKey): the dataset and the hash of the credentials
+            fetch (Callable[[], int]): the function that requests the external authentication service, and returns
+              the status code of its response
+
+        Returns:
+            int: the status code
+        """
+        coalesced = False
+        while True:
+            with self._lock:
+                status_code = self._get(key)
+                if status_code is not None:
+                    AUTH_CHECK_CACHE_LOOKUPS_TOTAL.labels(result="coalesced" if coalesced else "hit").inc()
+                    return status_code
+                event = self._in_flight.get(key)
+                is_leader = event is None
+                if event is None:
+                    event = self._in_flight[key] = threading.Event()
+            if not is_leader:
+                # wait for the decision of the concurrent check. If it could not be cached (error), try again.
+                event.wait()
+                coalesced = True
+                continue
+            AUTH_CHECK_CACHE_LOOKUPS_TOTAL.labels(result="miss").inc()
+            try:
+                status_code = fetch()
+                if status_code in CACHEABLE_STATUS_CODES:
+                    with self._lock:
+                        self._set(key, status_code)
+                return status_code
+            finally:
+                with self._lock:
+                    del self._in_flight[key]
+                event.set()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def request_external_auth(url: str, auth: RequestAuth, hf_timeout_seconds: Optional[float] = None) -> int:
+    try:
+        return get_http_session().get(url, auth=auth, timeout=hf_timeout_seconds).status_code
+    except Exception as err:
+        raise AuthCheckHubRequestError(
+            (
+                "Authentication check on the Hugging Face Hub failed or timed out. Please try again later,"
+                " it's a temporary internal issue."
+            ),
+            err,
+        ) from err
+
+
 def auth_check(
     dataset: str,
     external_auth_url: Optional[str] = None,
@@ -45,6 +163,7 @@ def auth_check(
     hf_jwt_public_key: Optional[str] = None,
     hf_jwt_algorithm: Optional[str] = None,
     hf_timeout_seconds: Optional[float] = None,
+    auth_check_cache: Optional[AuthCheckCache] = None,
 ) -> Literal[True]:
     """check if the dataset is authorized for the request
 
@@ -64,6 +183,8 @@ def auth_check(
         hf_jwt_algorithm (str): the algorithm to use to decode the JWT token
         hf_timeout_seconds (float|None): the timeout in seconds for the external authentication service. It
           is used both for the connection timeout and the read timeout. If None, the request never timeouts.
+        auth_check_cache (AuthCheckCache|None): the cache of the decisions of the external authentication service,
+          by dataset and credentials. If None, the external authentication service is requested every time.
 
     Returns:
         None: the dataset is authorized for the request
@@ -103,35 +224,32 @@ def auth_check(
             auth = RequestAuth(request)
         with StepProfiler(
             method="auth_check",
-            step="requests.get",
+            step="get status code",
             context=f"external_auth_url={external_auth_url} timeout={hf_timeout_seconds}",
         ):
-            try:
-                logging.debug(
-                    f"Checking authentication on the Hugging Face Hub for dataset {dataset}, url: {url}, timeout:"
-                    f" {hf_timeout_seconds}, authorization: {auth.authorization}"
+            logging.debug(
+                f"Checking authentication on the Hugging Face Hub for dataset {dataset}, url: {url}, timeout:"
+                f" {hf_timeout_seconds}, authorization: {auth.authorization}"
+            )
+            if auth_check_cache is None:
+                status_code = request_external_auth(url=url, auth=auth, hf_timeout_seconds=hf_timeout_seconds)
+            else:
+                status_code = auth_check_cache.get_status_code(
+                    key=get_auth_check_cache_key(dataset=dataset, auth=auth),
+                    fetch=lambda: request_external_auth(url=url, auth=auth, hf_timeout_seconds=hf_timeout_seconds),
                 )
-                response = requests.get(url, auth=auth, timeout=hf_timeout_seconds)
-            except Exception as err:
-                raise AuthCheckHubRequestError(
-                    (
-                        "Authentication check on the Hugging Face Hub failed or timed out. Please try again later,"
-                        " it's a temporary internal issue."
-                    ),
-                    err,
-                ) from err
     with StepProfiler(method="auth_check", step="return or raise"):
-        if response.status_code == 200:
+        if status_code == 200:
             return True
-        elif response.status_code == 401:
+        elif status_code == 401:
             raise ExternalUnauthenticatedError(
                 "The dataset does not exist, or is not accessible without authentication (private or gated). Please"
                 " check the spelling of the dataset name or retry with authentication."
             )
-        elif response.status_code in [403, 404]:
+        elif status_code in [403, 404]:
             raise ExternalAuthenticatedError(
                 "The dataset does not exist, or is not accessible with the current credentials (private or gated)."
                 " Please check the spelling of the dataset name or retry with other authentication credentials."
             )
         else:
-            raise ValueError(f"Unexpected status code {response.status_code}")
+            raise ValueError(f"Unexpected status code {status_code}")
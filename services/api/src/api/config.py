@@ -9,6 +9,7 @@ from libcommon.config import (
     CacheConfig,
     CachedAssetsConfig,
     CommonConfig,
+    HttpClientConfig,
     LogConfig,
     ParquetMetadataConfig,
     ProcessingGraphConfig,
@@ -38,6 +39,8 @@ class UvicornConfig:
             )
 
 
+API_AUTH_CACHE_MAX_SIZE = 10_000
+API_AUTH_CACHE_TTL_SECONDS = 10.0
 API_EXTERNAL_AUTH_URL = None
 API_HF_AUTH_PATH = "/api/datasets/%s/auth-check"
 API_HF_JWT_PUBLIC_KEY_URL = None
@@ -46,10 +49,17 @@ API_HF_TIMEOUT_SECONDS = 0.2
 API_HF_WEBHOOK_SECRET = None
 API_MAX_AGE_LONG = 120  # 2 minutes
 API_MAX_AGE_SHORT = 10  # 10 seconds
+API_RESPONSE_CACHE_MAX_BYTES = 10_000_000  # 10 MB, per uvicorn worker
+API_VALID_DATASETS_MAX_AGE_SECONDS = 900.0  # 15 minutes
+API_WEBHOOK_CONSUMER_INTERVAL_SECONDS = 1.0
+API_WEBHOOK_DEBOUNCE_SECONDS = 5.0
+API_WEBHOOK_MAX_WAIT_SECONDS = 60.0
 
 
 @dataclass(frozen=True)
 class ApiConfig:
+    auth_cache_max_size: int = API_AUTH_CACHE_MAX_SIZE
+    auth_cache_ttl_seconds: float = API_AUTH_CACHE_TTL_SECONDS
     external_auth_url: Optional[str] = API_EXTERNAL_AUTH_URL  # not documented
     hf_auth_path: str = API_HF_AUTH_PATH
     hf_jwt_public_key_url: Optional[str] = API_HF_JWT_PUBLIC_KEY_URL
@@ -58,6 +68,11 @@ class ApiConfig:
     hf_webhook_secret: Optional[str] = API_HF_WEBHOOK_SECRET
     max_age_long: int = API_MAX_AGE_LONG
     max_age_short: int = API_MAX_AGE_SHORT
+    response_cache_max_bytes: int = API_RESPONSE_CACHE_MAX_BYTES
+    valid_datasets_max_age_seconds: float = API_VALID_DATASETS_MAX_AGE_SECONDS
+    webhook_consumer_interval_seconds: float = API_WEBHOOK_CONSUMER_INTERVAL_SECONDS
+    webhook_debounce_seconds: float = API_WEBHOOK_DEBOUNCE_SECONDS
+    webhook_max_wait_seconds: float = API_WEBHOOK_MAX_WAIT_SECONDS
 
     @classmethod
     def from_env(cls, common_config: CommonConfig) -> "ApiConfig":
@@ -66,6 +81,8 @@ class ApiConfig:
             hf_auth_path = env.str(name="HF_AUTH_PATH", default=API_HF_AUTH_PATH)
             external_auth_url = None if hf_auth_path is None else f"{common_config.hf_endpoint}{hf_auth_path}"
             return cls(
+                auth_cache_max_size=env.int(name="AUTH_CACHE_MAX_SIZE", default=API_AUTH_CACHE_MAX_SIZE),
+                auth_cache_ttl_seconds=env.float(name="AUTH_CACHE_TTL_SECONDS", default=API_AUTH_CACHE_TTL_SECONDS),
                 external_auth_url=external_auth_url,
                 hf_auth_path=hf_auth_path,
                 hf_jwt_public_key_url=env.str(name="HF_JWT_PUBLIC_KEY_URL", default=API_HF_JWT_PUBLIC_KEY_URL),
@@ -74,6 +91,21 @@ class ApiConfig:
                 hf_webhook_secret=env.str(name="HF_WEBHOOK_SECRET", default=API_HF_WEBHOOK_SECRET),
                 max_age_long=env.int(name="MAX_AGE_LONG", default=API_MAX_AGE_LONG),
                 max_age_short=env.int(name="MAX_AGE_SHORT", default=API_MAX_AGE_SHORT),
+                response_cache_max_bytes=env.int(
+                    name="RESPONSE_CACHE_MAX_BYTES", default=API_RESPONSE_CACHE_MAX_BYTES
+                ),
+                valid_datasets_max_age_seconds=env.float(
+                    name="VALID_DATASETS_MAX_AGE_SECONDS", default=API_VALID_DATASETS_MAX_AGE_SECONDS
+                ),
+                webhook_consumer_interval_seconds=env.float(
+                    name="WEBHOOK_CONSUMER_INTERVAL_SECONDS", default=API_WEBHOOK_CONSUMER_INTERVAL_SECONDS
+                ),
+                webhook_debounce_seconds=env.float(
+                    name="WEBHOOK_DEBOUNCE_SECONDS", default=API_WEBHOOK_DEBOUNCE_SECONDS
+                ),
+                webhook_max_wait_seconds=env.float(
+                    name="WEBHOOK_MAX_WAIT_SECONDS", default=API_WEBHOOK_MAX_WAIT_SECONDS
+                ),
             )
 
 
@@ -83,6 +115,7 @@ class AppConfig:
     cached_assets: CachedAssetsConfig = field(default_factory=CachedAssetsConfig)
     cache: CacheConfig = field(default_factory=CacheConfig)
     common: CommonConfig = field(default_factory=CommonConfig)
+    http_client: HttpClientConfig = field(default_factory=HttpClientConfig)
     log: LogConfig = field(default_factory=LogConfig)
     queue: QueueConfig = field(default_factory=QueueConfig)
     processing_graph: ProcessingGraphConfig = field(default_factory=ProcessingGraphConfig)
@@ -95,6 +128,7 @@ class AppConfig:
             common=common_config,
             cached_assets=CachedAssetsConfig.from_env(),
             cache=CacheConfig.from_env(),
+            http_client=HttpClientConfig.from_env(),
             log=LogConfig.from_env(),
             processing_graph=ProcessingGraphConfig.from_env(),
             queue=QueueConfig.from_env(),
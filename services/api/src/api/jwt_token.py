@@ -1,11 +1,14 @@
 # SPDX-License-Identifier: Apache-2.0
 # Copyright 2022 The HuggingFace Authors.
 
+import hashlib
 import logging
-from typing import Any, Optional, Union
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple, Union
 
 import jwt
-import requests
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.primitives.asymmetric.ec import (
     EllipticCurvePrivateKey,
@@ -27,6 +30,7 @@ from jwt.algorithms import (
     RSAAlgorithm,
     RSAPSSAlgorithm,
 )
+from libcommon.http_client import get_http_session
 
 from api.utils import JWKError
 
@@ -106,13 +110,65 @@ def fetch_jwt_public_key(
         str: the public key
     """
     try:
-        response = requests.get(url, timeout=hf_timeout_seconds)
+        response = get_http_session().get(url, timeout=hf_timeout_seconds)
         response.raise_for_status()
         return parse_jwt_public_key(keys=response.json(), hf_jwt_algorithm=hf_jwt_algorithm)
     except Exception as err:
         raise JWKError(f"Failed to fetch or parse the JWT public key from {url}. ", cause=err) from err
 
 
+class VerifiedJWTCache:
+    """A bounded LRU cache of the claims of the JWT whose signature has been verified.
+
+    The entries are keyed by a digest of the token, the public key and the algorithm, so that the tokens are not kept
+    in memory, and expire at the time of the "exp" claim.
+
+    It is thread-safe.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        # ^ digest -> (expiration timestamp, claims)
+        self._lock = threading.Lock()
+
+    def get(self, digest: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+            exp, claims = entry
+            if exp <= time.time():
+                del self._entries[digest]
+                return None
+            self._entries.move_to_end(digest)
+            return claims
+
+    def set(self, digest: str, claims: Dict[str, Any]) -> None:
+        exp = claims.get("exp")
+        if not isinstance(exp, (int, float)):
+            return
+        with self._lock:
+            self._entries[digest] = (float(exp), claims)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+VERIFIED_JWT_CACHE_MAX_SIZE = 1_000
+# the cache is global to the process: the signature of a token is verified once per token and per process
+VERIFIED_JWT_CACHE = VerifiedJWTCache(max_size=VERIFIED_JWT_CACHE_MAX_SIZE)
+
+
+def get_jwt_digest(token: Any, public_key: str, algorithm: str) -> str:
+    token_bytes = token if isinstance(token, bytes) else str(token).encode("utf-8")
+    return hashlib.sha256(b"\n".join([algorithm.encode("utf-8"), public_key.encode("utf-8"), token_bytes])).hexdigest()
+
+
 def is_jwt_valid(
     dataset: str, token: Any, public_key: Optional[str], algorithm: Optional[str], verify_exp: Optional[bool] = True
 ) -> bool:
@@ -125,6 +181,9 @@ def is_jwt_valid(
 
     Returns True only if all the conditions are met. Else, it returns False.
 
+    The claims of the tokens with a valid signature are cached until their expiration (see VerifiedJWTCache), so
+    that the signature of a token reused for many requests is verified only once.
+
     Args:
         dataset (str): the dataset identifier
         token (Any): the JWT token to decode
@@ -141,20 +200,26 @@ def is_jwt_valid(
             " validation."
         )
         return False
-    try:
-        decoded = jwt.decode(
-            jwt=token,
-            key=public_key,
-            algorithms=[algorithm],
-            options={"require": ["exp", "sub", "read"], "verify_exp": verify_exp},
-        )
-        logging.debug(f"Decoded JWT is: '{public_key}'.")
-    except Exception:
-        logging.debug(
-            f"Missing public key '{public_key}' or algorithm '{algorithm}' to decode JWT token. Skipping JWT"
-            " validation."
-        )
-        return False
+    # the verified claims are only cached when the expiration is verified, since the cache relies on it
+    digest = get_jwt_digest(token=token, public_key=public_key, algorithm=algorithm) if verify_exp else None
+    decoded = VERIFIED_JWT_CACHE.get(digest) if digest else None
+    if decoded is None:
+        try:
+            decoded = jwt.decode(
+                jwt=token,
+                key=public_key,
+                algorithms=[algorithm],
+                options={"require": ["exp", "sub", "read"], "verify_exp": verify_exp},
+            )
+            logging.debug(f"Decoded JWT is: '{public_key}'.")
+        except Exception:
+            logging.debug(
+                f"Missing public key '{public_key}' or algorithm '{algorithm}' to decode JWT token. Skipping JWT"
+                " validation."
+            )
+            return False
+        if digest:
+            VERIFIED_JWT_CACHE.set(digest, decoded)
     sub = decoded.get("sub")
     if not isinstance(sub, str) or not sub.startswith("datasets/") or sub.removeprefix("datasets/") != dataset:
         return False
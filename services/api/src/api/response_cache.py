@@ -0,0 +1,99 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2023 The HuggingFace Authors.
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from http import HTTPStatus
+from typing import Optional, Tuple
+
+from prometheus_client import Counter
+
+RESPONSE_CACHE_LOOKUPS_TOTAL = Counter(
+    "response_cache_lookups_total",
+    "Number of lookups in the in-memory cache of the serialized cached responses, by result (hit, miss or stale)",
+    ["result"],
+)
+
+# an entry larger than this fraction of the budget is not stored: it would evict too many other entries
+MAX_ENTRY_BYTES_RATIO = 0.1
+
+ResponseCacheKey = Tuple[str, str, Optional[str], Optional[str]]
+# ^ kind, dataset, config, split
+
+
+@dataclass(frozen=True)
+class SerializedResponse:
+    body: bytes
+    http_status: HTTPStatus
+    error_code: Optional[str]
+    dataset_git_revision: Optional[str]
+    updated_at: Optional[datetime]
+
+
+class ResponseCache:
+    """A byte-budgeted in-process cache of the cached responses, serialized to JSON.
+
+    An entry is only returned if its update date and its revision are the same as the ones of the cache entry in the
+    database: a changed entry (recomputed, or moved to a new revision of the dataset) is never served. The least
+    recently used entries are evicted when the size of the bodies exceeds max_bytes, and the entries larger than a
+    tenth of max_bytes are not stored.
+
+    It is thread-safe.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = int(max_bytes * MAX_ENTRY_BYTES_RATIO)
+        self.num_bytes = 0
+        self._entries: "OrderedDict[ResponseCacheKey, SerializedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(
+        self, key: ResponseCacheKey, updated_at: datetime, dataset_git_revision: Optional[str]
+    ) -> Optional[SerializedResponse]:
+        """Get the serialized response for the key, if it's up to date.
+
+        Args:
+            key (ResponseCacheKey): the kind, dataset, config and split of the cache entry
+            updated_at (datetime): the update date of the cache entry in the database
+            dataset_git_revision (str, optional): the revision of the cache entry in the database
+
+        Returns:
+            Optional[SerializedResponse]: the serialized response, or None if it's not cached or outdated
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                RESPONSE_CACHE_LOOKUPS_TOTAL.labels(result="miss").inc()
+                return None
+            if entry.updated_at != updated_at or entry.dataset_git_revision != dataset_git_revision:
+                self._pop(key)
+                RESPONSE_CACHE_LOOKUPS_TOTAL.labels(result="stale").inc()
+                return None
+            self._entries.move_to_end(key)
+            RESPONSE_CACHE_LOOKUPS_TOTAL.labels(result="hit").inc()
+            return entry
+
+    def set(self, key: ResponseCacheKey, entry: SerializedResponse) -> None:
+        if entry.updated_at is None or len(entry.body) > self.max_entry_bytes:
+            return
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = entry
+            self.num_bytes += len(entry.body)
+            while self.num_bytes > self.max_bytes:
+                _, evicted_entry = self._entries.popitem(last=False)
+                self.num_bytes -= len(evicted_entry.body)
+
+    def _pop(self, key: ResponseCacheKey) -> None:
+        # must be called with the lock
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.num_bytes -= len(entry.body)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.num_bytes = 0
@@ -1,26 +1,30 @@
 # SPDX-License-Identifier: Apache-2.0
 # Copyright 2022 The HuggingFace Authors.
 
+import hashlib
 import logging
 from abc import ABC, abstractmethod
 from http import HTTPStatus
-from typing import List, Mapping, Optional, Tuple, TypedDict
+from typing import List, Mapping, NoReturn, Optional, Tuple, TypedDict
 
 from libcommon.dataset import get_dataset_git_revision
 from libcommon.orchestrator import DatasetOrchestrator
 from libcommon.processing_graph import InputType, ProcessingGraph, ProcessingStep
 from libcommon.prometheus import StepProfiler
 from libcommon.simple_cache import (
-    CACHED_RESPONSE_NOT_FOUND,
-    CacheEntry,
-    get_best_response,
+    BestResponseKind,
+    DoesNotExist,
+    get_best_response_kind,
+    get_response_json,
 )
 from libcommon.utils import Priority
+from starlette.concurrency import run_in_threadpool
 from starlette.requests import Request
 from starlette.responses import Response
 
-from api.authentication import auth_check
+from api.authentication import AuthCheckCache, auth_check
 from api.config import EndpointConfig
+from api.response_cache import ResponseCache, SerializedResponse
 from api.utils import (
     ApiCustomError,
     Endpoint,
@@ -29,9 +33,12 @@ from api.utils import (
     ResponseNotReadyError,
     UnexpectedError,
     are_valid_parameters,
+    get_etag,
     get_json_api_error_response,
-    get_json_error_response,
+    get_json_bytes_response,
     get_json_ok_response,
+    get_not_modified_response,
+    is_etag_matching,
 )
 
 StepsByInputType = Mapping[InputType, List[ProcessingStep]]
@@ -59,7 +66,54 @@ class EndpointsDefinition:
         }
 
 
-def get_cache_entry_from_steps(
+def raise_missing_cache_entry_error(
+    processing_steps: List[ProcessingStep],
+    dataset: str,
+    processing_graph: ProcessingGraph,
+    hf_endpoint: str,
+    hf_token: Optional[str] = None,
+    hf_timeout_seconds: Optional[float] = None,
+) -> NoReturn:
+    """Raises the error to return when no cache entry exists for the processing steps.
+    Checks if job is still in progress by each processing step.
+    Raises:
+        - [`~utils.ResponseNotFoundError`]
+          if the cache entry will not be created.
+        - [`~utils.ResponseNotReadyError`]
+          if the response is not ready yet.
+    """
+    dataset_orchestrator = DatasetOrchestrator(dataset=dataset, processing_graph=processing_graph)
+    if not dataset_orchestrator.has_some_cache():
+        # We have to check if the dataset exists and is supported
+        try:
+            revision = get_dataset_git_revision(
+                dataset=dataset,
+                hf_endpoint=hf_endpoint,
+                hf_token=hf_token,
+                hf_timeout_seconds=hf_timeout_seconds,
+            )
+        except Exception as e:
+            # The dataset is not supported
+            raise ResponseNotFoundError("Not found.") from e
+        # The dataset is supported, and the revision is known. We set the revision (it will create the jobs)
+        # and tell the user to retry.
+        dataset_orchestrator.set_revision(revision=revision, priority=Priority.NORMAL, error_codes_to_retry=[])
+        raise ResponseNotReadyError(
+            "The server is busier than usual and the response is not ready yet. Please retry later."
+        )
+    elif dataset_orchestrator.has_pending_ancestor_jobs(
+        processing_step_names=[processing_step.name for processing_step in processing_steps]
+    ):
+        # some jobs are still in progress, the cache entries could exist in the future
+        raise ResponseNotReadyError(
+            "The server is busier than usual and the response is not ready yet. Please retry later."
+        )
+    else:
+        # no pending job: the cache entry will not be created
+        raise ResponseNotFoundError("Not found.")
+
+
+def get_best_response_kind_from_steps(
     processing_steps: List[ProcessingStep],
     dataset: str,
     config: Optional[str],
@@ -68,52 +122,88 @@ def get_cache_entry_from_steps(
     hf_endpoint: str,
     hf_token: Optional[str] = None,
     hf_timeout_seconds: Optional[float] = None,
-) -> CacheEntry:
-    """Gets the cache from the first successful step in the processing steps list.
-    If no successful result is found, it will return the last one even if it's an error,
-    Checks if job is still in progress by each processing step in case of no entry found.
+) -> BestResponseKind:
+    """Gets the metadata of the best cache entry for the processing steps, not its content.
+    The first successful entry is preferred. If no successful entry is found, the first error entry is selected.
+    Checks if a job is still in progress for the processing steps in case of no entry found.
     Raises:
         - [`~utils.ResponseNotFoundError`]
           if no result is found.
         - [`~utils.ResponseNotReadyError`]
           if the response is not ready yet.
 
-    Returns: the cached record
+    Returns: the kind and the metadata of the best cache entry
     """
     kinds = [processing_step.cache_kind for processing_step in processing_steps]
-    best_response = get_best_response(kinds=kinds, dataset=dataset, config=config, split=split)
-    if "error_code" in best_response.response and best_response.response["error_code"] == CACHED_RESPONSE_NOT_FOUND:
-        dataset_orchestrator = DatasetOrchestrator(dataset=dataset, processing_graph=processing_graph)
-        if not dataset_orchestrator.has_some_cache():
-            # We have to check if the dataset exists and is supported
-            try:
-                revision = get_dataset_git_revision(
-                    dataset=dataset,
-                    hf_endpoint=hf_endpoint,
-                    hf_token=hf_token,
-                    hf_timeout_seconds=hf_timeout_seconds,
-                )
-            except Exception as e:
-                # The dataset is not supported
-                raise ResponseNotFoundError("Not found.") from e
-            # The dataset is supported, and the revision is known. We set the revision (it will create the jobs)
-            # and tell the user to retry.
-            dataset_orchestrator.set_revision(revision=revision, priority=Priority.NORMAL, error_codes_to_retry=[])
-            raise ResponseNotReadyError(
-                "The server is busier than usual and the response is not ready yet. Please retry later."
-            )
-        elif dataset_orchestrator.has_pending_ancestor_jobs(
-            processing_step_names=[processing_step.name for processing_step in processing_steps]
-        ):
-            # some jobs are still in progress, the cache entries could exist in the future
-            raise ResponseNotReadyError(
-                "The server is busier than usual and the response is not ready yet. Please retry later."
-            )
-        else:
-            # no pending job: the cache entry will not be created
-            raise ResponseNotFoundError("Not found.")
+    best_response_kind = get_best_response_kind(kinds=kinds, dataset=dataset, config=config, split=split)
+    if best_response_kind.updated_at is None:
+        raise_missing_cache_entry_error(
+            processing_steps=processing_steps,
+            dataset=dataset,
+            processing_graph=processing_graph,
+            hf_endpoint=hf_endpoint,
+            hf_token=hf_token,
+            hf_timeout_seconds=hf_timeout_seconds,
+        )
+    return best_response_kind
 
-    return best_response.response
+
+def get_cache_entry_etag(
+    best_response_kind: BestResponseKind, dataset: str, config: Optional[str], split: Optional[str]
+) -> str:
+    """Gets the strong ETag of a cache entry, from its metadata only.
+
+    It's the hash of the serialized content if it has been stored along with the content (an entry recomputed with
+    the same content keeps its ETag). Else, it's a hash of the identity of the entry, its update date and the version
+    of the job runner, that change every time the entry is updated.
+    """
+    if best_response_kind.content_hash is not None:
+        return get_etag(best_response_kind.content_hash)
+    updated_at = best_response_kind.updated_at.isoformat() if best_response_kind.updated_at else ""
+    fields = [best_response_kind.kind, dataset, config, split, updated_at, best_response_kind.job_runner_version]
+    return get_etag(hashlib.sha256(repr(fields).encode("utf-8")).hexdigest())
+
+
+def get_serialized_response(
+    best_response_kind: BestResponseKind,
+    dataset: str,
+    config: Optional[str],
+    split: Optional[str],
+    response_cache: Optional[ResponseCache] = None,
+) -> SerializedResponse:
+    """Gets the best cache entry, with its content serialized to JSON, as stored by the workers.
+
+    If response_cache is passed, the serialized response is read from it when it's up to date (same update date and
+    revision as the cache entry in the database), which saves the query of the content.
+    Raises:
+        - [`~utils.ResponseNotReadyError`]
+          if the cache entry has been deleted since it was selected.
+    """
+    key = (best_response_kind.kind, dataset, config, split)
+    if response_cache is not None and best_response_kind.updated_at is not None:
+        serialized_response = response_cache.get(
+            key,
+            updated_at=best_response_kind.updated_at,
+            dataset_git_revision=best_response_kind.dataset_git_revision,
+        )
+        if serialized_response is not None:
+            return serialized_response
+    try:
+        result = get_response_json(kind=best_response_kind.kind, dataset=dataset, config=config, split=split)
+    except DoesNotExist as e:
+        raise ResponseNotReadyError(
+            "The server is busier than usual and the response is not ready yet. Please retry later."
+        ) from e
+    serialized_response = SerializedResponse(
+        body=result["content_json"],
+        http_status=HTTPStatus(result["http_status"]),
+        error_code=result["error_code"],
+        dataset_git_revision=result["dataset_git_revision"],
+        updated_at=result["updated_at"],
+    )
+    if response_cache is not None:
+        response_cache.set(key, serialized_response)
+    return serialized_response
 
 
 # TODO: remove once full scan is implemented for spawning urls scan
@@ -253,6 +343,8 @@ def create_endpoint(
     hf_jwt_algorithm: Optional[str] = None,
     external_auth_url: Optional[str] = None,
     hf_timeout_seconds: Optional[float] = None,
+    auth_check_cache: Optional[AuthCheckCache] = None,
+    response_cache: Optional[ResponseCache] = None,
     max_age_long: int = 0,
     max_age_short: int = 0,
 ) -> Endpoint:
@@ -291,13 +383,15 @@ def create_endpoint(
 
                 # if auth_check fails, it will raise an exception that will be caught below
                 with StepProfiler(method="processing_step_endpoint", step="check authentication", context=context):
-                    auth_check(
+                    await run_in_threadpool(
+                        auth_check,
                         dataset,
                         external_auth_url=external_auth_url,
                         request=request,
                         hf_jwt_public_key=hf_jwt_public_key,
                         hf_jwt_algorithm=hf_jwt_algorithm,
                         hf_timeout_seconds=hf_timeout_seconds,
+                        auth_check_cache=auth_check_cache,
                     )
                 # getting result based on processing steps
                 with StepProfiler(method="processing_step_endpoint", step="get cache entry", context=context):
@@ -311,7 +405,8 @@ def create_endpoint(
                             content=HARD_CODED_OPT_IN_OUT_URLS[dataset], max_age=max_age_long, revision=revision
                         )
 
-                    result = get_cache_entry_from_steps(
+                    best_response_kind = await run_in_threadpool(
+                        get_best_response_kind_from_steps,
                         processing_steps=processing_steps,
                         dataset=dataset,
                         config=config,
@@ -321,21 +416,42 @@ def create_endpoint(
                         hf_token=hf_token,
                         hf_timeout_seconds=hf_timeout_seconds,
                     )
-                content = result["content"]
-                http_status = result["http_status"]
-                error_code = result["error_code"]
-                revision = result["dataset_git_revision"]
-                if http_status == HTTPStatus.OK:
+                    revision = best_response_kind.dataset_git_revision
+                    max_age = max_age_long if best_response_kind.http_status == HTTPStatus.OK else max_age_short
+                    etag = get_cache_entry_etag(
+                        best_response_kind=best_response_kind, dataset=dataset, config=config, split=split
+                    )
+                    # the client already has the response: no need to get the content
+                    if is_etag_matching(request.headers.get("if-none-match"), etag):
+                        return get_not_modified_response(
+                            etag=etag,
+                            max_age=max_age,
+                            error_code=best_response_kind.error_code,
+                            revision=revision,
+                        )
+                    serialized_response = await run_in_threadpool(
+                        get_serialized_response,
+                        best_response_kind=best_response_kind,
+                        dataset=dataset,
+                        config=config,
+                        split=split,
+                        response_cache=response_cache,
+                    )
+                revision = serialized_response.dataset_git_revision
+                if serialized_response.http_status == HTTPStatus.OK:
                     with StepProfiler(method="processing_step_endpoint", step="generate OK response", context=context):
-                        return get_json_ok_response(content=content, max_age=max_age_long, revision=revision)
+                        return get_json_bytes_response(
+                            body=serialized_response.body, max_age=max_age_long, revision=revision, etag=etag
+                        )
 
                 with StepProfiler(method="processing_step_endpoint", step="generate error response", context=context):
-                    return get_json_error_response(
-                        content=content,
-                        status_code=http_status,
+                    return get_json_bytes_response(
+                        body=serialized_response.body,
+                        status_code=serialized_response.http_status,
                         max_age=max_age_short,
-                        error_code=error_code,
+                        error_code=serialized_response.error_code,
                         revision=revision,
+                        etag=etag,
                     )
             except Exception as e:
                 error = e if isinstance(e, ApiCustomError) else UnexpectedError("Unexpected error.", e)
@@ -20,10 +20,11 @@ from libcommon.viewer_utils.asset import (
     update_last_modified_date_of_rows_in_assets_dir,
 )
 from libcommon.viewer_utils.features import get_cell_value
+from starlette.concurrency import run_in_threadpool
 from starlette.requests import Request
 from starlette.responses import Response
 
-from api.authentication import auth_check
+from api.authentication import AuthCheckCache, auth_check
 from api.utils import (
     ApiCustomError,
     Endpoint,
@@ -262,6 +263,7 @@ def create_rows_endpoint(
     hf_jwt_algorithm: Optional[str] = None,
     external_auth_url: Optional[str] = None,
     hf_timeout_seconds: Optional[float] = None,
+    auth_check_cache: Optional[AuthCheckCache] = None,
     max_age_long: int = 0,
     max_age_short: int = 0,
     clean_cache_proba: float = 0.0,
@@ -300,13 +302,15 @@ def create_rows_endpoint(
                     )
                 with StepProfiler(method="rows_endpoint", step="check authentication"):
                     # if auth_check fails, it will raise an exception that will be caught below
-                    auth_check(
+                    await run_in_threadpool(
+                        auth_check,
                         dataset=dataset,
                         external_auth_url=external_auth_url,
                         request=request,
                         hf_jwt_public_key=hf_jwt_public_key,
                         hf_jwt_algorithm=hf_jwt_algorithm,
                         hf_timeout_seconds=hf_timeout_seconds,
+                        auth_check_cache=auth_check_cache,
                     )
                 with StepProfiler(method="rows_endpoint", step="get row groups index"):
                     rows_index = indexer.get_rows_index(
@@ -3,78 +3,81 @@
 
 import logging
 from dataclasses import dataclass, field
-from typing import List, Set, TypedDict
+from typing import Optional
 
-from libcommon.processing_graph import ProcessingGraph, ProcessingStep
+from libcommon.processing_graph import ProcessingGraph
 from libcommon.prometheus import StepProfiler
-from libcommon.simple_cache import get_valid_datasets
+from libcommon.simple_cache import (
+    ValidDatasetsContent,
+    compute_valid_datasets,
+    get_valid_datasets_snapshot,
+)
+from starlette.concurrency import run_in_threadpool
 from starlette.requests import Request
 from starlette.responses import Response
 
 from api.utils import (
     Endpoint,
     UnexpectedError,
+    get_etag,
     get_json_api_error_response,
+    get_json_bytes_response,
     get_json_ok_response,
+    get_not_modified_response,
+    is_etag_matching,
 )
 
 
-class ValidContent(TypedDict):
-    valid: List[str]
-    preview: List[str]
-    viewer: List[str]
-
-
 @dataclass
 class ValidDatasets:
     processing_graph: ProcessingGraph
-    content: ValidContent = field(init=False)
+    content: ValidDatasetsContent = field(init=False)
 
     def __post_init__(self) -> None:
-        _viewer_set: Set[str] = self._get_valid_set(
-            processing_steps=self.processing_graph.get_processing_steps_enables_viewer()
-        )
-        _preview_set: Set[str] = self._get_valid_set(
-            processing_steps=self.processing_graph.get_processing_steps_enables_preview()
-        ).difference(_viewer_set)
-        _valid_set = set.union(_viewer_set, _preview_set)
-        self.content = ValidContent(
-            valid=sorted(_valid_set),
-            preview=sorted(_preview_set),
-            viewer=sorted(_viewer_set),
+        self.content = compute_valid_datasets(
+            viewer_kinds=[
+                processing_step.cache_kind
+                for processing_step in self.processing_graph.get_processing_steps_enables_viewer()
+            ],
+            preview_kinds=[
+                processing_step.cache_kind
+                for processing_step in self.processing_graph.get_processing_steps_enables_preview()
+            ],
         )
 
-    def _get_valid_set(self, processing_steps: List[ProcessingStep]) -> Set[str]:
-        """Returns the list of the valid datasets for the list of steps
 
-        A dataset is considered valid if at least one response of any of the artifacts for any of the
-        steps is valid.
-
-        Args:
-            processing_steps (List[ProcessingStep]): The list of processing steps
-
-        Returns:
-            List[str]: The list of valid datasets for the steps
-        """
-        if not processing_steps:
-            return set()
-        return set.union(
-            *[get_valid_datasets(kind=processing_step.cache_kind) for processing_step in processing_steps]
-        )
+def get_valid_datasets_content(processing_graph: ProcessingGraph) -> ValidDatasetsContent:
+    return ValidDatasets(processing_graph=processing_graph).content
 
 
 def create_valid_endpoint(
     processing_graph: ProcessingGraph,
     max_age_long: int = 0,
     max_age_short: int = 0,
+    valid_datasets_max_age_seconds: Optional[float] = None,
 ) -> Endpoint:
     # this endpoint is used by the frontend to know which datasets support the dataset viewer
-    async def valid_endpoint(_: Request) -> Response:
+    async def valid_endpoint(request: Request) -> Response:
         with StepProfiler(method="valid_endpoint", step="all"):
             try:
                 logging.info("/valid")
+                # the lists are precomputed periodically by the cache maintenance job (update-valid-datasets action)
+                if valid_datasets_max_age_seconds is None or valid_datasets_max_age_seconds > 0:
+                    with StepProfiler(method="valid_endpoint", step="get precomputed content"):
+                        snapshot = await run_in_threadpool(
+                            get_valid_datasets_snapshot, max_age_seconds=valid_datasets_max_age_seconds
+                        )
+                    if snapshot is not None:
+                        etag = get_etag(snapshot["content_hash"])
+                        if is_etag_matching(request.headers.get("if-none-match"), etag):
+                            return get_not_modified_response(etag=etag, max_age=max_age_long)
+                        with StepProfiler(method="valid_endpoint", step="generate OK response"):
+                            return get_json_bytes_response(
+                                body=snapshot["content_json"], max_age=max_age_long, etag=etag
+                            )
+                    logging.warning("The precomputed lists of valid datasets are missing or outdated.")
                 with StepProfiler(method="valid_endpoint", step="prepare content"):
-                    content = ValidDatasets(processing_graph=processing_graph).content
+                    content = await run_in_threadpool(get_valid_datasets_content, processing_graph=processing_graph)
                 with StepProfiler(method="valid_endpoint", step="generate OK response"):
                     return get_json_ok_response(content, max_age=max_age_long)
             except Exception as e:
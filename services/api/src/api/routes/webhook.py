@@ -1,15 +1,23 @@
 # SPDX-License-Identifier: Apache-2.0
 # Copyright 2022 The HuggingFace Authors.
 
+import asyncio
 import logging
+from dataclasses import dataclass, field
 from typing import Any, Literal, Optional, TypedDict
 
 from jsonschema import ValidationError, validate
 from libcommon.exceptions import CustomError, DatasetRevisionEmptyError
-from libcommon.operations import backfill_dataset, delete_dataset
+from libcommon.operations import (
+    backfill_dataset,
+    buffer_dataset_update,
+    delete_dataset,
+    process_dataset_updates,
+)
 from libcommon.processing_graph import ProcessingGraph
 from libcommon.prometheus import StepProfiler
 from libcommon.utils import Priority
+from starlette.concurrency import run_in_threadpool
 from starlette.requests import Request
 from starlette.responses import Response
 
@@ -64,7 +72,18 @@ def process_payload(
     processing_graph: ProcessingGraph,
     payload: MoonWebhookV2Payload,
     trust_sender: bool = False,
+    buffer_updates: bool = False,
+    hf_endpoint: Optional[str] = None,
+    hf_token: Optional[str] = None,
 ) -> None:
+    """Process a webhook payload.
+
+    If buffer_updates is True, the "add" and "update" events are buffered, and coalesced per dataset, and the datasets
+    are backfilled later by a DatasetUpdatesConsumer. Else, the datasets are backfilled synchronously.
+
+    If hf_endpoint is set, the cache entries of an updated dataset are updated in place when only non-data files
+    changed (see libcommon.operations.backfill_dataset).
+    """
     if payload["repo"]["type"] != "dataset":
         return
     dataset = payload["repo"]["name"]
@@ -80,9 +99,17 @@ def process_payload(
     if revision is None:
         raise DatasetRevisionEmptyError(message=f"Dataset {dataset} has no revision")
     if event in ["add", "update"]:
-        backfill_dataset(
-            dataset=dataset, revision=revision, processing_graph=processing_graph, priority=Priority.NORMAL
-        )
+        if buffer_updates:
+            buffer_dataset_update(dataset=dataset, revision=revision)
+        else:
+            backfill_dataset(
+                dataset=dataset,
+                revision=revision,
+                processing_graph=processing_graph,
+                priority=Priority.NORMAL,
+                hf_endpoint=hf_endpoint,
+                hf_token=hf_token,
+            )
     elif event == "move" and (moved_to := payload["movedTo"]):
         # destructive actions (delete, move) require a trusted sender
         if trust_sender:
@@ -92,7 +119,55 @@ def process_payload(
             delete_dataset(dataset=dataset)
 
 
-def create_webhook_endpoint(processing_graph: ProcessingGraph, hf_webhook_secret: Optional[str] = None) -> Endpoint:
+@dataclass
+class DatasetUpdatesConsumer:
+    """Backfill the datasets whose buffered updates have settled, in the background.
+
+    Every interval_seconds, the settled updates are claimed and processed in a thread (see
+    libcommon.operations.process_dataset_updates). Every uvicorn worker can run a consumer: an update is only claimed
+    by one of them.
+    """
+
+    processing_graph: ProcessingGraph
+    debounce_seconds: float
+    max_wait_seconds: float
+    interval_seconds: float
+    hf_endpoint: Optional[str] = None
+    hf_token: Optional[str] = None
+
+    _task: Optional["asyncio.Task[None]"] = field(default=None, init=False)
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await run_in_threadpool(
+                    process_dataset_updates,
+                    processing_graph=self.processing_graph,
+                    debounce_seconds=self.debounce_seconds,
+                    max_wait_seconds=self.max_wait_seconds,
+                    hf_endpoint=self.hf_endpoint,
+                    hf_token=self.hf_token,
+                )
+            except Exception:
+                logging.exception("failed to process the dataset updates")
+            await asyncio.sleep(self.interval_seconds)
+
+
+def create_webhook_endpoint(
+    processing_graph: ProcessingGraph,
+    hf_webhook_secret: Optional[str] = None,
+    buffer_updates: bool = False,
+    hf_endpoint: Optional[str] = None,
+    hf_token: Optional[str] = None,
+) -> Endpoint:
     async def webhook_endpoint(request: Request) -> Response:
         with StepProfiler(method="webhook_endpoint", step="all"):
             with StepProfiler(method="webhook_endpoint", step="get JSON"):
@@ -127,7 +202,15 @@ def create_webhook_endpoint(processing_graph: ProcessingGraph, hf_webhook_secret
 
             with StepProfiler(method="webhook_endpoint", step="process payload"):
                 try:
-                    process_payload(processing_graph=processing_graph, payload=payload, trust_sender=trust_sender)
+                    await run_in_threadpool(
+                        process_payload,
+                        processing_graph=processing_graph,
+                        payload=payload,
+                        trust_sender=trust_sender,
+                        buffer_updates=buffer_updates,
+                        hf_endpoint=hf_endpoint,
+                        hf_token=hf_token,
+                    )
                 except CustomError as e:
                     content = {"status": "error", "error": "the dataset is not supported"}
                     dataset = payload["repo"]["name"]
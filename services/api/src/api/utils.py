@@ -3,7 +3,7 @@
 
 import logging
 from http import HTTPStatus
-from typing import Any, Callable, Coroutine, List, Literal, Optional
+from typing import Any, Callable, Coroutine, Dict, List, Literal, Optional
 
 from libcommon.exceptions import CustomError
 from libcommon.utils import orjson_dumps
@@ -117,6 +117,19 @@ def get_response(content: Any, status_code: int = 200, max_age: int = 0) -> Resp
     return OrjsonResponse(content=content, status_code=status_code, headers=headers)
 
 
+def get_json_headers(
+    max_age: int = 0, error_code: Optional[str] = None, revision: Optional[str] = None, etag: Optional[str] = None
+) -> Dict[str, str]:
+    headers = {"Cache-Control": f"max-age={max_age}" if max_age > 0 else "no-store"}
+    if error_code is not None:
+        headers["X-Error-Code"] = error_code
+    if revision is not None:
+        headers["X-Revision"] = revision
+    if etag is not None:
+        headers["ETag"] = etag
+    return headers
+
+
 def get_json_response(
     content: Any,
     status_code: HTTPStatus = HTTPStatus.OK,
@@ -124,14 +137,43 @@ def get_json_response(
     error_code: Optional[str] = None,
     revision: Optional[str] = None,
 ) -> Response:
-    headers = {"Cache-Control": f"max-age={max_age}" if max_age > 0 else "no-store"}
-    if error_code is not None:
-        headers["X-Error-Code"] = error_code
-    if revision is not None:
-        headers["X-Revision"] = revision
+    headers = get_json_headers(max_age=max_age, error_code=error_code, revision=revision)
     return OrjsonResponse(content=content, status_code=status_code.value, headers=headers)
 
 
+def get_json_bytes_response(
+    body: bytes,
+    status_code: HTTPStatus = HTTPStatus.OK,
+    max_age: int = 0,
+    error_code: Optional[str] = None,
+    revision: Optional[str] = None,
+    etag: Optional[str] = None,
+) -> Response:
+    """Like get_json_response, but the content is already serialized to JSON."""
+    headers = get_json_headers(max_age=max_age, error_code=error_code, revision=revision, etag=etag)
+    return Response(content=body, status_code=status_code.value, headers=headers, media_type="application/json")
+
+
+def get_not_modified_response(
+    etag: str, max_age: int = 0, error_code: Optional[str] = None, revision: Optional[str] = None
+) -> Response:
+    headers = get_json_headers(max_age=max_age, error_code=error_code, revision=revision, etag=etag)
+    return Response(status_code=HTTPStatus.NOT_MODIFIED.value, headers=headers)
+
+
+def get_etag(content_hash: str) -> str:
+    return f'"{content_hash}"'
+
+
+def is_etag_matching(if_none_match: Optional[str], etag: str) -> bool:
+    """Check if the If-None-Match header of a request matches the ETag of the response (weak comparison)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
 def get_json_ok_response(content: Any, max_age: int = 0, revision: Optional[str] = None) -> Response:
     return get_json_response(content=content, max_age=max_age, revision=revision)
 
@@ -4,6 +4,7 @@
 from pathlib import Path
 from typing import Iterator
 
+from libcommon.http_client import init_http_client
 from libcommon.processing_graph import ProcessingGraph
 from libcommon.queue import _clean_queue_database
 from libcommon.resources import CacheMongoResource, QueueMongoResource
@@ -96,6 +97,12 @@ def first_split_endpoint(endpoint_definition: StepsByInputTypeAndEndpoint) -> st
     )
 
 
+@fixture(autouse=True)
+def http_client(app_config: AppConfig) -> None:
+    # the circuit breakers must not be shared between the tests
+    init_http_client(config=app_config.http_client)
+
+
 @fixture(autouse=True)
 def cache_mongo_resource(app_config: AppConfig) -> Iterator[CacheMongoResource]:
     with CacheMongoResource(database=app_config.cache.mongo_database, host=app_config.cache.mongo_url) as resource:
@@ -1,17 +1,26 @@
 # SPDX-License-Identifier: Apache-2.0
 # Copyright 2022 The HuggingFace Authors.
 
+from dataclasses import replace
+from datetime import datetime
 from http import HTTPStatus
+from typing import List
 from unittest.mock import patch
 
 from libcommon.config import ProcessingGraphConfig
-from libcommon.processing_graph import ProcessingGraph
+from libcommon.processing_graph import ProcessingGraph, ProcessingStep
 from libcommon.queue import Queue
-from libcommon.simple_cache import upsert_response
+from libcommon.simple_cache import BestResponseKind, upsert_response
 from pytest import raises
 
 from api.config import AppConfig, EndpointConfig
-from api.routes.endpoint import EndpointsDefinition, get_cache_entry_from_steps
+from api.response_cache import ResponseCache, SerializedResponse
+from api.routes.endpoint import (
+    EndpointsDefinition,
+    get_best_response_kind_from_steps,
+    get_cache_entry_etag,
+    get_serialized_response,
+)
 from api.utils import ResponseNotReadyError
 
 
@@ -87,7 +96,7 @@ def test_endpoints_definition() -> None:
     assert len(opt_in_out_urls["dataset"]) == 1  # Only has one processing step
 
 
-def test_get_cache_entry_from_steps() -> None:
+def test_get_best_response_kind_from_steps() -> None:
     dataset = "dataset"
     revision = "revision"
     config = "config"
@@ -118,36 +127,20 @@ def test_get_cache_entry_from_steps() -> None:
         http_status=HTTPStatus.INTERNAL_SERVER_ERROR,
     )
 
+    def get_http_status(processing_steps: List[ProcessingStep]) -> HTTPStatus:
+        best_response_kind = get_best_response_kind_from_steps(
+            processing_steps, dataset, config, None, processing_graph, app_config.common.hf_endpoint
+        )
+        return get_serialized_response(best_response_kind, dataset, config, None).http_status
+
     # succeeded result is returned
-    result = get_cache_entry_from_steps(
-        [step_without_error, step_with_error],
-        dataset,
-        config,
-        None,
-        processing_graph,
-        app_config.common.hf_endpoint,
-    )
-    assert result
-    assert result["http_status"] == HTTPStatus.OK
+    assert get_http_status([step_without_error, step_with_error]) == HTTPStatus.OK
 
     # succeeded result is returned even if first step failed
-    result = get_cache_entry_from_steps(
-        [step_with_error, step_without_error],
-        dataset,
-        config,
-        None,
-        processing_graph,
-        app_config.common.hf_endpoint,
-    )
-    assert result
-    assert result["http_status"] == HTTPStatus.OK
+    assert get_http_status([step_with_error, step_without_error]) == HTTPStatus.OK
 
     # error result is returned if all steps failed
-    result = get_cache_entry_from_steps(
-        [step_with_error, step_with_error], dataset, config, None, processing_graph, app_config.common.hf_endpoint
-    )
-    assert result
-    assert result["http_status"] == HTTPStatus.INTERNAL_SERVER_ERROR
+    assert get_http_status([step_with_error, step_with_error]) == HTTPStatus.INTERNAL_SERVER_ERROR
 
     # pending job throws exception
     queue = Queue()
@@ -156,6 +149,52 @@ def test_get_cache_entry_from_steps() -> None:
     with patch("api.routes.endpoint.get_dataset_git_revision", return_value=revision):
         # ^ the dataset does not exist on the Hub, we don't want to raise an issue here
         with raises(ResponseNotReadyError):
-            get_cache_entry_from_steps(
+            get_best_response_kind_from_steps(
                 [non_existent_step], dataset, None, None, processing_graph, app_config.common.hf_endpoint
             )
+
+
+def test_get_serialized_response() -> None:
+    dataset = "dataset"
+    config = "config"
+    kind = "config-split-names-from-info"
+
+    app_config = AppConfig.from_env()
+    processing_graph = ProcessingGraph(ProcessingGraphConfig().specification)
+    step = processing_graph.get_processing_step(kind)
+    response_cache = ResponseCache(max_bytes=1_000_000)
+
+    def get_serialized_response_from_steps() -> SerializedResponse:
+        best_response_kind = get_best_response_kind_from_steps(
+            [step], dataset, config, None, processing_graph, app_config.common.hf_endpoint
+        )
+        return get_serialized_response(best_response_kind, dataset, config, None, response_cache=response_cache)
+
+    upsert_response(kind=kind, dataset=dataset, config=config, content={"a": 1}, http_status=HTTPStatus.OK)
+    serialized_response = get_serialized_response_from_steps()
+    assert serialized_response.body == b'{"a":1}'
+    assert serialized_response.http_status == HTTPStatus.OK
+    assert response_cache.num_bytes == len(serialized_response.body)
+
+    # served from memory while the cache entry is not updated
+    assert get_serialized_response_from_steps() is serialized_response
+
+    # the updated cache entry is fetched again
+    upsert_response(kind=kind, dataset=dataset, config=config, content={"a": 2}, http_status=HTTPStatus.OK)
+    assert get_serialized_response_from_steps().body == b'{"a":2}'
+
+
+def test_get_cache_entry_etag() -> None:
+    best_response_kind = BestResponseKind(kind="kind", updated_at=datetime(2023, 7, 1), job_runner_version=1)
+    etag = get_cache_entry_etag(best_response_kind, "dataset", "config", None)
+    assert etag.startswith('"') and etag.endswith('"')
+    assert get_cache_entry_etag(best_response_kind, "dataset", "config", None) == etag
+    # the ETag changes when the cache entry is updated
+    assert (
+        get_cache_entry_etag(replace(best_response_kind, updated_at=datetime(2023, 7, 2)), "dataset", "config", None)
+        != etag
+    )
+    assert get_cache_entry_etag(replace(best_response_kind, job_runner_version=2), "dataset", "config", None) != etag
+    assert get_cache_entry_etag(best_response_kind, "dataset", "config", "split") != etag
+    # the hash of the serialized content is used if it has been stored
+    assert get_cache_entry_etag(replace(best_response_kind, content_hash="abc"), "dataset", "config", None) == '"abc"'
@@ -1,11 +1,15 @@
 # SPDX-License-Identifier: Apache-2.0
 # Copyright 2022 The HuggingFace Authors.
 
+import asyncio
 from typing import Any, Mapping
+from unittest.mock import patch
 
 import pytest
+from libcommon.processing_graph import ProcessingGraph
+from libcommon.queue import DatasetUpdate
 
-from api.routes.webhook import parse_payload
+from api.routes.webhook import DatasetUpdatesConsumer, parse_payload, process_payload
 
 
 @pytest.mark.parametrize(
@@ -59,3 +63,56 @@ def test_parse_payload(
             parse_payload(payload)
     else:
         parse_payload(payload)
+
+
+def get_update_payload(dataset: str, revision: str) -> Mapping[str, Any]:
+    return {"event": "update", "repo": {"type": "dataset", "name": dataset, "headSha": revision}}
+
+
+def test_process_payload_buffer_updates(processing_graph: ProcessingGraph) -> None:
+    with patch("api.routes.webhook.backfill_dataset") as backfill_dataset_mock:
+        for revision in ["revision1", "revision2"]:
+            process_payload(
+                processing_graph=processing_graph,
+                payload=parse_payload(get_update_payload(dataset="dataset", revision=revision)),
+                buffer_updates=True,
+            )
+    # the dataset is not backfilled: the two updates are buffered, and coalesced
+    backfill_dataset_mock.assert_not_called()
+    assert [(update.dataset, update.revision, update.num_events) for update in DatasetUpdate.objects()] == [
+        ("dataset", "revision2", 2)
+    ]
+
+
+def test_process_payload_without_buffer(processing_graph: ProcessingGraph) -> None:
+    with patch("api.routes.webhook.backfill_dataset") as backfill_dataset_mock:
+        process_payload(
+            processing_graph=processing_graph,
+            payload=parse_payload(get_update_payload(dataset="dataset", revision="revision")),
+            buffer_updates=False,
+        )
+    backfill_dataset_mock.assert_called_once()
+    assert backfill_dataset_mock.call_args.kwargs["revision"] == "revision"
+    assert DatasetUpdate.objects().count() == 0
+
+
+def test_dataset_updates_consumer(processing_graph: ProcessingGraph) -> None:
+    consumer = DatasetUpdatesConsumer(
+        processing_graph=processing_graph, debounce_seconds=5, max_wait_seconds=60, interval_seconds=0.01
+    )
+
+    async def run_consumer() -> None:
+        await consumer.start()
+        await asyncio.sleep(0.1)
+        await consumer.stop()
+
+    def fail_once(**kwargs: Any) -> int:
+        if mock.call_count == 1:
+            raise RuntimeError("the first call fails")
+        return 0
+
+    with patch("api.routes.webhook.process_dataset_updates", side_effect=fail_once) as mock:
+        asyncio.run(run_consumer())
+    # the consumer keeps processing the updates, even after an error
+    assert mock.call_count > 1
+    assert mock.call_args.kwargs["debounce_seconds"] == 5
@@ -4,6 +4,7 @@
 from typing import Optional
 
 import pytest
+from libcommon.simple_cache import update_valid_datasets_snapshot
 from starlette.testclient import TestClient
 
 from api.app import create_app_with_config
@@ -53,6 +54,17 @@ def test_get_valid_datasets(client: TestClient) -> None:
     assert "viewer" in response.json()
 
 
+def test_get_precomputed_valid_datasets(client: TestClient) -> None:
+    update_valid_datasets_snapshot(viewer_kinds=[], preview_kinds=[])
+    response = client.get("/valid")
+    assert response.status_code == 200
+    assert response.json() == {"valid": [], "preview": [], "viewer": []}
+    etag = response.headers["ETag"]
+    response = client.get("/valid", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+
+
 def test_get_healthcheck(client: TestClient) -> None:
     response = client.get("/healthcheck")
     assert response.status_code == 200
@@ -2,8 +2,9 @@
 # Copyright 2022 The HuggingFace Authors.
 
 import time
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import nullcontext as does_not_raise
-from typing import Any, Dict, Mapping, Optional
+from typing import Any, Dict, List, Mapping, Optional
 
 import jwt
 import pytest
@@ -14,7 +15,7 @@ from starlette.requests import Request
 from werkzeug.wrappers import Request as WerkzeugRequest
 from werkzeug.wrappers import Response as WerkzeugResponse
 
-from api.authentication import auth_check
+from api.authentication import AuthCheckCache, AuthCheckCacheKey, auth_check
 from api.utils import (
     AuthCheckHubRequestError,
     ExternalAuthenticatedError,
@@ -175,3 +176,98 @@ def test_bypass_auth_public_key(
             hf_jwt_public_key=hf_jwt_public_key,
             hf_jwt_algorithm=algorithm_rs256,
         )
+
+
+@pytest.mark.parametrize(
+    "headers,expectation",
+    [
+        ({"Cookie": "some cookie"}, pytest.raises(ExternalUnauthenticatedError)),
+        ({"Authorization": "Bearer invalid"}, pytest.raises(ExternalAuthenticatedError)),
+        ({}, does_not_raise()),
+    ],
+)
+def test_auth_check_cache(
+    httpserver: HTTPServer,
+    hf_endpoint: str,
+    hf_auth_path: str,
+    headers: Mapping[str, str],
+    expectation: Any,
+) -> None:
+    dataset = "dataset"
+    external_auth_url = hf_endpoint + hf_auth_path
+    httpserver.expect_request(hf_auth_path % dataset).respond_with_handler(auth_callback)
+    auth_check_cache = AuthCheckCache(ttl_seconds=60, max_size=10)
+    for _ in range(3):
+        with expectation:
+            auth_check(
+                dataset,
+                external_auth_url=external_auth_url,
+                request=create_request(headers=headers),
+                auth_check_cache=auth_check_cache,
+            )
+    # the decision (positive or negative) is cached
+    assert len(httpserver.log) == 1
+    with pytest.raises(ExternalUnauthenticatedError):
+        auth_check(
+            dataset,
+            external_auth_url=external_auth_url,
+            request=create_request(headers={"Cookie": "another cookie"}),
+            auth_check_cache=auth_check_cache,
+        )
+    # other credentials: not cached
+    assert len(httpserver.log) == 2
+
+
+def test_auth_check_cache_does_not_cache_errors(httpserver: HTTPServer, hf_endpoint: str, hf_auth_path: str) -> None:
+    dataset = "dataset"
+    external_auth_url = hf_endpoint + hf_auth_path
+    httpserver.expect_request(hf_auth_path % dataset).respond_with_handler(raise_value_error)
+    auth_check_cache = AuthCheckCache(ttl_seconds=60, max_size=10)
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            auth_check(dataset, external_auth_url=external_auth_url, auth_check_cache=auth_check_cache)
+    assert len(httpserver.log) == 2
+
+
+def test_auth_check_cache_expiration_and_eviction() -> None:
+    auth_check_cache = AuthCheckCache(ttl_seconds=0.1, max_size=2)
+    calls: List[AuthCheckCacheKey] = []
+
+    def get_status_code(key: AuthCheckCacheKey) -> int:
+        def fetch() -> int:
+            calls.append(key)
+            return 200
+
+        return auth_check_cache.get_status_code(key=key, fetch=fetch)
+
+    key_a, key_b, key_c = ("a", "hash"), ("b", "hash"), ("c", "hash")
+    get_status_code(key_a)
+    get_status_code(key_b)
+    get_status_code(key_a)
+    assert calls == [key_a, key_b]
+    # the least recently used entry (b) is evicted
+    get_status_code(key_c)
+    get_status_code(key_a)
+    get_status_code(key_b)
+    assert calls == [key_a, key_b, key_c, key_b]
+    # the entries expire
+    time.sleep(0.2)
+    get_status_code(key_b)
+    assert calls == [key_a, key_b, key_c, key_b, key_b]
+
+
+def test_auth_check_cache_single_flight() -> None:
+    auth_check_cache = AuthCheckCache(ttl_seconds=60, max_size=10)
+    key = ("dataset", "hash")
+    num_calls = 0
+
+    def fetch() -> int:
+        nonlocal num_calls
+        num_calls += 1
+        time.sleep(0.2)
+        return 403
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        status_codes = list(executor.map(lambda _: auth_check_cache.get_status_code(key=key, fetch=fetch), range(8)))
+    assert status_codes == [403] * 8
+    assert num_calls == 1
@@ -2,13 +2,19 @@
 # Copyright 2022 The HuggingFace Authors.
 
 import datetime
+import time
 from contextlib import nullcontext as does_not_raise
 from typing import Any, Dict, Optional
 
 import jwt
 import pytest
 
-from api.jwt_token import is_jwt_valid, parse_jwt_public_key
+from api.jwt_token import (
+    VERIFIED_JWT_CACHE,
+    VerifiedJWTCache,
+    is_jwt_valid,
+    parse_jwt_public_key,
+)
 
 HUB_JWT_KEYS = [{"crv": "Ed25519", "x": "-RBhgyNluwaIL5KFJb6ZOL2H1nmyI8mW4Z2EHGDGCXM", "kty": "OKP"}]
 HUB_JWT_ALGORITHM = "EdDSA"
@@ -123,3 +129,44 @@ algorithm_rs256 = "RS256"
 def test_is_jwt_valid(public_key: Optional[str], payload: Dict[str, str], expected: bool) -> None:
     token = jwt.encode(payload, private_key, algorithm=algorithm_rs256)
     assert is_jwt_valid(dataset=dataset_ok, token=token, public_key=public_key, algorithm=algorithm_rs256) is expected
+
+
+def test_is_jwt_valid_verifies_the_signature_once(monkeypatch: pytest.MonkeyPatch) -> None:
+    VERIFIED_JWT_CACHE.clear()
+    decode_calls = 0
+    decode = jwt.decode
+
+    def counting_decode(*args: Any, **kwargs: Any) -> Any:
+        nonlocal decode_calls
+        decode_calls += 1
+        return decode(*args, **kwargs)
+
+    monkeypatch.setattr(jwt, "decode", counting_decode)
+    token = jwt.encode(payload_ok, private_key, algorithm=algorithm_rs256)
+    for _ in range(3):
+        assert is_jwt_valid(dataset=dataset_ok, token=token, public_key=public_key, algorithm=algorithm_rs256)
+    assert decode_calls == 1
+    # the claims are cached, but the dataset is still checked
+    assert not is_jwt_valid(dataset=wrong_dataset, token=token, public_key=public_key, algorithm=algorithm_rs256)
+    # another public key does not use the cached claims
+    assert not is_jwt_valid(dataset=dataset_ok, token=token, public_key=other_public_key, algorithm=algorithm_rs256)
+    assert decode_calls == 2
+
+
+def test_verified_jwt_cache() -> None:
+    cache = VerifiedJWTCache(max_size=2)
+    now = time.time()
+    cache.set("a", {"exp": now + 1000})
+    cache.set("b", {"exp": now + 1000})
+    assert cache.get("a") is not None
+    # the least recently used entry (b) is evicted
+    cache.set("c", {"exp": now + 1000})
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    # the entries expire at "exp"
+    cache.set("d", {"exp": now - 1})
+    assert cache.get("d") is None
+    # the claims without "exp" are not cached
+    cache.set("e", {})
+    assert cache.get("e") is None
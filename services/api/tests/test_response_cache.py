@@ -0,0 +1,85 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2023 The HuggingFace Authors.
+
+from datetime import datetime
+from http import HTTPStatus
+from typing import Optional
+
+from api.response_cache import ResponseCache, SerializedResponse
+
+UPDATED_AT = datetime(2023, 7, 1)
+OTHER_UPDATED_AT = datetime(2023, 7, 2)
+REVISION = "revision"
+
+
+def get_serialized_response(body: bytes, updated_at: Optional[datetime] = UPDATED_AT) -> SerializedResponse:
+    return SerializedResponse(
+        body=body,
+        http_status=HTTPStatus.OK,
+        error_code=None,
+        dataset_git_revision=REVISION,
+        updated_at=updated_at,
+    )
+
+
+def test_response_cache_get() -> None:
+    response_cache = ResponseCache(max_bytes=1_000)
+    key = ("kind", "dataset", "config", None)
+    assert response_cache.get(key, updated_at=UPDATED_AT, dataset_git_revision=REVISION) is None
+
+    serialized_response = get_serialized_response(b'{"a":1}')
+    response_cache.set(key, serialized_response)
+    assert response_cache.get(key, updated_at=UPDATED_AT, dataset_git_revision=REVISION) == serialized_response
+    assert (
+        response_cache.get(
+            ("kind", "dataset", "config", "split"), updated_at=UPDATED_AT, dataset_git_revision=REVISION
+        )
+        is None
+    )
+    assert response_cache.num_bytes == 7
+
+    # the entry has been moved to another revision: it's removed
+    assert response_cache.get(key, updated_at=UPDATED_AT, dataset_git_revision="other_revision") is None
+    assert response_cache.get(key, updated_at=UPDATED_AT, dataset_git_revision=REVISION) is None
+    response_cache.set(key, serialized_response)
+
+    # the entry is outdated: it's removed
+    assert response_cache.get(key, updated_at=OTHER_UPDATED_AT, dataset_git_revision=REVISION) is None
+    assert response_cache.get(key, updated_at=UPDATED_AT, dataset_git_revision=REVISION) is None
+    assert response_cache.num_bytes == 0
+
+
+def test_response_cache_set_replaces_the_entry() -> None:
+    response_cache = ResponseCache(max_bytes=1_000)
+    key = ("kind", "dataset", None, None)
+    response_cache.set(key, get_serialized_response(b"[1]"))
+    response_cache.set(key, get_serialized_response(b"[1,2]", updated_at=OTHER_UPDATED_AT))
+    assert response_cache.num_bytes == 5
+    assert response_cache.get(
+        key, updated_at=OTHER_UPDATED_AT, dataset_git_revision=REVISION
+    ) == get_serialized_response(b"[1,2]", updated_at=OTHER_UPDATED_AT)
+
+
+def test_response_cache_eviction() -> None:
+    response_cache = ResponseCache(max_bytes=100)
+    keys = [("kind", f"dataset{i}", None, None) for i in range(3)]
+    for key in keys:
+        response_cache.set(key, get_serialized_response(b"0" * 10))
+    assert response_cache.num_bytes == 30
+    # the first key is used, the second one is the least recently used
+    assert response_cache.get(keys[0], updated_at=UPDATED_AT, dataset_git_revision=REVISION) is not None
+    for i in range(8):
+        response_cache.set(("kind", f"other{i}", None, None), get_serialized_response(b"0" * 10))
+    assert response_cache.num_bytes == 100
+    assert response_cache.get(keys[0], updated_at=UPDATED_AT, dataset_git_revision=REVISION) is not None
+    assert response_cache.get(keys[1], updated_at=UPDATED_AT, dataset_git_revision=REVISION) is None
+
+
+def test_response_cache_does_not_store_large_entries() -> None:
+    response_cache = ResponseCache(max_bytes=100)
+    key = ("kind", "dataset", None, None)
+    response_cache.set(key, get_serialized_response(b"0" * 11))
+    assert response_cache.get(key, updated_at=UPDATED_AT, dataset_git_revision=REVISION) is None
+    assert response_cache.num_bytes == 0
+    response_cache.set(key, get_serialized_response(b"0" * 10, updated_at=None))
+    assert response_cache.get(key, updated_at=UPDATED_AT, dataset_git_revision=REVISION) is None
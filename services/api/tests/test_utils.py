@@ -0,0 +1,27 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2023 The HuggingFace Authors.
+
+from typing import Optional
+
+import pytest
+
+from api.utils import get_etag, is_etag_matching
+
+ETAG = get_etag("abc")
+
+
+@pytest.mark.parametrize(
+    "if_none_match,expected",
+    [
+        (None, False),
+        ("", False),
+        ('"abc"', True),
+        ('W/"abc"', True),
+        ('"def"', False),
+        ('"def", "abc"', True),
+        ("*", True),
+        ("abc", False),
+    ],
+)
+def test_is_etag_matching(if_none_match: Optional[str], expected: bool) -> None:
+    assert is_etag_matching(if_none_match, ETAG) is expected
@@ -2,7 +2,7 @@
 # Copyright 2022 The HuggingFace Authors.
 
 from dataclasses import dataclass, field
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from environs import Env
 from libcommon.config import (
@@ -25,6 +25,7 @@ WORKER_MAX_JOB_DURATION_SECONDS = 20 * 60
 WORKER_MAX_LOAD_PCT = 70
 WORKER_MAX_MEMORY_PCT = 80
 WORKER_MAX_MISSING_HEARTBEATS = 5
+WORKER_PRIORITY_AGING_SECONDS = 0
 WORKER_SLEEP_SECONDS = 15
 WORKER_STATE_FILE_PATH = None
 
@@ -33,12 +34,17 @@ def get_empty_str_list() -> List[str]:
     return []
 
 
+def get_empty_float_dict() -> Dict[str, float]:
+    return {}
+
+
 @dataclass(frozen=True)
 class WorkerConfig:
     content_max_bytes: int = WORKER_CONTENT_MAX_BYTES
     heartbeat_interval_seconds: float = WORKER_HEARTBEAT_INTERVAL_SECONDS
     job_types_blocked: list[str] = field(default_factory=get_empty_str_list)
     job_types_only: list[str] = field(default_factory=get_empty_str_list)
+    job_type_weights: Dict[str, float] = field(default_factory=get_empty_float_dict)
     kill_long_job_interval_seconds: float = WORKER_KILL_LONG_JOB_INTERVAL_SECONDS
     kill_zombies_interval_seconds: float = WORKER_KILL_ZOMBIES_INTERVAL_SECONDS
     max_disk_usage_pct: int = WORKER_MAX_DISK_USAGE_PCT
@@ -46,6 +52,8 @@ class WorkerConfig:
     max_load_pct: int = WORKER_MAX_LOAD_PCT
     max_memory_pct: int = WORKER_MAX_MEMORY_PCT
     max_missing_heartbeats: int = WORKER_MAX_MISSING_HEARTBEATS
+    priority_aging_seconds: float = WORKER_PRIORITY_AGING_SECONDS
+    priority_weights: Dict[str, float] = field(default_factory=get_empty_float_dict)
     sleep_seconds: float = WORKER_SLEEP_SECONDS
     state_file_path: Optional[str] = WORKER_STATE_FILE_PATH
     storage_paths: List[str] = field(default_factory=get_empty_str_list)
@@ -61,6 +69,9 @@ class WorkerConfig:
                 ),
                 job_types_blocked=env.list(name="JOB_TYPES_BLOCKED", default=get_empty_str_list()),
                 job_types_only=env.list(name="JOB_TYPES_ONLY", default=get_empty_str_list()),
+                job_type_weights=env.dict(
+                    name="JOB_TYPE_WEIGHTS", subcast_values=float, default=get_empty_float_dict()
+                ),
                 kill_long_job_interval_seconds=env.float(
                     name="KILL_LONG_JOB_INTERVAL_SECONDS", default=WORKER_KILL_LONG_JOB_INTERVAL_SECONDS
                 ),
@@ -74,6 +85,10 @@ class WorkerConfig:
                 max_load_pct=env.int(name="MAX_LOAD_PCT", default=WORKER_MAX_LOAD_PCT),
                 max_memory_pct=env.int(name="MAX_MEMORY_PCT", default=WORKER_MAX_MEMORY_PCT),
                 max_missing_heartbeats=env.int(name="MAX_MISSING_HEARTBEATS", default=WORKER_MAX_MISSING_HEARTBEATS),
+                priority_aging_seconds=env.float(name="PRIORITY_AGING_SECONDS", default=WORKER_PRIORITY_AGING_SECONDS),
+                priority_weights=env.dict(
+                    name="PRIORITY_WEIGHTS", subcast_values=float, default=get_empty_float_dict()
+                ),
                 sleep_seconds=env.float(name="SLEEP_SECONDS", default=WORKER_SLEEP_SECONDS),
                 state_file_path=env.str(
                     name="STATE_FILE_PATH", default=WORKER_STATE_FILE_PATH
@@ -6,13 +6,15 @@ import os
 import sys
 from datetime import datetime, timedelta
 from random import random
-from typing import Any, Callable, Optional, Tuple, Union
+from typing import Any, Callable, List, Optional, Tuple, Union
 
 import orjson
 from filelock import FileLock
-from libcommon.processing_graph import ProcessingGraph
+from libcommon.exceptions import JobManagerCrashedError
+from libcommon.orchestrator import finish_crashed_jobs
+from libcommon.processing_graph import ProcessingGraph, ProcessingStepDoesNotExist
 from libcommon.queue import Queue
-from libcommon.utils import get_datetime
+from libcommon.utils import JobInfo, JobResult, get_datetime
 from mirakuru import OutputExecutor
 
 from worker import start_worker_loop
@@ -134,17 +136,37 @@ class WorkerExecutor:
     def kill_zombies(self) -> None:
         queue = Queue()
         zombies = queue.get_zombies(max_seconds_without_heartbeat=self.max_seconds_without_heartbeat_for_zombies)
-        message = "Job manager crashed while running this job (missing heartbeats)."
+        if not zombies:
+            return
+        error = JobManagerCrashedError(message="Job manager crashed while running this job (missing heartbeats).")
+        job_results: List[JobResult] = []
+        unknown_zombies: List[JobInfo] = []
         for zombie in zombies:
-            job_runner = self.job_runner_factory.create_job_runner(zombie)
-            job_manager = JobManager(
-                job_info=zombie,
-                app_config=self.app_config,
-                job_runner=job_runner,
-                processing_graph=self.processing_graph,
+            try:
+                processing_step = self.processing_graph.get_processing_step_by_job_type(zombie["type"])
+            except ProcessingStepDoesNotExist:
+                unknown_zombies.append(zombie)
+                continue
+            job_results.append(
+                {
+                    "job_info": zombie,
+                    "job_runner_version": processing_step.job_runner_version,
+                    "is_success": False,
+                    "output": {
+                        "content": dict(error.as_response()),
+                        "http_status": error.status_code,
+                        "error_code": error.code,
+                        "details": dict(error.as_response_with_cause()),
+                        "progress": None,
+                    },
+                }
             )
-            job_manager.set_crashed(message=message)
-            logging.info(f"Killing zombie. Job info = {zombie}")
+        killed_zombies_count = finish_crashed_jobs(job_results=job_results, processing_graph=self.processing_graph)
+        if unknown_zombies:
+            # the job type is not in the processing graph anymore: the job is killed, but nothing is cached
+            killed_zombies_count += len(queue.kill_zombies(zombies=unknown_zombies))
+            logging.warning(f"Killed zombies with a job type that does not exist. Job infos = {unknown_zombies}")
+        logging.info(f"Killed {killed_zombies_count} zombies. Job infos = {zombies}")
 
     def kill_long_job(self, worker_loop_executor: OutputExecutor) -> None:
         worker_state = self.get_state()
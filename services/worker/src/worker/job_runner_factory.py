@@ -5,7 +5,7 @@ from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from pathlib import Path
 
-from libcommon.processing_graph import ProcessingGraph
+from libcommon.processing_graph import ProcessingGraph, ProcessingStepDoesNotExist
 from libcommon.storage import StrPath
 from libcommon.utils import JobInfo
 
@@ -78,7 +78,7 @@ class JobRunnerFactory(BaseJobRunnerFactory):
         job_type = job_info["type"]
         try:
             processing_step = self.processing_graph.get_processing_step_by_job_type(job_type)
-        except ValueError as e:
+        except ProcessingStepDoesNotExist as e:
             raise ValueError(
                 f"Unsupported job type: '{job_type}'. The job types declared in the processing graph are:"
                 f" {[processing_step.job_type for processing_step in self.processing_graph.get_processing_steps()]}"
@@ -36,9 +36,10 @@ def compute_is_valid_response(dataset: str) -> Tuple[DatasetIsValidResponse, flo
     """
     logging.info(f"get is-valid response for dataset={dataset}")
 
+    # one aggregation for all the kinds
     validity_by_kind = get_validity_by_kind(dataset=dataset, kinds=SPLIT_KINDS + FIRST_ROWS_KINDS)
-    is_valid = any(validity_by_kind[kind] for kind in SPLIT_KINDS if kind in validity_by_kind) and any(
-        validity_by_kind[kind] for kind in FIRST_ROWS_KINDS if kind in validity_by_kind
+    is_valid = any(validity_by_kind.get(kind, False) for kind in SPLIT_KINDS) and any(
+        validity_by_kind.get(kind, False) for kind in FIRST_ROWS_KINDS
     )
 
     return (DatasetIsValidResponse({"valid": is_valid}), 1.0)
@@ -12,7 +12,7 @@ import orjson
 from filelock import FileLock
 from libcommon.processing_graph import ProcessingGraph
 from libcommon.queue import EmptyQueueError, Queue
-from libcommon.utils import JobInfo, get_datetime
+from libcommon.utils import JobInfo, Priority, get_datetime
 from psutil import cpu_count, disk_usage, getloadavg, swap_memory, virtual_memory
 
 from worker.config import AppConfig
@@ -53,7 +53,14 @@ class Loop:
     storage_paths: set[str] = field(init=False)
 
     def __post_init__(self) -> None:
-        self.queue = Queue()
+        self.queue = Queue(
+            priority_weights={
+                Priority(priority): weight for priority, weight in self.app_config.worker.priority_weights.items()
+            },
+            job_type_weights=self.app_config.worker.job_type_weights,
+            priority_aging_seconds=self.app_config.worker.priority_aging_seconds,
+            processing_graph=self.processing_graph,
+        )
         self.storage_paths = set(self.app_config.worker.storage_paths).union(self.library_cache_paths)
 
     def has_memory(self) -> bool:
@@ -271,6 +271,40 @@ def test_executor_kill_zombies(
         CachedResponse.objects().delete()
 
 
+def test_executor_kill_zombies_with_unknown_job_type(
+    executor: WorkerExecutor,
+    set_zombie_job_in_queue: Job,
+    tmp_dataset_repo_factory: Callable[[str], str],
+    cache_mongo_resource: CacheMongoResource,
+) -> None:
+    zombie = set_zombie_job_in_queue
+    tmp_dataset_repo_factory(zombie.dataset)
+    unknown_zombie = Job(
+        type="job-type-removed-from-the-graph",
+        dataset=zombie.dataset,
+        revision=zombie.revision,
+        unicity_id="unknown_unicity_id",
+        namespace="user",
+        priority=zombie.priority,
+        status=Status.STARTED,
+        created_at=zombie.created_at,
+        started_at=zombie.started_at,
+        last_heartbeat=zombie.last_heartbeat,
+    )
+    unknown_zombie.save()
+    try:
+        executor.kill_zombies()
+        # the zombie with an unknown job type doesn't prevent the other zombies from being killed
+        assert Job.objects(pk=zombie.pk).get().status == Status.ERROR
+        assert Job.objects(pk=unknown_zombie.pk).get().status == Status.ERROR
+        # but nothing is cached for it
+        assert CachedResponse.objects().count() == 1
+        assert CachedResponse.objects().get().kind == zombie.type
+    finally:
+        unknown_zombie.delete()
+        CachedResponse.objects().delete()
+
+
 def test_executor_start(
     executor: WorkerExecutor,
     queue_mongo_resource: QueueMongoResource,
@@ -224,7 +224,10 @@ def test_job_runner_set_crashed(
     assert response.dataset_git_revision == revision
     assert response.config == config
     assert response.split == split
-    assert response.content == expected_error
+    assert (
+        get_response(kind=test_processing_step.cache_kind, dataset=dataset, config=config, split=split)["content"]
+        == expected_error
+    )
     assert response.details == expected_error
     # TODO: check if it stores the correct dataset git sha and job version when it's implemented
 